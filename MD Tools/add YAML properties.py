@@ -1,88 +1,233 @@
+import argparse
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
 
 # ================== НАСТРОЙКИ ==================
-# Словарь с новыми свойствами для добавления в YAML-заголовки.
-# Ключ - имя свойства, значение - его значение.
-NEW_PROPERTIES = {
-    "wikilinks": "[[Windows Software]]"
-    # "new_property_2": "value_2",
-    # "new_property_3": "value_3"
-}
+# Папка для обработки (обходится рекурсивно). Относительный путь считается от папки скрипта.
+# Чтобы пройтись по всему хранилищу, укажите абсолютный путь, например "C:/Obsidian/MyVault".
+TARGET_DIR = "working folder"
+
+# Папки и файлы, которые не обрабатываются (шаблоны относительно TARGET_DIR, '**' — любые подпапки)
+EXCLUDE_GLOBS = [".obsidian/**", ".trash/**", ".git/**"]
+
+# Какие заметки менять — условие на свойства frontmatter, например:
+#   'type contains contact and Area == Social'
+#   '(status == "in progress" or important == true) and not archived exists'
+# Пустая строка — все заметки с frontmatter.
+SELECTOR = ""
+
+# Правки по порядку:
+#   ("set", "свойство", значение)        — записать значение;
+#   ("append", "свойство", значение)     — добавить элемент в список (повтор не добавляется);
+#   ("remove", "свойство")               — удалить свойство;
+#   ("remove", "свойство", значение)     — убрать элемент из списка;
+#   ("rename", "свойство", "новое_имя")  — переименовать свойство.
+MUTATIONS = [
+    ("append", "wikilinks", "[[Windows Software]]"),
+    # ("set", "status", "in progress"),
+    # ("rename", "tags_old", "tags"),
+]
+
+# Индекс frontmatter сохраняется рядом со скриптом: повторный запуск читает только измененные заметки
+INDEX_CACHE_FILE_NAME = ".frontmatter_index_cache.json"
+
+# Число процессов: None — по числу ядер, 1 — последовательно
+MAX_WORKERS = None
+
+# True — только показать, какие файлы изменятся, ничего не записывая
+DRY_RUN = False
 # ===============================================
 
-# PyYAML требуется для работы. Установите его: pip install PyYAML
-try:
-    import yaml
-except ImportError:
-    print("Ошибка: Библиотека PyYAML не найдена. Пожалуйста, установите ее: pip install PyYAML", file=sys.stderr)
-    sys.exit(1)
-    
-def process_file(file_path, new_properties):
-    """Читает, обновляет YAML и перезаписывает один файл, если это необходимо."""
-    filename = os.path.basename(file_path)
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except IOError as e:
-        print(f"Ошибка чтения файла {filename}: {e}")
-        return
+# Индекс frontmatter и точечная правка заголовков лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_frontmatter import parse_frontmatter, FrontmatterError
+from vault_frontmatter_columns import build_columns_index
+from vault_frontmatter_index import compile_selector, SelectorError
+from vault_frontmatter_patch import (
+    Mutation, mutate_file, mutate_files, OP_RENAME,
+    MUTATE_CHANGED, MUTATE_NO_FRONTMATTER, MUTATE_UNCHANGED, MUTATE_UNSAFE,
+)
+from vault_paths import PathFilter
 
-    if not lines or not lines[0].startswith('---'):
-        print(f"В файле отсутствует YAML-заголовок: {filename}")
-        return
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-    try:
-        # Ищем закрывающий '---' начиная со второй строки
-        end_yaml_idx = lines[1:].index('---\n') + 1
-    except ValueError:
-        print(f"Предупреждение: Не найден закрывающий тег YAML в файле: {filename}")
-        return
+# Меньше выбранных файлов обрабатывается последовательно: запуск процессов дороже самой работы
+PARALLEL_MIN_FILES = 64
+CHUNK_SIZE = 32
+# Сколько измененных файлов перечислять в консоли поименно
+PRINT_LIMIT = 50
 
-    yaml_content = ''.join(lines[1:end_yaml_idx])
-    
+
+def to_mutation(spec) -> Mutation:
+    """Правка из кортежа настроек: (операция, свойство[, значение или новое имя])."""
+    op, key, *rest = spec
+    if op == OP_RENAME:
+        return Mutation(op, key, new_key=rest[0] if rest else None)
+    return Mutation(op, key, *rest[:1])
+
+
+def parse_cli_value(text: str):
+    """Значение из командной строки: true, 5, null — как в YAML, остальное — строкой ([[ссылки]] тоже)."""
     try:
-        # yaml.safe_load вернет None для пустого блока, `or {}` обработает этот случай
-        data = yaml.safe_load(yaml_content) or {}
-        if not isinstance(data, dict):
-            print(f"Предупреждение: YAML в файле {filename} не является словарем. Пропускаем.")
-            return
-    except yaml.YAMLError as e:
-        print(f"Предупреждение: Ошибка разбора YAML в файле {filename}: {e}. Пропускаем.")
-        return
+        value = parse_frontmatter(f"v: {text}\n")["v"]
+    except (FrontmatterError, TypeError, KeyError):
+        return text
+    return value if isinstance(value, (str, bool, int, float)) or value is None else text
 
-    # Обновляем данные, только если есть изменения, чтобы не перезаписывать файл зря
-    original_data = data.copy()
-    data.update(new_properties)
 
-    if data == original_data:
-        return # Изменения не требуются
+@dataclass
+class MutationReport:
+    """Итог правки свойств по хранилищу."""
+    selected: int = 0                                     # заметок подошло под условие
+    parsed: int = 0                                       # заметок разобрано заново при обновлении индекса
+    changed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    unsafe: List[Tuple[str, str]] = field(default_factory=list)
+    index_errors: List[Tuple[str, str]] = field(default_factory=list)
 
-    # Собираем новый файл и записываем его
-    new_yaml_str = yaml.dump(data, default_flow_style=False, allow_unicode=True, sort_keys=False)
-    new_content = ['---\n', new_yaml_str, '---\n'] + lines[end_yaml_idx + 1:]
 
+def run_mutations(
+    root: str,
+    selector: str,
+    mutations: Sequence[Mutation],
+    exclude: Sequence[str] = EXCLUDE_GLOBS,
+    cache_path: Optional[str] = None,
+    max_workers: Optional[int] = MAX_WORKERS,
+    dry_run: bool = DRY_RUN,
+) -> MutationReport:
+    """
+    Выбирает заметки по условию через индекс frontmatter (открываются только подходящие)
+    и применяет к ним правки параллельно, с атомарной записью измененных файлов.
+    """
+    compiled = compile_selector(selector)
+    index = build_columns_index(root, PathFilter(("**/*.md",), exclude), cache_path, max_workers)
+    report = MutationReport(parsed=index.parsed, index_errors=index.errors)
+    rel_paths = index.select(compiled)
+    report.selected = len(rel_paths)
+
+    if max_workers == 1 or len(rel_paths) < PARALLEL_MIN_FILES:
+        results = mutate_files(root, rel_paths, mutations, dry_run)
+    else:
+        chunks = [rel_paths[i:i + CHUNK_SIZE] for i in range(0, len(rel_paths), CHUNK_SIZE)]
+        results = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(mutate_files, root, chunk, list(mutations), dry_run) for chunk in chunks]
+            for future in futures:
+                results.extend(future.result())
+
+    for rel_path, status, frontmatter, error in results:
+        if status == MUTATE_CHANGED:
+            report.changed.append(rel_path)
+            if not dry_run:
+                index.update(root, rel_path, frontmatter)
+        elif status == MUTATE_UNCHANGED:
+            report.unchanged += 1
+        elif status == MUTATE_NO_FRONTMATTER:
+            report.unsafe.append((rel_path, "frontmatter пропал с момента индексации"))
+        else:
+            report.unsafe.append((rel_path, error or "правку нельзя выполнить безопасно (ошибка YAML или конфликт имен)"))
+    if cache_path and index.dirty:
+        index.save(cache_path, root)
+    return report
+
+
+def print_report(report: MutationReport, dry_run: bool, elapsed: float):
+    action = "будет изменен" if dry_run else "обновлен"
+    for rel_path in report.changed[:PRINT_LIMIT]:
+        print(f"Файл {action}: {rel_path}")
+    if len(report.changed) > PRINT_LIMIT:
+        print(f"... и еще {len(report.changed) - PRINT_LIMIT}")
+    for rel_path, reason in report.unsafe:
+        print(f"⚠️ Пропущен {rel_path}: {reason}")
+    for rel_path, error in report.index_errors:
+        print(f"⚠️ Ошибка разбора YAML в файле {rel_path}: {error}")
+    print(
+        f"\nПодошло под условие: {report.selected}, "
+        f"{'требуют изменений' if dry_run else 'изменено'}: {len(report.changed)}, "
+        f"без изменений: {report.unchanged}, пропущено: {len(report.unsafe)}; "
+        f"заметок разобрано заново: {report.parsed} ({elapsed:.2f} сек.)"
+    )
+
+
+def process_file(file_path, mutations):
+    """Применяет правки к одному файлу и сообщает, изменился ли он."""
+    filename = os.path.basename(file_path)
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.writelines(new_content)
+        status, _ = mutate_file(file_path, [to_mutation(m) if not isinstance(m, Mutation) else m for m in mutations])
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Ошибка обработки файла {filename}: {e}")
+        return
+    if status == MUTATE_CHANGED:
         print(f"Файл обновлен: {filename}")
-    except IOError as e:
-        print(f"Ошибка записи в файл {filename}: {e}")
+    elif status == MUTATE_NO_FRONTMATTER:
+        print(f"В файле отсутствует YAML-заголовок: {filename}")
+    elif status == MUTATE_UNSAFE:
+        print(f"Предупреждение: Не удалось безопасно изменить YAML в файле {filename}. Пропускаем.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Меняет свойства frontmatter в заметках, выбранных по условию.")
+    parser.add_argument("--root", default=TARGET_DIR, help="папка или хранилище (обходится рекурсивно)")
+    parser.add_argument("--where", default=None, help="условие выбора заметок, например 'type contains contact'")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="записать значение")
+    parser.add_argument("--append", action="append", default=[], metavar="KEY=VALUE", help="добавить элемент в список")
+    parser.add_argument("--remove", action="append", default=[], metavar="KEY[=VALUE]", help="удалить свойство или элемент списка")
+    parser.add_argument("--rename", action="append", default=[], metavar="OLD=NEW", help="переименовать свойство")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="число процессов (1 — без параллельности)")
+    parser.add_argument("--dry-run", action="store_true", default=DRY_RUN, help="ничего не записывать")
+    return parser.parse_args(argv)
+
 
-def main():
+def mutations_from_args(args) -> List[Mutation]:
+    """Правки из командной строки в порядке групп set, append, remove, rename; без них — MUTATIONS."""
+    mutations = []
+    for op in ("set", "append", "remove", "rename"):
+        for item in getattr(args, op):
+            key, has_value, value = item.partition("=")
+            key = key.strip()
+            if op == "rename":
+                mutations.append(Mutation(op, key, new_key=value.strip()))
+            elif has_value:
+                mutations.append(Mutation(op, key, parse_cli_value(value.strip())))
+            else:
+                mutations.append(Mutation(op, key))
+    return mutations or [to_mutation(spec) for spec in MUTATIONS]
+
+
+def main(argv=None) -> int:
     """Основная функция для запуска скрипта."""
-    # Создаем абсолютный путь к 'working folder' рядом со скриптом
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    folder_path = os.path.join(script_dir, "working folder")
+    args = parse_args(argv)
+    root = args.root if os.path.isabs(args.root) else os.path.join(SCRIPT_DIR, args.root)
+    if not os.path.isdir(root):
+        print(f"Ошибка: Папка '{root}' не найдена.", file=sys.stderr)
+        return 1
+    try:
+        mutations = mutations_from_args(args)
+        selector = SELECTOR if args.where is None else args.where
+        compile_selector(selector)
+    except (ValueError, TypeError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
 
-    if not os.path.isdir(folder_path):
-        print(f"Ошибка: Папка '{folder_path}' не найдена.", file=sys.stderr)
-        sys.exit(1)
+    print(f"Начинаю обработку заметок в папке: {root}")
+    print(f"Условие: {selector or '(все заметки с frontmatter)'}")
+    print(f"Правки: {'; '.join(m.describe() for m in mutations)}\n")
+    started = time.perf_counter()
+    try:
+        report = run_mutations(root, selector, mutations, cache_path=os.path.join(SCRIPT_DIR, INDEX_CACHE_FILE_NAME),
+                               max_workers=args.workers, dry_run=args.dry_run)
+    except SelectorError as e:
+        print(f"Ошибка в условии: {e}", file=sys.stderr)
+        return 1
+    print_report(report, args.dry_run, time.perf_counter() - started)
+    return 0
 
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".md"):
-            file_path = os.path.join(folder_path, filename)
-            process_file(file_path, NEW_PROPERTIES)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
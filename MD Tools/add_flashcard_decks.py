@@ -1,63 +1,184 @@
+import argparse
+import hashlib
+import io
+import json
 import os
 import re
+import shutil
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
 
-def add_deck_headers_to_file(file_path, cards_per_deck=20):
+# ================== НАСТРОЙКИ ==================
+# Папка для обработки (обходится рекурсивно). Относительный путь считается от папки скрипта.
+TARGET_DIR = "working folder"
+
+# Какие файлы обрабатывать и какие пропускать (шаблоны относительно TARGET_DIR, '**' — любые подпапки)
+INCLUDE_GLOBS = ["**/*.md"]
+EXCLUDE_GLOBS = [".obsidian/**", ".trash/**", ".git/**"]
+
+# Тег колоды: заголовки имеют вид '<DECK_TAG_PREFIX>/01', '<DECK_TAG_PREFIX>/02', ...
+DECK_TAG_PREFIX = "#flashcards/300paints"
+# Количество карточек в одной колоде
+CARDS_PER_DECK = 20
+
+# Состояние (контрольные точки колод) и статистика сохраняются рядом со скриптом
+STATE_FILE_NAME = ".flashcard_decks_state.json"
+STATS_FILE_NAME = "flashcard_decks_stats.json"
+
+# Число процессов: None — по числу ядер, 1 — последовательно
+MAX_WORKERS = None
+# ===============================================
+
+# Потоковая перезапись файлов и выбор файлов лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_paths import PathFilter, iter_files
+from vault_stream import stream_rewrite, transform_text
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Хвост файла до этого размера переписывается на месте, больший — через временный файл
+TAIL_REWRITE_MAX_BYTES = 1 << 20
+HASH_CHUNK_BYTES = 1 << 20
+COMPARE_CHUNK_BYTES = 1 << 16
+# Меньше файлов обрабатывается последовательно: запуск процессов дороже самой работы
+PARALLEL_MIN_FILES = 64
+CHUNK_SIZE = 32
+
+# Что произошло с файлом
+ACTION_SKIPPED = "skipped"      # не менялся с прошлого запуска (по mtime и размеру), не читался
+ACTION_UNCHANGED = "unchanged"  # прочитан, колоды уже расставлены верно
+ACTION_TAIL = "tail"            # переписан на месте начиная с первой измененной колоды
+ACTION_REWRITTEN = "rewritten"  # переписан целиком через временный файл
+ACTION_ERROR = "error"
+
+
+def deck_header_re(tag_prefix=DECK_TAG_PREFIX):
+    """Регулярное выражение сгенерированного заголовка колоды."""
+    return re.compile(r'^' + re.escape(tag_prefix) + r'/\d+$')
+
+# Сгенерированный заголовок колоды
+DECK_HEADER_RE = deck_header_re()
+
+def is_flashcard(line):
+    """Флеш-карточка — строка с изображением и '::'."""
+    return line.strip().startswith('![[') and '::' in line
+
+def _without_deck_headers(lines, header_re=DECK_HEADER_RE, first_deck=1):
+    """Первый проход: убирает ВСЕ существующие сгенерированные заголовки для полной перестройки."""
+    # Пустая строка придерживается: если за ней идет заголовок, она удаляется вместе с ним.
+    # Перед первой колодой разделитель не ставится, поэтому пустая строка над ее заголовком
+    # принадлежит тексту заметки и остается на месте.
+    seen_header = first_deck > 1
+    pending_blank = None
+    for line in lines:
+        if header_re.match(line.strip()):
+            if seen_header:
+                pending_blank = None
+            seen_header = True
+            continue
+        if pending_blank is not None:
+            yield pending_blank
+            pending_blank = None
+        if line.strip():
+            yield line
+        else:
+            pending_blank = line
+    if pending_blank is not None:
+        yield pending_blank
+
+def _deck_pieces(lines, cards_per_deck, tag_prefix=DECK_TAG_PREFIX, first_deck=1, deck_sizes=None):
+    """
+    Второй проход: расставляет заголовки заново. Перед началом каждой колоды выдает ее номер
+    (int) — по нему менеджер колод ставит контрольные точки. В deck_sizes (если передан)
+    дописывается число карточек каждой новой колоды.
+    """
+    flashcard_counter = (first_deck - 1) * cards_per_deck
+    # Начинаем нумерацию колод с first_deck (с 1 при полной перестройке)
+    deck_counter = first_deck
+    for line in lines:
+        # Проверяем, является ли строка флеш-карточкой
+        if is_flashcard(line):
+            # Если это начало новой колоды, добавляем заголовок
+            if flashcard_counter % cards_per_deck == 0:
+                yield deck_counter
+                # Добавляем пустую строку перед новым заголовком, если это не первая колода
+                if deck_counter > 1:
+                    yield '\n'
+                yield f'{tag_prefix}/{deck_counter:02d}\n'
+                deck_counter += 1
+                if deck_sizes is not None:
+                    deck_sizes.append(0)
+            flashcard_counter += 1
+            if deck_sizes is not None:
+                deck_sizes[-1] += 1
+        # Все остальные строки (например, YAML-заголовок) остаются как есть
+        yield line
+
+def _with_deck_headers(lines, cards_per_deck, tag_prefix=DECK_TAG_PREFIX):
+    """Второй проход без номеров колод — только текст."""
+    for piece in _deck_pieces(lines, cards_per_deck, tag_prefix):
+        if not isinstance(piece, int):
+            yield piece
+
+def deck_header_lines(lines, cards_per_deck=CARDS_PER_DECK, tag_prefix=DECK_TAG_PREFIX):
+    """
+    Построчное преобразование для vault_stream: заголовки колод флеш-карточек расставляются
+    заново перед каждым N-м изображением. Если текст изменился, лишние пустые строки в конце
+    файла убираются. В памяти держится только хвост из последней непустой строки и пустых
+    строк после нее.
+    """
+    original_hash, final_hash = hashlib.sha256(), hashlib.sha256()
+
+    def tracked(source):
+        for line in source:
+            original_hash.update(line.encode('utf-8'))
+            yield line
+
+    tail = []
+    header_re = deck_header_re(tag_prefix)
+    for line in _with_deck_headers(_without_deck_headers(tracked(lines), header_re), cards_per_deck, tag_prefix):
+        final_hash.update(line.encode('utf-8'))
+        if line.strip():
+            yield from tail
+            tail = [line]
+        else:
+            tail.append(line)
+
+    if final_hash.digest() == original_hash.digest():
+        yield from tail
+    else:
+        # Убираем лишние пустые строки в конце файла, если они появились
+        yield "".join(tail).rstrip() + '\n'
+
+def add_deck_headers(content, cards_per_deck=CARDS_PER_DECK, tag_prefix=DECK_TAG_PREFIX):
+    """
+    Возвращает текст, в котором заголовки колод флеш-карточек расставлены заново:
+    перед каждым N-м изображением. Если менять нечего, текст возвращается как есть.
+
+    :param content: Текст markdown-файла.
+    :param cards_per_deck: Количество карточек в одной колоде.
+    :param tag_prefix: Тег колоды без номера.
+    """
+    return transform_text(content, lambda lines: deck_header_lines(lines, cards_per_deck, tag_prefix))
+
+def add_deck_headers_to_file(file_path, cards_per_deck=CARDS_PER_DECK, tag_prefix=DECK_TAG_PREFIX):
     """
     Обрабатывает markdown-файл, добавляя заголовки для новых колод
-    флеш-карточек после каждого N-го изображения.
+    флеш-карточек после каждого N-го изображения. Файл перестраивается целиком;
+    для повторных запусков по большим файлам используйте update_deck_file.
 
     :param file_path: Путь к файлу для обработки.
     :param cards_per_deck: Количество карточек в одной колоде.
+    :param tag_prefix: Тег колоды без номера.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_lines = f.readlines()
-
-        new_lines = []
-        flashcard_counter = 0
-        # Начинаем нумерацию колод с 1
-        deck_counter = 1
-        headers_to_remove = set()
-        
-        # Первый проход: найдем ВСЕ существующие сгенерированные заголовки для полной перестройки
-        for i, line in enumerate(original_lines):
-            if re.match(r'^#flashcards/300paints/\d+$', line.strip()):
-                # Также удаляем предыдущую пустую строку, если она есть
-                if i > 0 and not original_lines[i-1].strip():
-                    headers_to_remove.add(i-1)
-                headers_to_remove.add(i)
-
-        # Создаем чистый список строк без старых заголовков
-        cleaned_lines = [line for i, line in enumerate(original_lines) if i not in headers_to_remove]
-
-        # Второй проход: расставляем заголовки заново
-        header_added = False
-        for line in cleaned_lines:
-            # Проверяем, является ли строка флеш-карточкой
-            if line.strip().startswith('![[') and '::' in line:
-                # Если это начало новой колоды, добавляем заголовок
-                if flashcard_counter % cards_per_deck == 0:
-                    # Добавляем пустую строку перед новым заголовком, если это не первая колода
-                    if deck_counter > 1:
-                        new_lines.append('\n')
-                    new_lines.append(f'#flashcards/300paints/{deck_counter:02d}\n')
-                    deck_counter += 1
-                
-                new_lines.append(line)
-                flashcard_counter += 1
-            else:
-                # Добавляем все остальные строки (например, YAML-заголовок) как есть
-                new_lines.append(line)
-
-        final_content = "".join(new_lines)
-        original_content = "".join(original_lines)
-
-        if final_content != original_content:
-            # Убираем лишние пустые строки в конце файла, если они появились
-            final_content = final_content.rstrip() + '\n'
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+        if stream_rewrite(file_path, lambda lines: deck_header_lines(lines, cards_per_deck, tag_prefix)):
             print(f"Файл '{os.path.basename(file_path)}' успешно разбит на колоды.")
         else:
             print(f"Файл '{os.path.basename(file_path)}' не требует изменений.")
@@ -66,20 +187,478 @@ def add_deck_headers_to_file(file_path, cards_per_deck=20):
         print(f"Ошибка при обработке файла {os.path.basename(file_path)}: {e}", file=sys.stderr)
 
 
+# ================== МЕНЕДЖЕР КОЛОД ==================
+# Колоды расставлены так, что разметка до начала колоды N (пустой строки перед ее заголовком)
+# зависит только от текста до этого места. Поэтому после каждой обработки для начала каждой
+# колоды запоминается смещение в байтах и sha256 всего файла до него. При следующем запуске
+# файл хэшируется до последней совпавшей контрольной точки, и разбор начинается с нее:
+# если в конец заметки на 6000 карточек дописали 20 новых, разбирается и пишется только
+# последняя колода и новые карточки.
+
+@dataclass
+class DeckCheckpoint:
+    """Начало колоды: смещение в байтах и sha256 файла до него."""
+    deck: int
+    offset: int
+    digest: str
+
+
+@dataclass
+class DeckFileState:
+    """Что известно о файле после прошлой обработки."""
+    size: int
+    mtime_ns: int
+    tag_prefix: str
+    cards_per_deck: int
+    deck_sizes: List[int] = field(default_factory=list)  # карточек в каждой колоде по порядку
+    checkpoints: List[DeckCheckpoint] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeckFileState":
+        data = dict(data)
+        data["checkpoints"] = [DeckCheckpoint(*checkpoint) for checkpoint in data.get("checkpoints", [])]
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["checkpoints"] = [[cp.deck, cp.offset, cp.digest] for cp in self.checkpoints]
+        return data
+
+    def is_current(self, stat: os.stat_result, tag_prefix: str, cards_per_deck: int) -> bool:
+        return (self.size, self.mtime_ns, self.tag_prefix, self.cards_per_deck) == (
+            stat.st_size, stat.st_mtime_ns, tag_prefix, cards_per_deck)
+
+
+@dataclass
+class DeckFileResult:
+    """Итог обработки одного файла менеджером колод."""
+    path: str
+    action: str
+    deck_sizes: List[int] = field(default_factory=list)
+    resumed_from_deck: int = 1  # с какой колоды начат разбор (1 — весь файл)
+    bytes_written: int = 0
+    state: Optional[DeckFileState] = None
+    error: Optional[str] = None
+
+    @property
+    def cards(self) -> int:
+        return sum(self.deck_sizes)
+
+
+def _detect_newline(file_path) -> str:
+    """Перевод строки файла ('\\r\\n' или '\\n') по первой строке: хвост пишется тем же."""
+    with open(file_path, 'rb') as f:
+        head = f.read(COMPARE_CHUNK_BYTES)
+    end = head.find(b'\n')
+    return '\r\n' if end > 0 and head[end - 1:end] == b'\r' else '\n'
+
+
+def _verified_checkpoint(file_path, checkpoints: List[DeckCheckpoint]):
+    """
+    Последняя контрольная точка, до которой файл не изменился и с которой по-прежнему
+    начинается колода, и sha256 файла до нее (объект hashlib, чтобы продолжить считать
+    хэш нового хвоста).
+    """
+    hasher = hashlib.sha256()
+    verified, verified_hasher = None, hasher.copy()
+    position = 0
+    with open(file_path, 'rb') as f:
+        for checkpoint in checkpoints:
+            remaining = checkpoint.offset - position
+            while remaining > 0:
+                chunk = f.read(min(remaining, HASH_CHUNK_BYTES))
+                if not chunk:
+                    return verified, verified_hasher
+                hasher.update(chunk)
+                remaining -= len(chunk)
+            position = checkpoint.offset
+            if hasher.hexdigest() != checkpoint.digest:
+                break
+            # С контрольной точки должна по-прежнему начинаться пустая строка-разделитель:
+            # заголовок на ее месте удалил бы пустую строку перед ним, то есть изменил начало
+            separator = f.readline()
+            if separator.strip() or not separator.endswith(b'\n'):
+                break
+            verified, verified_hasher = checkpoint, hasher.copy()
+            hasher.update(separator)
+            position += len(separator)
+    return verified, verified_hasher
+
+
+class _ByteCursor:
+    """Сравнивает куски выхода с байтами исходного файла, читая его блоками."""
+
+    def __init__(self, source):
+        self._source = source
+        self._buffer = b""
+        self._pos = 0
+
+    def _fill(self, size: int) -> bool:
+        if self._pos + size <= len(self._buffer):
+            return True
+        self._buffer = self._buffer[self._pos:] + self._source.read(max(size, COMPARE_CHUNK_BYTES))
+        self._pos = 0
+        return size <= len(self._buffer)
+
+    def match(self, data: bytes) -> bool:
+        if self._fill(len(data)) and self._buffer.startswith(data, self._pos):
+            self._pos += len(data)
+            return True
+        return False
+
+    def at_end(self) -> bool:
+        return not self._fill(1)
+
+
+class _TailWriter:
+    """
+    Новый текст файла начиная с первого расхождения. Пока хвост небольшой, он копится
+    в памяти и в конце пишется на место старого (файл не переписывается целиком). Если хвост
+    вырос больше TAIL_REWRITE_MAX_BYTES, начало файла копируется во временный файл, который
+    затем атомарно подменяет исходный.
+    """
+
+    def __init__(self, file_path, start: int):
+        self.file_path = file_path
+        self.start = start
+        self.written = 0
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._tmp_path: Optional[str] = None
+        self._tmp = None
+
+    @property
+    def action(self) -> str:
+        return ACTION_REWRITTEN if self._tmp is not None else ACTION_TAIL
+
+    def write(self, data: bytes):
+        self.written += len(data)
+        if self._tmp is not None:
+            self._tmp.write(data)
+            return
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered > TAIL_REWRITE_MAX_BYTES:
+            self._spill()
+
+    def _spill(self):
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file_path)),
+                                              prefix=".flashcard_decks_", suffix=".tmp")
+        self._tmp = os.fdopen(fd, 'wb')
+        with open(self.file_path, 'rb') as source:
+            remaining = self.start
+            while remaining:
+                chunk = source.read(min(remaining, HASH_CHUNK_BYTES))
+                if not chunk:
+                    break
+                self._tmp.write(chunk)
+                remaining -= len(chunk)
+        self._tmp.writelines(self._buffer)
+        self._buffer, self._buffered = [], 0
+
+    def commit(self):
+        if self._tmp is not None:
+            self._tmp.close()
+            shutil.copymode(self.file_path, self._tmp_path)
+            os.replace(self._tmp_path, self.file_path)
+            return
+        with open(self.file_path, 'r+b') as f:
+            f.seek(self.start)
+            f.writelines(self._buffer)
+            f.truncate()
+
+    def discard(self):
+        if self._tmp is not None:
+            self._tmp.close()
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+
+def _rebuild_from(file_path, tag_prefix, cards_per_deck, start: Optional[DeckCheckpoint], hasher,
+                  kept: List[DeckCheckpoint], dry_run) -> Optional[DeckFileResult]:
+    """
+    Разбирает файл с контрольной точки start (None — с начала) и переписывает его с первого
+    расхождения. Возвращает None, если после start не осталось ни одной непустой строки,
+    а лишние пустые строки в конце нужно убрать: тогда они начинаются еще до start.
+    """
+    first_deck, offset = (start.deck, start.offset) if start is not None else (1, 0)
+    deck_sizes = [cards_per_deck] * (first_deck - 1)
+    new_checkpoints = []
+    newline = _detect_newline(file_path)
+    header_re = deck_header_re(tag_prefix)
+
+    position = offset  # сколько байт нового текста уже выдано
+    writer: Optional[_TailWriter] = None
+    changed = False
+
+    def encode(piece):
+        return (piece if newline == '\n' else piece.replace('\n', newline)).encode('utf-8')
+
+    def emit(pieces):
+        nonlocal position, writer, changed
+        for piece in pieces:
+            if isinstance(piece, int):
+                # Пустая строка над заголовком первой колоды — часть текста заметки, а не
+                # разделитель, поэтому разбор можно начинать только со второй колоды и дальше
+                if piece > 1:
+                    new_checkpoints.append(DeckCheckpoint(piece, position, hasher.hexdigest()))
+                continue
+            data = encode(piece)
+            if not changed and not cursor.match(data):
+                changed = True
+                if dry_run:
+                    return
+                writer = _TailWriter(file_path, position)
+            if writer is not None:
+                writer.write(data)
+            hasher.update(data)
+            position += len(data)
+
+    try:
+        with open(file_path, 'rb') as raw, open(file_path, 'rb') as original:
+            raw.seek(offset)
+            original.seek(offset)
+            cursor = _ByteCursor(original)
+            lines = io.TextIOWrapper(raw, encoding='utf-8', newline=None)
+            tail = []
+            for piece in _deck_pieces(_without_deck_headers(lines, header_re, first_deck),
+                                      cards_per_deck, tag_prefix, first_deck, deck_sizes):
+                if isinstance(piece, str) and piece.strip():
+                    emit(tail)
+                    tail = [piece]
+                else:
+                    tail.append(piece)
+                if changed and dry_run:
+                    break
+            else:
+                tail_text = "".join(piece for piece in tail if isinstance(piece, str))
+                tail_data = encode(tail_text)
+                if not changed and cursor.match(tail_data) and cursor.at_end():
+                    hasher.update(tail_data)
+                    position += len(tail_data)
+                elif start is not None and not tail_text.strip():
+                    if writer is not None:
+                        writer.discard()
+                    return None
+                else:
+                    changed = True
+                    if not dry_run:
+                        if writer is None:
+                            writer = _TailWriter(file_path, position)
+                        # Убираем лишние пустые строки в конце файла, если они появились
+                        emit([tail_text.rstrip() + '\n'])
+        # Файл закрыт для чтения: теперь его можно переписать или подменить
+        if writer is not None:
+            writer.commit()
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+
+    result = DeckFileResult(file_path, ACTION_UNCHANGED, deck_sizes, first_deck)
+    if changed:
+        result.action = ACTION_TAIL if dry_run else writer.action
+        result.bytes_written = writer.written if writer is not None else 0
+    if not dry_run:
+        stat = os.stat(file_path)
+        result.state = DeckFileState(stat.st_size, stat.st_mtime_ns, tag_prefix, cards_per_deck,
+                                     deck_sizes, kept + new_checkpoints)
+    return result
+
+
+def update_deck_file(file_path, tag_prefix=DECK_TAG_PREFIX, cards_per_deck=CARDS_PER_DECK,
+                     state: Optional[DeckFileState] = None, dry_run=False) -> DeckFileResult:
+    """
+    Расставляет заголовки колод в файле, начиная с первой колоды, состав которой мог измениться.
+    Результат побайтно совпадает с полной перестройкой (add_deck_headers), но начало файла
+    до последней неизмененной колоды не разбирается и не переписывается.
+
+    :param state: Состояние файла после прошлой обработки (None — разобрать файл целиком).
+    :param dry_run: Только определить, изменится ли файл, ничего не записывая.
+    """
+    stat = os.stat(file_path)
+    if state is not None and state.is_current(stat, tag_prefix, cards_per_deck):
+        return DeckFileResult(file_path, ACTION_SKIPPED, list(state.deck_sizes),
+                              len(state.deck_sizes) + 1, state=state)
+
+    checkpoints = []
+    if state is not None and (state.tag_prefix, state.cards_per_deck) == (tag_prefix, cards_per_deck):
+        checkpoints = state.checkpoints
+    start, hasher = _verified_checkpoint(file_path, checkpoints)
+    kept = [checkpoint for checkpoint in checkpoints if start is not None and checkpoint.deck < start.deck]
+    result = _rebuild_from(file_path, tag_prefix, cards_per_deck, start, hasher, kept, dry_run)
+    if result is None:
+        # Колоды в конце файла удалены целиком: разбираем файл с начала
+        result = _rebuild_from(file_path, tag_prefix, cards_per_deck, None, hashlib.sha256(), [], dry_run)
+    if dry_run:
+        result.state = state
+    return result
+
+
+def load_state(state_path) -> Dict[str, DeckFileState]:
+    """Состояние файлов после прошлого запуска (пустое, если его нет или оно повреждено)."""
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {path: DeckFileState.from_dict(entry) for path, entry in data.get("files", {}).items()}
+    except (OSError, ValueError, TypeError, KeyError):
+        return {}
+
+
+def save_state(state_path, states: Dict[str, DeckFileState]):
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({"files": {path: state.to_dict() for path, state in sorted(states.items())}}, f, ensure_ascii=False)
+
+
+def _process_chunk(root, items: List[Tuple[str, Optional[DeckFileState]]], tag_prefix, cards_per_deck, dry_run) -> List[DeckFileResult]:
+    results = []
+    for rel_path, state in items:
+        try:
+            result = update_deck_file(os.path.join(root, rel_path), tag_prefix, cards_per_deck, state, dry_run)
+            result.path = rel_path
+        except Exception as e:
+            result = DeckFileResult(rel_path, ACTION_ERROR, error=f"{type(e).__name__}: {e}")
+        results.append(result)
+    return results
+
+
+def run_decks(root, tag_prefix=DECK_TAG_PREFIX, cards_per_deck=CARDS_PER_DECK,
+              include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS, state_path=None,
+              max_workers=MAX_WORKERS, dry_run=False) -> List[DeckFileResult]:
+    """
+    Расставляет колоды во всех подходящих файлах папки `root` (рекурсивно, параллельно).
+    Состояние файлов читается из state_path и сохраняется обратно, поэтому повторный запуск
+    не читает неизмененные файлы и разбирает остальные только с первой измененной колоды.
+    """
+    if cards_per_deck < 1:
+        raise ValueError("Количество карточек в колоде должно быть положительным")
+    states = load_state(state_path) if state_path else {}
+    rel_paths = list(iter_files(root, PathFilter(include, exclude)))
+    by_path: Dict[str, DeckFileResult] = {}
+    items = []
+    for rel_path in rel_paths:
+        file_path = os.path.join(root, rel_path)
+        state = states.get(os.path.normcase(file_path))
+        # Файлы, не менявшиеся с прошлого запуска, не отдаются процессам: хватает os.stat
+        if state is not None and state.is_current(os.stat(file_path), tag_prefix, cards_per_deck):
+            by_path[rel_path] = DeckFileResult(rel_path, ACTION_SKIPPED, list(state.deck_sizes),
+                                               len(state.deck_sizes) + 1, state=state)
+        else:
+            items.append((rel_path, state))
+
+    if max_workers == 1 or len(items) < PARALLEL_MIN_FILES:
+        processed = _process_chunk(root, items, tag_prefix, cards_per_deck, dry_run)
+    else:
+        chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+        processed = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_process_chunk, root, chunk, tag_prefix, cards_per_deck, dry_run) for chunk in chunks]
+            for future in futures:
+                processed.extend(future.result())
+    by_path.update((result.path, result) for result in processed)
+    results = [by_path[rel_path] for rel_path in rel_paths]
+
+    if state_path and not dry_run:
+        # Файлы, которых больше нет в папке, из состояния удаляются
+        prefix = os.path.normcase(os.path.join(root, ""))
+        states = {path: state for path, state in states.items() if not path.startswith(prefix)}
+        for result in results:
+            if result.state is not None:
+                states[os.path.normcase(os.path.join(root, result.path))] = result.state
+        save_state(state_path, states)
+    return results
+
+
+def deck_stats(results: List[DeckFileResult], tag_prefix=DECK_TAG_PREFIX) -> dict:
+    """Статистика по колодам: для каждого файла — число карточек в каждой колоде."""
+    files = {}
+    for result in results:
+        if result.deck_sizes:
+            files[result.path] = {
+                "cards": result.cards,
+                "action": result.action,
+                "decks": {f"{tag_prefix}/{number:02d}": size for number, size in enumerate(result.deck_sizes, 1)},
+            }
+    return {
+        "tag_prefix": tag_prefix,
+        "files": files,
+        "total_decks": sum(len(result.deck_sizes) for result in results),
+        "total_cards": sum(result.cards for result in results),
+    }
+
+
+def print_results(results: List[DeckFileResult], cards_per_deck, dry_run, elapsed):
+    labels = {
+        ACTION_TAIL: "требует изменений" if dry_run else "переписан с колоды",
+        ACTION_REWRITTEN: "переписан целиком",
+    }
+    for result in results:
+        if result.error:
+            print(f"❌ Ошибка при обработке файла {result.path}: {result.error}", file=sys.stderr)
+            continue
+        if result.action in (ACTION_SKIPPED, ACTION_UNCHANGED):
+            continue  # колоды по всем файлам — в файле статистики
+        label = labels[result.action]
+        if result.action == ACTION_TAIL and not dry_run:
+            label += f" {result.resumed_from_deck:02d} ({result.bytes_written} байт)"
+        last = result.deck_sizes[-1] if result.deck_sizes else 0
+        print(f"📄 {result.path}: колод {len(result.deck_sizes)}, карточек {result.cards}, "
+              f"в последней колоде {last}/{cards_per_deck} — {label}")
+    changed = sum(result.action in (ACTION_TAIL, ACTION_REWRITTEN) for result in results)
+    errors = sum(result.action == ACTION_ERROR for result in results)
+    print(
+        f"\nОбработано файлов: {len(results)}, {'требуют изменений' if dry_run else 'изменено'}: {changed}, "
+        f"ошибок: {errors}; колод: {sum(len(r.deck_sizes) for r in results)}, "
+        f"карточек: {sum(r.cards for r in results)} ({elapsed:.2f} сек.)"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Расставляет заголовки колод флеш-карточек, переписывая файлы только с первой измененной колоды.")
+    parser.add_argument("--root", default=TARGET_DIR, help="папка для обработки (обходится рекурсивно)")
+    parser.add_argument("--tag", default=DECK_TAG_PREFIX, help="тег колоды без номера")
+    parser.add_argument("--size", type=int, default=CARDS_PER_DECK, help="карточек в одной колоде")
+    parser.add_argument("--include", action="append", help="шаблон включаемых файлов (можно несколько раз)")
+    parser.add_argument("--exclude", action="append", help="шаблон исключаемых файлов и папок (можно несколько раз)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="число процессов (1 — без параллельности)")
+    parser.add_argument("--full", action="store_true", help="забыть сохраненное состояние и разобрать файлы целиком")
+    parser.add_argument("--dry-run", action="store_true", help="ничего не записывать")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    root = args.root if os.path.isabs(args.root) else os.path.join(SCRIPT_DIR, args.root)
+    if not os.path.isdir(root):
+        print(f"Ошибка: Папка '{root}' не найдена.", file=sys.stderr)
+        return 1
+    state_path = os.path.join(SCRIPT_DIR, STATE_FILE_NAME)
+    if args.full and os.path.exists(state_path) and not args.dry_run:
+        os.remove(state_path)
+
+    print(f"Начинаю обработку файлов в папке: {root}")
+    print(f"Колоды: {args.tag}/NN по {args.size} карточек\n")
+    started = time.perf_counter()
+    try:
+        results = run_decks(
+            root, args.tag, args.size,
+            include=args.include or INCLUDE_GLOBS,
+            exclude=args.exclude or EXCLUDE_GLOBS,
+            state_path=None if args.full and args.dry_run else state_path,
+            max_workers=args.workers,
+            dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    print_results(results, args.size, args.dry_run, time.perf_counter() - started)
+
+    stats_path = os.path.join(SCRIPT_DIR, STATS_FILE_NAME)
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump(deck_stats(results, args.tag), f, ensure_ascii=False, indent=2)
+    print(f"Статистика по колодам сохранена в {stats_path}")
+    return 1 if any(result.error for result in results) else 0
+
+
 if __name__ == "__main__":
-    # Определяем директорию, где лежит скрипт
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Папка с файлами для обработки находится рядом со скриптом
-    working_dir = os.path.join(script_dir, "working folder")
-
-    if not os.path.isdir(working_dir):
-        print(f"Ошибка: Папка '{working_dir}' не найдена.", file=sys.stderr)
-        sys.exit(1)
-
-    print(f"Начинаю обработку файлов в папке: {working_dir}\n")
-    for filename in os.listdir(working_dir):
-        if filename.lower().endswith(".md"):
-            file_path = os.path.join(working_dir, filename)
-            add_deck_headers_to_file(file_path)
-
-    print("\nОбработка завершена.")
\ No newline at end of file
+    sys.exit(main())
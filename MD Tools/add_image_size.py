@@ -7,6 +7,16 @@ import sys
 IMAGE_WIDTH = 1000
 # -----------------
 
+# Регулярное выражение для поиска ссылок без указания размера.
+# Оно ищет ![[...]], где внутри нет символа '|'.
+# Группа 1: ([^|\]]+) - захватывает имя файла.
+EMBED_WITHOUT_SIZE_RE = re.compile(r'!\[\[([^|\]]+)\]\]')
+
+def add_size_to_text(content, width=IMAGE_WIDTH):
+    """Возвращает текст, в котором к ссылкам ![[filename.ext]] добавлен размер: ![[filename.ext|width]]."""
+    # \1 - это ссылка на захваченную группу 1 (имя файла).
+    return EMBED_WITHOUT_SIZE_RE.sub(rf'![[\1|{width}]]', content)
+
 def add_size_to_links(file_path, width):
     """
     Добавляет размер к ссылкам на изображения в markdown-файле.
@@ -17,14 +27,7 @@ def add_size_to_links(file_path, width):
         with open(file_path, 'r', encoding='utf-8') as f:
             original_content = f.read()
 
-        # Регулярное выражение для поиска ссылок без указания размера.
-        # Оно ищет ![[...]], где внутри нет символа '|'.
-        # Группа 1: (.*?) - захватывает имя файла.
-        regex = re.compile(r'!\[\[([^|\]]+)\]\]')
-        
-        # Замена с использованием f-строки для подстановки ширины.
-        # \1 - это ссылка на захваченную группу 1 (имя файла).
-        new_content = regex.sub(rf'![[\1|{width}]]', original_content)
+        new_content = add_size_to_text(original_content, width)
 
         # Перезаписываем файл, только если были внесены изменения.
         if new_content != original_content:
@@ -2,53 +2,78 @@ import os
 import re
 import sys
 
-def process_markdown_file(file_path):
-    """
-    Обрабатывает markdown-файл: добавляет псевдонимы к ссылкам на изображения
-    и удаляет пустые строки между ними.
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_content = f.read()
+# Потоковая перезапись файлов лежит в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_stream import stream_rewrite, transform_text
 
-        # Функция для замены, которая будет вызвана для каждого найденного совпадения
-        def create_alias(match):
-            full_link = match.group(0)
-            # Проверяем, есть ли уже псевдоним
-            if '::' in full_link:
-                return full_link
+# Ссылки на изображения ![[...]] (в пределах одной строки); группа 1 — имя файла
+EMBED_RE = re.compile(r'!\[\[([^\]\n]+)\]\]')
 
-            filename_with_ext = match.group(1)
-            # Отделяем имя файла от расширения
-            filename_without_ext, _ = os.path.splitext(filename_with_ext)
-            
-            # Формируем новую строку
-            return f"![[{filename_with_ext}]]::{filename_without_ext}"
+def create_alias(match):
+    """Функция для замены, которая вызывается для каждой найденной ссылки."""
+    full_link = match.group(0)
+    # Проверяем, есть ли уже псевдоним
+    if '::' in full_link:
+        return full_link
 
-        # Используем регулярное выражение для поиска всех ссылок ![[...]]
-        # Оно найдет все ссылки, а функция create_alias обработает только нужные.
-        content_with_aliases = re.sub(r'!\[\[([^\]]+)\]\]', create_alias, original_content)
+    filename_with_ext = match.group(1)
+    # Отделяем имя файла от расширения
+    filename_without_ext, _ = os.path.splitext(filename_with_ext)
 
-        # Удаляем пустые строки между ссылками на изображения
-        lines = content_with_aliases.split('\n')
-        processed_lines = []
-        for i, line in enumerate(lines):
-            # Добавляем строку, если она не пустая
-            if line.strip():
-                processed_lines.append(line)
-            # Или если это пустая строка, но предыдущая и следующая не являются ссылками
-            elif i > 0 and i < len(lines) - 1:
-                prev_line = lines[i-1].strip()
-                next_line = lines[i+1].strip()
-                if not (prev_line.startswith('![[') and next_line.startswith('![[')):
-                    processed_lines.append(line)
+    # Формируем новую строку
+    return f"![[{filename_with_ext}]]::{filename_without_ext}"
+
+def _split_elements(lines):
+    """Строки без '\n' — как элементы content.split('\n'), включая хвост после последнего '\n'."""
+    ends_with_newline = True
+    for line in lines:
+        ends_with_newline = line.endswith('\n')
+        yield line[:-1] if ends_with_newline else line
+    if ends_with_newline:
+        yield ''
+
+def string_flashcard_lines(lines):
+    """
+    Построчное преобразование для vault_stream: добавляет псевдонимы к ссылкам на изображения
+    и удаляет пустые строки между ними. В памяти одновременно только три соседние строки.
+    """
+    # Используем регулярное выражение для поиска всех ссылок ![[...]]
+    # Оно найдет все ссылки, а функция create_alias обработает только нужные.
+    elements = (EMBED_RE.sub(create_alias, element) for element in _split_elements(lines))
 
-        final_content = '\n'.join(processed_lines)
+    emitted = False
+    prev_line = line = None
+    index = 0
+    for next_line in elements:
+        if line is not None:
+            # Добавляем строку, если она не пустая, или если это пустая строка (не первая и
+            # не последняя), но предыдущая и следующая не являются ссылками
+            if line.strip() or (index > 0 and not (prev_line.strip().startswith('![[') and next_line.strip().startswith('![['))):
+                yield ('\n' if emitted else '') + line
+                emitted = True
+            index += 1
+        prev_line, line = line, next_line
+    # Последняя строка остается, только если она не пустая
+    if line is not None and line.strip():
+        yield ('\n' if emitted else '') + line
 
-        # Если были изменения, перезаписываем файл
-        if final_content != original_content:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+def convert_to_string_flashcards(content):
+    """
+    Возвращает текст, в котором к ссылкам на изображения добавлены псевдонимы
+    и удалены пустые строки между ними.
+    """
+    return transform_text(content, string_flashcard_lines)
+
+def process_markdown_file(file_path):
+    """
+    Обрабатывает markdown-файл: добавляет псевдонимы к ссылкам на изображения
+    и удаляет пустые строки между ними. Файл читается построчно и перезаписывается
+    (атомарно), только если были изменения.
+    """
+    try:
+        if stream_rewrite(file_path, string_flashcard_lines):
             print(f"Файл '{os.path.basename(file_path)}' успешно обновлен.")
         else:
             print(f"Файл '{os.path.basename(file_path)}' не требует изменений.")
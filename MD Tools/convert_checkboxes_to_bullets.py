@@ -1,24 +1,43 @@
 import os
 import re
+import sys
+
+# Потоковая перезапись файлов лежит в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_stream import stream_rewrite, transform_text
+
+# Группа 1 — любые комбинации '>' и пробелов перед '- [ ]' или '- [x]'
+CHECKBOX_RE = re.compile(r'^(\s*(?:>+\s*)*)-\s*\[[ xX]\]\s*')
+
+def convert_checkbox_line(line):
+    """Заменяет чекбокс в начале строки на обычный маркер списка."""
+    # Без '[' чекбокса в строке быть не может — регулярное выражение не нужно
+    if '[' not in line:
+        return line
+    # Заменяем только совпадение шаблона (checkbox → bullet),
+    # всё остальное (текст, ссылки, отступы, callout) остаётся нетронутым
+    return CHECKBOX_RE.sub(r'\1- ', line)
+
+def convert_checkbox_lines(lines):
+    """Построчное преобразование для vault_stream: строки читаются и отдаются по одной."""
+    for line in lines:
+        yield convert_checkbox_line(line)
+
+def convert_checkboxes_in_text(content):
+    """Построчно заменяет чекбоксы во всём тексте (см. convert_checkbox_line)."""
+    return transform_text(content, convert_checkbox_lines)
 
 def process_markdown_file(input_path):
     """
     В файле оставляем всё как есть, заменяя лишь чекбоксы:
     - [ ] и - [x] (в любом регистре) → - 
     при этом сохраняем любые ведущие '>' и пробелы.
+    Файл читается построчно и перезаписывается, только если в нем были чекбоксы.
+    Возвращает True, если файл изменен.
     """
-    # Группа 1 — любые комбинации '>' и пробелов перед '- [ ]' или '- [x]'
-    pattern = re.compile(r'^(\s*(?:>+\s*)*)-\s*\[[ xX]\]\s*')
-
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    with open(input_path, 'w', encoding='utf-8') as f:
-        for line in lines:
-            # Заменяем только совпадение шаблона (checkbox → bullet),
-            # всё остальное (текст, ссылки, отступы, callout) остаётся нетронутым
-            new_line = pattern.sub(r'\1- ', line)
-            f.write(new_line)
+    return stream_rewrite(input_path, convert_checkbox_lines)
 
 if __name__ == "__main__":
     # Путь к папке 'working folder' рядом со скриптом
@@ -28,5 +47,7 @@ if __name__ == "__main__":
     for filename in os.listdir(working_dir):
         if filename.lower().endswith(".md"):
             file_path = os.path.join(working_dir, filename)
-            process_markdown_file(file_path)
-            print(f"Обработан файл: {filename}")
+            if process_markdown_file(file_path):
+                print(f"Обработан файл: {filename}")
+            else:
+                print(f"Файл '{filename}' не требует изменений.")
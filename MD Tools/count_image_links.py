@@ -1,6 +1,40 @@
 import sys
 import os
 import re
+import json
+import time
+
+# ================== НАСТРОЙКИ ==================
+# Путь к хранилищу для индекса вложений (пункт 2 меню). Пункт 1 работает с 'working folder'.
+VAULT_PATH = "C:/Obsidian/dkosarevmusic"
+
+# Папки и файлы хранилища, которые не учитываются (шаблоны относительно корня, '**' — любые подпапки)
+EXCLUDE_GLOBS = [".obsidian/**", ".trash/**", "Templates/**"]
+
+# Свойства frontmatter, в которых могут быть ссылки на файлы (например, banner: "image.png")
+FRONTMATTER_LINK_PROPERTIES = ["banner", "image"]
+
+# Индекс (JSON для запросов) и кэш сохраняются рядом со скриптом, сводка — в корень хранилища
+INDEX_FILE_NAME = "attachment_index.json"
+CACHE_FILE_NAME = ".attachment_index_cache.json"
+REPORT_FILE_NAME = "attachments_report.md"
+
+# Число процессов: None — по числу ядер, 1 — последовательно
+MAX_WORKERS = None
+
+# Сколько самых используемых вложений показывать в сводке
+TOP_USED_COUNT = 30
+# ===============================================
+
+# Индекс вложений и общие модули лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_attachments import AttachmentIndex, build_attachment_index
+from vault_paths import PathFilter
+from vault_telemetry import Telemetry, phase, PHASE_REPORT, PHASE_WRITE
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 def count_links_in_file(file_path):
     """
@@ -32,13 +66,110 @@ def count_links_in_file(file_path):
     except Exception as e:
         print(f"Произошла ошибка при чтении или обработке файла: {e}")
 
-if __name__ == "__main__":
+def _obsidian_link(rel_path):
+    """Кликабельная wikilink-ссылка для Obsidian."""
+    return f"[[{rel_path[:-3] if rel_path.lower().endswith('.md') else rel_path}]]"
+
+def _format_size(size):
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+def build_vault_index(vault_path):
+    """Строит индекс вложений всего хранилища (заметки, не изменившиеся с прошлого раза, берутся из кэша)."""
+    path_filter = PathFilter(include=(), exclude=EXCLUDE_GLOBS + [REPORT_FILE_NAME])
+    return build_attachment_index(
+        vault_path, path_filter,
+        cache_path=os.path.join(SCRIPT_DIR, CACHE_FILE_NAME),
+        frontmatter_properties=FRONTMATTER_LINK_PROPERTIES,
+        max_workers=MAX_WORKERS,
+    )
+
+def write_index_json(index: AttachmentIndex, index_path):
+    """Сохраняет индекс в JSON: attachments (кто и сколько раз ссылается), unused, missing."""
+    with phase(PHASE_WRITE), open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False, indent=2)
+    print(f"📄 Индекс сохранен в: {index_path}")
+
+def write_attachment_report(index: AttachmentIndex, report_path):
+    """Пишет markdown-сводку: битые встраивания, неиспользуемые и самые используемые вложения."""
+    with phase(PHASE_REPORT):
+        unused = index.unused
+        unused_bytes = sum(index.attachments[path].size for path in unused)
+        lines = [
+            "---\ntags:\n  - optimization\n  - cleanup\n---\n\n",
+            "# Индекс вложений\n\n",
+            f"**Заметок:** {index.notes_scanned}, **вложений:** {len(index.attachments)} "
+            f"(используется {len(index.attachments) - len(unused)}, не используется {len(unused)} — {_format_size(unused_bytes)}).\n\n",
+        ]
+        if index.missing:
+            lines.append(f"## ❌ Ссылки на несуществующие файлы ({len(index.missing)} шт.)\n\n")
+            lines.append("| Цель | Вид | Где встречается |\n|:---|:---|:---|\n")
+            for target, missing in sorted(index.missing.items(), key=lambda item: (-item[1].references, item[0])):
+                sources = ", ".join(f"{_obsidian_link(source)} ×{n}" if n > 1 else _obsidian_link(source) for source, n in sorted(missing.referenced_by.items()))
+                lines.append(f"| `{target}` | {missing.kind} | {sources} |\n")
+            lines.append("\n")
+        if unused:
+            lines.append(f"## 🗑️ Неиспользуемые вложения ({len(unused)} шт., {_format_size(unused_bytes)})\n\n")
+            lines.append("| Вложение | Размер |\n|:---|:---|\n")
+            for path in sorted(unused, key=lambda path: (-index.attachments[path].size, path)):
+                lines.append(f"| `{path}` | `{_format_size(index.attachments[path].size)}` |\n")
+            lines.append("\n")
+        used = sorted(
+            ((path, usage) for path, usage in index.attachments.items() if usage.references),
+            key=lambda item: (-item[1].references, item[0]),
+        )[:TOP_USED_COUNT]
+        if used:
+            lines.append(f"## 📊 Самые используемые вложения (топ {len(used)})\n\n")
+            lines.append("| Вложение | Встраиваний | Ссылок | Во frontmatter | Заметок |\n|:---|:---|:---|:---|:---|\n")
+            for path, usage in used:
+                lines.append(f"| {_obsidian_link(path)} | {usage.embeds} | {usage.links} | {usage.frontmatter} | {len(usage.referenced_by)} |\n")
+            lines.append("\n")
+        lines.append(f"_Отчет обновлен {time.strftime('%Y-%m-%d %H:%M:%S')}_\n")
+    with phase(PHASE_WRITE), open(report_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    print(f"✅ Сводка сохранена в: {report_path}")
+
+def run_vault_index():
+    """Пункт 2: индекс вложений всего хранилища."""
+    if not os.path.isdir(VAULT_PATH):
+        print(f"❌ Ошибка: Указанный путь к хранилищу не существует или не является папкой: {VAULT_PATH}")
+        return
+    print(f"🔄 Индексация вложений хранилища: {VAULT_PATH}")
+    with Telemetry("count_image_links") as telemetry:
+        index = build_vault_index(VAULT_PATH)
+        print(f"  - Загружено из кэша: {index.notes_from_cache} заметок, прочитано заново: {index.notes_scanned - index.notes_from_cache}.")
+        for path, error in sorted(index.errors.items()):
+            print(f"  ⚠️  Ошибка при чтении файла {path}: {error}")
+        write_index_json(index, os.path.join(SCRIPT_DIR, INDEX_FILE_NAME))
+        write_attachment_report(index, os.path.join(VAULT_PATH, REPORT_FILE_NAME))
+    unused = index.unused
+    print(f"\n✅ Вложений: {len(index.attachments)}, не используется: {len(unused)}, ссылок на несуществующие файлы: {len(index.missing)}.")
+    print(f"⏱️  Время выполнения: {telemetry.wall_seconds:.2f} сек.")
+
+def show_attachment_users(query):
+    """Пункт 3: кто ссылается на вложение (по сохраненному индексу, поиск по части пути)."""
+    index_path = os.path.join(SCRIPT_DIR, INDEX_FILE_NAME)
+    if not os.path.exists(index_path):
+        print("❌ Индекс еще не построен. Сначала выполните пункт 2.")
+        return
+    with open(index_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    query = query.lower()
+    matches = {path: info for path, info in data["attachments"].items() if query in path.lower()}
+    if not matches:
+        print(f"ℹ️ Вложения, содержащие '{query}', не найдены.")
+        return
+    for path, info in sorted(matches.items()):
+        print(f"\n📎 {path} — ссылок: {info['references']} (встраиваний {info['embeds']}, ссылок {info['links']}, frontmatter {info['frontmatter']})")
+        for source, n in info["referenced_by"].items():
+            print(f"    {n:>4} × {source}")
+
+def count_in_working_folder():
+    """Пункт 1: подсчет ссылок ![[...]] в каждом файле папки 'working folder'."""
     # Папка, в которой находятся файлы для обработки.
     WORKING_FOLDER_NAME = "working folder"
 
     # Определяем путь к папке 'working folder' относительно скрипта
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    working_dir = os.path.join(script_dir, WORKING_FOLDER_NAME)
+    working_dir = os.path.join(SCRIPT_DIR, WORKING_FOLDER_NAME)
 
     if not os.path.isdir(working_dir):
         print(f"Ошибка: Папка '{working_dir}' не найдена.")
@@ -51,4 +182,19 @@ if __name__ == "__main__":
         # Обрабатываем только файлы с расширением .md
         if filename.lower().endswith(".md"):
             file_path = os.path.join(working_dir, filename)
-            count_links_in_file(file_path)
\ No newline at end of file
+            count_links_in_file(file_path)
+
+if __name__ == "__main__":
+    print("Выберите действие:")
+    print("  1. Подсчитать ссылки на изображения в файлах 'working folder'")
+    print("  2. Построить индекс вложений всего хранилища (JSON + сводка)")
+    print("  3. Показать, где используется вложение (по индексу)")
+    choice = input("Введите номер варианта (1-3): ").strip()
+    if choice == '1':
+        count_in_working_folder()
+    elif choice == '2':
+        run_vault_index()
+    elif choice == '3':
+        show_attachment_users(input("Имя или часть пути вложения: ").strip())
+    else:
+        print("❌ Неверный выбор.")
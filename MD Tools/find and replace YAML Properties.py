@@ -1,84 +1,177 @@
+import argparse
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
 
 # ================== НАСТРОЙКИ ==================
-# Папка (относительно скрипта), в которой находятся файлы для обработки.
-FOLDER_NAME = "working folder"
+# Папка для обработки (обходится рекурсивно). Относительный путь считается от папки скрипта.
+# Чтобы пройтись по всему хранилищу, укажите абсолютный путь, например "C:/Obsidian/MyVault".
+TARGET_DIR = "working folder"
+
+# Папки и файлы, которые не обрабатываются (шаблоны относительно TARGET_DIR, '**' — любые подпапки)
+EXCLUDE_GLOBS = [".obsidian/**", ".trash/**", ".git/**"]
 
 # Словарь для замены: "что найти": "на что заменить".
-# Замена чувствительна к регистру.
+# Замена чувствительна к регистру. Все замены выполняются за один проход, поэтому
+# результат одной замены не попадает под другую; из пересекающихся вхождений
+# побеждает самое левое, а при равенстве — самое длинное.
 FIND_REPLACE_MAP = {
     "Company": "Brand",
     "Type": "tags",
     "Фишка": "Comment",
     "Best in Class": "BestInClass"
 }
+
+# Где менять: "keys" — только имена свойств, "values" — только значения, "all" — весь YAML-заголовок
+SCOPE = "keys"
+
+# True — заменять только целые слова: "Type" не заденет "Prototype" и "Types"
+WHOLE_TOKEN = True
+
+# Число процессов: None — по числу ядер, 1 — последовательно
+MAX_WORKERS = None
+
+# True — только показать, какие файлы изменятся, ничего не записывая
+DRY_RUN = False
 # ===============================================
 
+# Автомат замены и разбор frontmatter лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_paths import PathFilter, iter_files
+from vault_replace import (
+    MultiReplacer, replace_in_files, SCOPES,
+    REPLACE_CHANGED, REPLACE_NO_FRONTMATTER, REPLACE_UNCHANGED,
+)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Меньше файлов обрабатывается последовательно: запуск процессов дороже самой работы
+PARALLEL_MIN_FILES = 64
+CHUNK_SIZE = 64
+# Сколько измененных файлов перечислять в консоли поименно
+PRINT_LIMIT = 50
+
+
+@dataclass
+class ReplaceReport:
+    """Итог замены по папке."""
+    processed: int = 0
+    changed: List[Tuple[str, int]] = field(default_factory=list)   # (путь, число замен)
+    unchanged: int = 0
+    no_frontmatter: int = 0
+    unsafe: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def run_replace(
+    root: str,
+    find_replace_map: Dict[str, str],
+    scope: str = SCOPE,
+    whole_token: bool = WHOLE_TOKEN,
+    exclude: Sequence[str] = EXCLUDE_GLOBS,
+    max_workers: Optional[int] = MAX_WORKERS,
+    dry_run: bool = DRY_RUN,
+) -> ReplaceReport:
+    """
+    Рекурсивно заменяет строки во frontmatter всех .md файлов папки.
+    Все шаблоны проверяются за один проход по заголовку, файлы обрабатываются параллельно.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"неизвестная область замены: {scope!r} (допустимо: {', '.join(SCOPES)})")
+    replacer = MultiReplacer(find_replace_map, whole_token)
+    rel_paths = list(iter_files(root, PathFilter(("**/*.md",), exclude)))
+    report = ReplaceReport(processed=len(rel_paths))
+
+    if max_workers == 1 or len(rel_paths) < PARALLEL_MIN_FILES:
+        results = replace_in_files(root, rel_paths, replacer, scope, dry_run)
+    else:
+        chunks = [rel_paths[i:i + CHUNK_SIZE] for i in range(0, len(rel_paths), CHUNK_SIZE)]
+        results = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(replace_in_files, root, chunk, replacer, scope, dry_run) for chunk in chunks]
+            for future in futures:
+                results.extend(future.result())
+
+    for rel_path, status, count, error in results:
+        if status == REPLACE_CHANGED:
+            report.changed.append((rel_path, count))
+        elif status == REPLACE_UNCHANGED:
+            report.unchanged += 1
+        elif status == REPLACE_NO_FRONTMATTER:
+            report.no_frontmatter += 1
+        else:
+            report.unsafe.append((rel_path, error or "после замены YAML не разбирается или свойства слились в одно"))
+    return report
+
+
+def print_report(report: ReplaceReport, dry_run: bool, elapsed: float):
+    action = "Будет обновлен" if dry_run else "Обновлен"
+    for rel_path, count in report.changed[:PRINT_LIMIT]:
+        print(f"  - {action} YAML в файле: {rel_path} (замен: {count})")
+    if len(report.changed) > PRINT_LIMIT:
+        print(f"  ... и еще {len(report.changed) - PRINT_LIMIT}")
+    for rel_path, reason in report.unsafe:
+        print(f"⚠️ Пропущен {rel_path}: {reason}", file=sys.stderr)
+    print(
+        f"\nОбработка завершена. Всего обработано файлов: {report.processed}. "
+        f"{'Требуют изменений' if dry_run else 'Обновлено'}: {len(report.changed)}. "
+        f"Без YAML-заголовка: {report.no_frontmatter}. Пропущено: {len(report.unsafe)} ({elapsed:.2f} сек.)"
+    )
+
+
 def find_and_replace(folder_path, find_replace_map):
     """
-    Выполняет поиск и замену текста в YAML-заголовке всех .md файлах в указанной папке.
+    Выполняет поиск и замену текста в YAML-заголовке всех .md файлов папки и ее подпапок
+    с настройками SCOPE, WHOLE_TOKEN и MAX_WORKERS.
 
     :param folder_path: Путь к папке с файлами Markdown.
     :param find_replace_map: Словарь, где ключ - текст для поиска, а значение - текст для замены.
     """
     print(f"Начинаю обработку YAML-заголовков в папке: {folder_path}\n")
-    updated_files_count = 0
-    processed_files_count = 0
-
-    # os.scandir() эффективнее для больших директорий, чем os.listdir()
-    for entry in os.scandir(folder_path):
-        # Обрабатываем только файлы с расширением .md
-        if entry.is_file() and entry.name.lower().endswith(".md"):
-            processed_files_count += 1
-            try:
-                with open(entry.path, "r", encoding="utf-8") as f:
-                    original_content = f.read()
-            except IOError as e:
-                print(f"Ошибка чтения файла {entry.name}: {e}", file=sys.stderr)
-                continue  # Переходим к следующему файлу
-
-            # Проверяем наличие и корректность YAML-заголовка
-            if not original_content.startswith('---'):
-                continue # Пропускаем файлы без YAML-заголовка
-
-            parts = original_content.split('---', 2)
-            if len(parts) < 3:
-                continue # Пропускаем файлы с некорректным заголовком (нет закрывающего '---')
-
-            # parts[1] - содержимое YAML-заголовка
-            # parts[2] - остальное содержимое файла
-            original_frontmatter = parts[1]
-            body = parts[2]
-
-            # Выполняем замены только в YAML-заголовке
-            modified_frontmatter = original_frontmatter
-            for find_text, replace_text in find_replace_map.items():
-                modified_frontmatter = modified_frontmatter.replace(find_text, replace_text)
-
-            # Перезаписываем файл, только если в YAML-заголовке были изменения
-            if modified_frontmatter != original_frontmatter:
-                new_content = f"---{modified_frontmatter}---{body}"
-                try:
-                    with open(entry.path, "w", encoding="utf-8") as f:
-                        f.write(new_content)
-                    print(f"  - Обновлен YAML в файле: {entry.name}")
-                    updated_files_count += 1
-                except IOError as e:
-                    print(f"Ошибка записи в файл {entry.name}: {e}", file=sys.stderr)
-
-    print(f"\nОбработка завершена. Всего обработано файлов: {processed_files_count}. Обновлено: {updated_files_count}.")
-
-def main():
+    started = time.perf_counter()
+    report = run_replace(folder_path, find_replace_map)
+    print_report(report, DRY_RUN, time.perf_counter() - started)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Заменяет строки в YAML-заголовках заметок за один проход.")
+    parser.add_argument("--root", default=TARGET_DIR, help="папка или хранилище (обходится рекурсивно)")
+    parser.add_argument("--map", action="append", default=[], metavar="FIND=REPLACE",
+                        help="пара замены (можно несколько); без них используется FIND_REPLACE_MAP")
+    parser.add_argument("--scope", choices=SCOPES, default=SCOPE, help="где менять: имена свойств, значения или всё")
+    parser.add_argument("--substring", action="store_true", help="заменять и внутри слов (отключает WHOLE_TOKEN)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="число процессов (1 — без параллельности)")
+    parser.add_argument("--dry-run", action="store_true", default=DRY_RUN, help="ничего не записывать")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Основная функция для запуска скрипта."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    folder_path = os.path.join(script_dir, FOLDER_NAME)
+    args = parse_args(argv)
+    folder_path = args.root if os.path.isabs(args.root) else os.path.join(SCRIPT_DIR, args.root)
 
     if not os.path.isdir(folder_path):
         print(f"Ошибка: Папка '{folder_path}' не найдена.", file=sys.stderr)
         sys.exit(1)
 
-    find_and_replace(folder_path, FIND_REPLACE_MAP)
+    find_replace_map = dict(pair.split("=", 1) for pair in args.map if "=" in pair) or FIND_REPLACE_MAP
+    whole_token = WHOLE_TOKEN and not args.substring
+    print(f"Начинаю обработку YAML-заголовков в папке: {folder_path}")
+    print(f"Область: {args.scope}, {'целые слова' if whole_token else 'подстроки'}, шаблонов: {len(find_replace_map)}\n")
+    started = time.perf_counter()
+    try:
+        report = run_replace(folder_path, find_replace_map, args.scope, whole_token,
+                             max_workers=args.workers, dry_run=args.dry_run)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        sys.exit(1)
+    print_report(report, args.dry_run, time.perf_counter() - started)
+
 
 if __name__ == "__main__":
     main()
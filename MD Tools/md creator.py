@@ -1,10 +1,27 @@
+import csv
+import json
 import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 
 # ================== SETTINGS ==================
 # Папка (относительно скрипта), в которой будут созданы файлы.
 OUTPUT_FOLDER_NAME = "working folder"
 
+# Файл с данными для массового создания заметок: .csv (первая строка — заголовки столбцов)
+# или .jsonl (один JSON-объект на строку). Относительный путь считается от папки скрипта.
+# None — создать заметки из списка ITEMS_TO_CREATE ниже (подставляется только поле {{name}},
+# остальные {{...}}, например шаблоны Templater, попадают в заметку как есть).
+SOURCE_FILE = None
+# Разделитель столбцов CSV
+CSV_DELIMITER = ","
+
 # Список элементов, для которых будут созданы .md файлы.
 # Каждый элемент в списке станет отдельным файлом.
 ITEMS_TO_CREATE = [
@@ -22,6 +39,12 @@ ITEMS_TO_CREATE = [
     "Даша"
 ]
 
+# Имя файла и содержимое заметки. {{поле}} заменяется значением столбца CSV или ключа JSONL
+# ({{адрес.город}} — вложенный ключ JSONL). После имени поля можно указать фильтр:
+#   {{name|yaml}}  — значение в кавычках, безопасное для YAML (списки — как ["a", "b"]);
+#   {{name|link}}  — [[значение]];  {{name|lower}} — строчными буквами.
+NAME_TEMPLATE = "{{name}}"
+
 # Шаблон YAML frontmatter для записи в каждый новый файл.
 # Используйте тройные кавычки для определения многострочного текста.
 YAML_TEMPLATE = """---
@@ -36,8 +59,42 @@ status:
   - in progress
 ---
 """
+
+# Хранилище, в котором проверяются совпадения имен (без учета регистра): в Obsidian две
+# заметки с одинаковым именем в разных папках путают ссылки. None — проверять только
+# папку OUTPUT_FOLDER_NAME.
+VAULT_PATH = None
+
+# Что делать, если заметка с таким именем уже есть: "skip" — пропустить строку,
+# "suffix" — добавить к имени номер ("Мама 1", "Мама 2", ...). Существующие файлы
+# не перезаписываются никогда.
+ON_COLLISION = "skip"
+
+# Число потоков записи файлов
+MAX_WORKERS = 4
 # ==============================================
 
+# Выбор файлов хранилища лежит в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_paths import DEFAULT_EXCLUDE, PathFilter, iter_files
+
+COLLISION_SKIP = "skip"
+COLLISION_SUFFIX = "suffix"
+
+# Сколько строк рендерится и отдается потокам записи за раз: в памяти не больше одной пачки
+WRITE_BATCH_SIZE = 512
+# Сколько созданных файлов и пропусков перечислять в консоли поименно
+PRINT_LIMIT = 20
+
+TEMPLATE_FIELD_RE = re.compile(r"\{\{\s*([^{}|\s]+)\s*(?:\|\s*(\w+)\s*)?\}\}")
+
+
+class TemplateError(ValueError):
+    """Ошибка в шаблоне или в строке данных (нет нужного поля, неизвестный фильтр)."""
+
+
 def sanitize_filename(name: str) -> str:
     """
     Очищает строку, чтобы она стала валидным именем файла, заменяя или удаляя недопустимые символы.
@@ -55,37 +112,271 @@ def sanitize_filename(name: str) -> str:
 
     return name
 
-def create_md_files(output_dir: str, items: list, template: str):
+
+def name_key(name: str) -> str:
+    """Ключ для сравнения имен заметок: без учета регистра и формы Unicode (macOS хранит NFD)."""
+    return unicodedata.normalize("NFC", name).casefold()
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_format_value(item) for item in value)
+    return str(value)
+
+
+FILTERS = {
+    "yaml": lambda value: json.dumps(value if isinstance(value, (list, int, float, bool)) else _format_value(value), ensure_ascii=False),
+    "link": lambda value: f"[[{_format_value(value)}]]",
+    "lower": lambda value: _format_value(value).lower(),
+}
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Шаблон, разобранный один раз: чередование текста и полей (имя, фильтр)."""
+    parts: Tuple[Any, ...]
+
+    def render(self, row: Dict[str, Any]) -> str:
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            name, filter_name = part
+            value = _lookup(row, name)
+            out.append(FILTERS[filter_name](value) if filter_name else _format_value(value))
+        return "".join(out)
+
+
+def _lookup(row: Dict[str, Any], name: str) -> Any:
+    if name in row:
+        return row[name]
+    value: Any = row
+    for key in name.split("."):
+        if not isinstance(value, dict) or key not in value:
+            raise TemplateError(f"нет поля '{name}'")
+        value = value[key]
+    return value
+
+
+def compile_template(text: str, fields: Optional[Set[str]] = None) -> CompiledTemplate:
+    """
+    Разбирает шаблон с полями {{поле}} и {{поле|фильтр}}. Если задан fields, поля с другими
+    именами остаются в тексте как есть (например, `{{date}}` для Templater в ITEMS_TO_CREATE).
+    """
+    parts: List[Any] = []
+    position = 0
+    for match in TEMPLATE_FIELD_RE.finditer(text):
+        name, filter_name = match.group(1), match.group(2)
+        if fields is not None and name not in fields:
+            continue
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        if filter_name and filter_name not in FILTERS:
+            raise TemplateError(f"неизвестный фильтр '{filter_name}' (доступны: {', '.join(FILTERS)})")
+        parts.append((name, filter_name))
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+    return CompiledTemplate(tuple(parts))
+
+
+def iter_rows(source_path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Построчно читает CSV или JSONL и выдает (номер строки, данные, ошибка). Файл целиком
+    в память не загружается; испорченная строка не прерывает импорт.
+    """
+    extension = os.path.splitext(source_path)[1].lower()
+    if extension == ".csv":
+        with open(source_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f, delimiter=CSV_DELIMITER)
+            for row in reader:
+                # DictReader дополняет короткую строку значениями None, а лишние поля кладет под ключ None
+                if None in row:
+                    yield reader.line_num, None, f"лишних полей: {len(row[None])} (столбцов в заголовке: {len(reader.fieldnames)})"
+                elif None in row.values():
+                    missing = sum(value is None for value in row.values())
+                    yield reader.line_num, None, f"не хватает полей: {missing} (столбцов в заголовке: {len(reader.fieldnames)})"
+                else:
+                    yield reader.line_num, row, None
+    elif extension in (".jsonl", ".ndjson"):
+        with open(source_path, "r", encoding="utf-8-sig") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, None, f"некорректный JSON: {e}"
+                    continue
+                if isinstance(row, dict):
+                    yield line_number, row, None
+                else:
+                    yield line_number, None, "ожидался JSON-объект"
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла '{source_path}': нужен .csv или .jsonl")
+
+
+def build_name_index(*roots: str) -> Set[str]:
+    """Ключи имен всех заметок в указанных папках (рекурсивно, без служебных папок)."""
+    names = set()
+    for root in roots:
+        if root and os.path.isdir(root):
+            for rel_path in iter_files(root, PathFilter(("**/*.md",), DEFAULT_EXCLUDE)):
+                names.add(name_key(os.path.splitext(rel_path.rsplit("/", 1)[-1])[0]))
+    return names
+
+
+@dataclass
+class CreateResult:
+    """Итог массового создания заметок."""
+    created: List[str] = field(default_factory=list)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)  # (имя или номер строки, причина)
+    errors: List[str] = field(default_factory=list)
+
+
+def _write_note(file_path: str, content: str) -> Optional[str]:
+    """Создает файл; режим 'x' не дает перезаписать уже существующий. Возвращает ошибку или None."""
+    try:
+        with open(file_path, "x", encoding="utf-8") as file:
+            file.write(content)
+        return None
+    except FileExistsError:
+        return "exists"
+    except OSError as e:
+        return str(e)
+
+
+def _unique_name(base_name: str, taken: Set[str], on_collision: str) -> Optional[str]:
+    if name_key(base_name) not in taken:
+        return base_name
+    if on_collision != COLLISION_SUFFIX:
+        return None
+    number = 1
+    while name_key(f"{base_name} {number}") in taken:
+        number += 1
+    return f"{base_name} {number}"
+
+
+def create_notes(
+    output_dir: str,
+    rows: Iterable[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+    name_template: str = NAME_TEMPLATE,
+    note_template: str = YAML_TEMPLATE,
+    vault_path: Optional[str] = VAULT_PATH,
+    on_collision: str = ON_COLLISION,
+    max_workers: int = MAX_WORKERS,
+    template_fields: Optional[Set[str]] = None,
+) -> CreateResult:
+    """
+    Создает по заметке на каждую строку данных. Шаблоны компилируются один раз; имена
+    сверяются с заметками хранилища (и папки output_dir) без учета регистра после
+    sanitize_filename; файлы пишутся пачками в несколько потоков и никогда не перезаписываются.
+    template_fields ограничивает поля, которые подставляются в шаблоны (см. compile_template).
+    """
+    if on_collision not in (COLLISION_SKIP, COLLISION_SUFFIX):
+        raise ValueError(f"ON_COLLISION должен быть '{COLLISION_SKIP}' или '{COLLISION_SUFFIX}'")
+    name_renderer = compile_template(name_template, template_fields)
+    note_renderer = compile_template(note_template, template_fields)
+    os.makedirs(output_dir, exist_ok=True)
+    taken = build_name_index(vault_path, output_dir)
+    result = CreateResult()
+
+    def flush(batch: List[Tuple[str, str, str]]):
+        for (name, file_path, _), error in zip(batch, executor.map(lambda item: _write_note(item[1], item[2]), batch)):
+            if error is None:
+                result.created.append(name)
+            elif error == "exists":
+                result.skipped.append((name, "файл уже существует"))
+            else:
+                result.errors.append(f"{name}: {error}")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        batch: List[Tuple[str, str, str]] = []
+        for line_number, row, row_error in rows:
+            if row_error is not None:
+                result.errors.append(f"строка {line_number}: {row_error}")
+                continue
+            try:
+                base_name = sanitize_filename(name_renderer.render(row)).strip()
+                content = note_renderer.render(row)
+            except TemplateError as e:
+                result.errors.append(f"строка {line_number}: {e}")
+                continue
+            if not base_name:
+                result.skipped.append((f"строка {line_number}", "пустое имя"))
+                continue
+            name = _unique_name(base_name, taken, on_collision)
+            if name is None:
+                result.skipped.append((base_name, "заметка с таким именем уже есть"))
+                continue
+            taken.add(name_key(name))
+            batch.append((name, os.path.join(output_dir, f"{name}.md"), content))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    return result
+
+
+def print_result(result: CreateResult, elapsed: float):
+    for name in result.created[:PRINT_LIMIT]:
+        print(f"  - Created: {name}.md")
+    if len(result.created) > PRINT_LIMIT:
+        print(f"  ... и еще {len(result.created) - PRINT_LIMIT}")
+    for name, reason in result.skipped[:PRINT_LIMIT]:
+        print(f"  ⚠️ Пропущено '{name}': {reason}")
+    if len(result.skipped) > PRINT_LIMIT:
+        print(f"  ... и еще {len(result.skipped) - PRINT_LIMIT} пропусков")
+    for error in result.errors:
+        print(f"  ❌ {error}", file=sys.stderr)
+    print(f"\nSuccessfully created {len(result.created)} .md files "
+          f"(пропущено: {len(result.skipped)}, ошибок: {len(result.errors)}, {elapsed:.2f} сек.).")
+
+
+def create_md_files(output_dir: str, items: list, template: str) -> CreateResult:
     """
     Создает .md файлы для списка элементов в указанной директории.
 
     :param output_dir: Абсолютный путь к выходной директории.
     :param items: Список строк, где каждая строка - это имя для нового файла.
     :param template: Содержимое (обычно YAML frontmatter), которое будет записано в каждый файл.
+                     Подставляется только {{name}}; остальные {{...}} записываются как есть.
     """
-    os.makedirs(output_dir, exist_ok=True)
     print(f"Creating files in: {output_dir}")
+    started = time.perf_counter()
+    rows = ((number, {"name": item}, None) for number, item in enumerate(items, 1))
+    result = create_notes(output_dir, rows, "{{name}}", template, vault_path=VAULT_PATH, template_fields={"name"})
+    print_result(result, time.perf_counter() - started)
+    return result
 
-    for item in items:
-        base_name = sanitize_filename(item)
-        file_name = f"{base_name}.md"
-        file_path = os.path.join(output_dir, file_name)
-
-        try:
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(template)
-            print(f"  - Created: {file_name}")
-        except IOError as e:
-            print(f"  - Error creating {file_name}: {e}")
-
-    print(f"\nSuccessfully created {len(items)} .md files.")
 
 def main():
     """Основная функция для запуска скрипта."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_directory = os.path.join(script_dir, OUTPUT_FOLDER_NAME)
 
-    create_md_files(output_directory, ITEMS_TO_CREATE, YAML_TEMPLATE)
+    if SOURCE_FILE is None:
+        create_md_files(output_directory, ITEMS_TO_CREATE, YAML_TEMPLATE)
+        return
+
+    source_path = SOURCE_FILE if os.path.isabs(SOURCE_FILE) else os.path.join(script_dir, SOURCE_FILE)
+    if not os.path.isfile(source_path):
+        print(f"❌ Файл с данными не найден: {source_path}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Creating files in: {output_directory}")
+    print(f"Источник данных: {source_path}")
+    started = time.perf_counter()
+    try:
+        result = create_notes(output_directory, iter_rows(source_path), NAME_TEMPLATE, YAML_TEMPLATE)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    print_result(result, time.perf_counter() - started)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence
+
+# ================== НАСТРОЙКИ ==================
+# Папка для обработки (обходится рекурсивно). Относительный путь считается от папки скрипта,
+# поэтому по умолчанию это та же 'working folder', что и у остальных скриптов.
+# Чтобы пройтись по всему хранилищу, укажите абсолютный путь, например "C:/Obsidian/MyVault".
+TARGET_DIR = "working folder"
+
+# Какие файлы обрабатывать и какие пропускать (шаблоны относительно TARGET_DIR, '**' — любые подпапки)
+INCLUDE_GLOBS = ["**/*.md"]
+EXCLUDE_GLOBS = [".obsidian/**", ".trash/**", ".git/**"]
+
+# Преобразования в порядке применения к каждому файлу (список имен: python md_batch_runner.py --list)
+TRANSFORMS = ["remove_image_size", "add_image_size"]
+
+# Число процессов: None — по числу ядер, 1 — последовательно в текущем процессе
+MAX_WORKERS = None
+
+# True — только показать, какие файлы изменятся, ничего не записывая
+DRY_RUN = False
+# ===============================================
+
+# Общие модули выбора и записи файлов лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
+from vault_paths import PathFilter, iter_files
+from vault_stream import write_text_atomically
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Меньше файлов обрабатывается последовательно: запуск процессов дороже самой работы
+PARALLEL_MIN_FILES = 64
+# Сколько файлов отдается процессу за раз
+CHUNK_SIZE = 32
+
+
+@dataclass(frozen=True)
+class TransformSpec:
+    """Преобразование текста заметки: функция `(content) -> content` из скрипта MD Tools."""
+    name: str
+    script: str    # файл скрипта в папке MD Tools
+    function: str  # имя функции в скрипте
+    description: str
+
+
+TRANSFORM_SPECS = {spec.name: spec for spec in (
+    TransformSpec("add_image_size", "add_image_size.py", "add_size_to_text",
+                  "![[file.ext]] -> ![[file.ext|IMAGE_WIDTH]]"),
+    TransformSpec("remove_image_size", "remove_image_size.py", "remove_size_from_text",
+                  "![[file.ext|width]] -> ![[file.ext]]"),
+    TransformSpec("checkboxes_to_bullets", "convert_checkboxes_to_bullets.py", "convert_checkboxes_in_text",
+                  "- [ ] и - [x] -> -"),
+    TransformSpec("string_flashcards", "convert strings to string-flashcards.py", "convert_to_string_flashcards",
+                  "![[file.ext]] -> ![[file.ext]]::file, без пустых строк между картинками"),
+    TransformSpec("flashcard_decks", "add_flashcard_decks.py", "add_deck_headers",
+                  "заголовки колод #flashcards/300paints/NN каждые 20 карточек"),
+)}
+
+
+@dataclass
+class FileResult:
+    """Итог обработки одного файла."""
+    path: str                                         # относительный путь
+    applied: List[str] = field(default_factory=list)  # преобразования, изменившие текст
+    written: bool = False
+    error: Optional[str] = None
+
+
+@lru_cache(maxsize=None)
+def load_transform(name: str) -> Callable[[str], str]:
+    """Загружает функцию преобразования из скрипта (один раз на процесс)."""
+    spec = TRANSFORM_SPECS[name]
+    module_spec = importlib.util.spec_from_file_location(
+        f"md_tools_{os.path.splitext(spec.script)[0].replace(' ', '_').replace('-', '_')}",
+        os.path.join(SCRIPT_DIR, spec.script),
+    )
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return getattr(module, spec.function)
+
+
+def process_file(root: str, rel_path: str, transform_names: Sequence[str], dry_run: bool = False) -> FileResult:
+    """Читает файл один раз, применяет все преобразования по очереди и пишет его, только если текст изменился."""
+    result = FileResult(rel_path)
+    file_path = os.path.join(root, rel_path)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            original_content = f.read()
+        content = original_content
+        for name in transform_names:
+            new_content = load_transform(name)(content)
+            if new_content != content:
+                result.applied.append(name)
+                content = new_content
+        if content != original_content and not dry_run:
+            write_text_atomically(file_path, content)
+            result.written = True
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _process_chunk(root: str, rel_paths: List[str], transform_names: Sequence[str], dry_run: bool) -> List[FileResult]:
+    return [process_file(root, rel_path, transform_names, dry_run) for rel_path in rel_paths]
+
+
+def run_batch(
+    root: str,
+    transform_names: Sequence[str],
+    include: Sequence[str] = INCLUDE_GLOBS,
+    exclude: Sequence[str] = EXCLUDE_GLOBS,
+    max_workers: Optional[int] = MAX_WORKERS,
+    dry_run: bool = DRY_RUN,
+) -> List[FileResult]:
+    """Применяет преобразования ко всем подходящим файлам папки `root` (рекурсивно)."""
+    if unknown := [name for name in transform_names if name not in TRANSFORM_SPECS]:
+        raise ValueError(f"Неизвестные преобразования: {', '.join(unknown)}. Доступны: {', '.join(TRANSFORM_SPECS)}")
+    rel_paths = list(iter_files(root, PathFilter(include, exclude)))
+    if not rel_paths or not transform_names:
+        return []
+
+    if max_workers == 1 or len(rel_paths) < PARALLEL_MIN_FILES:
+        return _process_chunk(root, rel_paths, transform_names, dry_run)
+
+    chunks = [rel_paths[i:i + CHUNK_SIZE] for i in range(0, len(rel_paths), CHUNK_SIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_process_chunk, root, chunk, list(transform_names), dry_run) for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def print_results(results: List[FileResult], dry_run: bool, elapsed: float):
+    changed = [result for result in results if result.applied and not result.error]
+    errors = [result for result in results if result.error]
+    for result in changed:
+        action = "будет изменен" if dry_run else "обновлен"
+        print(f"Файл '{result.path}' {action}: {', '.join(result.applied)}.")
+    for result in errors:
+        print(f"Ошибка при обработке файла {result.path}: {result.error}", file=sys.stderr)
+    print(
+        f"\nОбработано файлов: {len(results)}, "
+        f"{'требуют изменений' if dry_run else 'изменено'}: {len(changed)}, "
+        f"без изменений: {len(results) - len(changed) - len(errors)}, ошибок: {len(errors)} "
+        f"({elapsed:.2f} сек.)"
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Применяет несколько преобразований MD Tools за один проход по папке.")
+    parser.add_argument("--root", default=TARGET_DIR, help="папка для обработки (обходится рекурсивно)")
+    parser.add_argument("--transforms", default=",".join(TRANSFORMS), help="преобразования через запятую, в порядке применения")
+    parser.add_argument("--include", action="append", help="шаблон включаемых файлов (можно несколько раз)")
+    parser.add_argument("--exclude", action="append", help="шаблон исключаемых файлов и папок (можно несколько раз)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="число процессов (1 — без параллельности)")
+    parser.add_argument("--dry-run", action="store_true", default=DRY_RUN, help="ничего не записывать")
+    parser.add_argument("--list", action="store_true", help="показать доступные преобразования")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.list:
+        for spec in TRANSFORM_SPECS.values():
+            print(f"{spec.name:24} {spec.description}  ({spec.script})")
+        return 0
+
+    root = args.root if os.path.isabs(args.root) else os.path.join(SCRIPT_DIR, args.root)
+    if not os.path.isdir(root):
+        print(f"Ошибка: Папка '{root}' не найдена.", file=sys.stderr)
+        return 1
+    transform_names = [name.strip() for name in args.transforms.split(",") if name.strip()]
+
+    print(f"Начинаю обработку файлов в папке: {root}")
+    print(f"Преобразования: {', '.join(transform_names)}\n")
+    started = time.perf_counter()
+    try:
+        results = run_batch(
+            root, transform_names,
+            include=args.include or INCLUDE_GLOBS,
+            exclude=args.exclude or EXCLUDE_GLOBS,
+            max_workers=args.workers,
+            dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    print_results(results, args.dry_run, time.perf_counter() - started)
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
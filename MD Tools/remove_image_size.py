@@ -2,6 +2,17 @@ import os
 import re
 import sys
 
+# Регулярное выражение для поиска ссылок с указанием размера.
+# Оно ищет ![[...|число]]
+# Группа 1: ([^|\]]+) - захватывает имя файла.
+# [0-9]+ - соответствует одному или нескольким цифровым символам (размеру).
+EMBED_WITH_SIZE_RE = re.compile(r'!\[\[([^|\]]+)\|[0-9]+\]\]')
+
+def remove_size_from_text(content):
+    """Возвращает текст, в котором из ссылок ![[filename.ext|width]] убран размер."""
+    # \1 - это ссылка на захваченную группу 1 (имя файла).
+    return EMBED_WITH_SIZE_RE.sub(r'![[\1]]', content)
+
 def remove_size_from_links(file_path):
     """
     Удаляет размер из ссылок на изображения в markdown-файле.
@@ -11,15 +22,7 @@ def remove_size_from_links(file_path):
         with open(file_path, 'r', encoding='utf-8') as f:
             original_content = f.read()
 
-        # Регулярное выражение для поиска ссылок с указанием размера.
-        # Оно ищет ![[...|число]]
-        # Группа 1: ([^|\]]+) - захватывает имя файла.
-        # [0-9]+ - соответствует одному или нескольким цифровым символам (размеру).
-        regex = re.compile(r'!\[\[([^|\]]+)\|[0-9]+\]\]')
-        
-        # Замена, оставляющая только имя файла внутри двойных скобок.
-        # \1 - это ссылка на захваченную группу 1 (имя файла).
-        new_content = regex.sub(r'![[\1]]', original_content)
+        new_content = remove_size_from_text(original_content)
 
         # Перезаписываем файл, только если были внесены изменения.
         if new_content != original_content:
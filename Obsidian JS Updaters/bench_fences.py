@@ -0,0 +1,168 @@
+"""
+Проверка эквивалентности и замер скорости сканера блоков dataviewjs (obsidian_updater_fences.py).
+
+1. На корпусе обычных и "неудобных" заметок сканер должен находить те же диапазоны блоков
+   и разделителей, что и прежнее регулярное выражение, а удаление разделителей — давать
+   тот же текст.
+2. На патологических заметках (огромный незакрытый блок, множество незакрытых и коротких блоков,
+   вложенные обратные кавычки, CRLF) сравнивается время регулярного выражения и сканера
+   при росте размера заметки.
+3. Проверяется, что ограничение времени на файл срабатывает.
+
+Запуск: python bench_fences.py
+"""
+import re
+import sys
+import time
+
+from obsidian_updater_fences import FenceScanTimeout, scan_dataviewjs_blocks, remove_separators, replace_blocks
+
+# Прежнее регулярное выражение — эталон поведения
+LEGACY_BLOCK_RE = re.compile(r"(```dataviewjs.*?\n```)(\s*---\s*\n)?", re.DOTALL)
+
+BLOCK = "```dataviewjs\nconst x = 1;\ndv.table([], []);\n```"
+
+# --- КОРПУС ЭКВИВАЛЕНТНОСТИ ---
+CORPUS = [
+    "",
+    "просто текст без блоков\n",
+    f"---\ntype: project\n---\n{BLOCK}\n---\nтекст\n",
+    f"{BLOCK}\n\n  ---  \n\nтекст",
+    f"{BLOCK}---\n",
+    f"{BLOCK}\n----\nне разделитель\n",
+    f"{BLOCK}\n--- текст\n",
+    f"{BLOCK}\n---",
+    f"{BLOCK}\n{BLOCK}\n---\n{BLOCK}",
+    f"{BLOCK}\r\n---\r\nCRLF\r\n",
+    "```dataviewjs\r\nconst a = '```';\r\n```\r\n---\r\n",
+    "```dataviewjs\n```\n---\n",
+    "```dataviewjs```\n```\n",
+    "```dataviewjs\nconsole.log(`a ${'```'}`)\n````\n---\n",
+    "```dataviewjs\n```dataviewjs\n```\n---\n",
+    "```dataviewjs\nнезакрытый блок\n",
+    f"```dataviewjs\nнезакрытый\n{BLOCK}\n",
+    f"{BLOCK}\n---\n```dataviewjs\nнезакрытый",
+    "```js\nне dataviewjs\n```\n---\n",
+    f"{BLOCK} \n--- \n",
+]
+
+
+def legacy_spans(content: str):
+    return [(m.start(), m.end(1), m.end()) for m in LEGACY_BLOCK_RE.finditer(content)]
+
+
+def legacy_remove(content: str) -> str:
+    return LEGACY_BLOCK_RE.sub(lambda m: m.group(1) + "\n\n" if m.group(2) else m.group(0), content)
+
+
+def legacy_replace(content: str, replacement: str) -> str:
+    # Старая замена через subn: шаблон — буквальная строка (без интерпретации \1 и т.п.)
+    return LEGACY_BLOCK_RE.sub(lambda m: replacement, content)
+
+
+def check_equivalence() -> bool:
+    ok = True
+    for content in CORPUS:
+        blocks = scan_dataviewjs_blocks(content, time_budget=None)
+        spans = [(b.start, b.end, b.separator_end) for b in blocks]
+        if spans != legacy_spans(content):
+            ok = False
+            print(f"  ❌ Диапазоны расходятся для {content!r}: {spans} != {legacy_spans(content)}")
+        if remove_separators(content, blocks)[0] != legacy_remove(content):
+            ok = False
+            print(f"  ❌ Удаление разделителей расходится для {content!r}")
+        # Шаблон с разделителем (заканчивается переносом строки) заменяется так же, как раньше
+        replacement = BLOCK + "\n---\n"
+        if replace_blocks(content, blocks, replacement)[0] != legacy_replace(content, replacement):
+            ok = False
+            print(f"  ❌ Замена блоков расходится для {content!r}")
+    # Обратные слэши в шаблоне переносятся как есть
+    backslash_block = "```dataviewjs\nconst re = /\\d+\\n/;\n```"
+    if replace_blocks(BLOCK, scan_dataviewjs_blocks(BLOCK), backslash_block)[0] != backslash_block:
+        ok = False
+        print("  ❌ Обратные слэши в шаблоне изменены при замене")
+    return ok
+
+
+# --- ПАТОЛОГИЧЕСКИЕ ЗАМЕТКИ ---
+def huge_unclosed_block(size: int) -> str:
+    return "```dataviewjs\n" + ("const line = 'text';\n" * (size // 21))
+
+
+def many_unclosed_blocks(size: int) -> str:
+    # Открывающая строка не в начале строки, поэтому следующая не закрывает предыдущую
+    return ("x ```dataviewjs\nconst a = 1;\n" * (size // 29))
+
+
+def many_closed_blocks(size: int) -> str:
+    return ("```dataviewjs\nx\n" * (size // 16)) + "\n```"
+
+
+def nested_backticks(size: int) -> str:
+    return ("```dataviewjs\nconst s = '``' + '`';\n``\n" * (size // 40)) + "\n```"
+
+
+def crlf_blocks(size: int) -> str:
+    unit = "```dataviewjs\r\ndv.list([]);\r\n```\r\n  ---  \r\nтекст\r\n"
+    return unit * (size // len(unit))
+
+
+PATHOLOGICAL = {
+    "огромный незакрытый блок": huge_unclosed_block,
+    "много незакрытых блоков": many_unclosed_blocks,
+    "много коротких блоков": many_closed_blocks,
+    "вложенные обратные кавычки": nested_backticks,
+    "CRLF и разделители": crlf_blocks,
+}
+# Размеры заметок; регулярное выражение на больших размерах не запускается, если
+# на предыдущем размере оно уже заняло больше REGEX_TIME_CAP секунд
+SIZES = (10_000, 40_000, 160_000)
+REGEX_TIME_CAP = 5.0
+
+
+def _timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def run_benchmarks():
+    for name, make in PATHOLOGICAL.items():
+        print(f"\n🔄 {name}:")
+        regex_too_slow = False
+        for size in SIZES:
+            content = make(size)
+            scanner_time = _timed(scan_dataviewjs_blocks, content, None)
+            if regex_too_slow:
+                regex_text = "пропущено"
+            else:
+                regex_time = _timed(legacy_spans, content)
+                regex_too_slow = regex_time > REGEX_TIME_CAP
+                regex_text = f"{regex_time * 1000:9.1f} мс"
+            print(f"  - {len(content):>8} симв.: регулярное выражение {regex_text}, сканер {scanner_time * 1000:7.2f} мс")
+
+
+def check_time_budget() -> bool:
+    content = many_closed_blocks(160_000)
+    try:
+        scan_dataviewjs_blocks(content, time_budget=0.0)
+    except FenceScanTimeout as e:
+        print(f"✅ Ограничение времени сработало: {e}")
+        return True
+    print("❌ Ограничение времени не сработало.")
+    return False
+
+
+def main():
+    print("🔄 Проверка эквивалентности с прежним регулярным выражением...")
+    if not check_equivalence():
+        print("❌ Обнаружены расхождения.")
+        sys.exit(1)
+    print(f"✅ Все {len(CORPUS)} заметок корпуса обработаны одинаково.")
+    if not check_time_budget():
+        sys.exit(1)
+    run_benchmarks()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,79 @@
 import os
-import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import List, Tuple
-
-# PyYAML требуется для работы. Установите его: pip install PyYAML
-try:
-    import yaml
-except ImportError:
-    print("❌ Ошибка: Библиотека PyYAML не найдена. Пожалуйста, установите ее: pip install PyYAML")
-    sys.exit(1)
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Callable, FrozenSet, List, Optional, Tuple
 
 from obsidian_updater_core import (
     AnalysisResult,
+    CandidateFilter,
+    FRONTMATTER_COLUMNS_NAME,
+    TRIGRAM_INDEX_NAME,
     FRONTMATTER_RE,
-    DATAVIEWJS_BLOCK_RE,
+    FRONTMATTER_OPEN_RE,
     INLINE_SELECT_RE,
+    FRONTMATTER_READ_BLOCK_SIZE,
+    FRONTMATTER_READ_LIMIT,
+    BODY_CHECK_BLOCKS,
+    BODY_CHECK_INLINE_SELECT,
+    ALL_BODY_CHECKS,
     format_yaml_value
 )
+from obsidian_updater_fences import scan_dataviewjs_blocks
+from obsidian_updater_fingerprints import block_fingerprint
+from vault_frontmatter import parse_frontmatter, FrontmatterError
+from vault_frontmatter_columns import build_columns_index
+from vault_paths import PathFilter
+from vault_trigrams import build_trigram_index, candidate_paths
+from vault_telemetry import (
+    active as active_telemetry, count, phase, read_text_timed,
+    PHASE_WALK, PHASE_READ, PHASE_DECODE, PHASE_FRONTMATTER, PHASE_REGEX,
+)
 
-def analyze_file(file_path: str, special_names: List[str], target_types: List[str]) -> AnalysisResult:
-    """Анализирует один markdown-файл, извлекая метаданные и считая dataviewjs блоки."""
+def read_frontmatter_only(file_path: str, block_size: int = FRONTMATTER_READ_BLOCK_SIZE, limit: int = FRONTMATTER_READ_LIMIT) -> str:
+    """
+    Читает начало файла блоками, пока не найдется закрывающий '---' frontmatter.
+    Возвращает прочитанный префикс: он содержит весь frontmatter, если тот есть.
+    Если frontmatter не закрылся в пределах `limit` символов, выбрасывает ValueError.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        head = f.read(block_size)
+        while True:
+            if not head.startswith('---'):
+                return head
+            # Открывающая строка уже прочитана, но это не '---' (например, '----' или '---text')
+            if '\n' in head and not FRONTMATTER_OPEN_RE.match(head):
+                return head
+            if FRONTMATTER_RE.match(head):
+                return head
+            if len(head) >= limit:
+                raise ValueError(f"Frontmatter не закрыт в пределах {limit} символов")
+            chunk = f.read(block_size)
+            if not chunk:
+                return head
+            head += chunk
+
+def analyze_file(
+    file_path: str,
+    special_names: List[str],
+    target_types: List[str],
+    body_checks: FrozenSet[str] = ALL_BODY_CHECKS,
+    frontmatter_read_limit: int = FRONTMATTER_READ_LIMIT,
+) -> AnalysisResult:
+    """
+    Анализирует один markdown-файл, извлекая метаданные и считая dataviewjs блоки.
+    Если `body_checks` пуст, файл читается только до конца frontmatter.
+    Время фаз (чтение, декодирование, разбор frontmatter, поиск в тексте) возвращается в `timings`.
+    """
+    timings = {}
+    size_bytes = 0
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if body_checks:
+            content, size_bytes, timings[PHASE_READ], timings[PHASE_DECODE] = read_text_timed(file_path)
+        else:
+            started = time.perf_counter()
+            content = read_frontmatter_only(file_path, limit=frontmatter_read_limit)
+            timings[PHASE_READ] = time.perf_counter() - started
 
         is_special_name = os.path.basename(file_path) in special_names
         area, file_type_str = "[No Area]", "[No Type]"
@@ -31,10 +82,13 @@ def analyze_file(file_path: str, special_names: List[str], target_types: List[st
         status_is_important = False
         original_status_value = None
         has_target_type, has_non_target_type = False, False
+        type_values = ()
 
+        started = time.perf_counter()
         if fm_match := FRONTMATTER_RE.match(content):
             try:
-                if (frontmatter := yaml.safe_load(fm_match.group(1))) and isinstance(frontmatter, dict):
+                frontmatter = parse_frontmatter(fm_match.group(1))
+                if frontmatter and isinstance(frontmatter, dict):
                     area = format_yaml_value(frontmatter.get('Area'), '[No Area]')
                     
                     if status_val := frontmatter.get('status'):
@@ -47,49 +101,134 @@ def analyze_file(file_path: str, special_names: List[str], target_types: List[st
                     if file_type := frontmatter.get('type'):
                         file_type_str = format_yaml_value(file_type, '[No Type]')
                         types_to_check = {str(s) for s in (file_type if isinstance(file_type, list) else [file_type]) if s}
+                        type_values = tuple(sorted(types_to_check))
                         if types_to_check:
                             # Проверяем, что target_types не None, прежде чем создавать set
                             target_types_set = set(target_types) if target_types is not None else set()
                             has_target_type = not types_to_check.isdisjoint(target_types_set)
                             has_non_target_type = bool(types_to_check - target_types_set)
-            except yaml.YAMLError as e:
-                return AnalysisResult(file_path, is_target=False, error=f"Ошибка YAML: {e}")
+            except FrontmatterError as e:
+                return AnalysisResult(file_path, is_target=False, error=f"Ошибка YAML: {e}", size_bytes=size_bytes, timings=timings)
+        timings[PHASE_FRONTMATTER] = time.perf_counter() - started
 
+        started = time.perf_counter()
         is_target = is_special_name or has_target_type
         
-        has_inline_select_string = bool(INLINE_SELECT_RE.search(content))
+        has_inline_select_string = False
+        if BODY_CHECK_INLINE_SELECT in body_checks:
+            has_inline_select_string = bool(INLINE_SELECT_RE.search(content))
 
         block_count = 0
+        block_hashes = ()
         separators_found_count = 0
-        for match in DATAVIEWJS_BLOCK_RE.finditer(content):
-            block_count += 1
-            if match.group(2):  # Если группа с разделителем найдена
-                separators_found_count += 1
+        if BODY_CHECK_BLOCKS in body_checks:
+            blocks = scan_dataviewjs_blocks(content)
+            block_count = len(blocks)
+            block_hashes = tuple(block_fingerprint(content[block.start:block.end]) for block in blocks)
+            separators_found_count = sum(1 for block in blocks if block.has_separator)
+        timings[PHASE_REGEX] = time.perf_counter() - started
         
         return AnalysisResult(
-            file_path, is_target=is_target, area=area, file_type=file_type_str,
+            file_path, is_target=is_target, area=area, file_type=file_type_str, type_values=type_values,
             has_target_type=has_target_type, has_non_target_type=has_non_target_type,
             block_count=block_count,
+            block_hashes=block_hashes,
             separators_found_count=separators_found_count,
             status_is_list=status_is_list,
             status_is_not_string=status_is_not_string,
             status_is_important=status_is_important,
             has_inline_select_string=has_inline_select_string,
-            original_status_value=original_status_value
+            original_status_value=original_status_value,
+            size_bytes=size_bytes,
+            timings=timings
         )
 
     except Exception as e:
-        return AnalysisResult(file_path, is_target=False, error=f"{type(e).__name__}: {e}")
+        return AnalysisResult(file_path, is_target=False, error=f"{type(e).__name__}: {e}", size_bytes=size_bytes, timings=timings)
+
+# Все .md файлы хранилища без исключений — как при обходе в run_analysis
+ALL_MARKDOWN_FILTER = PathFilter(("**/*.[mM][dD]",), ())
 
-def run_analysis(vault_path: str, special_names: List[str], target_types: List[str], return_all_files: bool = False) -> Tuple[List[AnalysisResult], List[AnalysisResult]]:
-    """Сканирует хранилище и анализирует файлы в несколько потоков."""
+def select_candidates(
+    vault_path: str,
+    script_dir: str,
+    candidate_filter: CandidateFilter,
+    frontmatter_read_limit: int = FRONTMATTER_READ_LIMIT,
+) -> Tuple[List[str], int]:
+    """
+    Возвращает пути файлов, которые может выбрать операция с фильтром `candidate_filter`,
+    и общее число заметок хранилища. 'type' и 'status' ищутся по инвертированным спискам
+    колоночного индекса frontmatter, регулярки по тексту — по триграммному индексу; файлы
+    с ошибками frontmatter попадают в кандидаты всегда (чтобы они оказались в отчете).
+    Оба индекса лежат в `script_dir` и обновляются инкрементально: заново читаются только
+    изменившиеся заметки.
+    """
+    with phase("frontmatter_index"):
+        columns = build_columns_index(vault_path, ALL_MARKDOWN_FILTER, os.path.join(script_dir, FRONTMATTER_COLUMNS_NAME),
+                                      read_limit=frontmatter_read_limit)
+    candidates = set(columns.any_of("type", candidate_filter.target_types))
+    candidates.update(columns.any_of("status", candidate_filter.status_values))
+    candidates.update(rel for rel in columns.ids if rel.rsplit("/", 1)[-1] in candidate_filter.special_names)
+    candidates.update(rel for rel, _ in columns.errors)
+    count("frontmatter_index_parsed", columns.parsed)
+    message = f"ℹ️ Индекс frontmatter: {len(columns)} заметок (разобрано заново: {columns.parsed})"
+    if candidate_filter.content_patterns:
+        with phase("trigram_index"):
+            trigrams = build_trigram_index(vault_path, ALL_MARKDOWN_FILTER, os.path.join(script_dir, TRIGRAM_INDEX_NAME))
+            candidates.update(candidate_paths(trigrams, candidate_filter.content_patterns))
+        count("trigram_index_read", trigrams.indexed)
+        message += f", триграммный индекс: прочитано заново {trigrams.indexed}"
+    print(f"{message}; к анализу отобрано: {len(candidates)}.")
+    return [os.path.join(vault_path, *rel.split("/")) for rel in sorted(candidates)], len(columns)
+
+def _record_result_timings(telemetry, result: AnalysisResult, vault_path: str):
+    for name, seconds in result.timings.items():
+        telemetry.add_phase_time(name, seconds)
+    telemetry.count("files")
+    telemetry.count("bytes_read", result.size_bytes)
+    if result.error:
+        telemetry.count("analysis_errors")
+    telemetry.record_file(os.path.relpath(result.file_path, vault_path), sum(result.timings.values()), result.size_bytes)
+
+def run_analysis(
+    vault_path: str,
+    special_names: List[str],
+    target_types: List[str],
+    return_all_files: bool = False,
+    body_checks: FrozenSet[str] = ALL_BODY_CHECKS,
+    frontmatter_read_limit: int = FRONTMATTER_READ_LIMIT,
+    executor: Optional[Executor] = None,
+    on_result: Optional[Callable[[AnalysisResult], None]] = None,
+    paths: Optional[List[str]] = None,
+) -> Tuple[List[AnalysisResult], List[AnalysisResult]]:
+    """
+    Сканирует хранилище и анализирует файлы в несколько потоков.
+    `body_checks` задает проверки тела файла, нужные операции (пустой набор — только frontmatter).
+    `executor` — уже запущенный пул процессов (например, общий для очереди заданий);
+    если он не передан, создается и закрывается собственный пул.
+    `on_result` вызывается для каждого результата сразу по готовности (например, для потоковой записи отчета).
+    `paths` — заранее отобранные файлы (см. select_candidates); без них обходится всё хранилище.
+    Если запущены замеры (vault_telemetry), в них попадают время фаз рабочих процессов
+    (суммарное по всем процессам), размеры и самые медленные файлы.
+    """
     print("\nНачинаю анализ файлов в хранилище...")
-    all_md_files = [os.path.join(root, file) for root, _, files in os.walk(vault_path) for file in files if file.lower().endswith('.md')]
+    if paths is not None:
+        all_md_files = list(paths)
+    else:
+        with phase(PHASE_WALK):
+            all_md_files = [os.path.join(root, file) for root, _, files in os.walk(vault_path) for file in files if file.lower().endswith('.md')]
     
+    telemetry = active_telemetry()
     all_results = []
-    with ProcessPoolExecutor() as executor:
-        futures = [executor.submit(analyze_file, path, special_names, target_types) for path in all_md_files]
-        all_results.extend(future.result() for future in as_completed(futures))
+    with (nullcontext(executor) if executor else ProcessPoolExecutor()) as pool:
+        futures = [pool.submit(analyze_file, path, special_names, target_types, body_checks, frontmatter_read_limit) for path in all_md_files]
+        for future in as_completed(futures):
+            result = future.result()
+            all_results.append(result)
+            if telemetry is not None:
+                _record_result_timings(telemetry, result, vault_path)
+            if on_result:
+                on_result(result)
 
     error_files = [r for r in all_results if r.error]
     
@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 # PyYAML требуется для работы. Установите его: pip install PyYAML
 try:
@@ -9,6 +9,9 @@ except ImportError:
     print("❌ Ошибка: Библиотека PyYAML не найдена. Пожалуйста, установите ее: pip install PyYAML")
     sys.exit(1)
 
+from obsidian_updater_core import VAULT_CONFIG_NAME, FRONTMATTER_READ_LIMIT
+from vault_telemetry import ask
+
 def get_all_configs(script_dir: str, exclude: Optional[str] = None) -> List[str]:
     """Находит все .yml файлы, опционально исключая один."""
     exclude_list = [exclude] if exclude else []
@@ -32,7 +35,7 @@ def select_config(config_files: List[str], script_dir: str) -> Optional[str]:
         print(f"{i}. {f}")
     while True:
         try:
-            choice = int(input(f"Введите номер (1-{len(config_files)}): "))
+            choice = int(ask(f"Введите номер (1-{len(config_files)}): "))
             if 1 <= choice <= len(config_files):
                 return os.path.join(script_dir, config_files[choice - 1])
             print("Неверный номер.")
@@ -46,4 +49,35 @@ def load_config(config_path: str) -> Optional[dict]:
             return yaml.safe_load(f)
     except Exception as e:
         print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось прочитать или разобрать файл '{config_path}': {e}")
-        return None
\ No newline at end of file
+        return None
+
+def load_vault_settings(script_dir: str, vault_path: Optional[str] = None) -> Optional[Tuple[str, int]]:
+    """
+    Читает глобальный vault_config.yml и проверяет путь к хранилищу.
+    `vault_path` (из аргументов или файла заданий) важнее ключа 'vault_path' файла; остальные
+    настройки файла (frontmatter_read_limit) применяются и тогда, а сам файл становится необязательным.
+    Возвращает (vault_path, frontmatter_read_limit) или None с сообщением об ошибке.
+    """
+    vault_config_path = os.path.join(script_dir, VAULT_CONFIG_NAME)
+    vault_config = {}
+    if os.path.exists(vault_config_path):
+        vault_config = load_config(vault_config_path) or {}
+    elif vault_path is None:
+        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Глобальный конфигурационный файл '{VAULT_CONFIG_NAME}' не найден.")
+        print("Пожалуйста, создайте его и укажите 'vault_path'.")
+        return None
+
+    source = "указанный в аргументах или файле заданий" if vault_path else f"указанный в '{VAULT_CONFIG_NAME}'"
+    if not vault_path and not (vault_path := vault_config.get("vault_path")):
+        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Ключ 'vault_path' не найден в '{VAULT_CONFIG_NAME}'.")
+        return None
+
+    # Относительный путь считается от папки со скриптами; слэши нормализуются для кросс-платформенной совместимости
+    vault_path = os.path.join(script_dir, vault_path).replace('\\', '/')
+    # Предел чтения frontmatter для операций, которым не нужно тело файла
+    frontmatter_read_limit = vault_config.get("frontmatter_read_limit", FRONTMATTER_READ_LIMIT)
+
+    if not os.path.isdir(vault_path):
+        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Путь '{vault_path}', {source}, не существует или не является папкой.")
+        return None
+    return vault_path, frontmatter_read_limit
@@ -1,17 +1,53 @@
+import os
 import re
-from dataclasses import dataclass
-from typing import Optional
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Pattern, Tuple
+
+# Общие для всех инструментов модули (разбор frontmatter и т.д.) лежат в соседней папке
+VAULT_CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Obsidian Vault Core")
+if VAULT_CORE_DIR not in sys.path:
+    sys.path.insert(0, VAULT_CORE_DIR)
 
 # --- КОНСТАНТЫ ---
+VAULT_CONFIG_NAME = "vault_config.yml"
 SEPARATOR_CONFIG_NAME = "separator_remove.yml"
+# Индекс отпечатков блоков dataviewjs и версий шаблонов (лежит рядом со скриптами)
+FINGERPRINT_INDEX_NAME = "dataviewjs_fingerprints.json"
+# Колоночный индекс frontmatter хранилища (см. vault_frontmatter_columns): по нему операции,
+# выбирающие файлы по 'type', анализируют только подходящие заметки (лежит рядом со скриптами)
+FRONTMATTER_COLUMNS_NAME = "frontmatter_columns.json"
+# Триграммный индекс содержимого заметок (см. vault_trigrams): по нему операции, ищущие строку
+# в тексте (например, inlineSelect), читают только заметки, где она может встретиться
+TRIGRAM_INDEX_NAME = "content_trigrams.bin"
+# Замеры времени по фазам последнего интерактивного запуска (см. vault_telemetry)
+TELEMETRY_FILE_NAME = "updater_telemetry.json"
 # Регулярное выражение для поиска frontmatter
 FRONTMATTER_RE = re.compile(r'^---\s*\n(.*?\n)---\s*\n', re.DOTALL)
-# Регулярное выражение для анализа: находит блок и опционально разделитель после него
-DATAVIEWJS_BLOCK_RE = re.compile(r"(```dataviewjs.*?\n```)(\s*---\s*\n)?", re.DOTALL)
-# Регулярное выражение для операции удаления: находит блок, ТОЛЬКО если за ним есть разделитель
-SEPARATOR_REMOVAL_RE = re.compile(r"(```dataviewjs.*?\n```)\s*---\s*\n", re.DOTALL)
 # Регулярное выражение для поиска строки inlineSelect
 INLINE_SELECT_RE = re.compile(r"INPUT\[inlineSelect\(.*?\):status\]")
+# Начало открывающей строки frontmatter (нужно для чтения только заголовка файла)
+FRONTMATTER_OPEN_RE = re.compile(r'---\s*\n')
+
+# --- ЧТЕНИЕ ТОЛЬКО FRONTMATTER ---
+# Размер блока (в символах), которым читается начало файла до закрывающего '---'
+FRONTMATTER_READ_BLOCK_SIZE = 4096
+# Предел по умолчанию (в символах): если frontmatter не закрылся раньше, файл попадает в ошибки.
+# Можно переопределить ключом 'frontmatter_read_limit' в vault_config.yml
+FRONTMATTER_READ_LIMIT = 64 * 1024
+
+# --- ПОИСК БЛОКОВ DATAVIEWJS ---
+# Блоки dataviewjs ищутся линейным сканером (obsidian_updater_fences.py).
+# Предел времени (в секундах) на поиск блоков в одном файле: если он превышен,
+# файл попадает в ошибки и не изменяется.
+FENCE_SCAN_TIME_BUDGET = 2.0
+
+# --- ПРОВЕРКИ ТЕЛА ФАЙЛА ---
+# Операция запрашивает только те проверки тела, которые ей нужны.
+# Пустой набор означает, что файл читается только до конца frontmatter.
+BODY_CHECK_BLOCKS = "blocks"                # dataviewjs блоки и разделители после них
+BODY_CHECK_INLINE_SELECT = "inline_select"  # строка INPUT[inlineSelect(...):status]
+ALL_BODY_CHECKS = frozenset({BODY_CHECK_BLOCKS, BODY_CHECK_INLINE_SELECT})
 
 
 @dataclass
@@ -21,9 +57,11 @@ class AnalysisResult:
     is_target: bool
     area: str = "[No Area]"
     file_type: Optional[str] = "[No Type]"
+    type_values: Tuple[str, ...] = ()
     has_target_type: bool = False
     has_non_target_type: bool = False
     block_count: int = 0
+    block_hashes: Tuple[str, ...] = ()
     separators_found_count: int = 0
     status_is_list: bool = False
     status_is_not_string: bool = False
@@ -31,6 +69,28 @@ class AnalysisResult:
     has_inline_select_string: bool = False
     original_status_value: Optional[any] = None
     error: Optional[str] = None
+    # Замеры рабочего процесса: размер файла и время по фазам (см. vault_telemetry)
+    size_bytes: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class CandidateFilter:
+    """
+    По каким признакам операция выбирает файлы. Если они известны, к анализу достаточно
+    отобрать заметки по индексам хранилища (frontmatter и триграммы), не читая остальные.
+    """
+    target_types: FrozenSet[str] = frozenset()     # 'type' из списка
+    special_names: FrozenSet[str] = frozenset()    # имя файла из списка
+    status_values: FrozenSet[str] = frozenset()    # 'status' из списка
+    content_patterns: Tuple[Pattern, ...] = ()     # регулярки по тексту заметки
+
+    def merge(self, other: "CandidateFilter") -> "CandidateFilter":
+        return CandidateFilter(
+            self.target_types | other.target_types,
+            self.special_names | other.special_names,
+            self.status_values | other.status_values,
+            tuple(dict.fromkeys(self.content_patterns + other.content_patterns)),
+        )
 
 def format_yaml_value(value: any, default: str) -> str:
     """Форматирует значение из YAML (строку или список строк) в единую строку."""
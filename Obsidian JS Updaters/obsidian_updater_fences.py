@@ -0,0 +1,100 @@
+"""
+Линейный поиск блоков ```dataviewjs и разделителей '---' после них.
+
+Раньше блоки искались регулярным выражением ```dataviewjs.*?\n``` с DOTALL. На незакрытом
+блоке такое выражение от каждого вхождения ```dataviewjs просматривает файл до конца,
+и заметка с множеством открывающих строк без закрытия превращалась в квадратичную работу.
+Сканер ниже находит те же самые диапазоны, что и регулярное выражение, но за один проход
+через `str.find`: если закрывающая строка не найдена, дальше искать бессмысленно.
+"""
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from obsidian_updater_core import FENCE_SCAN_TIME_BUDGET
+
+FENCE_OPEN = "```dataviewjs"
+FENCE_CLOSE = "\n```"
+# Разделитель после блока: пробельные символы, '---', пробельные символы до конца строки.
+# Выражение применяется только в позиции конца блока и работает за линейное время.
+SEPARATOR_RE = re.compile(r"\s*---\s*\n")
+
+
+class FenceScanTimeout(Exception):
+    """Поиск блоков в файле превысил отведенное время."""
+
+
+@dataclass(slots=True)
+class FenceBlock:
+    """Блок dataviewjs: [start, end) — сам блок, [end, separator_end) — разделитель после него."""
+    start: int
+    end: int
+    separator_end: int
+
+    @property
+    def has_separator(self) -> bool:
+        return self.separator_end > self.end
+
+
+def iter_dataviewjs_blocks(content: str, deadline: Optional[float] = None) -> Iterator[FenceBlock]:
+    """
+    Находит блоки dataviewjs так же, как (```dataviewjs.*?\\n```)(\\s*---\\s*\\n)? с DOTALL:
+    блок заканчивается на первой строке, начинающейся с ```, после открывающей строки.
+    `deadline` — момент (time.monotonic()), после которого выбрасывается FenceScanTimeout.
+    """
+    pos = 0
+    while (start := content.find(FENCE_OPEN, pos)) != -1:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise FenceScanTimeout(f"поиск блоков dataviewjs занял больше отведенного времени (позиция {start} из {len(content)})")
+        close = content.find(FENCE_CLOSE, start + len(FENCE_OPEN))
+        if close == -1:
+            # Незакрытый блок: последующие открывающие строки тоже не будут закрыты
+            return
+        end = close + len(FENCE_CLOSE)
+        separator = SEPARATOR_RE.match(content, end)
+        separator_end = separator.end() if separator else end
+        yield FenceBlock(start, end, separator_end)
+        pos = separator_end
+
+
+def scan_dataviewjs_blocks(content: str, time_budget: Optional[float] = FENCE_SCAN_TIME_BUDGET) -> List[FenceBlock]:
+    """Возвращает все блоки dataviewjs файла (с ограничением времени `time_budget` секунд, None — без ограничения)."""
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    return list(iter_dataviewjs_blocks(content, deadline))
+
+
+def replace_blocks(content: str, blocks: List[FenceBlock], replacement: str) -> Tuple[str, int]:
+    """
+    Заменяет блоки (вместе с разделителями) на `replacement`. Замена буквальная: обратные
+    слэши и `\\1` в шаблоне не интерпретируются. Если вместе с разделителем был удален
+    перенос строки, а замена им не заканчивается, добавляется пустая строка, чтобы блок
+    не "слипся" со следующим текстом.
+    """
+    if not blocks:
+        return content, 0
+    parts = []
+    pos = 0
+    for block in blocks:
+        parts.append(content[pos:block.start])
+        parts.append(replacement)
+        if block.has_separator and not replacement.endswith("\n"):
+            parts.append("\n\n")
+        pos = block.separator_end
+    parts.append(content[pos:])
+    return "".join(parts), len(blocks)
+
+
+def remove_separators(content: str, blocks: List[FenceBlock]) -> Tuple[str, int]:
+    """Удаляет разделители после блоков, оставляя после блока пустую строку."""
+    with_separator = [block for block in blocks if block.has_separator]
+    if not with_separator:
+        return content, 0
+    parts = []
+    pos = 0
+    for block in with_separator:
+        parts.append(content[pos:block.end])
+        parts.append("\n\n")
+        pos = block.separator_end
+    parts.append(content[pos:])
+    return "".join(parts), len(with_separator)
@@ -1,50 +1,178 @@
+import difflib
 import os
 import shutil
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Callable
+from typing import List, Callable, Optional, Tuple
 
 from obsidian_updater_core import AnalysisResult
+from vault_telemetry import phase, count, read_text, PHASE_WRITE
 
-def archive_and_modify_files(results: List[AnalysisResult], vault_path: str, modification_func: Callable) -> int:
-    """
-    Архивирует файлы, а затем изменяет их с помощью предоставленной функции.
-    """
-    if not results:
-        return 0
+@dataclass
+class FileChange:
+    """Результат пробного прогона для одного файла: новое содержимое и статистика изменений."""
+    file_path: str
+    relative_path: str
+    new_content: Optional[str] = None  # None — файл не изменится
+    num_replacements: int = 0
+    added_lines: int = 0
+    removed_lines: int = 0
+    diff: str = ""
+    mtime_ns: int = 0
+    size: int = 0
+    error: Optional[str] = None
 
-    # --- Создание директории для архива ---
+def _create_archive_run_dir(vault_path: str) -> Optional[str]:
+    """Создает директорию архива для текущей сессии (None, если это не удалось)."""
     try:
         archive_base_dir = os.path.join(os.path.dirname(vault_path), "Archive", "Obsidian Updater Archive")
         timestamp_dir = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
         archive_run_dir = os.path.join(archive_base_dir, timestamp_dir)
         os.makedirs(archive_run_dir, exist_ok=True)
         print(f"\n🗄️ Создан архив для этой сессии: '{archive_run_dir}'")
+        return archive_run_dir
     except Exception as e:
         print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось создать директорию для архива: {e}")
         print("🚫 Замена отменена для предотвращения потери данных.")
+        return None
+
+def _archive_file(file_path: str, vault_path: str, archive_run_dir: str):
+    relative_path = os.path.relpath(file_path, vault_path)
+    backup_path = os.path.join(archive_run_dir, relative_path)
+    os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+    shutil.copy2(file_path, backup_path)
+
+def archive_and_modify_plan(plan: List[Tuple[AnalysisResult, Callable]], vault_path: str) -> int:
+    """
+    Архивирует и изменяет файлы по плану [(файл, функция изменения)].
+    Каждый файл читается, архивируется и записывается один раз, даже если
+    его функция изменения объединяет несколько операций.
+    """
+    if not plan:
+        return 0
+
+    if not (archive_run_dir := _create_archive_run_dir(vault_path)):
         return 0
 
     modified_count = 0
-    for res in results:
+    for res, modification_func in plan:
         try:
-            # --- Архивирование файла ---
-            relative_path = os.path.relpath(res.file_path, vault_path)
-            backup_path = os.path.join(archive_run_dir, relative_path)
-            os.makedirs(os.path.dirname(backup_path), exist_ok=True)
-            shutil.copy2(res.file_path, backup_path)
-
-            # --- Замена содержимого ---
-            with open(res.file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            new_content, num_replacements = modification_func(content)
-            
-            if num_replacements > 0:
+            content = read_text(res.file_path)
+
+            with phase("transform"):
+                new_content, num_replacements = modification_func(content)
+            # Файлы, которые не изменились бы, не архивируются и не перезаписываются
+            if num_replacements == 0 or new_content == content:
+                continue
+
+            with phase(PHASE_WRITE):
+                # --- Архивирование файла ---
+                _archive_file(res.file_path, vault_path, archive_run_dir)
+
+                # --- Замена содержимого ---
                 with open(res.file_path, 'w', encoding='utf-8') as f:
                     f.write(new_content)
-                modified_count += 1
+            modified_count += 1
         except Exception as e:
             print(f"❗️ Не удалось выполнить архивирование и замену в файле {res.file_path}: {e}")
-    
-    print(f"🚀 Операция завершена. Модифицировано {modified_count} из {len(results)} файлов.")
-    return modified_count
\ No newline at end of file
+
+    count("files_modified", modified_count)
+    print(f"🚀 Операция завершена. Модифицировано {modified_count} из {len(plan)} файлов.")
+    return modified_count
+
+# --- ПРОБНЫЙ ПРОГОН (DRY-RUN) ---
+
+def compute_file_change(file_path: str, vault_path: str, modification_func: Callable) -> FileChange:
+    """
+    Вычисляет новое содержимое файла той же функцией, что и реальный запуск, не записывая его.
+    Выполняется в рабочем процессе; `modification_func` должна быть объявлена на уровне модуля.
+    """
+    change = FileChange(file_path, os.path.relpath(file_path, vault_path).replace('\\', '/'))
+    try:
+        stat = os.stat(file_path)
+        change.mtime_ns, change.size = stat.st_mtime_ns, stat.st_size
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        new_content, num_replacements = modification_func(content)
+        if num_replacements > 0 and new_content != content:
+            diff_lines = list(difflib.unified_diff(
+                content.splitlines(keepends=True), new_content.splitlines(keepends=True),
+                fromfile=f"a/{change.relative_path}", tofile=f"b/{change.relative_path}"
+            ))
+            change.new_content = new_content
+            change.num_replacements = num_replacements
+            change.added_lines = sum(1 for line in diff_lines[2:] if line.startswith('+'))
+            change.removed_lines = sum(1 for line in diff_lines[2:] if line.startswith('-'))
+            change.diff = "".join(line if line.endswith('\n') else line + "\n\\ No newline at end of file\n" for line in diff_lines)
+    except Exception as e:
+        change.error = f"{type(e).__name__}: {e}"
+    return change
+
+def run_dry_run(plan: List[Tuple[AnalysisResult, Callable]], vault_path: str, diff_path: str, executor: Optional[Executor] = None) -> List[FileChange]:
+    """
+    Вычисляет изменения для всех файлов плана в пуле процессов и по мере готовности
+    записывает unified diff со статистикой по каждому файлу в `diff_path`.
+    Хранилище при этом не изменяется. `executor` — уже запущенный пул (необязательно).
+    """
+    print(f"\n🔍 Пробный прогон для {len(plan)} файлов...")
+    changes = []
+    with phase("dry_run"), open(diff_path, 'w', encoding='utf-8') as diff_file, (nullcontext(executor) if executor else ProcessPoolExecutor()) as pool:
+        diff_file.write(f"# Пробный прогон Obsidian Updater ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
+        diff_file.write(f"# Хранилище: {vault_path}\n\n")
+        futures = [pool.submit(compute_file_change, res.file_path, vault_path, func) for res, func in plan]
+        for future in as_completed(futures):
+            change = future.result()
+            changes.append(change)
+            if change.error:
+                diff_file.write(f"# ❌ {change.relative_path}: {change.error}\n\n")
+            elif change.new_content is not None:
+                diff_file.write(f"# {change.relative_path}: +{change.added_lines} -{change.removed_lines} (замен: {change.num_replacements})\n")
+                diff_file.write(change.diff)
+                diff_file.write("\n")
+
+        changed = [c for c in changes if c.new_content is not None]
+        diff_file.write(f"# Итого: изменится {len(changed)} из {len(plan)} файлов, "
+                        f"+{sum(c.added_lines for c in changed)} -{sum(c.removed_lines for c in changed)} строк.\n")
+
+    errors = [c for c in changes if c.error]
+    print(f"✅ Изменится {len(changed)} из {len(plan)} файлов "
+          f"(+{sum(c.added_lines for c in changed)} -{sum(c.removed_lines for c in changed)} строк).")
+    if errors:
+        print(f"⚠️ Не удалось вычислить изменения для {len(errors)} файлов.")
+    print(f"📄 Diff сохранён в '{diff_path}'")
+    return changes
+
+def commit_file_changes(changes: List[FileChange], vault_path: str) -> int:
+    """
+    Записывает уже вычисленные в пробном прогоне изменения, не пересчитывая их.
+    Файлы, изменившиеся на диске после пробного прогона, пропускаются.
+    """
+    pending = [c for c in changes if c.new_content is not None]
+    if not pending:
+        return 0
+
+    if not (archive_run_dir := _create_archive_run_dir(vault_path)):
+        return 0
+
+    modified_count = 0
+    for change in pending:
+        try:
+            stat = os.stat(change.file_path)
+            if (stat.st_mtime_ns, stat.st_size) != (change.mtime_ns, change.size):
+                print(f"⚠️ Файл {change.file_path} изменился после пробного прогона и пропущен.")
+                continue
+
+            with phase(PHASE_WRITE):
+                _archive_file(change.file_path, vault_path, archive_run_dir)
+                with open(change.file_path, 'w', encoding='utf-8') as f:
+                    f.write(change.new_content)
+            modified_count += 1
+        except Exception as e:
+            print(f"❗️ Не удалось выполнить архивирование и замену в файле {change.file_path}: {e}")
+
+    count("files_modified", modified_count)
+    print(f"🚀 Операция завершена. Модифицировано {modified_count} из {len(pending)} файлов.")
+    return modified_count
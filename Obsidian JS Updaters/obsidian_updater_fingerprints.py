@@ -0,0 +1,104 @@
+"""
+Индекс отпечатков блоков dataviewjs.
+
+Каждый блок хешируется при анализе. Индекс (FINGERPRINT_INDEX_NAME) хранит известные
+версии шаблонов — отпечатки блоков из файлов `reference_file_path` всех конфигов. По нему
+замена выбирает только устаревшие блоки, а отчет показывает, сколько блоков какой версии
+в хранилище. Отпечатки блоков самих файлов не сохраняются: их дает анализ каждого запуска.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from obsidian_updater_core import AnalysisResult, SEPARATOR_CONFIG_NAME
+from obsidian_updater_config import get_all_configs, load_config
+from obsidian_updater_fences import scan_dataviewjs_blocks
+
+UNKNOWN_VERSION_LABEL = "неизвестная версия"
+
+
+def block_fingerprint(block_text: str) -> str:
+    """Короткий отпечаток текста блока (без разделителя после него)."""
+    return hashlib.blake2b(block_text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass
+class FingerprintIndex:
+    """Версии шаблонов dataviewjs-блоков."""
+    path: str
+    # путь к файлу-шаблону -> список версий [{"hash", "version", "registered"}]
+    templates: Dict[str, List[dict]] = field(default_factory=dict)
+    # появились ли новые версии с момента загрузки (иначе сохранять нечего)
+    dirty: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> "FingerprintIndex":
+        """Читает индекс; если файла нет или он поврежден, начинает с пустого."""
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # Индексы прежнего формата хранили еще и отпечатки блоков файлов: их просто не переносим
+                return cls(path, data.get("templates", {}), dirty="files" in data)
+            except (json.JSONDecodeError, OSError, AttributeError) as e:
+                print(f"⚠️ Индекс отпечатков '{path}' поврежден и будет создан заново: {e}")
+        return cls(path)
+
+    def save(self):
+        """Записывает индекс, если в нем появились новые версии шаблонов."""
+        if not self.dirty:
+            return
+        data = {"templates": self.templates}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def register_template(self, reference_path: str, fingerprint: str) -> int:
+        """Запоминает отпечаток блока шаблона как версию; возвращает номер версии."""
+        versions = self.templates.setdefault(reference_path, [])
+        for entry in versions:
+            if entry["hash"] == fingerprint:
+                return entry["version"]
+        version = len(versions) + 1
+        versions.append({"hash": fingerprint, "version": version, "registered": datetime.now().isoformat(timespec="seconds")})
+        self.dirty = True
+        return version
+
+    def label(self, fingerprint: str, current: Optional[str] = None) -> str:
+        """Человекочитаемая версия блока: '<шаблон> vN' (с пометкой актуальной) или 'неизвестная версия'."""
+        for reference_path, versions in self.templates.items():
+            for entry in versions:
+                if entry["hash"] == fingerprint:
+                    name = os.path.splitext(os.path.basename(reference_path))[0]
+                    suffix = " (актуальная)" if fingerprint == current else ""
+                    return f"{name} v{entry['version']}{suffix}"
+        return UNKNOWN_VERSION_LABEL
+
+
+def register_config_templates(script_dir: str, index: FingerprintIndex):
+    """Регистрирует текущие блоки файлов-шаблонов всех конфигов, чтобы их версии распознавались в отчете."""
+    for config_name in get_all_configs(script_dir, exclude=SEPARATOR_CONFIG_NAME):
+        config = load_config(os.path.join(script_dir, config_name)) or {}
+        if not isinstance(config, dict) or not (reference_path := config.get("reference_file_path")):
+            continue
+        try:
+            with open(reference_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            continue
+        if blocks := scan_dataviewjs_blocks(content, time_budget=None):
+            index.register_template(reference_path, block_fingerprint(content[blocks[0].start:blocks[0].end]))
+
+
+def is_block_outdated(res: AnalysisResult, current: str, reference_has_separator: bool) -> bool:
+    """Есть ли в файле блок, отличающийся от актуального шаблона (включая лишний или недостающий разделитель)."""
+    if any(fingerprint != current for fingerprint in res.block_hashes):
+        return True
+    if reference_has_separator:
+        return res.separators_found_count < res.block_count
+    return res.separators_found_count > 0
@@ -0,0 +1,158 @@
+"""
+Пакетный (неинтерактивный) запуск операций obsidian_updater.
+
+Задания берутся из YAML-файла заданий или из аргументов командной строки и
+выполняются по очереди с общим пулом рабочих процессов. Итоги сохраняются в JSON,
+а код возврата показывает, всё ли прошло успешно:
+    0 — все задания выполнены;
+    1 — хотя бы одно задание завершилось ошибкой или не было подтверждено;
+    2 — неверные аргументы, файл заданий или глобальный конфиг.
+
+Примеры:
+    python obsidian_updater_headless.py --jobs jobs/nightly.yml
+    python obsidian_updater_headless.py --operations remove,status_fix --mode apply --yes
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Optional
+
+from vault_telemetry import Telemetry
+from obsidian_updater_config import load_vault_settings
+from obsidian_updater_jobs import (
+    Job,
+    JobError,
+    JobSummary,
+    JOB_MODES,
+    MODE_REPORT,
+    OPERATION_KEYS,
+    STATUS_OK,
+    execute_job,
+    job_from_dict,
+    load_job_file,
+    resolve_path,
+)
+
+EXIT_OK = 0
+EXIT_JOB_FAILED = 1
+EXIT_BAD_INPUT = 2
+
+DEFAULT_SUMMARY_NAME = "headless_summary.json"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Пакетный запуск операций obsidian_updater без интерактивных вопросов.",
+        epilog="Относительные пути (--jobs, --vault, --config, --report, --summary и пути в файле заданий) "
+               "считаются от папки со скриптами, а не от текущей папки.",
+    )
+    parser.add_argument("--jobs", help="YAML-файл с очередью заданий")
+    parser.add_argument("--operations", help=f"Операции через запятую: {', '.join(OPERATION_KEYS)}")
+    parser.add_argument("--mode", choices=JOB_MODES, default=MODE_REPORT, help="Режим выполнения (по умолчанию: report)")
+    parser.add_argument("--config", help="Конфиг замены для операции 'replace' (например, project.yml)")
+    parser.add_argument("--yes", action="store_true", help="Подтвердить запись изменений без вопроса")
+    parser.add_argument("--report", help="Путь к отчёту (по умолчанию — из separator_remove.yml)")
+    parser.add_argument("--summary", help=f"Путь к JSON-итогам (по умолчанию: {DEFAULT_SUMMARY_NAME})")
+    parser.add_argument("--vault", help="Путь к хранилищу (по умолчанию — из vault_config.yml)")
+    parser.add_argument("--workers", type=int, help="Число рабочих процессов общего пула")
+    parser.add_argument("--profile", help="Профилирование заданий: cpu, memory или all (по умолчанию — из OBSIDIAN_PROFILE)")
+    return parser.parse_args(argv)
+
+
+def collect_jobs(args: argparse.Namespace, script_dir: str):
+    """Возвращает (общие настройки, очередь заданий) из файла заданий или аргументов."""
+    if args.jobs:
+        if args.operations:
+            raise JobError("Укажите либо --jobs, либо --operations, но не оба сразу")
+        return load_job_file(resolve_path(args.jobs, script_dir))
+    if not args.operations:
+        raise JobError("Не указано, что выполнять: нужен --jobs или --operations")
+    job = job_from_dict({
+        "name": "cli",
+        "operations": args.operations,
+        "mode": args.mode,
+        "config": args.config,
+        "auto_confirm": args.yes,
+        "report_path": args.report,
+    }, 1)
+    return {}, [job]
+
+
+def write_summary(summary_path: str, vault_path: str, summaries: List[JobSummary], exit_code: int):
+    payload = {
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "vault_path": vault_path,
+        "exit_code": exit_code,
+        "jobs": [asdict(summary) for summary in summaries],
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"📄 Итоги сохранены в '{summary_path}'")
+
+
+def run_queue(
+    jobs: List[Job],
+    script_dir: str,
+    vault_path: str,
+    frontmatter_read_limit: int,
+    workers: Optional[int] = None,
+    profile: Optional[str] = None,
+) -> List[JobSummary]:
+    """
+    Выполняет очередь заданий с одним "прогретым" пулом процессов на всю очередь.
+    Замеры по фазам каждого задания попадают в его итог (поле 'telemetry').
+    """
+    queue = deque(jobs)
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while queue:
+            job = queue.popleft()
+            print(f"\n🚀 Задание '{job.name}': {', '.join(job.operations)} (режим: {job.mode})")
+            with Telemetry(f"obsidian_updater:{job.name}", profile=profile) as telemetry:
+                summary = execute_job(job, script_dir, vault_path, frontmatter_read_limit, executor)
+            summary.telemetry = telemetry.to_dict()
+            telemetry.print_summary(limit=3)
+            summaries.append(summary)
+            print(f"{'✅' if summary.status == STATUS_OK else '❌'} '{job.name}': {summary.status}, "
+                  f"изменено {summary.modified} из {summary.planned} файлов ({summary.elapsed_seconds} с)")
+    return summaries
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    args = parse_args(argv)
+
+    try:
+        settings, jobs = collect_jobs(args, script_dir)
+    except JobError as e:
+        print(f"❌ Ошибка в описании заданий: {e}")
+        return EXIT_BAD_INPUT
+
+    # Путь к хранилищу из аргументов или файла заданий важнее глобального vault_config.yml,
+    # но остальные его настройки (frontmatter_read_limit) действуют и тогда
+    if not (vault_settings := load_vault_settings(script_dir, args.vault or settings.get("vault_path"))):
+        return EXIT_BAD_INPUT
+    vault_path, frontmatter_read_limit = vault_settings
+    frontmatter_read_limit = settings.get("frontmatter_read_limit", frontmatter_read_limit)
+
+    print(f"✅ Работаем с хранилищем: {vault_path}")
+    print(f"ℹ️ Заданий в очереди: {len(jobs)}")
+    summaries = run_queue(
+        jobs, script_dir, vault_path, frontmatter_read_limit,
+        args.workers or settings.get("workers"), args.profile or settings.get("profile")
+    )
+
+    exit_code = EXIT_OK if all(summary.status == STATUS_OK for summary in summaries) else EXIT_JOB_FAILED
+    summary_path = resolve_path(args.summary or settings.get("summary_path") or DEFAULT_SUMMARY_NAME, script_dir)
+    write_summary(summary_path, vault_path, summaries, exit_code)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import os
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from obsidian_updater_core import (
+    AnalysisResult, CandidateFilter, SEPARATOR_CONFIG_NAME, FINGERPRINT_INDEX_NAME, FRONTMATTER_READ_LIMIT,
+)
+from obsidian_updater_config import load_config
+from obsidian_updater_analysis import run_analysis, select_candidates
+from obsidian_updater_reporting import StreamingReportWriter, generate_composite_report
+from obsidian_updater_fingerprints import FingerprintIndex, register_config_templates
+from obsidian_updater_fileops import archive_and_modify_plan, run_dry_run, commit_file_changes
+from vault_telemetry import phase, PHASE_WRITE
+from obsidian_updater_operations import (
+    Operation,
+    build_replace_operation,
+    build_remove_operation,
+    build_status_fix_operation,
+    build_status_check_operation,
+    build_refactor_important_operation,
+    build_file_plan,
+)
+
+# --- РЕЖИМЫ ВЫПОЛНЕНИЯ ---
+MODE_REPORT = "report"    # только отчёт
+MODE_APPLY = "apply"      # изменение файлов и отчёт
+MODE_DRY_RUN = "dry_run"  # diff изменений без записи (с записью при подтверждении)
+JOB_MODES = (MODE_REPORT, MODE_APPLY, MODE_DRY_RUN)
+
+# Ключи операций в порядке их применения к файлу
+OPERATION_KEYS = ("replace", "remove", "status_fix", "status_check", "important")
+
+# --- СТАТУСЫ ЗАДАНИЙ ---
+STATUS_OK = "ok"
+STATUS_CANCELLED = "cancelled"  # изменения не применены: нет подтверждения
+STATUS_FAILED = "failed"
+
+DEFAULT_REPORT_NAME = "default_report.md"
+
+
+class JobError(Exception):
+    """Задание невозможно выполнить: неверное описание, конфиг или файл-шаблон."""
+
+
+@dataclass
+class Job:
+    """Описание одного задания: какие операции и в каком режиме выполнить."""
+    name: str
+    operations: List[str]
+    mode: str = MODE_REPORT
+    config: Optional[str] = None       # конфиг замены (нужен операции 'replace')
+    auto_confirm: bool = False         # подтверждать запись без вопроса
+    report_path: Optional[str] = None  # по умолчанию — report_file_name из separator_remove.yml
+
+
+@dataclass
+class JobSummary:
+    """Машиночитаемый итог задания."""
+    name: str
+    mode: str
+    operations: List[str]
+    status: str = STATUS_OK
+    message: Optional[str] = None
+    files_scanned: int = 0
+    analysis_errors: int = 0
+    selected: Dict[str, int] = field(default_factory=dict)
+    planned: int = 0
+    modified: int = 0
+    report_path: Optional[str] = None
+    report_jsonl_path: Optional[str] = None
+    report_csv_path: Optional[str] = None
+    diff_path: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    telemetry: Optional[dict] = None  # замеры по фазам (vault_telemetry), если велись
+
+
+@dataclass
+class PreparedJob:
+    """Задание после анализа хранилища: выборки операций и план изменений."""
+    job: Job
+    report_path: str
+    all_files: List[AnalysisResult]
+    error_files: List[AnalysisResult]
+    selections: List[Tuple[Operation, List[AnalysisResult]]]
+    plan: List[Tuple[AnalysisResult, Callable]]
+    report_writer: StreamingReportWriter
+
+
+def resolve_path(path: str, base_dir: str) -> str:
+    """Относительные пути в заданиях считаются от папки со скриптами."""
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def validate_job(job: Job):
+    """Проверяет описание задания до запуска анализа."""
+    if not job.operations:
+        raise JobError(f"Задание '{job.name}': не указаны операции")
+    if unknown := [key for key in job.operations if key not in OPERATION_KEYS]:
+        raise JobError(f"Задание '{job.name}': неизвестные операции {unknown}. Допустимы: {', '.join(OPERATION_KEYS)}")
+    if job.mode not in JOB_MODES:
+        raise JobError(f"Задание '{job.name}': неизвестный режим '{job.mode}'. Допустимы: {', '.join(JOB_MODES)}")
+    if "replace" in job.operations and not job.config:
+        raise JobError(f"Задание '{job.name}': для операции 'replace' нужен ключ 'config'")
+
+
+def build_operations(job: Job, script_dir: str) -> Tuple[List[Operation], dict, Optional[FingerprintIndex]]:
+    """
+    Создает операции задания (в порядке OPERATION_KEYS) и возвращает их вместе с конфигом
+    separator_remove.yml и индексом отпечатков блоков (он нужен только операции 'replace').
+    """
+    fingerprint_index = None
+    separator_config = {}
+    separator_config_path = os.path.join(script_dir, SEPARATOR_CONFIG_NAME)
+    if os.path.exists(separator_config_path):
+        if (separator_config := load_config(separator_config_path)) is None:
+            raise JobError(f"Не удалось прочитать '{SEPARATOR_CONFIG_NAME}'")
+    elif "remove" in job.operations:
+        raise JobError(f"Конфигурационный файл для операции 'remove' не найден: '{SEPARATOR_CONFIG_NAME}'")
+
+    operations = []
+    for key in OPERATION_KEYS:
+        if key not in job.operations:
+            continue
+        if key == "replace":
+            if not (replace_config := load_config(resolve_path(job.config, script_dir))):
+                raise JobError(f"Не удалось прочитать конфиг замены '{job.config}'")
+            fingerprint_index = FingerprintIndex.load(os.path.join(script_dir, FINGERPRINT_INDEX_NAME))
+            register_config_templates(script_dir, fingerprint_index)
+            if not (operation := build_replace_operation(replace_config, fingerprint_index)):
+                raise JobError(f"Не удалось подготовить замену по конфигу '{job.config}'")
+        elif key == "remove":
+            operation = build_remove_operation(script_dir, separator_config)
+        elif key == "status_fix":
+            operation = build_status_fix_operation()
+        elif key == "status_check":
+            operation = build_status_check_operation()
+        else:
+            operation = build_refactor_important_operation()
+        operations.append(operation)
+    return operations, separator_config, fingerprint_index
+
+
+def prepare_job(
+    job: Job,
+    script_dir: str,
+    vault_path: str,
+    frontmatter_read_limit: int = FRONTMATTER_READ_LIMIT,
+    executor: Optional[Executor] = None,
+) -> PreparedJob:
+    """Анализирует хранилище за один проход для всех операций задания и строит план изменений."""
+    validate_job(job)
+    operations, separator_config, fingerprint_index = build_operations(job, script_dir)
+    report_path = resolve_path(job.report_path or separator_config.get("report_file_name", DEFAULT_REPORT_NAME), script_dir)
+
+    # Анализ запрашивает только те проверки тела файла, которые нужны выбранным операциям
+    body_checks = frozenset().union(*(op.body_checks for op in operations))
+    # Если все операции знают, по каким признакам выбирают файлы, анализируются только
+    # подходящие по индексам хранилища (frontmatter и триграммы), а не всё хранилище
+    paths = None
+    if all(op.candidates is not None for op in operations):
+        candidate_filter = CandidateFilter()
+        for op in operations:
+            candidate_filter = candidate_filter.merge(op.candidates)
+        paths, _ = select_candidates(vault_path, script_dir, candidate_filter, frontmatter_read_limit)
+    # Строки отчета (JSONL/CSV) пишутся по мере готовности результатов анализа
+    with StreamingReportWriter(report_path, vault_path, operations) as report_writer:
+        all_files, error_files = run_analysis(
+            vault_path, special_names=[], target_types=None, return_all_files=True,
+            body_checks=body_checks, frontmatter_read_limit=frontmatter_read_limit, executor=executor,
+            on_result=report_writer.add_result, paths=paths
+        )
+    if fingerprint_index is not None:
+        with phase(PHASE_WRITE):
+            fingerprint_index.save()
+    with phase("plan"):
+        selections, plan = build_file_plan(operations, all_files)
+    return PreparedJob(job, report_path, all_files, error_files, selections, plan, report_writer)
+
+
+def finish_job(
+    prepared: PreparedJob,
+    vault_path: str,
+    confirm: Callable[[str], bool],
+    executor: Optional[Executor] = None,
+    started: Optional[float] = None,
+) -> JobSummary:
+    """
+    Выполняет задание в выбранном режиме и пишет общий отчет.
+    `confirm(prompt)` решает, записывать ли изменения: в интерактивном режиме это вопрос
+    пользователю, в пакетном — флаг auto_confirm задания.
+    """
+    job = prepared.job
+    summary = JobSummary(
+        job.name, job.mode, list(job.operations),
+        files_scanned=len(prepared.all_files),
+        analysis_errors=len(prepared.error_files),
+        selected={op.key: len(selected) for op, selected in prepared.selections},
+        planned=len(prepared.plan),
+        report_path=prepared.report_path,
+        report_jsonl_path=prepared.report_writer.jsonl_path,
+        report_csv_path=prepared.report_writer.csv_path,
+    )
+
+    if job.mode == MODE_APPLY:
+        if not prepared.plan:
+            print("ℹ️ Нет файлов, требующих изменений.")
+        elif confirm(f"\n⚠️ ВНИМАНИЕ: Будет предпринята попытка изменить {len(prepared.plan)} файлов.\nВы уверены, что хотите продолжить? (введите 'yes'): "):
+            summary.modified = archive_and_modify_plan(prepared.plan, vault_path)
+        else:
+            print("🚫 Операция отменена.")
+            summary.status, summary.message = STATUS_CANCELLED, "изменения не подтверждены"
+
+    elif job.mode == MODE_DRY_RUN and prepared.plan:
+        summary.diff_path = os.path.splitext(prepared.report_path)[0] + "_dry_run.diff"
+        changes = run_dry_run(prepared.plan, vault_path, summary.diff_path, executor=executor)
+        if pending := [change for change in changes if change.new_content is not None]:
+            if confirm(f"\nПрименить вычисленные изменения к {len(pending)} файлам? (введите 'yes'): "):
+                summary.modified = commit_file_changes(changes, vault_path)
+            else:
+                print("ℹ️ Хранилище не изменено.")
+
+    generate_composite_report(prepared.report_writer, prepared.report_path)
+    if started is not None:
+        summary.elapsed_seconds = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def execute_job(
+    job: Job,
+    script_dir: str,
+    vault_path: str,
+    frontmatter_read_limit: int = FRONTMATTER_READ_LIMIT,
+    executor: Optional[Executor] = None,
+    confirm: Optional[Callable[[str], bool]] = None,
+) -> JobSummary:
+    """
+    Выполняет задание целиком без участия пользователя.
+    Ошибки задания не прерывают очередь, а попадают в итог со статусом 'failed'.
+    """
+    started = time.perf_counter()
+    if confirm is None:
+        confirm = lambda prompt: job.auto_confirm
+    try:
+        prepared = prepare_job(job, script_dir, vault_path, frontmatter_read_limit, executor)
+        return finish_job(prepared, vault_path, confirm, executor, started)
+    except Exception as e:
+        print(f"❌ Задание '{job.name}' не выполнено: {e}")
+        return JobSummary(
+            job.name, job.mode, list(job.operations), status=STATUS_FAILED,
+            message=f"{type(e).__name__}: {e}", elapsed_seconds=round(time.perf_counter() - started, 3)
+        )
+
+
+def job_from_dict(data: dict, index: int) -> Job:
+    """Создает задание из записи YAML-файла заданий."""
+    if not isinstance(data, dict):
+        raise JobError(f"Задание №{index}: ожидался словарь, получено {type(data).__name__}")
+    operations = data.get("operations") or []
+    if isinstance(operations, str):
+        operations = [key.strip() for key in operations.split(",") if key.strip()]
+    job = Job(
+        name=str(data.get("name") or f"job-{index}"),
+        operations=list(operations),
+        mode=data.get("mode", MODE_REPORT),
+        config=data.get("config"),
+        auto_confirm=bool(data.get("auto_confirm", False)),
+        report_path=data.get("report_path"),
+    )
+    validate_job(job)
+    return job
+
+
+def load_job_file(job_file_path: str) -> Tuple[dict, List[Job]]:
+    """
+    Читает YAML-файл заданий. Возвращает (общие настройки, задания).
+    Общие настройки — все ключи верхнего уровня, кроме 'jobs' (vault_path, summary_path и т.д.).
+    """
+    if not (data := load_config(job_file_path)) or not isinstance(data, dict):
+        raise JobError(f"Файл заданий '{job_file_path}' пуст или не является словарем")
+    raw_jobs = data.get("jobs")
+    if not raw_jobs or not isinstance(raw_jobs, list):
+        raise JobError(f"В файле заданий '{job_file_path}' нет списка 'jobs'")
+    settings = {key: value for key, value in data.items() if key != "jobs"}
+    return settings, [job_from_dict(item, index) for index, item in enumerate(raw_jobs, 1)]
@@ -0,0 +1,287 @@
+import os
+import re
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from obsidian_updater_core import (
+    AnalysisResult,
+    CandidateFilter,
+    INLINE_SELECT_RE,
+    SEPARATOR_CONFIG_NAME,
+    FRONTMATTER_RE,
+    BODY_CHECK_BLOCKS,
+    BODY_CHECK_INLINE_SELECT,
+)
+from obsidian_updater_config import get_all_configs, load_config
+from obsidian_updater_fences import scan_dataviewjs_blocks, replace_blocks, remove_separators
+from obsidian_updater_fingerprints import FingerprintIndex, block_fingerprint, is_block_outdated
+from vault_frontmatter import parse_frontmatter, FrontmatterError
+from vault_frontmatter_patch import patch_frontmatter
+
+# Опция 'important' в строке inlineSelect: сначала ", option(important)", затем "option(important), "
+IMPORTANT_OPTION_AFTER_RE = re.compile(r', *option\(important\)')
+IMPORTANT_OPTION_BEFORE_RE = re.compile(r'option\(important\), *')
+
+# --- ПРЕОБРАЗОВАНИЯ СОДЕРЖИМОГО ---
+# Все преобразования имеют вид (content) -> (new_content, num_replacements) и объявлены
+# на уровне модуля, чтобы их можно было комбинировать и передавать в рабочие процессы.
+
+def replace_dataviewjs_blocks(content: str, reference_content: str) -> Tuple[str, int]:
+    """
+    Заменяет блоки dataviewjs (вместе с разделителем после них) на эталонный блок.
+    Блоки, уже совпадающие с эталоном, не трогаются и не считаются заменами.
+    """
+    outdated = [block for block in scan_dataviewjs_blocks(content) if content[block.start:block.separator_end] != reference_content]
+    return replace_blocks(content, outdated, reference_content)
+
+def remove_block_separators(content: str) -> Tuple[str, int]:
+    """
+    Заменяет найденный блок (включая разделитель) на сам код-блок + два переноса строки.
+    Это гарантирует, что после блока dataviewjs останется пустая строка,
+    и он не "слипнется" со следующим элементом в файле.
+    """
+    return remove_separators(content, scan_dataviewjs_blocks(content))
+
+def fix_status_field(content: str) -> Tuple[str, int]:
+    """Превращает поле 'status' из списка в строку (первый элемент списка)."""
+    fm_match = FRONTMATTER_RE.match(content)
+    if not fm_match:
+        return content, 0
+
+    fm_text = fm_match.group(1)
+    try:
+        frontmatter = parse_frontmatter(fm_text)
+    except FrontmatterError:
+        return content, 0 # Не трогаем файлы с ошибками YAML
+    if isinstance(frontmatter, dict) and isinstance(frontmatter.get('status'), list):
+        status_list = frontmatter['status']
+        # Берем первый элемент или оставляем пустым, если список пуст.
+        # Переписываются только строки ключа 'status', остальной заголовок не меняется.
+        new_fm_text = patch_frontmatter(fm_text, {'status': status_list[0] if status_list else ''}, frontmatter)
+        if new_fm_text is not None:
+            return content[:fm_match.start(1)] + new_fm_text + content[fm_match.end(1):], 1
+    return content, 0
+
+def refactor_important_status(content: str) -> Tuple[str, int]:
+    """Заменяет статус 'important' на флаги important/urgent и убирает option(important) из inlineSelect."""
+    made_change = False
+
+    # Шаг 1: Обновление Frontmatter
+    fm_match = FRONTMATTER_RE.match(content)
+    if fm_match:
+        fm_text = fm_match.group(1)
+        try:
+            frontmatter = parse_frontmatter(fm_text)
+        except FrontmatterError:
+            frontmatter = None  # Игнорируем ошибки YAML, чтобы не повредить файл
+        if isinstance(frontmatter, dict) and frontmatter.get('status') == 'important':
+            new_fm_text = patch_frontmatter(
+                fm_text, {'status': 'in progress', 'important': True, 'urgent': True}, frontmatter
+            )
+            if new_fm_text is not None and new_fm_text != fm_text:
+                content = content[:fm_match.start(1)] + new_fm_text + content[fm_match.end(1):]
+                made_change = True
+
+    # Шаг 2: Обновление строки inlineSelect
+    content, num_subs1 = IMPORTANT_OPTION_AFTER_RE.subn('', content)
+    content, num_subs2 = IMPORTANT_OPTION_BEFORE_RE.subn('', content)
+    if num_subs1 > 0 or num_subs2 > 0:
+        made_change = True
+
+    return content, 1 if made_change else 0
+
+def apply_transforms(content: str, transforms: Sequence[Callable[[str], Tuple[str, int]]]) -> Tuple[str, int]:
+    """Последовательно применяет несколько преобразований к содержимому в памяти."""
+    total_replacements = 0
+    for transform in transforms:
+        content, num_replacements = transform(content)
+        total_replacements += num_replacements
+    return content, total_replacements
+
+def compose_transforms(transforms: Sequence[Callable[[str], Tuple[str, int]]]) -> Callable[[str], Tuple[str, int]]:
+    """Объединяет преобразования в одно (результат можно передавать в рабочие процессы)."""
+    if len(transforms) == 1:
+        return transforms[0]
+    return partial(apply_transforms, transforms=tuple(transforms))
+
+# --- ОПИСАНИЯ ОПЕРАЦИЙ ---
+
+@dataclass
+class Operation:
+    """Операция обновления: какие файлы она выбирает, как их меняет и как описывает в отчете."""
+    key: str
+    title: str
+    body_checks: FrozenSet[str]
+    select: Callable[[AnalysisResult], bool]
+    describe: Callable[[AnalysisResult], str]
+    transform: Optional[Callable[[str], Tuple[str, int]]] = None  # None — операция только формирует отчет
+    # Метки для сводной таблицы в отчете (например, версии блоков) и заголовок ее колонки
+    stats: Optional[Callable[[AnalysisResult], Iterable[str]]] = None
+    stats_title: str = "Значение"
+    # Признаки, по которым операция выбирает файлы (тогда анализируются только подходящие
+    # по индексам хранилища). None — операции нужен каждый файл хранилища
+    candidates: Optional[CandidateFilter] = None
+
+def load_reference_block(reference_file_path: str) -> Optional[str]:
+    """Читает файл-шаблон и возвращает его блок dataviewjs (или None с сообщением об ошибке)."""
+    try:
+        with open(reference_file_path, 'r', encoding='utf-8') as f:
+            reference_file_content = f.read()
+        blocks = scan_dataviewjs_blocks(reference_file_content, time_budget=None)
+        if not blocks:
+            print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: В файле-шаблоне '{reference_file_path}' не найден блок ```dataviewjs...``` для замены.")
+            return None
+        print(f"✅ Файл-шаблон '{reference_file_path}' успешно прочитан. Используется только блок dataviewjs.")
+        return reference_file_content[blocks[0].start:blocks[0].separator_end]
+    except (FileNotFoundError, TypeError) as e:
+        print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось прочитать файл-шаблон '{reference_file_path}'. Убедитесь, что 'reference_file_path' указан в конфиге и файл существует. Ошибка: {e}")
+        return None
+
+def collect_separator_target_types(script_dir: str, config: dict) -> List[str]:
+    """Собирает target_types из всех конфигов, кроме исключенных в 'exclude_configs'."""
+    other_configs = get_all_configs(script_dir, exclude=SEPARATOR_CONFIG_NAME)
+    configs_to_exclude = config.get("exclude_configs", [])
+    other_configs = [c for c in other_configs if c not in configs_to_exclude]
+
+    if other_configs:
+        print(f"ℹ️ Для определения целевых файлов будут просканированы 'target_types' из других конфигов: {', '.join(other_configs)}")
+
+    aggregated_types = set()
+    for cfg_path_str in other_configs:
+        full_cfg_path = os.path.join(script_dir, cfg_path_str)
+        if other_cfg := load_config(full_cfg_path):
+            aggregated_types.update(other_cfg.get("target_types", []))
+
+    if not aggregated_types:
+        print("⚠️ Предупреждение: Не найдено ни одного 'target_types' в других конфигурационных файлах. Будут обработаны только файлы, где `type` не указан.")
+    return list(aggregated_types)
+
+def _has_any_type(res: AnalysisResult, types: FrozenSet[str]) -> bool:
+    return not types.isdisjoint(res.type_values)
+
+def reference_fingerprint(reference_content: str) -> Tuple[str, bool]:
+    """Отпечаток блока шаблона (без разделителя) и признак того, что шаблон включает разделитель."""
+    block = scan_dataviewjs_blocks(reference_content, time_budget=None)[0]
+    return block_fingerprint(reference_content[block.start:block.end]), block.has_separator
+
+def build_replace_operation(config: dict, fingerprint_index: Optional[FingerprintIndex] = None) -> Optional[Operation]:
+    """
+    Операция №1: замена блоков dataviewjs на блок из файла-шаблона конфигурации.
+    Выбираются только файлы с устаревшими блоками (отпечаток не совпадает с текущим шаблоном).
+    Если передан индекс отпечатков, текущий шаблон регистрируется в нем как версия.
+    """
+    reference_file_path = config.get("reference_file_path")
+    if not (reference_content := load_reference_block(reference_file_path)):
+        return None
+    current, reference_has_separator = reference_fingerprint(reference_content)
+    if fingerprint_index is not None:
+        version = fingerprint_index.register_template(reference_file_path, current)
+        print(f"ℹ️ Актуальная версия шаблона: v{version} (отпечаток {current}).")
+
+    special_names = frozenset(config.get("special_file_names", []))
+    target_types = frozenset(config.get("target_types", []))
+
+    def is_target(res: AnalysisResult) -> bool:
+        return res.block_count > 0 and (os.path.basename(res.file_path) in special_names or _has_any_type(res, target_types))
+
+    def describe(res: AnalysisResult) -> str:
+        text = f"(Type: **{res.file_type}**, Блоков: {res.block_count}"
+        if fingerprint_index is not None:
+            text += f", Версии: {', '.join(dict.fromkeys(fingerprint_index.label(h, current) for h in res.block_hashes))}"
+        return text + ")"
+
+    def block_versions(res: AnalysisResult) -> List[str]:
+        if fingerprint_index is None or not is_target(res):
+            return []
+        return [fingerprint_index.label(h, current) for h in res.block_hashes]
+
+    return Operation(
+        key="replace",
+        title="🔄 Замена код-блоков dataviewjs",
+        body_checks=frozenset({BODY_CHECK_BLOCKS}),
+        select=lambda res: is_target(res) and is_block_outdated(res, current, reference_has_separator),
+        describe=describe,
+        transform=partial(replace_dataviewjs_blocks, reference_content=reference_content),
+        stats=block_versions,
+        stats_title="Версия блока",
+        candidates=CandidateFilter(target_types=target_types, special_names=special_names),
+    )
+
+def build_remove_operation(script_dir: str, config: dict) -> Operation:
+    """Операция №2: удаление разделителей '---' после блоков dataviewjs."""
+    target_types = frozenset(collect_separator_target_types(script_dir, config))
+    return Operation(
+        key="remove",
+        title="🧹 Удаление разделителей '---' после код-блоков",
+        body_checks=frozenset({BODY_CHECK_BLOCKS}),
+        select=lambda res: res.separators_found_count > 0 and _has_any_type(res, target_types),
+        describe=lambda res: f"(Найдено разделителей: {res.separators_found_count})",
+        transform=remove_block_separators,
+        candidates=CandidateFilter(target_types=target_types),
+    )
+
+def build_status_fix_operation() -> Operation:
+    """Операция №3: поле 'status' из списка в строку."""
+    return Operation(
+        key="status_fix",
+        title="🛠️ Исправление поля 'status' (из списка в строку)",
+        body_checks=frozenset(),
+        select=lambda res: res.status_is_list,
+        describe=lambda res: f"(Было: `{res.original_status_value}`)",
+        transform=fix_status_field,
+    )
+
+def build_status_check_operation() -> Operation:
+    """Операция №4: проверка, что 'status' — строка (файлы не изменяются)."""
+    return Operation(
+        key="status_check",
+        title="🔍 Проверка типа поля 'status'",
+        body_checks=frozenset(),
+        select=lambda res: res.status_is_not_string,
+        describe=lambda res: f"(Значение: `{res.original_status_value}`, Тип: `{type(res.original_status_value).__name__}`)",
+    )
+
+# Статус 'important' ищется по индексу frontmatter, строка inlineSelect — по триграммному индексу
+IMPORTANT_CANDIDATES = CandidateFilter(status_values=frozenset({'important'}), content_patterns=(INLINE_SELECT_RE,))
+
+def _describe_important(res: AnalysisResult) -> str:
+    changes = []
+    if res.status_is_important:
+        changes.append("frontmatter")
+    if res.has_inline_select_string:
+        changes.append("inlineSelect")
+    return f"(Изменения: {', '.join(changes)})"
+
+def build_refactor_important_operation() -> Operation:
+    """Операция №5: рефакторинг статуса 'important'."""
+    return Operation(
+        key="important",
+        title="🏭 Рефакторинг статуса 'important'",
+        body_checks=frozenset({BODY_CHECK_INLINE_SELECT}),
+        select=lambda res: res.status_is_important or res.has_inline_select_string,
+        describe=_describe_important,
+        transform=refactor_important_status,
+        candidates=IMPORTANT_CANDIDATES,
+    )
+
+def build_file_plan(operations: Sequence[Operation], results: Sequence[AnalysisResult]) -> Tuple[List[Tuple[Operation, List[AnalysisResult]]], List[Tuple[AnalysisResult, Callable[[str], Tuple[str, int]]]]]:
+    """
+    Распределяет результаты анализа по операциям и собирает для каждого файла
+    одно составное преобразование из преобразований выбравших его операций
+    (в порядке следования операций).
+    Возвращает (выборки по операциям, план изменений [(файл, преобразование)]).
+    """
+    selections = [(op, [res for res in results if op.select(res)]) for op in operations]
+
+    transforms_by_file = {}
+    results_by_file = {}
+    for op, selected in selections:
+        if op.transform is None:
+            continue
+        for res in selected:
+            transforms_by_file.setdefault(res.file_path, []).append(op.transform)
+            results_by_file[res.file_path] = res
+
+    plan = [(results_by_file[path], compose_transforms(transforms)) for path, transforms in transforms_by_file.items()]
+    return selections, plan
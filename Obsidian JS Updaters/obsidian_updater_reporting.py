@@ -1,193 +1,180 @@
+import csv
+import heapq
+import json
 import os
+import tempfile
+from collections import Counter
 from datetime import datetime
 from itertools import groupby
-from typing import List
+from typing import Dict, Iterator, List, Sequence, Tuple
 
 from obsidian_updater_core import AnalysisResult
+from obsidian_updater_operations import Operation
+from vault_telemetry import phase, PHASE_REPORT
 
-def generate_replace_report(results: List[AnalysisResult], errors: List[AnalysisResult], report_path: str, vault_path: str):
-    """
-    Генерирует отчет для операции ЗАМЕНЫ блоков.
-    """
-    results.sort(key=lambda r: (r.area.lower(), r.file_path.lower()))
-
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 📜 Отчёт о файлах для обновления ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n\n")
-        
-        files_to_check = sum(1 for r in results if not r.has_target_type or r.has_non_target_type)
-        files_ok = len(results) - files_to_check
-
-        f.write(f"🔍 Найдено для обработки: **{len(results)}** файлов.\n")
-        f.write(f"- ✅ С корректным типом: **{files_ok}**\n")
-        f.write(f"- ✍️ Требуют проверки типа: **{files_to_check}**\n\n")
-        
-        if results:
-            f.write("### Список файлов по областям\n\n")
-            f.write("✍️ - *файл будет обработан, но требует проверки. Возможные причины: `type` отсутствует, не соответствует `target_types` или содержит смесь целевых и нецелевых типов.*\n\n")
-            for area, group in groupby(results, key=lambda r: r.area):
-                f.write(f"#### Area: {area}\n")
-                for res in group:
-                    relative_path = os.path.relpath(res.file_path, vault_path)
-                    emoji = "✍️" if not res.has_target_type or res.has_non_target_type else "📄"
-                    f.write(f"- {emoji} `{relative_path}` (Type: **{res.file_type}**, Блоков: {res.block_count})\n")
-                f.write("\n")
-        
-        if errors:
-            f.write("\n---\n\n")
-            f.write(f"### ⚠️ Обнаружены ошибки ({len(errors)}):\n")
-            for err in errors:
-                relative_path = os.path.relpath(err.file_path, vault_path)
-                f.write(f"- ❌ Ошибка в файле `{relative_path}`: {err.error}\n")
-    
-    print(f"✅ Отчёт сохранён в '{report_path}'")
-
-def generate_remove_report(results: List[AnalysisResult], errors: List[AnalysisResult], report_path: str, vault_path: str):
-    """
-    Генерирует отчет для операции УДАЛЕНИЯ разделителей.
-    """
-    results.sort(key=lambda r: (r.area.lower(), r.file_path.lower()))
-
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 🧹 Отчёт об удалении разделителей ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n\n")
-        f.write(f"🔍 Найдено для обработки: **{len(results)}** файлов, где `dataviewjs` блок соседствует с `---`.\n\n")
-        
-        if results:
-            f.write("### Список файлов по областям\n\n")
-            for area, group in groupby(results, key=lambda r: r.area):
-                f.write(f"#### Area: {area}\n")
-                for res in group:
-                    relative_path = os.path.relpath(res.file_path, vault_path)
-                    f.write(f"- `{relative_path}` (Найдено разделителей: {res.separators_found_count})\n")
-                f.write("\n")
-        
-        if errors:
-            f.write("\n---\n\n")
-            f.write(f"### ⚠️ Обнаружены ошибки ({len(errors)}):\n")
-            for err in errors:
-                relative_path = os.path.relpath(err.file_path, vault_path)
-                f.write(f"- ❌ Ошибка в файле `{relative_path}`: {err.error}\n")
-    
-    print(f"✅ Отчёт сохранён в '{report_path}'")
-
-def generate_status_fix_report(
-    results: List[AnalysisResult], 
-    errors: List[AnalysisResult], 
-    report_path: str, 
-    vault_path: str,
-    total_files_scanned: int
-):
+# Сколько строк отчета сортируется в памяти за раз при сборке markdown из JSONL
+REPORT_SORT_CHUNK_ROWS = 50_000
+# Колонки машиночитаемого отчета
+REPORT_ROW_FIELDS = ("operation", "op_index", "path", "area", "type", "details", "error")
+
+# --- ПОТОКОВЫЕ ОТЧЕТЫ (JSONL/CSV → MARKDOWN) ---
+# Строки отчета пишутся в JSONL и CSV по мере того, как рабочие процессы завершают анализ.
+# Markdown-отчет затем собирается из JSONL внешней сортировкой слиянием, поэтому
+# в памяти одновременно находится не больше REPORT_SORT_CHUNK_ROWS строк.
+
+def report_side_paths(report_path: str) -> Tuple[str, str]:
+    """Пути к машиночитаемым версиям отчета: рядом с markdown, с расширениями .jsonl и .csv."""
+    stem = os.path.splitext(report_path)[0]
+    return stem + ".jsonl", stem + ".csv"
+
+class StreamingReportWriter:
     """
-    Генерирует отчет для операции исправления поля 'status'.
+    Пишет строки отчета в JSONL и CSV по мере поступления результатов анализа.
+    Одна строка — пара (операция, файл); ошибки анализа пишутся с операцией 'error'.
     """
-    results.sort(key=lambda r: (r.area.lower(), r.file_path.lower()))
-
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 🛠️ Отчёт об исправлении поля 'status' ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
-        f.write(f"🔍 Всего проанализировано: **{total_files_scanned}** файлов.\n")
-        f.write(f"✅ Найдено для исправления: **{len(results)}** файлов, где `status` был списком.\n\n")
-        
-        if results:
-            f.write("### Список измененных файлов по областям\n\n")
-            for area, group in groupby(results, key=lambda r: r.area):
-                f.write(f"#### Area: {area}\n")
-                for res in group:
-                    relative_path = os.path.relpath(res.file_path, vault_path)
-                    # Показываем, какое значение было до исправления
-                    f.write(f"- `{relative_path}` (Было: `{res.original_status_value}`)\n")
-                f.write("\n")
-        
-        if errors:
-            f.write("\n---\n\n")
-            f.write(f"### ⚠️ Обнаружены ошибки при анализе ({len(errors)}):\n")
-            for err in errors:
-                relative_path = os.path.relpath(err.file_path, vault_path)
-                f.write(f"- ❌ Ошибка в файле `{relative_path}`: {err.error}\n")
-
-    print(f"✅ Отчёт сохранён в '{report_path}'")
-
-def generate_status_check_report(
-    results: List[AnalysisResult],
-    errors: List[AnalysisResult],
-    report_path: str,
-    vault_path: str,
-    total_files_scanned: int
-):
+    def __init__(self, report_path: str, vault_path: str, operations: Sequence[Operation]):
+        self.jsonl_path, self.csv_path = report_side_paths(report_path)
+        self.vault_path = vault_path
+        self.operations = list(operations)
+        self.counts = {op.key: 0 for op in self.operations}
+        self.stats = {op.key: Counter() for op in self.operations if op.stats}
+        self.files_scanned = 0
+        self.files_touched = 0
+        self.errors = 0
+        self._jsonl_file = None
+        self._csv_file = None
+        self._csv_writer = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.jsonl_path)), exist_ok=True)
+        self._jsonl_file = open(self.jsonl_path, 'w', encoding='utf-8')
+        # utf-8-sig — чтобы Excel корректно открывал кириллицу
+        self._csv_file = open(self.csv_path, 'w', encoding='utf-8-sig', newline='')
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=REPORT_ROW_FIELDS, extrasaction='ignore')
+        self._csv_writer.writeheader()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._jsonl_file.close()
+        self._csv_file.close()
+
+    def _write_row(self, row: dict):
+        self._jsonl_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._csv_writer.writerow(row)
+
+    def add_result(self, res: AnalysisResult):
+        """Обрабатывает один результат анализа (вызывается по мере завершения рабочих процессов)."""
+        # Относительный путь вычисляется один раз на файл, а не на каждую строку отчета
+        relative_path = os.path.relpath(res.file_path, self.vault_path)
+        if res.error:
+            self.errors += 1
+            self._write_row({"operation": "error", "op_index": len(self.operations), "path": relative_path,
+                             "area": "", "type": "", "details": "", "error": res.error})
+            return
+
+        self.files_scanned += 1
+        for op in self.operations:
+            if op.stats:
+                self.stats[op.key].update(op.stats(res))
+        touched = False
+        for index, op in enumerate(self.operations):
+            if op.select(res):
+                touched = True
+                self.counts[op.key] += 1
+                self._write_row({"operation": op.key, "op_index": index, "path": relative_path,
+                                 "area": res.area, "type": res.file_type, "details": op.describe(res), "error": ""})
+        self.files_touched += touched
+
+def _report_sort_key(row: dict) -> Tuple[int, str, str]:
+    return row["op_index"], row["area"].lower(), row["path"].lower()
+
+def _read_jsonl(path: str) -> Iterator[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+def iter_sorted_report_rows(jsonl_path: str, chunk_rows: int = REPORT_SORT_CHUNK_ROWS) -> Iterator[dict]:
     """
-    Генерирует отчет для операции проверки типа поля 'status'.
+    Возвращает строки JSONL-отчета, отсортированные по (операция, Area, путь).
+    Строки читаются порциями по `chunk_rows`, каждая порция сортируется и сохраняется
+    во временный файл, затем порции сливаются `heapq.merge`.
     """
-    results.sort(key=lambda r: (r.area.lower(), r.file_path.lower()))
-
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 🔍 Отчёт о проверке поля 'status' ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
-        f.write(f"🔍 Всего проанализировано: **{total_files_scanned}** файлов.\n")
-        f.write(f"⚠️ Найдено с некорректным типом `status`: **{len(results)}** файлов.\n\n")
-
-        if results:
-            f.write("### Список файлов с 'status' не строкового типа\n\n")
-            for area, group in groupby(results, key=lambda r: r.area):
-                f.write(f"#### Area: {area}\n")
-                for res in group:
-                    relative_path = os.path.relpath(res.file_path, vault_path)
-                    f.write(f"- `{relative_path}` (Значение: `{res.original_status_value}`, Тип: `{type(res.original_status_value).__name__}`)\n")
-                f.write("\n")
-
-        if errors:
-            f.write("\n---\n\n")
-            f.write(f"### ⚠️ Обнаружены ошибки при анализе ({len(errors)}):\n")
-            for err in errors:
-                relative_path = os.path.relpath(err.file_path, vault_path)
-                f.write(f"- ❌ Ошибка в файле `{relative_path}`: {err.error}\n")
-
-    print(f"✅ Отчёт сохранён в '{report_path}'")
-
-def generate_refactor_important_status_report(
-    results: List[AnalysisResult],
-    errors: List[AnalysisResult],
-    report_path: str,
-    vault_path: str,
-    total_files_scanned: int
-):
+    chunk_paths = []
+    chunk = []
+    try:
+        for row in _read_jsonl(jsonl_path):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                chunk_paths.append(_write_sorted_chunk(chunk, jsonl_path))
+                chunk = []
+        if not chunk_paths:
+            # Все строки поместились в одну порцию — временные файлы не нужны
+            yield from sorted(chunk, key=_report_sort_key)
+            return
+        if chunk:
+            chunk_paths.append(_write_sorted_chunk(chunk, jsonl_path))
+        yield from heapq.merge(*(_read_jsonl(path) for path in chunk_paths), key=_report_sort_key)
+    finally:
+        for path in chunk_paths:
+            os.remove(path)
+
+def _write_sorted_chunk(chunk: List[dict], jsonl_path: str) -> str:
+    chunk.sort(key=_report_sort_key)
+    fd, chunk_path = tempfile.mkstemp(suffix=".jsonl", prefix=".report_chunk_", dir=os.path.dirname(os.path.abspath(jsonl_path)))
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        for row in chunk:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return chunk_path
+
+def _write_stats_table(f, title: str, stats: Dict[str, int]):
+    f.write(f"| {title} | Количество |\n")
+    f.write("|:---|---:|\n")
+    for label, count in sorted(stats.items(), key=lambda item: -item[1]):
+        f.write(f"| {label} | {count} |\n")
+    f.write("\n")
+
+def generate_composite_report(writer: StreamingReportWriter, report_path: str, chunk_rows: int = REPORT_SORT_CHUNK_ROWS):
     """
-    Генерирует отчет для операции рефакторинга статуса 'important'.
+    Генерирует markdown-отчет задания (одной операции или нескольких, выполненных за один
+    проход): раздел на каждую операцию, файлы по Area, затем ошибки анализа.
+    Строки берутся из JSONL, уже записанного `writer`, в порядке внешней сортировки.
     """
-    results.sort(key=lambda r: (r.area.lower(), r.file_path.lower()))
-
-    files_with_fm_change = [r for r in results if r.status_is_important]
-    files_with_str_change = [r for r in results if r.has_inline_select_string]
-
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 🔄 Отчёт о рефакторинге статуса 'important' ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
-        f.write(f"🔍 Всего проанализировано: **{total_files_scanned}** файлов.\n")
-        f.write(f"✅ Найдено для модификации: **{len(results)}** файлов.\n\n")
-
-        if files_with_fm_change:
-            f.write(f"### 🛠️ Метаданные (Frontmatter) изменены ({len(files_with_fm_change)} файлов)\n")
-            f.write("_Статус `important` заменен на `in progress` и добавлены поля `important: true`, `urgent: true`._\n\n")
-            for area, group in groupby(files_with_fm_change, key=lambda r: r.area):
-                f.write(f"#### Area: {area}\n")
-                for res in group:
-                    relative_path = os.path.relpath(res.file_path, vault_path)
-                    f.write(f"- `{relative_path}`\n")
-                f.write("\n")
-
-        if files_with_str_change:
-            f.write(f"### 🖋️ Строка `INPUT[inlineSelect(...)]` обновлена ({len(files_with_str_change)} файлов)\n")
-            f.write("_Опция `option(important)` удалена из списка._\n\n")
-            for area, group in groupby(files_with_str_change, key=lambda r: r.area):
+    rows_by_op = groupby(iter_sorted_report_rows(writer.jsonl_path, chunk_rows), key=lambda row: row["op_index"])
+    next_group = next(rows_by_op, None)
+
+    single = len(writer.operations) == 1
+    title = f"{writer.operations[0].title} — отчёт" if single else "🧩 Отчёт о составной операции"
+    with phase(PHASE_REPORT), open(report_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {title} ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
+        f.write(f"🔍 Всего проанализировано: **{writer.files_scanned}** файлов.\n")
+        f.write(f"✅ Затронуто операциями: **{writer.files_touched}** файлов.\n\n")
+
+        # Сводная таблица нужна, только если операций несколько
+        if not single:
+            f.write("| Операция | Файлов |\n")
+            f.write("|:---|---:|\n")
+            for op in writer.operations:
+                f.write(f"| {op.title} | {writer.counts[op.key]} |\n")
+            f.write("\n")
+
+        for index, op in enumerate(writer.operations):
+            f.write(f"## {op.title} ({writer.counts[op.key]} файлов)\n\n")
+            if op_stats := writer.stats.get(op.key):
+                _write_stats_table(f, op.stats_title, op_stats)
+            if next_group is None or next_group[0] != index:
+                f.write("ℹ️ Файлов для этой операции не найдено.\n\n")
+                continue
+            for area, group in groupby(next_group[1], key=lambda row: row["area"]):
                 f.write(f"#### Area: {area}\n")
-                for res in group:
-                    relative_path = os.path.relpath(res.file_path, vault_path)
-                    f.write(f"- `{relative_path}`\n")
+                for row in group:
+                    f.write(f"- `{row['path']}` {row['details']}\n")
                 f.write("\n")
+            next_group = next(rows_by_op, None)
 
-        if not files_with_fm_change and not files_with_str_change and results:
-             f.write("ℹ️ Не было найдено файлов, требующих изменений в метаданных или строках inlineSelect.\n\n")
-        
-        if errors:
+        if next_group is not None:
             f.write("\n---\n\n")
-            f.write(f"### ⚠️ Обнаружены ошибки при анализе ({len(errors)}):\n")
-            for err in errors:
-                relative_path = os.path.relpath(err.file_path, vault_path)
-                f.write(f"- ❌ Ошибка в файле `{relative_path}`: {err.error}\n")
+            f.write(f"### ⚠️ Обнаружены ошибки при анализе ({writer.errors}):\n")
+            for row in next_group[1]:
+                f.write(f"- ❌ Ошибка в файле `{row['path']}`: {row['error']}\n")
 
-    print(f"✅ Отчёт сохранён в '{report_path}'")
+    print(f"✅ Отчёт сохранён в '{report_path}' (данные: '{writer.jsonl_path}', '{writer.csv_path}')")
@@ -0,0 +1,155 @@
+"""
+Проверка эквивалентности и замер скорости vault_frontmatter.parse_frontmatter.
+
+1. Каждый заголовок из CORPUS разбирается и parse_frontmatter, и PyYAML; результаты
+   (включая типы значений и ошибки) должны совпадать. Плоские заголовки сверяются
+   с `yaml.safe_load`, сложные — с тем загрузчиком, в который они уходят (libyaml
+   местами снисходительнее чистого PyYAML, например к табуляциям).
+2. Замеряется пропускная способность на типичной смеси заголовков хранилища.
+
+Запуск: python bench_frontmatter.py [число повторов]
+"""
+import sys
+import time
+
+try:
+    import yaml
+except ImportError:
+    print("❌ Ошибка: для сравнения нужен PyYAML. Установите его: pip install PyYAML")
+    sys.exit(1)
+
+from vault_frontmatter import parse_frontmatter, FrontmatterError, YAML_BACKEND, _fast_parse, _UNSUPPORTED, _SafeLoader
+
+# --- КОРПУС ЭКВИВАЛЕНТНОСТИ ---
+# Плоские заголовки, которые должен разбирать быстрый парсер
+FLAT_CORPUS = [
+    "",
+    "\n",
+    "# только комментарий\n",
+    "status: in progress\n",
+    "Area:\n  - Social\ntype:\n  - contact\n  - task\nwikilinks:\n  - \"[[Family DB]]\"\nstatus:\n  - in progress\n",
+    "Area: Matter\ntype: project\nstatus: important\n",
+    "status:\n- done\n- archived\n",
+    "important: true\nurgent: false\nflag: yes\nother: Off\n",
+    "count: 42\nneg: -7\nzero: 0\nplus: +3\n",
+    "empty:\nnull1: ~\nnull2: null\nnull3: NULL\n",
+    "banner: \"attachments/image.png\"\nimage: 'it''s here'\n",
+    "title: Note about C# and [[Links]] inside\n",
+    "aliases:\n  - Первый\n  - \"Второй\"\n  - 'Третий'\n  -\n",
+    "key with spaces: value with spaces   \n",
+    "dup: 1\ndup: 2\n",
+    "status: in progress\r\ntype: project\r\n",
+    "tags:\n  - a\n\n  - b\n# комментарий\n  - c\n",
+    "url: https://example.com/path?x=1\n",
+    "~tilde: ~value\n",
+]
+# Заголовки, которые должны уходить в PyYAML (или давать ту же ошибку)
+EXOTIC_CORPUS = [
+    "wikilinks: [[Windows Software]]\n",
+    "nested:\n  key: value\n",
+    "multi: |\n  line 1\n  line 2\n",
+    "folded: >-\n  a\n  b\n",
+    "created: 2024-01-15\n",
+    "ratio: 1.5\nsci: 1e5\ninf: .inf\n",
+    "octal: 0755\nhex: 0x1F\nsexa: 1:30\n",
+    "anchor: &a value\nref: *a\n",
+    "tagged: !!str 123\n",
+    "escaped: \"line\\nbreak\"\n",
+    "yes: key is bool\n",
+    "123: numeric key\n",
+    "\"quoted key\": v\n",
+    "flow: {a: 1, b: [2, 3]}\n",
+    "continued: first line\n  second line\n",
+    "list:\n  - a\n - b\n",
+    "bad: value: with colon\n",
+    "comment: value # trailing comment\n",
+    "dash: -\n",
+    "tab:\tvalue\n",
+    "key:\n\t- item\n",
+    "items:\n  - key: v\n  - - nested\n",
+    "- top level list\n- item\n",
+    "just a string\n",
+    "reserved: @value\n",
+    "status: todo\x85type: project\n",
+    "status: todo\u2028type: project\n",
+    "tags:\n  - a\u2029  - b\n",
+    "# комментарий\rkey: value\n",
+]
+CORPUS = FLAT_CORPUS + EXOTIC_CORPUS
+
+
+def _same(a, b) -> bool:
+    """Строгое сравнение с учетом типов (True != 1, '1' != 1)."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a.keys()) == list(b.keys()) and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _reference(text: str, loader=yaml.SafeLoader):
+    try:
+        return yaml.load(text, Loader=loader), None
+    except yaml.YAMLError as e:
+        return None, type(e).__name__
+
+
+def check_equivalence() -> bool:
+    """Сравнивает parse_frontmatter с yaml.safe_load на всем корпусе."""
+    ok = True
+    for text in CORPUS:
+        expected, expected_error = _reference(text, yaml.SafeLoader if text in FLAT_CORPUS else _SafeLoader)
+        try:
+            actual, actual_error = parse_frontmatter(text), None
+        except FrontmatterError:
+            actual, actual_error = None, "FrontmatterError"
+        if bool(expected_error) != bool(actual_error) or not _same(expected, actual):
+            ok = False
+            print(f"  ❌ Расхождение для {text!r}: ожидалось {expected!r} ({expected_error}), получено {actual!r} ({actual_error})")
+    for text in FLAT_CORPUS:
+        if _fast_parse(text) is _UNSUPPORTED:
+            ok = False
+            print(f"  ❌ Быстрый парсер не принял плоский заголовок {text!r}")
+    return ok
+
+
+def _throughput(parse, texts, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            parse(text)
+    elapsed = time.perf_counter() - start
+    return repeats * len(texts) / elapsed
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"ℹ️ Бэкенд PyYAML для сложных заголовков: {YAML_BACKEND}")
+
+    print("🔄 Проверка эквивалентности с yaml.safe_load...")
+    if not check_equivalence():
+        print("❌ Обнаружены расхождения.")
+        sys.exit(1)
+    print(f"✅ Все {len(CORPUS)} заголовков корпуса разобраны одинаково.")
+
+    # Типичная смесь: 95% плоских заголовков и 5% сложных
+    workload = FLAT_CORPUS * 19 + EXOTIC_CORPUS[:len(FLAT_CORPUS)]
+    workload = [t for t in workload if _reference(t)[1] is None]
+
+    print(f"🔄 Замер скорости ({len(workload)} заголовков × {repeats})...")
+    results = {
+        "yaml.safe_load (чистый Python)": _throughput(lambda t: yaml.load(t, Loader=yaml.SafeLoader), workload, repeats),
+    }
+    if hasattr(yaml, "CSafeLoader"):
+        results["yaml.load (CSafeLoader)"] = _throughput(lambda t: yaml.load(t, Loader=yaml.CSafeLoader), workload, repeats)
+    results["parse_frontmatter"] = _throughput(parse_frontmatter, workload, repeats)
+
+    baseline = results["yaml.safe_load (чистый Python)"]
+    for name, per_second in results.items():
+        print(f"  - {name}: {per_second:,.0f} заголовков/сек (x{per_second / baseline:.1f})")
+
+
+if __name__ == "__main__":
+    main()
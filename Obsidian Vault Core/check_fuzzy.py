@@ -0,0 +1,105 @@
+"""
+Проверка vault_fuzzy: опечатки в пределах допустимого числа правок находят свое имя.
+
+Сначала проверяются известные случаи (перестановка соседних букв в коротком имени —
+одна правка: `[[Alhpa]]` → "Alpha"), затем битово-параллельное edit_distance сверяется
+с обычной таблицей optimal string alignment, а FuzzyIndex.search — с полным перебором имен.
+
+Запуск: python check_fuzzy.py [число случайных запросов]
+"""
+import random
+import sys
+
+from vault_fuzzy import FuzzyIndex, default_max_distance, edit_distance, normalize_name
+
+NAMES = ["Alpha", "Project Alpha", "Beta", "Meeting Notes", "Альфа", "Daily Log", "Inbox"]
+
+# (запрос, ожидаемое имя, ожидаемое число правок)
+CASES = [
+    ("Alhpa", "alpha", 1),
+    ("lApha", "alpha", 1),
+    ("Projcet Alpha", "project alpha", 1),
+    ("Meetign Ntoes", "meeting notes", 2),
+    ("Алфьа", "альфа", 1),
+    ("Ibnox", "inbox", 1),
+]
+
+
+def reference_distance(a: str, b: str) -> int:
+    """Optimal string alignment обычной таблицей O(len(a)·len(b))."""
+    rows = [list(range(len(b) + 1))]
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            row[j] = min(rows[-1][j] + 1, row[j - 1] + 1, rows[-1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], rows[-2][j - 2] + 1)
+        rows.append(row)
+    return rows[-1][-1]
+
+
+def _mutate(rng: random.Random, text: str, alphabet: str) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        position = rng.randrange(len(chars) + 1)
+        operation = rng.choice(("insert", "delete", "replace", "swap"))
+        if operation == "insert":
+            chars.insert(position, rng.choice(alphabet))
+        elif operation == "delete" and position < len(chars):
+            del chars[position]
+        elif operation == "replace" and position < len(chars):
+            chars[position] = rng.choice(alphabet)
+        elif operation == "swap" and position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    return "".join(chars)
+
+
+def main() -> int:
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    problems = []
+
+    index = FuzzyIndex()
+    for name in NAMES:
+        index.add(name, name)
+    for query, expected, distance in CASES:
+        found = [(key, found_distance) for _, key, found_distance in index.search(query, limit=1)]
+        if found != [(expected, distance)]:
+            problems.append(f"search({query!r}) = {found}, ожидалось {[(expected, distance)]}")
+
+    print("🔄 Сверка edit_distance с таблицей optimal string alignment...")
+    rng = random.Random(1)
+    for _ in range(queries * 10):
+        a = "".join(rng.choice("abc") for _ in range(rng.randint(0, 10)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 10)))
+        if edit_distance(a, b) != reference_distance(a, b):
+            problems.append(f"edit_distance({a!r}, {b!r}) = {edit_distance(a, b)}, ожидалось {reference_distance(a, b)}")
+
+    print("🔄 Сверка FuzzyIndex.search с полным перебором имен...")
+    alphabet = "abcde "
+    names = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 16))) for _ in range(500)]
+    index = FuzzyIndex()
+    for name in names:
+        index.add(name, name)
+    keys = sorted({normalize_name(name) for name in names} - {""})
+    for _ in range(queries):
+        query = normalize_name(_mutate(rng, rng.choice(keys), alphabet))
+        if not query:
+            continue
+        limit = default_max_distance(len(query))
+        best = min(reference_distance(query, key) for key in keys)
+        expected = [best] if best <= limit else []
+        found = [distance for _, _, distance in index.search(query, limit=1)]
+        if found != expected:
+            problems.append(f"search({query!r}): расстояния {found}, ожидалось {expected}")
+
+    for problem in problems[:20]:
+        print(f"❌ {problem}")
+    if problems:
+        print(f"❌ Расхождений: {len(problems)}")
+        return 1
+    print("✅ Расхождений нет.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Проверка vault_graph: соседи узла, полученные из загруженного графа, не мешают его закрыть.
+
+Граф сохраняется во временный файл, открывается через mmap, у него берутся списки
+successors/predecessors, после чего вызывается close(). Закрытие не должно падать
+с BufferError, а полученные списки должны оставаться пригодными.
+
+Запуск: python check_graph.py
+"""
+import os
+import sys
+import tempfile
+
+from vault_graph import GraphBuilder, LinkGraph
+
+
+def main() -> int:
+    builder = GraphBuilder()
+    a, b, c = builder.add_node("A.md"), builder.add_node("B.md"), builder.add_node("C.md")
+    builder.add_edge(a, b)
+    builder.add_edge(a, c)
+    builder.add_edge(c, b)
+    built = builder.build(meta={"signature": "check"})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "graph.bin")
+        built.save(file_path)
+        graph = LinkGraph.load(file_path)
+        successors = graph.successors(a)
+        predecessors = graph.predecessors(b)
+        try:
+            graph.close()
+        except BufferError as e:
+            print(f"❌ close() не освободил отображение файла: {e}")
+            return 1
+
+    problems = []
+    if successors != built.successors(a):
+        problems.append(f"successors({a}) = {successors}, ожидалось {built.successors(a)}")
+    if predecessors != built.predecessors(b):
+        problems.append(f"predecessors({b}) = {predecessors}, ожидалось {built.predecessors(b)}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        return 1
+    print("✅ Граф закрывается, пока вызывающий держит списки соседей")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Проверка обещания vault_trigrams: отбор по триграммам никогда не теряет заметку с совпадением.
+
+Для каждой пары (регулярка, текст) из корпуса и из случайных текстов на "трудном" алфавите
+(`İ`, `ı`, `ſ`, `K` (знак Кельвина), `ς`/`σ`/`Σ`, `ß`, ...) проверяется: если `re.search`
+находит совпадение, сигнатура текста должна пройти план `plan_regex`. Лишние кандидаты
+допустимы, пропуски — нет.
+
+Запуск: python check_trigrams.py [число случайных текстов]
+"""
+import random
+import re
+import sys
+
+from vault_trigrams import plan_regex, signature, text_trigrams
+
+PATTERNS = [
+    r"(?i)important",
+    r"(?i)option\(important\)",
+    r"INPUT\[inlineSelect\(.*?\):status\]",
+    r"(?i)status:\s*(todo|done)",
+    r"(?i)straße",
+    r"(?i)σοφία",
+    r"(?i)kelvin",
+    r"(?i)class",
+    r"(?i:İstanbul)",
+    r"İstanbul",
+    r"(?i)ﬅar",
+    r"(?i)a+bc|xyz{2,}",
+]
+
+TEXTS = [
+    "İMPORTANT",
+    "OPTION(İMPORTANT)",
+    "optıon(ımportant)",
+    "INPUT[inlineSelect(option(a)):status]",
+    "STATUS: TODO",
+    "STRASSE and STRAẞE",
+    "ΣΟΦΊΑ and σοφίας and ΣΟΦΙΑ",
+    "KELVIN",
+    "claſſ",
+    "istanbul İSTANBUL",
+    "ﬆAR",
+    "AAABC and XYZZZ",
+]
+
+# Символы, у которых casefold(), lower() и правила IGNORECASE в re расходятся
+TRICKY = "iIİıkKKsSſßẞσςΣfﬅﬆtaornmpΙιͅι()[]: "
+
+
+def passes(pattern: str, text: str) -> bool:
+    bits_log2, bloom = signature(text_trigrams(text))
+    return plan_regex(pattern).may_match(bits_log2, int.from_bytes(bloom, "little"))
+
+
+def check(random_texts: int) -> int:
+    """Число пропусков (совпадение есть, а заметка не отобрана)."""
+    rng = random.Random(1)
+    texts = list(TEXTS)
+    for _ in range(random_texts):
+        texts.append("".join(rng.choice(TRICKY) for _ in range(rng.randint(3, 40))))
+    # Тексты, в которых совпадение гарантированно есть: литерал регулярки в случайном регистре
+    for literal in ("important", "option(important)", "kelvin", "class", "istanbul", "straße", "σοφία"):
+        for _ in range(random_texts // 10 + 1):
+            swapped = {"i": "İı", "k": "K", "s": "ſ", "σ": "ςΣ", "ß": "ẞ"}
+            texts.append("".join(rng.choice(swapped.get(ch, "") + ch + ch.upper()) for ch in literal))
+
+    misses = 0
+    for pattern in PATTERNS:
+        compiled = re.compile(pattern)
+        for text in texts:
+            if compiled.search(text) and not passes(pattern, text):
+                misses += 1
+                print(f"  ❌ {pattern!r} совпадает с {text!r}, но заметка не отобрана")
+    return misses
+
+
+def main():
+    random_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("🔄 Проверка: отбор по триграммам не теряет совпадений re.search...")
+    misses = check(random_texts)
+    if misses:
+        print(f"❌ Пропусков: {misses}")
+        sys.exit(1)
+    print("✅ Пропусков нет.")
+
+
+if __name__ == "__main__":
+    main()
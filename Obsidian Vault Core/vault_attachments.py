@@ -0,0 +1,375 @@
+"""
+Индекс использования вложений по всему хранилищу.
+
+За один проход собирает, какие вложения (любые файлы, кроме заметок) упоминаются в заметках,
+кем и сколько раз, какие не используются нигде и какие встраивания ведут на несуществующие файлы.
+Учитываются:
+*   встраивания `![[file.png]]` и `![alt](path/file.png)` (в том числе `![](<path with spaces.png>)`);
+*   обычные ссылки `[[file.pdf]]` и `[text](file.pdf)` — вложение, на которое только ссылаются,
+    тоже считается используемым;
+*   свойства frontmatter с путями к файлам (`banner: files/cover.png`, `image`); вики-ссылки
+    внутри frontmatter (`banner: "[[cover.png]]"`) считаются обычными ссылками.
+Ссылки разрешаются так же, как в find_orphans: по пути относительно заметки (inline) или
+корня хранилища, а затем по имени файла в любой папке. Код-блоки и комментарии пропускаются.
+
+Извлечение ссылок из файла — самая дорогая часть, поэтому оно идет параллельно и кэшируется
+по (mtime, размер): при повторном запуске читаются только измененные заметки.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+import vault_frontmatter
+from vault_frontmatter import FrontmatterError, parse_frontmatter
+from vault_paths import PathFilter
+import vault_telemetry
+from vault_telemetry import PHASE_REGEX, PHASE_WALK, PHASE_WRITE, count, phase
+
+# Расширения заметок; остальные файлы считаются вложениями
+NOTE_EXTENSIONS = (".md",)
+# Файлы Obsidian, которые не являются ни заметками, ни вложениями
+NON_ATTACHMENT_EXTENSIONS = (".canvas", ".base")
+DEFAULT_FRONTMATTER_PROPERTIES = ("banner", "image")
+EXTERNAL_PREFIXES = ("http://", "https://", "ftp://", "mailto:", "obsidian://", "data:")
+
+# --- ВИДЫ ССЫЛОК ---
+KIND_EMBED = "embed"              # ![[...]] и ![](...)
+KIND_LINK = "link"                # [[...]] и []()
+KIND_FRONTMATTER = "frontmatter"  # banner: ..., image: ...
+
+# Меньше файлов обрабатывается последовательно: запуск процессов дороже самой работы
+PARALLEL_MIN_FILES = 64
+CHUNK_SIZE = 64
+
+WIKI_LINK_RE = re.compile(r'(!?)\[\[([^\]\|#\n]+)')
+INLINE_LINK_RE = re.compile(r'(!?)\[[^\]\n]*\]\((?:<([^>\n]+)>|([^)\s#?]+))')
+FRONTMATTER_RE = re.compile(r'^---\s*\n(.*?)\n---', re.DOTALL)
+FM_WIKILINK_RE = re.compile(r'\[\[([^\]\|#]+)\]\]')
+CODE_BLOCK_RE = re.compile(r'```.*?```', re.DOTALL)
+COMMENT_RE = re.compile(r'%%.*?%%', re.DOTALL)
+INLINE_CODE_RE = re.compile(r'`[^`]*`')
+
+
+def is_attachment(rel_path: str) -> bool:
+    """Вложение — файл с расширением, которое не относится к заметкам и файлам Obsidian."""
+    ext = os.path.splitext(rel_path)[1].lower()
+    return bool(ext) and ext not in NOTE_EXTENSIONS and ext not in NON_ATTACHMENT_EXTENSIONS
+
+
+# --- ИЗВЛЕЧЕНИЕ ССЫЛОК (в рабочих процессах) ---
+
+def _strings_from_yaml_value(value) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item for sub_value in value for item in _strings_from_yaml_value(sub_value)]
+    if isinstance(value, dict):
+        return [item for sub_value in value.values() for item in _strings_from_yaml_value(sub_value)]
+    return []
+
+
+def extract_references(content: str, frontmatter_properties: Sequence[str] = DEFAULT_FRONTMATTER_PROPERTIES) -> List[Tuple[str, str, str]]:
+    """
+    Возвращает все ссылки заметки как (вид, форма, цель): форма — 'wiki', 'inline' или 'path'
+    (путь из frontmatter). Цель уже раскодирована (%20 -> пробел), повторы сохраняются.
+    Внешние ссылки (http и т.п.) пропускаются.
+    """
+    references = []
+    cleaned = INLINE_CODE_RE.sub('', COMMENT_RE.sub('', CODE_BLOCK_RE.sub('', content)))
+    for match in WIKI_LINK_RE.finditer(cleaned):
+        if target := unquote(match.group(2).strip()):
+            references.append((KIND_EMBED if match.group(1) else KIND_LINK, "wiki", target))
+    for match in INLINE_LINK_RE.finditer(cleaned):
+        target = unquote((match.group(2) or match.group(3)).strip())
+        if target and not target.lower().startswith(EXTERNAL_PREFIXES):
+            references.append((KIND_EMBED if match.group(1) else KIND_LINK, "inline", target))
+
+    if frontmatter_properties and (fm_match := FRONTMATTER_RE.match(content)):
+        try:
+            fm_data = parse_frontmatter(fm_match.group(1))
+        except FrontmatterError:
+            fm_data = None
+        if isinstance(fm_data, dict):
+            for prop in frontmatter_properties:
+                for raw_value in _strings_from_yaml_value(fm_data.get(prop)):
+                    # Значения вида "[[file.png]]" уже учтены как вики-ссылки выше
+                    if FM_WIKILINK_RE.search(raw_value):
+                        continue
+                    target = unquote(raw_value.strip())
+                    if target and not target.lower().startswith(EXTERNAL_PREFIXES):
+                        references.append((KIND_FRONTMATTER, "path", target))
+    return references
+
+
+def _extract_files(vault_path: str, items: List[Tuple[str, int, int]], frontmatter_properties: Sequence[str]) -> List[dict]:
+    """Извлекает ссылки из пачки файлов; каждый элемент — (путь, mtime_ns, размер)."""
+    results = []
+    for rel_path, mtime_ns, size in items:
+        entry = {"path": rel_path, "mtime_ns": mtime_ns, "size": size, "refs": [], "error": None}
+        started = time.perf_counter()
+        try:
+            with open(os.path.join(vault_path, rel_path), 'r', encoding='utf-8') as f:
+                entry["refs"] = [list(ref) for ref in extract_references(f.read(), frontmatter_properties)]
+        except (OSError, UnicodeDecodeError) as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["seconds"] = time.perf_counter() - started
+        results.append(entry)
+    return results
+
+
+# --- РАЗРЕШЕНИЕ ССЫЛОК ---
+
+class FileLookup:
+    """Поиск файлов хранилища по относительному пути и по имени (как в find_orphans)."""
+
+    def __init__(self, rel_paths: Sequence[str]):
+        self.by_path: Dict[str, str] = {}
+        self.by_name: Dict[str, str] = {}
+        for rel_path in rel_paths:
+            self.by_path[os.path.normcase(rel_path)] = rel_path
+            self.by_name[os.path.normcase(rel_path.rsplit('/', 1)[-1])] = rel_path
+
+    def by_file_name(self, name: str) -> Optional[str]:
+        key = os.path.normcase(name)
+        if (found := self.by_name.get(key)) is None and not key.endswith('.md'):
+            found = self.by_name.get(key + '.md')
+        return found
+
+    def by_relative_path(self, base_dir: str, target: str) -> Optional[str]:
+        path = os.path.normpath(os.path.join(base_dir, target)).replace(os.sep, '/')
+        if path.startswith('../'):
+            return None
+        key = os.path.normcase(path)
+        if (found := self.by_path.get(key)) is None and not key.endswith('.md'):
+            found = self.by_path.get(key + '.md')
+        return found
+
+    def resolve(self, source: str, form: str, target: str) -> Optional[str]:
+        """Относительный путь файла, на который указывает ссылка, или None."""
+        if form == "inline":
+            base_dir = source.rsplit('/', 1)[0] if '/' in source else ''
+            if (found := self.by_relative_path(base_dir, target)) is not None:
+                return found
+        elif '/' in target and (found := self.by_relative_path('', target)) is not None:
+            # Путь от корня: [[folder/file.png]] и свойства frontmatter
+            return found
+        return self.by_file_name(target.rsplit('/', 1)[-1])
+
+
+# --- ИНДЕКС ---
+
+@dataclass
+class AttachmentUsage:
+    size: int = 0
+    embeds: int = 0
+    links: int = 0
+    frontmatter: int = 0
+    referenced_by: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def references(self) -> int:
+        return self.embeds + self.links + self.frontmatter
+
+
+@dataclass
+class MissingTarget:
+    kind: str
+    referenced_by: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def references(self) -> int:
+        return sum(self.referenced_by.values())
+
+
+@dataclass
+class AttachmentIndex:
+    vault_path: str
+    attachments: Dict[str, AttachmentUsage] = field(default_factory=dict)
+    missing: Dict[str, MissingTarget] = field(default_factory=dict)
+    notes_scanned: int = 0
+    notes_from_cache: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def unused(self) -> List[str]:
+        return sorted(path for path, usage in self.attachments.items() if not usage.references)
+
+    def to_dict(self) -> dict:
+        unused = self.unused
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "vault": self.vault_path,
+            "totals": {
+                "notes": self.notes_scanned,
+                "attachments": len(self.attachments),
+                "used": len(self.attachments) - len(unused),
+                "unused": len(unused),
+                "unused_bytes": sum(self.attachments[path].size for path in unused),
+                "missing_targets": len(self.missing),
+            },
+            "attachments": {
+                path: {
+                    "size": usage.size,
+                    "references": usage.references,
+                    "embeds": usage.embeds,
+                    "links": usage.links,
+                    "frontmatter": usage.frontmatter,
+                    "referenced_by": dict(sorted(usage.referenced_by.items())),
+                }
+                for path, usage in sorted(self.attachments.items())
+            },
+            "unused": unused,
+            "missing": {
+                target: {"kind": missing.kind, "references": missing.references, "referenced_by": dict(sorted(missing.referenced_by.items()))}
+                for target, missing in sorted(self.missing.items())
+            },
+            "errors": dict(sorted(self.errors.items())),
+        }
+
+
+def _walk_vault(vault_path: str, path_filter: PathFilter) -> Tuple[List[Tuple[str, int, int]], Dict[str, int]]:
+    """Возвращает заметки (путь, mtime_ns, размер) и вложения (путь -> размер). Скрытые файлы и папки пропускаются."""
+    notes, attachments = [], {}
+    for root, dirs, files in os.walk(vault_path):
+        rel_root = os.path.relpath(root, vault_path).replace(os.sep, '/')
+        prefix = '' if rel_root == '.' else rel_root + '/'
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and not path_filter.excludes_dir(prefix + d))
+        for name in sorted(files):
+            rel_path = prefix + name
+            if name.startswith('.') or not path_filter.matches(rel_path):
+                continue
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            if name.lower().endswith(NOTE_EXTENSIONS):
+                notes.append((rel_path, stat.st_mtime_ns, stat.st_size))
+            elif is_attachment(rel_path):
+                attachments[rel_path] = stat.st_size
+    return notes, attachments
+
+
+def extraction_signature() -> str:
+    """Хэш кода извлечения ссылок: при его изменении кэш перестает действовать."""
+    hasher = hashlib.sha256()
+    for source_path in (__file__, vault_frontmatter.__file__):
+        with open(source_path, 'rb') as f:
+            hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def load_cache(cache_path: Optional[str], vault_path: str, signature: str) -> Dict[str, dict]:
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        print("  ⚠️  Не удалось прочитать кэш индекса вложений, все заметки будут прочитаны заново.")
+        return {}
+    if data.get("signature") != signature or data.get("vault") != vault_path:
+        return {}
+    return data.get("files", {})
+
+
+def save_cache(cache_path: Optional[str], vault_path: str, signature: str, entries: Dict[str, dict]):
+    if not cache_path:
+        return
+    tmp_path = cache_path + ".tmp"
+    try:
+        with phase(PHASE_WRITE), open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"signature": signature, "vault": vault_path, "files": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"  ⚠️  Не удалось сохранить кэш индекса вложений: {e}")
+
+
+def build_attachment_index(
+    vault_path: str,
+    path_filter: Optional[PathFilter] = None,
+    cache_path: Optional[str] = None,
+    frontmatter_properties: Sequence[str] = DEFAULT_FRONTMATTER_PROPERTIES,
+    max_workers: Optional[int] = None,
+) -> AttachmentIndex:
+    """
+    Строит индекс вложений хранилища. Ссылки заметок, не изменившихся с прошлого запуска,
+    берутся из кэша `cache_path` (если он задан).
+    """
+    vault_path = os.path.abspath(vault_path)
+    path_filter = path_filter or PathFilter(include=(), exclude=())
+    signature = f"{extraction_signature()}|{','.join(frontmatter_properties)}"
+    with phase(PHASE_WALK):
+        notes, attachment_sizes = _walk_vault(vault_path, path_filter)
+    count("notes", len(notes))
+    count("attachments", len(attachment_sizes))
+
+    cache = load_cache(cache_path, vault_path, signature)
+    entries: Dict[str, dict] = {}
+    stale = []
+    for rel_path, mtime_ns, size in notes:
+        cached = cache.get(rel_path)
+        if cached is not None and cached.get("mtime_ns") == mtime_ns and cached.get("size") == size:
+            entries[rel_path] = cached
+        else:
+            stale.append((rel_path, mtime_ns, size))
+
+    index = AttachmentIndex(vault_path, notes_scanned=len(notes), notes_from_cache=len(notes) - len(stale))
+    count("cache_hits", index.notes_from_cache)
+    telemetry = vault_telemetry.active()
+    with phase(PHASE_REGEX):
+        for result in _extract_all(vault_path, stale, frontmatter_properties, max_workers):
+            if telemetry is not None:
+                telemetry.record_file(result["path"], result["seconds"], result["size"])
+            if result["error"]:
+                index.errors[result["path"]] = result["error"]
+                count("errors")
+                continue
+            entries[result["path"]] = {"mtime_ns": result["mtime_ns"], "size": result["size"], "refs": result["refs"]}
+    save_cache(cache_path, vault_path, signature, entries)
+
+    with phase("resolve"):
+        _resolve_references(index, entries, attachment_sizes, [rel_path for rel_path, _, _ in notes])
+    return index
+
+
+def _extract_all(vault_path: str, items: List[Tuple[str, int, int]], frontmatter_properties: Sequence[str], max_workers: Optional[int]) -> List[dict]:
+    if max_workers == 1 or len(items) < PARALLEL_MIN_FILES:
+        return _extract_files(vault_path, items, frontmatter_properties)
+    chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_extract_files, vault_path, chunk, tuple(frontmatter_properties)) for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def _resolve_references(index: AttachmentIndex, entries: Dict[str, dict], attachment_sizes: Dict[str, int], note_paths: List[str]):
+    lookup = FileLookup(note_paths + list(attachment_sizes))
+    index.attachments = {path: AttachmentUsage(size=size) for path, size in attachment_sizes.items()}
+    for source, entry in entries.items():
+        for kind, form, target in entry["refs"]:
+            resolved = lookup.resolve(source, form, target)
+            if resolved is None:
+                # Обычная ссылка на несуществующую заметку — забота find_orphans, а не индекса вложений
+                if kind == KIND_LINK and not is_attachment(target):
+                    continue
+                missing = index.missing.setdefault(target, MissingTarget(kind))
+                missing.referenced_by[source] = missing.referenced_by.get(source, 0) + 1
+                continue
+            if (usage := index.attachments.get(resolved)) is None:
+                continue  # ссылка на заметку
+            if kind == KIND_EMBED:
+                usage.embeds += 1
+            elif kind == KIND_LINK:
+                usage.links += 1
+            else:
+                usage.frontmatter += 1
+            usage.referenced_by[source] = usage.referenced_by.get(source, 0) + 1
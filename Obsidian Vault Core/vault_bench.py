@@ -0,0 +1,451 @@
+"""
+Замеры скорости и памяти инструментов репозитория на синтетических хранилищах (vault_synth.py).
+
+Для каждого размера хранилища (по умолчанию 1k/10k/100k заметок) и каждого инструмента —
+find_orphans, obsidian_bfs_tool (режим отчета), операций obsidian_updater и скриптов MD Tools —
+делается два запуска в отдельных процессах:
+*   cold — на свежей копии хранилища, без кэшей и индексов инструмента;
+*   warm — сразу следом на том же хранилище (кэш find_orphans, индекс отпечатков updater,
+    уже обработанные файлы MD Tools). Файловый кэш ОС не сбрасывается.
+
+Для каждого запуска сохраняются время, пиковая память процесса (RSS, вместе с рабочими
+процессами) и замеры по фазам vault_telemetry. Результаты дописываются в историю
+(VAULT_BENCH_RESULTS_NAME), и каждый новый замер сравнивается с медианой последних
+запусков на этой же машине: заметно более медленные или "тяжелые" замеры помечаются
+как регрессии, а код возврата становится 1.
+
+Примеры:
+    python vault_bench.py --sizes 1000,10000
+    python vault_bench.py --tools find_orphans,updater --profile cpu
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from vault_synth import SynthConfig, SynthSummary, generate_vault, REPLACE_CONFIG_NAME
+from vault_telemetry import Telemetry, PROFILE_ENV_VAR
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(CORE_DIR)
+MAINTENANCE_DIR = os.path.join(REPO_DIR, "Obsidian Vault Maintenance")
+UPDATER_DIR = os.path.join(REPO_DIR, "Obsidian JS Updaters")
+MD_TOOLS_DIR = os.path.join(REPO_DIR, "MD Tools")
+
+# --- НАСТРОЙКИ ---
+BENCH_SIZES = (1_000, 10_000, 100_000)
+VAULT_BENCH_RESULTS_NAME = "vault_bench_results.json"
+# Замер считается регрессией, если он хуже медианы последних HISTORY_WINDOW запусков
+# больше чем на REGRESSION_THRESHOLD (доля) и при этом больше чем на абсолютный порог
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_MIN_SECONDS = 0.05
+REGRESSION_MIN_RSS_KB = 10 * 1024
+HISTORY_WINDOW = 5
+
+STATE_COLD = "cold"
+STATE_WARM = "warm"
+
+
+@dataclass
+class BenchContext:
+    """Пути одного прогона инструмента (копия хранилища, конфиги updater, папка состояния)."""
+    tool: str
+    vault_path: str
+    updater_config_dir: str
+    state_dir: str
+
+
+@dataclass
+class BenchResult:
+    tool: str
+    notes: int
+    state: str
+    seconds: float
+    peak_rss_kb: Optional[int] = None
+    error: Optional[str] = None
+    telemetry: Dict = field(default_factory=dict)
+
+
+# --- ЗАПУСК ИНСТРУМЕНТОВ (в дочернем процессе) ---
+
+def _load_script(path: str, module_name: str):
+    """Импортирует скрипт по пути (имена скриптов MD Tools содержат пробелы)."""
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _markdown_files(vault_path: str) -> List[str]:
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(vault_path) for name in files if name.lower().endswith(".md")
+    )
+
+
+def _read_telemetry(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_find_orphans(ctx: BenchContext) -> Optional[dict]:
+    sys.path.insert(0, MAINTENANCE_DIR)
+    import find_orphans
+    find_orphans.VAULT_PATH = ctx.vault_path
+    find_orphans.IGNORED_FOLDERS = []
+    find_orphans.IGNORE_ROOT_FILES = False
+    # Абсолютные пути: кэш, история и замеры пишутся в папку состояния, а не рядом со скриптом
+    find_orphans.CACHE_FILE_NAME = os.path.join(ctx.state_dir, "find_orphans_cache.json")
+    find_orphans.TELEMETRY_FILE_NAME = os.path.join(ctx.state_dir, "find_orphans_telemetry.json")
+    find_orphans.HISTORY_FILE_NAME = os.path.join(ctx.state_dir, "find_orphans_history.json")
+    find_orphans.DUPLICATES_CACHE_FILE_NAME = os.path.join(ctx.state_dir, "find_orphans_hashes.json")
+    find_orphans.main()
+    return _read_telemetry(find_orphans.TELEMETRY_FILE_NAME)
+
+
+def run_bfs_report(ctx: BenchContext) -> Optional[dict]:
+    sys.path.insert(0, MAINTENANCE_DIR)
+    import obsidian_bfs_tool
+    from vault_synth import START_NOTE_NAME
+    obsidian_bfs_tool.VAULT_PATH = ctx.vault_path
+    obsidian_bfs_tool.START_FILE_NAME = START_NOTE_NAME
+    obsidian_bfs_tool.TELEMETRY_FILE_NAME = os.path.join(ctx.state_dir, "bfs_telemetry.json")
+    obsidian_bfs_tool.GRAPH_CACHE_FILE_NAME = os.path.join(ctx.state_dir, "bfs_graph_cache.bin")
+    obsidian_bfs_tool.main(mode="report")
+    return _read_telemetry(obsidian_bfs_tool.TELEMETRY_FILE_NAME)
+
+
+def _updater_runner(operation: str) -> Callable[[BenchContext], Optional[dict]]:
+    """Операция updater как задание в режиме пробного прогона: все вычисления без записи в хранилище."""
+    def run(ctx: BenchContext) -> Optional[dict]:
+        sys.path.insert(0, UPDATER_DIR)
+        from obsidian_updater_jobs import Job, MODE_DRY_RUN, STATUS_OK, execute_job
+        job = Job(
+            name=operation, operations=[operation], mode=MODE_DRY_RUN,
+            config=REPLACE_CONFIG_NAME if operation == "replace" else None,
+        )
+        summary = execute_job(job, ctx.updater_config_dir, ctx.vault_path)
+        if summary.status != STATUS_OK:
+            raise RuntimeError(summary.message or summary.status)
+        return None
+    return run
+
+
+def _md_tool_runner(script_name: str, call: Callable) -> Callable[[BenchContext], Optional[dict]]:
+    """Скрипт MD Tools: `call(module, ctx)` применяет его ко всему хранилищу."""
+    def run(ctx: BenchContext) -> Optional[dict]:
+        module = _load_script(os.path.join(MD_TOOLS_DIR, script_name), "md_tool")
+        call(module, ctx)
+        return None
+    return run
+
+
+def _for_each_file(func_name: str, *args):
+    def call(module, ctx: BenchContext):
+        func = getattr(module, func_name)
+        for path in _markdown_files(ctx.vault_path):
+            func(path, *args)
+    return call
+
+
+def run_md_batch(ctx: BenchContext) -> Optional[dict]:
+    # Обычный импорт, а не _load_script: рабочие процессы импортируют модуль по имени
+    sys.path.insert(0, MD_TOOLS_DIR)
+    import md_batch_runner
+    # Все преобразования за один параллельный проход по хранилищу
+    md_batch_runner.run_batch(ctx.vault_path, list(md_batch_runner.TRANSFORM_SPECS))
+    return None
+
+
+def run_deck_manager(ctx: BenchContext) -> Optional[dict]:
+    # Обычный импорт: рабочие процессы импортируют модуль по имени. Состояние колод лежит
+    # в папке состояния, поэтому теплый запуск только сверяет mtime и размер файлов
+    sys.path.insert(0, MD_TOOLS_DIR)
+    import add_flashcard_decks
+    add_flashcard_decks.run_decks(ctx.vault_path, state_path=os.path.join(ctx.state_dir, add_flashcard_decks.STATE_FILE_NAME))
+    return None
+
+
+def _attachment_index(module, ctx: BenchContext):
+    # Индекс, кэш и сводка пишутся в папку состояния: теплый запуск берет заметки из кэша
+    module.VAULT_PATH = ctx.vault_path
+    module.SCRIPT_DIR = ctx.state_dir
+    module.run_vault_index()
+
+
+def _mutate_selected(module, ctx: BenchContext):
+    # Выбор по индексу frontmatter: кэш индекса в папке состояния, теплый запуск не разбирает заметки заново
+    module.run_mutations(ctx.vault_path, "type exists", [module.to_mutation(spec) for spec in module.MUTATIONS],
+                         cache_path=os.path.join(ctx.state_dir, module.INDEX_CACHE_FILE_NAME))
+
+
+def _create_notes(module, ctx: BenchContext):
+    items = [f"Item {i:06d}" for i in range(len(_markdown_files(ctx.vault_path)))]
+    module.create_md_files(os.path.join(ctx.state_dir, "md creator"), items, module.YAML_TEMPLATE)
+
+
+TOOLS: Dict[str, Callable[[BenchContext], Optional[dict]]] = {
+    "find_orphans": run_find_orphans,
+    "bfs_report": run_bfs_report,
+    "updater_replace": _updater_runner("replace"),
+    "updater_remove": _updater_runner("remove"),
+    "updater_status_fix": _updater_runner("status_fix"),
+    "updater_status_check": _updater_runner("status_check"),
+    "updater_important": _updater_runner("important"),
+    "md_add_yaml_properties": _md_tool_runner("add YAML properties.py", lambda m, ctx: _for_each_file("process_file", m.MUTATIONS)(m, ctx)),
+    "md_frontmatter_mutate": _md_tool_runner("add YAML properties.py", _mutate_selected),
+    "md_add_flashcard_decks": _md_tool_runner("add_flashcard_decks.py", _for_each_file("add_deck_headers_to_file")),
+    "md_add_image_size": _md_tool_runner("add_image_size.py", lambda m, ctx: _for_each_file("add_size_to_links", m.IMAGE_WIDTH)(m, ctx)),
+    "md_remove_image_size": _md_tool_runner("remove_image_size.py", _for_each_file("remove_size_from_links")),
+    "md_string_flashcards": _md_tool_runner("convert strings to string-flashcards.py", _for_each_file("process_markdown_file")),
+    "md_checkboxes_to_bullets": _md_tool_runner("convert_checkboxes_to_bullets.py", _for_each_file("process_markdown_file")),
+    "md_count_image_links": _md_tool_runner("count_image_links.py", _for_each_file("count_links_in_file")),
+    "md_attachment_index": _md_tool_runner("count_image_links.py", _attachment_index),
+    "md_find_replace_yaml": _md_tool_runner("find and replace YAML Properties.py", lambda m, ctx: m.run_replace(ctx.vault_path, m.FIND_REPLACE_MAP)),
+    "md_creator": _md_tool_runner("md creator.py", _create_notes),
+    "md_batch_runner": run_md_batch,
+    "md_flashcard_deck_manager": run_deck_manager,
+}
+
+
+def _peak_rss_kb() -> Optional[int]:
+    """Пиковая память процесса и его завершившихся дочерних процессов (КБ); None, если недоступно."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    scale = 1024 if sys.platform == "darwin" else 1  # на macOS ru_maxrss в байтах
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return max(own, children)
+
+
+def run_child(tool: str, ctx: BenchContext, out_path: str):
+    """Один запуск инструмента в текущем процессе; результат пишется в `out_path`."""
+    error = None
+    tool_telemetry = None
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        with Telemetry(tool) as telemetry:
+            started = time.perf_counter()
+            try:
+                tool_telemetry = TOOLS[tool](ctx)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            seconds = time.perf_counter() - started
+    result = {
+        "seconds": seconds,
+        "peak_rss_kb": _peak_rss_kb(),
+        "error": error,
+        "telemetry": tool_telemetry or telemetry.to_dict(),
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+# --- УПРАВЛЕНИЕ ПРОГОНОМ (в основном процессе) ---
+
+def prepare_base_vault(work_dir: str, config: SynthConfig) -> SynthSummary:
+    """Создает (или берет готовое, если параметры совпадают) эталонное хранилище для размера."""
+    base_dir = os.path.join(work_dir, f"synth_{config.notes}_{config.seed}")
+    marker_path = os.path.join(base_dir, "synth_config.json")
+    vault_path = os.path.join(base_dir, "vault")
+    if os.path.exists(marker_path):
+        with open(marker_path, "r", encoding="utf-8") as f:
+            marker = json.load(f)
+        if marker.get("config") == asdict(config):
+            return SynthSummary(**marker["summary"])
+    shutil.rmtree(base_dir, ignore_errors=True)
+    print(f"🔄 Генерация хранилища на {config.notes} заметок...")
+    started = time.perf_counter()
+    summary = generate_vault(vault_path, config)
+    with open(marker_path, "w", encoding="utf-8") as f:
+        json.dump({"config": asdict(config), "summary": asdict(summary)}, f, ensure_ascii=False)
+    print(f"✅ Хранилище создано за {time.perf_counter() - started:.1f} сек.")
+    return summary
+
+
+def _fresh_context(tool: str, base: SynthSummary, work_dir: str) -> BenchContext:
+    run_dir = os.path.join(work_dir, "run")
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    vault_path = os.path.join(run_dir, "vault")
+    updater_config_dir = os.path.join(run_dir, "updater")
+    state_dir = os.path.join(run_dir, "state")
+    shutil.copytree(base.vault_path, vault_path)
+    shutil.copytree(base.updater_config_dir, updater_config_dir)
+    # Конфиг замены ссылается на шаблон по абсолютному пути — переносим его в копию
+    replace_config_path = os.path.join(updater_config_dir, REPLACE_CONFIG_NAME)
+    with open(replace_config_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(replace_config_path, "w", encoding="utf-8") as f:
+        f.write(text.replace(base.updater_config_dir.replace("\\", "/"), updater_config_dir.replace("\\", "/")))
+    os.makedirs(state_dir)
+    return BenchContext(tool, vault_path, updater_config_dir, state_dir)
+
+
+def run_tool(tool: str, base: SynthSummary, work_dir: str, profile: Optional[str]) -> List[BenchResult]:
+    """Холодный и теплый запуск инструмента, каждый в отдельном процессе."""
+    ctx = _fresh_context(tool, base, work_dir)
+    env = dict(os.environ)
+    if profile:
+        env[PROFILE_ENV_VAR] = profile
+    results = []
+    for state in (STATE_COLD, STATE_WARM):
+        out_path = os.path.join(ctx.state_dir, f"result_{state}.json")
+        command = [
+            sys.executable, os.path.abspath(__file__), "--child", tool, "--child-out", out_path,
+            "--child-vault", ctx.vault_path, "--child-updater", ctx.updater_config_dir, "--child-state", ctx.state_dir,
+        ]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True, encoding="utf-8", errors="replace")
+        if completed.returncode != 0 or not os.path.exists(out_path):
+            tail = (completed.stderr or completed.stdout).strip().splitlines()[-1:] or ["нет вывода"]
+            results.append(BenchResult(tool, base.notes, state, 0.0, error=f"процесс завершился с кодом {completed.returncode}: {tail[0]}"))
+            break
+        with open(out_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        results.append(BenchResult(tool, base.notes, state, round(data["seconds"], 4), data["peak_rss_kb"], data["error"], data["telemetry"]))
+    return results
+
+
+def load_history(results_path: str) -> dict:
+    if os.path.exists(results_path):
+        try:
+            with open(results_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ История замеров '{results_path}' повреждена и будет начата заново: {e}")
+    return {"runs": []}
+
+
+def find_regressions(history: dict, run: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Сравнивает замеры прогона с медианой последних запусков на той же машине."""
+    previous = [old for old in history["runs"] if old.get("machine") == run["machine"]][-HISTORY_WINDOW:]
+    messages = []
+    for result in run["results"]:
+        if result["error"]:
+            continue
+        key = (result["tool"], result["notes"], result["state"])
+        past = [
+            old_result for old in previous for old_result in old["results"]
+            if (old_result["tool"], old_result["notes"], old_result["state"]) == key and not old_result["error"]
+        ]
+        if not past:
+            continue
+        median_seconds = statistics.median(r["seconds"] for r in past)
+        if result["seconds"] > median_seconds * (1 + threshold) and result["seconds"] - median_seconds > REGRESSION_MIN_SECONDS:
+            messages.append(f"{key[0]} ({key[1]} заметок, {key[2]}): {result['seconds']:.2f} сек. против медианы {median_seconds:.2f} сек.")
+        rss_values = [r["peak_rss_kb"] for r in past if r.get("peak_rss_kb")]
+        if result.get("peak_rss_kb") and rss_values:
+            median_rss = statistics.median(rss_values)
+            if result["peak_rss_kb"] > median_rss * (1 + threshold) and result["peak_rss_kb"] - median_rss > REGRESSION_MIN_RSS_KB:
+                messages.append(f"{key[0]} ({key[1]} заметок, {key[2]}): память {result['peak_rss_kb'] / 1024:.0f} МБ против медианы {median_rss / 1024:.0f} МБ")
+    return messages
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True)
+        return completed.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def select_tools(spec: Optional[str]) -> List[str]:
+    """Инструменты по списку имен или префиксов через запятую ('updater' — все операции updater)."""
+    if not spec:
+        return list(TOOLS)
+    selected = []
+    for item in (part.strip() for part in spec.split(",") if part.strip()):
+        matches = [name for name in TOOLS if name == item or name.startswith(item)]
+        if not matches:
+            raise ValueError(f"Неизвестный инструмент '{item}'. Доступны: {', '.join(TOOLS)}")
+        selected += [name for name in matches if name not in selected]
+    return selected
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Замеры инструментов на синтетических хранилищах.")
+    parser.add_argument("--sizes", default=",".join(map(str, BENCH_SIZES)), help="Размеры хранилищ через запятую")
+    parser.add_argument("--tools", help=f"Инструменты или префиксы через запятую (по умолчанию все: {', '.join(TOOLS)})")
+    parser.add_argument("--seed", type=int, default=SynthConfig.seed)
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "obsidian_vault_bench"),
+                        help="Папка для хранилищ (сгенерированные хранилища переиспользуются между запусками)")
+    parser.add_argument("--results", default=os.path.join(CORE_DIR, VAULT_BENCH_RESULTS_NAME), help="JSON с историей замеров")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Допустимое ухудшение (доля)")
+    parser.add_argument("--profile", help="Профилирование в запусках: cpu, memory или all")
+    parser.add_argument("--no-store", action="store_true", help="Не сохранять прогон в историю")
+    # Служебные аргументы дочернего процесса
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    parser.add_argument("--child-vault", help=argparse.SUPPRESS)
+    parser.add_argument("--child-updater", help=argparse.SUPPRESS)
+    parser.add_argument("--child-state", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.child:
+        run_child(args.child, BenchContext(args.child, args.child_vault, args.child_updater, args.child_state), args.child_out)
+        return 0
+
+    try:
+        tools = select_tools(args.tools)
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    run = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "commit": _git_commit(),
+        "seed": args.seed,
+        "profile": args.profile,
+        "results": [],
+    }
+    for notes in sizes:
+        base = prepare_base_vault(args.work_dir, SynthConfig(notes=notes, seed=args.seed))
+        print(f"\n🚀 Хранилище на {notes} заметок:")
+        for tool in tools:
+            for result in run_tool(tool, base, args.work_dir, args.profile):
+                run["results"].append(asdict(result))
+                memory = f"{result.peak_rss_kb / 1024:7.0f} МБ" if result.peak_rss_kb else "      —"
+                status = f"❌ {result.error}" if result.error else ""
+                print(f"  {tool:<26} {result.state:<5} {result.seconds:9.3f} сек. {memory} {status}")
+    shutil.rmtree(os.path.join(args.work_dir, "run"), ignore_errors=True)
+
+    history = load_history(args.results)
+    regressions = find_regressions(history, run, args.threshold)
+    if not args.no_store:
+        history["runs"].append(run)
+        with open(args.results, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=1)
+        print(f"\n📄 Замеры добавлены в историю: {args.results}")
+
+    failed = [result for result in run["results"] if result["error"]]
+    if regressions:
+        print(f"\n⚠️ Регрессии ({len(regressions)}):")
+        for message in regressions:
+            print(f"  - {message}")
+    elif not failed:
+        print("\n✅ Регрессий не обнаружено.")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
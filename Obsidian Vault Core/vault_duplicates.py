@@ -0,0 +1,232 @@
+"""
+Поиск одинаковых файлов (по содержимому) в несколько ступеней.
+
+Полный хэш каждого вложения стоил бы чтения всего хранилища, поэтому файлы отсеиваются
+постепенно, и на каждой ступени дальше идут только группы из двух и более файлов:
+1.  по размеру — без чтения, по `os.stat`;
+2.  по хэшу первых и последних 64 КБ — у файлов не больше 128 КБ это уже хэш всего содержимого;
+3.  по хэшу всего файла — в пуле потоков, файл читается через mmap (хэширование больших
+    буферов в hashlib отпускает GIL, поэтому потоки действительно работают параллельно).
+
+Хэши кэшируются по (mtime, размер): при повторном запуске читаются только новые и измененные
+файлы из групп-кандидатов.
+
+    sets = find_duplicates(vault, ["img/a.png", "old/a copy.png", ...], cache_path="hashes.json")
+    for duplicate in sets:
+        duplicate.size, duplicate.paths, duplicate.wasted
+"""
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from vault_telemetry import PHASE_READ, PHASE_WALK, PHASE_WRITE, count, phase
+
+DUPLICATES_VERSION = 1
+# Сколько байт начала и конца файла хэшируется на второй ступени
+EDGE_BYTES = 64 * 1024
+# Файлы меньше этого размера не сравниваются (пустые файлы "одинаковы" всегда)
+DEFAULT_MIN_SIZE = 1
+READ_BLOCK = 1024 * 1024
+
+
+@dataclass
+class DuplicateSet:
+    """Группа файлов с одинаковым содержимым (пути относительные, через '/', по алфавиту)."""
+    size: int
+    digest: str
+    paths: List[str]
+
+    @property
+    def wasted(self) -> int:
+        """Сколько байт занимают лишние копии."""
+        return self.size * (len(self.paths) - 1)
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+def edge_hash(path: str, size: int) -> str:
+    """Хэш первых и последних EDGE_BYTES байт (у небольших файлов — всего содержимого)."""
+    hasher = _hasher()
+    with open(path, "rb") as f:
+        if size <= 2 * EDGE_BYTES:
+            hasher.update(f.read())
+        else:
+            hasher.update(f.read(EDGE_BYTES))
+            f.seek(-EDGE_BYTES, os.SEEK_END)
+            hasher.update(f.read(EDGE_BYTES))
+    return hasher.hexdigest()
+
+
+def full_hash(path: str) -> str:
+    """Хэш всего файла; файл отображается в память, без mmap (пустой, особая ФС) читается блоками."""
+    hasher = _hasher()
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+                return hasher.hexdigest()
+        except (OSError, ValueError):
+            f.seek(0)
+        while block := f.read(READ_BLOCK):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """Хэши файлов по относительному пути: [mtime_ns, размер, хэш краев, полный хэш или None]."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.entries: Dict[str, list] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, cache_path: Optional[str], root: str) -> "HashCache":
+        """Читает кэш; кэш другого хранилища, другой версии или поврежденный дает пустой."""
+        cache = cls(root)
+        if not cache_path or not os.path.exists(cache_path):
+            return cache
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == DUPLICATES_VERSION and data.get("root") == root and data.get("edge_bytes") == EDGE_BYTES:
+                cache.entries = dict(data["files"])
+        except (OSError, ValueError, TypeError, KeyError):
+            print("  ⚠️  Не удалось прочитать кэш хэшей, файлы будут прочитаны заново.")
+            return cls(root)
+        return cache
+
+    def get(self, rel_path: str, stat: Tuple[int, int]) -> Optional[list]:
+        entry = self.entries.get(rel_path)
+        if entry is None or (entry[0], entry[1]) != stat:
+            return None
+        return entry
+
+    def put(self, rel_path: str, stat: Tuple[int, int], edge: str, full: Optional[str]):
+        self.entries[rel_path] = [stat[0], stat[1], edge, full]
+        self.dirty = True
+
+    def retain(self, rel_paths: Iterable[str]):
+        """Оставляет только записи перечисленных файлов (остальные файлы удалены или уже не кандидаты)."""
+        keep = set(rel_paths)
+        if any(rel_path not in keep for rel_path in self.entries):
+            self.entries = {rel_path: entry for rel_path, entry in self.entries.items() if rel_path in keep}
+            self.dirty = True
+
+    def save(self, cache_path: Optional[str]):
+        if not cache_path or not self.dirty:
+            return
+        data = {"version": DUPLICATES_VERSION, "root": self.root, "edge_bytes": EDGE_BYTES, "files": self.entries}
+        tmp_path = cache_path + ".tmp"
+        try:
+            with phase(PHASE_WRITE):
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, cache_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"  ⚠️  Не удалось сохранить кэш хэшей: {e}")
+
+
+def _groups(keys: Dict[str, object]) -> List[List[str]]:
+    """Пути, сгруппированные по ключу; только группы из двух и более файлов."""
+    grouped: Dict[object, List[str]] = {}
+    for rel_path, key in keys.items():
+        grouped.setdefault(key, []).append(rel_path)
+    return [paths for paths in grouped.values() if len(paths) > 1]
+
+
+def _hash_all(function, root: str, items: List[Tuple[str, ...]], max_workers: Optional[int]) -> Dict[str, Optional[str]]:
+    """Хэширует файлы в пуле потоков; файл, который не удалось прочитать, дает None."""
+    def task(item):
+        try:
+            return item[0], function(os.path.join(root, item[0]), *item[1:])
+        except OSError:
+            return item[0], None
+    if not items:
+        return {}
+    if max_workers == 1 or len(items) == 1:
+        return dict(map(task, items))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(task, items))
+
+
+def find_duplicates(
+    root: str,
+    rel_paths: Iterable[str],
+    cache_path: Optional[str] = None,
+    min_size: int = DEFAULT_MIN_SIZE,
+    max_workers: Optional[int] = None,
+) -> List[DuplicateSet]:
+    """
+    Группы одинаковых файлов среди rel_paths (пути относительно root, через '/'),
+    от самых "дорогих" (больше всего лишних байт) к дешевым.
+    """
+    root = os.path.abspath(root)
+    stats: Dict[str, Tuple[int, int]] = {}
+    with phase(PHASE_WALK):
+        for rel_path in rel_paths:
+            try:
+                stat = os.stat(os.path.join(root, rel_path))
+            except OSError:
+                continue
+            if stat.st_size >= min_size:
+                stats[rel_path] = (stat.st_mtime_ns, stat.st_size)
+
+    # Ступень 1: размер
+    candidates = [rel_path for group in _groups({p: s[1] for p, s in stats.items()}) for rel_path in group]
+    count("duplicate_size_candidates", len(candidates))
+
+    # Ступень 2: начало и конец файла
+    cache = HashCache.load(cache_path, root)
+    edges: Dict[str, str] = {}
+    stale = []
+    for rel_path in candidates:
+        entry = cache.get(rel_path, stats[rel_path])
+        if entry is not None:
+            edges[rel_path] = entry[2]
+        else:
+            stale.append((rel_path, stats[rel_path][1]))
+    with phase(PHASE_READ):
+        for rel_path, edge in _hash_all(edge_hash, root, stale, max_workers).items():
+            if edge is not None:
+                edges[rel_path] = edge
+                cache.put(rel_path, stats[rel_path], edge, None)
+    count("duplicate_edge_hashed", len(stale))
+
+    # Ступень 3: весь файл (небольшие файлы уже прочитаны целиком на ступени 2)
+    digests: Dict[str, str] = {}
+    stale = []
+    for group in _groups({p: (stats[p][1], edge) for p, edge in edges.items()}):
+        for rel_path in group:
+            size = stats[rel_path][1]
+            entry = cache.get(rel_path, stats[rel_path])
+            if size <= 2 * EDGE_BYTES:
+                digests[rel_path] = edges[rel_path]
+            elif entry is not None and entry[3] is not None:
+                digests[rel_path] = entry[3]
+            else:
+                stale.append((rel_path,))
+    with phase(PHASE_READ):
+        for rel_path, digest in _hash_all(full_hash, root, stale, max_workers).items():
+            if digest is not None:
+                digests[rel_path] = digest
+                cache.put(rel_path, stats[rel_path], edges[rel_path], digest)
+    count("duplicate_full_hashed", len(stale))
+
+    cache.retain(edges)
+    cache.save(cache_path)
+
+    sets = [
+        DuplicateSet(stats[group[0]][1], digests[group[0]], sorted(group))
+        for group in _groups({p: (stats[p][1], digest) for p, digest in digests.items()})
+    ]
+    sets.sort(key=lambda duplicate: (-duplicate.wasted, duplicate.paths[0]))
+    count("duplicate_sets", len(sets))
+    return sets
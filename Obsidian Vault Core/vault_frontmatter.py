@@ -0,0 +1,188 @@
+"""
+Быстрый разбор YAML frontmatter заметок Obsidian.
+
+Почти все заголовки в хранилище — плоские блоки вида `key: scalar` и `key:` со списком
+`  - item`. Для такого подмножества используется собственный построчный парсер. Всё,
+что выходит за его рамки (вложенные словари, flow-коллекции `[...]`, многострочные
+значения, якоря, даты и т.п.), разбирается PyYAML — через libyaml (`CSafeLoader`),
+если он доступен. Результат всегда совпадает с `yaml.safe_load`.
+
+`split_frontmatter` и `read_frontmatter_text` находят сам блок `---` ... `---` в начале
+заметки (с переводами строк '\n' и '\r\n'); второй читает файл только до конца блока.
+"""
+import re
+from typing import Optional, Tuple
+
+# PyYAML нужен только для "экзотических" заголовков, поэтому он необязателен.
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+if yaml is not None:
+    _SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    YAML_BACKEND = "libyaml" if _SafeLoader is not yaml.SafeLoader else "pyyaml"
+else:
+    _SafeLoader = None
+    YAML_BACKEND = None
+
+
+class FrontmatterError(ValueError):
+    """Frontmatter не удалось разобрать: ошибка синтаксиса YAML или PyYAML не установлен."""
+
+
+# Маркер "быстрый парсер не поддерживает этот заголовок"
+_UNSUPPORTED = object()
+
+# Строка вида `key:` или `key: value` без отступа
+_KEY_LINE_RE = re.compile(r"([^\s:#'\"\[\]{}&*!|>%@`,?-][^:]*?)[ \t]*:(?:[ \t]+(.*?))?[ \t]*")
+# Десятичное целое без подчеркиваний и ведущих нулей (остальные формы YAML 1.1 уходят в PyYAML)
+_INT_RE = re.compile(r"[-+]?(?:0|[1-9][0-9]*)")
+# Символы, недопустимые в YAML-потоке (как в yaml.reader.Reader.NON_PRINTABLE)
+_NON_PRINTABLE_RE = re.compile("[^\x09\x0A\x0D\x20-\x7E\x85\xA0-\uD7FF\uE000-\uFFFD\U00010000-\U0010ffff]")
+# Переводы строк YAML, кроме '\n' и '\r\n': одиночный '\r', NEL и разделители строк/абзацев Unicode
+_EXTRA_BREAKS_RE = re.compile("\r(?!\n)|[\x85\u2028\u2029]")
+
+# Первые символы, с которых не может начинаться простое (plain) значение
+_INDICATORS = frozenset("-?:,[]{}#&*!|>'\"%@`")
+# Первые символы чисел, дат и специальных float-значений
+_NUMBER_START = frozenset("-+.0123456789")
+_BOOLS = {
+    "yes": True, "Yes": True, "YES": True, "true": True, "True": True, "TRUE": True,
+    "on": True, "On": True, "ON": True,
+    "no": False, "No": False, "NO": False, "false": False, "False": False, "FALSE": False,
+    "off": False, "Off": False, "OFF": False,
+}
+_NULLS = frozenset({"~", "null", "Null", "NULL"})
+
+
+def _parse_scalar(text: str):
+    """Преобразует однострочное значение в Python-объект так же, как это делает SafeLoader."""
+    first = text[0]
+    if first == '"':
+        inner = text[1:-1]
+        if len(text) < 2 or text[-1] != '"' or '"' in inner or "\\" in inner:
+            return _UNSUPPORTED
+        return inner
+    if first == "'":
+        inner = text[1:-1]
+        if len(text) < 2 or text[-1] != "'" or "'" in inner.replace("''", ""):
+            return _UNSUPPORTED
+        return inner.replace("''", "'")
+    if first in _NUMBER_START:
+        return int(text) if _INT_RE.fullmatch(text) else _UNSUPPORTED
+    if first in _INDICATORS or ": " in text or " #" in text or text[-1] == ":" or text in ("=", "<<"):
+        return _UNSUPPORTED
+    if text in _BOOLS:
+        return _BOOLS[text]
+    if text in _NULLS:
+        return None
+    return text
+
+
+def _fast_parse(text: str):
+    """
+    Построчный разбор плоского frontmatter.
+    Возвращает dict (или None для пустого заголовка), либо _UNSUPPORTED,
+    если встретилась конструкция, которую должен разбирать PyYAML.
+    """
+    if "\t" in text or _NON_PRINTABLE_RE.search(text) or _EXTRA_BREAKS_RE.search(text):
+        return _UNSUPPORTED
+
+    result = {}
+    list_key = None      # ключ без значения, для которого могут идти элементы списка
+    list_indent = None   # отступ элементов текущего списка
+    for raw_line in text.split("\n"):
+        line = raw_line.rstrip(" \r")
+        stripped = line.lstrip(" ")
+        if not stripped or stripped[0] == "#":
+            continue
+        indent = len(line) - len(stripped)
+
+        if stripped[0] == "-" and (len(stripped) == 1 or stripped[1] == " "):
+            if list_key is None:
+                return _UNSUPPORTED
+            if list_indent is None:
+                list_indent = indent
+                result[list_key] = []
+            elif indent != list_indent:
+                return _UNSUPPORTED
+            item_text = stripped[1:].strip(" ")
+            item = _parse_scalar(item_text) if item_text else None
+            if item is _UNSUPPORTED:
+                return _UNSUPPORTED
+            result[list_key].append(item)
+            continue
+
+        # Продолжение многострочного значения, вложенный словарь и т.п.
+        if indent or "\r" in line:
+            return _UNSUPPORTED
+        match = _KEY_LINE_RE.fullmatch(line)
+        if not match:
+            return _UNSUPPORTED
+        key_text, value_text = match.groups()
+        key = _parse_scalar(key_text)
+        if not isinstance(key, str):
+            return _UNSUPPORTED
+
+        if value_text:
+            value = _parse_scalar(value_text)
+            if value is _UNSUPPORTED:
+                return _UNSUPPORTED
+            result[key] = value
+            list_key = None
+        else:
+            result[key] = None
+            list_key, list_indent = key, None
+
+    return result or None
+
+
+def parse_frontmatter(text: str):
+    """
+    Разбирает текст frontmatter (без ограничивающих '---').
+    Возвращает то же, что и `yaml.safe_load(text)`; при ошибке выбрасывает FrontmatterError.
+    """
+    result = _fast_parse(text)
+    if result is not _UNSUPPORTED:
+        return result
+    if yaml is None:
+        raise FrontmatterError("сложный frontmatter требует PyYAML (pip install PyYAML)")
+    try:
+        return yaml.load(text, Loader=_SafeLoader)
+    except yaml.YAMLError as e:
+        raise FrontmatterError(str(e)) from e
+
+
+# Блок frontmatter в начале заметки: строка '---', строки YAML, строка '---'
+FRONTMATTER_BLOCK_RE = re.compile(r"---[ \t]*\r?\n(.*?)(?<=\n)---[ \t]*(?:\r?\n|\Z)", re.DOTALL)
+FRONTMATTER_READ_BLOCK_SIZE = 4096
+FRONTMATTER_READ_LIMIT = 64 * 1024
+
+
+def split_frontmatter(text: str) -> Optional[Tuple[int, int]]:
+    """Диапазон (start, end) текста frontmatter между '---' или None, если заголовка нет."""
+    match = FRONTMATTER_BLOCK_RE.match(text)
+    return match.span(1) if match else None
+
+
+def read_frontmatter_text(file_path: str, limit: int = FRONTMATTER_READ_LIMIT) -> Optional[str]:
+    """
+    Читает файл блоками только до конца frontmatter и возвращает его текст (None — заголовка нет).
+    Если заголовок не закрылся в пределах `limit` символов, выбрасывает FrontmatterError.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        head = f.read(FRONTMATTER_READ_BLOCK_SIZE)
+        while head.startswith("---"):
+            if match := FRONTMATTER_BLOCK_RE.match(head):
+                return match.group(1)
+            first_line_end = head.find("\n")
+            if first_line_end != -1 and head[3:first_line_end].strip():
+                return None  # '----' или '---text' — это не заголовок
+            if len(head) >= limit:
+                raise FrontmatterError(f"frontmatter не закрыт в пределах {limit} символов")
+            chunk = f.read(FRONTMATTER_READ_BLOCK_SIZE)
+            if not chunk:
+                return None
+            head += chunk
+    return None
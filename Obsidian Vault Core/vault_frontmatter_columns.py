@@ -0,0 +1,311 @@
+"""
+Колоночный индекс frontmatter хранилища с инвертированными списками — единственный
+постоянный индекс frontmatter для всех инструментов.
+
+Каждое свойство хранится отдельной колонкой: номер заметки → значение (как в заголовке,
+даты — строкой ISO). Сравнения идут по нормализованным значениям (кортеж строк: скаляр дает
+один элемент, список — по элементу на пункт, `true`/`false` для логических значений).
+Для категориальных свойств (`type`, `status`, `Area`) дополнительно ведутся инвертированные
+списки "значение → номера заметок", поэтому выбор "все заметки с type: project" — это поиск
+в словаре, а не разбор всего хранилища. Произвольные условия (`compile_selector` из
+vault_frontmatter_index) проверяются по строкам, собранным из колонок, без чтения файлов.
+
+    index = build_columns_index(vault, cache_path="frontmatter_columns.json")
+    index.any_of("type", ["project", "taskhub"])   # отсортированные пути заметок
+    index.equals("status", "todo")
+    index.exists("banner")
+    index.select(compile_selector("type contains contact and Area == Social"))
+
+Индекс сохраняется в JSON (колонки — параллельными массивами номеров и значений) и
+обновляется инкрементально: при повторном запуске заново читаются, и только до конца
+заголовка, лишь заметки с изменившимися mtime или размером.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from vault_frontmatter import FRONTMATTER_READ_LIMIT
+from vault_frontmatter_index import (
+    IndexEntry, Selector, index_signature, read_chunk, jsonable, PARALLEL_MIN_FILES, CHUNK_SIZE,
+)
+from vault_paths import PathFilter, iter_files
+
+COLUMNS_VERSION = 2
+# Свойства, для которых ведутся инвертированные списки (значений немного, запросов по ним много)
+DEFAULT_CATEGORICAL = ("type", "status", "Area")
+
+Values = Tuple[str, ...]
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return str(value)
+
+
+def normalize_value(value: Any) -> Values:
+    """Значение свойства в виде кортежа строк; None и пустые строки не считаются значениями."""
+    items = value if isinstance(value, list) else [value]
+    return tuple(_text(item) for item in items if item is not None and item != "")
+
+
+def _signature() -> str:
+    return hashlib.sha256(f"{COLUMNS_VERSION}:{index_signature()}".encode()).hexdigest()[:16]
+
+
+class FrontmatterColumns:
+    """Колонки свойств и инвертированные списки по номерам заметок (пути — относительные, через '/')."""
+
+    def __init__(self, categorical: Sequence[str] = DEFAULT_CATEGORICAL, read_limit: int = FRONTMATTER_READ_LIMIT):
+        self.categorical = tuple(categorical)
+        self.read_limit = read_limit
+        self.paths: List[Optional[str]] = []           # номер → путь (None — заметка удалена)
+        self.ids: Dict[str, int] = {}
+        self.stats: List[Tuple[int, int]] = []         # номер → (mtime_ns, размер)
+        self.columns: Dict[str, Dict[int, Any]] = {}    # свойство → номер → значение из заголовка
+        self.postings: Dict[str, Dict[str, Set[int]]] = {key: {} for key in self.categorical}
+        self.with_frontmatter: Set[int] = set()
+        self._errors: Dict[int, str] = {}
+        self._row_keys: Dict[int, Tuple[str, ...]] = {}  # номер → свойства заметки (для удаления из колонок)
+        self.parsed = 0                                # сколько заметок разобрано при последнем обновлении
+        self.dirty = False
+
+    # --- ведение колонок ---
+
+    def _add(self, note_id: int, entry: IndexEntry):
+        self.stats[note_id] = (entry.mtime_ns, entry.size)
+        if entry.error:
+            self._errors[note_id] = entry.error
+        if entry.frontmatter is None:
+            return
+        self.with_frontmatter.add(note_id)
+        self._row_keys[note_id] = tuple(entry.frontmatter)
+        for key, value in entry.frontmatter.items():
+            self.columns.setdefault(key, {})[note_id] = value
+            if (postings := self.postings.get(key)) is not None:
+                for item in set(normalize_value(value)):
+                    postings.setdefault(item, set()).add(note_id)
+
+    def _remove(self, note_id: int):
+        self._errors.pop(note_id, None)
+        self.with_frontmatter.discard(note_id)
+        for key in self._row_keys.pop(note_id, ()):
+            value = self.columns[key].pop(note_id, None)
+            if not self.columns[key]:
+                del self.columns[key]
+            if (postings := self.postings.get(key)) is not None:
+                for item in set(normalize_value(value)):
+                    ids = postings[item]
+                    ids.discard(note_id)
+                    if not ids:
+                        del postings[item]
+
+    def _new_id(self, rel_path: str) -> int:
+        note_id = len(self.paths)
+        self.paths.append(rel_path)
+        self.stats.append((0, 0))
+        self.ids[rel_path] = note_id
+        return note_id
+
+    def refresh(self, root: str, path_filter: Optional[PathFilter] = None, max_workers: Optional[int] = None):
+        """Сверяет индекс с хранилищем: убирает исчезнувшие заметки, перечитывает изменившиеся."""
+        alive: Set[int] = set()
+        stale: List[Tuple[str, int, int]] = []
+        for rel_path in iter_files(root, path_filter):
+            try:
+                stat = os.stat(os.path.join(root, rel_path))
+            except OSError:
+                continue
+            note_id = self.ids.get(rel_path)
+            if note_id is not None:
+                alive.add(note_id)
+                if self.stats[note_id] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+            stale.append((rel_path, stat.st_mtime_ns, stat.st_size))
+
+        removed = [note_id for note_id, rel_path in enumerate(self.paths) if rel_path is not None and note_id not in alive]
+        for note_id in removed:
+            self._remove(note_id)
+            del self.ids[self.paths[note_id]]
+            self.paths[note_id] = None
+
+        if max_workers == 1 or len(stale) < PARALLEL_MIN_FILES:
+            fresh = read_chunk(root, stale, self.read_limit)
+        else:
+            chunks = [stale[i:i + CHUNK_SIZE] for i in range(0, len(stale), CHUNK_SIZE)]
+            fresh = []
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                limits = [self.read_limit] * len(chunks)
+                for chunk_result in executor.map(read_chunk, [root] * len(chunks), chunks, limits):
+                    fresh.extend(chunk_result)
+        for rel_path, entry in fresh:
+            note_id = self.ids.get(rel_path)
+            if note_id is None:
+                note_id = self._new_id(rel_path)
+            else:
+                self._remove(note_id)
+            self._add(note_id, entry)
+        self.parsed = len(fresh)
+        self.dirty = self.dirty or bool(fresh or removed)
+
+    def update(self, root: str, rel_path: str, frontmatter: Optional[dict]):
+        """Запоминает frontmatter, только что записанный в заметку, без повторного чтения файла."""
+        stat = os.stat(os.path.join(root, rel_path))
+        note_id = self.ids.get(rel_path)
+        if note_id is None:
+            note_id = self._new_id(rel_path)
+        else:
+            self._remove(note_id)
+        self._add(note_id, IndexEntry(stat.st_mtime_ns, stat.st_size, jsonable(frontmatter)))
+        self.dirty = True
+
+    # --- запросы ---
+
+    def _ids_equal(self, key: str, value: Any) -> Set[int]:
+        values = normalize_value(value)
+        if not values:
+            return set()
+        target = values[0]
+        if (postings := self.postings.get(key)) is not None:
+            return set(postings.get(target, ()))
+        return {note_id for note_id, value in self.columns.get(key, {}).items() if target in normalize_value(value)}
+
+    def paths_of(self, ids: Iterable[int]) -> List[str]:
+        return sorted(self.paths[note_id] for note_id in ids)
+
+    def equals(self, key: str, value: Any) -> List[str]:
+        """Заметки, у которых свойство равно значению (для списка — содержит его)."""
+        return self.paths_of(self._ids_equal(key, value))
+
+    def any_of(self, key: str, values: Iterable[Any]) -> List[str]:
+        """Заметки, у которых свойство равно хотя бы одному из значений."""
+        ids: Set[int] = set()
+        for value in values:
+            ids |= self._ids_equal(key, value)
+        return self.paths_of(ids)
+
+    def exists(self, key: str) -> List[str]:
+        """Заметки, в заголовке которых есть свойство (даже пустое)."""
+        return self.paths_of(self.columns.get(key, ()))
+
+    def value_counts(self, key: str) -> Dict[str, int]:
+        """Сколько заметок имеет каждое значение свойства (по убыванию)."""
+        if (postings := self.postings.get(key)) is not None:
+            counts = {value: len(ids) for value, ids in postings.items()}
+        else:
+            counts = {}
+            for value in self.columns.get(key, {}).values():
+                for item in set(normalize_value(value)):
+                    counts[item] = counts.get(item, 0) + 1
+        return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+    def get(self, rel_path: str, key: str) -> Optional[Values]:
+        """Значения свойства заметки или None, если свойства нет."""
+        note_id = self.ids.get(rel_path)
+        column = self.columns.get(key, {})
+        return normalize_value(column[note_id]) if note_id in column else None
+
+    def row(self, rel_path: str) -> Optional[dict]:
+        """Frontmatter заметки, собранный из колонок (None — заголовка нет или заметки нет в индексе)."""
+        note_id = self.ids.get(rel_path)
+        if note_id is None or note_id not in self.with_frontmatter:
+            return None
+        return self._row(note_id)
+
+    def _row(self, note_id: int) -> dict:
+        return {key: self.columns[key][note_id] for key in self._row_keys.get(note_id, ())}
+
+    def select(self, selector: Selector) -> List[str]:
+        """Пути заметок с frontmatter, подходящих под условие compile_selector (по алфавиту)."""
+        return self.paths_of(note_id for note_id in self.with_frontmatter if selector(self._row(note_id)))
+
+    @property
+    def errors(self) -> List[Tuple[str, str]]:
+        """Заметки, frontmatter которых не удалось прочитать или разобрать."""
+        return sorted((self.paths[note_id], error) for note_id, error in self._errors.items())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- сохранение ---
+
+    def save(self, cache_path: str, root: Optional[str] = None):
+        """Сохраняет индекс, уплотняя номера заметок (удаленные не оставляют дыр)."""
+        live = [note_id for note_id, rel_path in enumerate(self.paths) if rel_path is not None]
+        remap = {old: new for new, old in enumerate(live)}
+        columns = {}
+        for key, column in self.columns.items():
+            ids = sorted(column)
+            columns[key] = {"ids": [remap[i] for i in ids], "values": [column[i] for i in ids]}
+        data = {
+            "signature": _signature(),
+            "root": os.path.abspath(root) if root is not None else None,
+            "categorical": list(self.categorical),
+            "read_limit": self.read_limit,
+            "paths": [self.paths[i] for i in live],
+            "mtime_ns": [self.stats[i][0] for i in live],
+            "size": [self.stats[i][1] for i in live],
+            "with_frontmatter": sorted(remap[i] for i in self.with_frontmatter),
+            "errors": {str(remap[i]): error for i, error in self._errors.items()},
+            "columns": columns,
+            "postings": {key: {value: sorted(remap[i] for i in ids) for value, ids in postings.items()}
+                         for key, postings in self.postings.items()},
+        }
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, cache_path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, cache_path: str, root: Optional[str] = None, categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+             read_limit: int = FRONTMATTER_READ_LIMIT) -> "FrontmatterColumns":
+        """Читает индекс; поврежденный, устаревший или собранный с другими настройками дает пустой."""
+        index = cls(categorical, read_limit)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if (data.get("signature") != _signature()
+                    or data.get("categorical") != list(index.categorical)
+                    or data.get("read_limit") != read_limit
+                    or (root is not None and data.get("root") != os.path.abspath(root))):
+                return index
+            index.paths = list(data["paths"])
+            index.ids = {rel_path: note_id for note_id, rel_path in enumerate(index.paths)}
+            index.stats = list(zip(data["mtime_ns"], data["size"]))
+            index.with_frontmatter = set(data["with_frontmatter"])
+            index._errors = {int(note_id): error for note_id, error in data["errors"].items()}
+            row_keys: Dict[int, List[str]] = {}
+            for key, column in data["columns"].items():
+                index.columns[key] = dict(zip(column["ids"], column["values"]))
+                for note_id in column["ids"]:
+                    row_keys.setdefault(note_id, []).append(key)
+            index._row_keys = {note_id: tuple(keys) for note_id, keys in row_keys.items()}
+            index.postings = {key: {value: set(ids) for value, ids in data["postings"][key].items()}
+                              for key in index.categorical}
+        except (OSError, ValueError, TypeError, KeyError):
+            return cls(categorical, read_limit)
+        return index
+
+
+def build_columns_index(
+    root: str,
+    path_filter: Optional[PathFilter] = None,
+    cache_path: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+    read_limit: int = FRONTMATTER_READ_LIMIT,
+) -> FrontmatterColumns:
+    """Загружает индекс из кэша (если указан), обновляет его по хранилищу и сохраняет, если он изменился."""
+    if cache_path:
+        index = FrontmatterColumns.load(cache_path, root, categorical, read_limit)
+    else:
+        index = FrontmatterColumns(categorical, read_limit)
+    index.refresh(root, path_filter, max_workers)
+    if cache_path and index.dirty:
+        index.save(cache_path, root)
+    return index
@@ -0,0 +1,229 @@
+"""
+Чтение frontmatter заметок для индекса и выбор заметок по условиям на свойства.
+
+`read_entry`/`read_chunk` читают заметку только до конца заголовка и возвращают разобранный
+frontmatter вместе с (mtime, размер) файла; сам постоянный индекс — `build_columns_index`
+из vault_frontmatter_columns. Условие выбора записывается строкой:
+
+    type contains contact and Area == Social
+    (status == "in progress" or important == true) and not archived exists
+
+*   `key == value`, `key != value` — значение равно (для списка — равен хотя бы один элемент);
+*   `key contains value` — список содержит элемент, строка — подстроку;
+*   `key exists` — свойство есть в заголовке (даже пустое);
+*   `and`, `or`, `not`, скобки. Значения с пробелами и ключевыми словами берутся в кавычки.
+Сравнение текстовое: `true`/`false` для логических значений, числа — как записаны.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+import vault_frontmatter
+from vault_frontmatter import read_frontmatter_text, parse_frontmatter, FrontmatterError, FRONTMATTER_READ_LIMIT
+
+INDEX_VERSION = 1
+# Меньше измененных файлов разбирается последовательно: запуск процессов дороже самой работы
+PARALLEL_MIN_FILES = 64
+CHUNK_SIZE = 64
+
+
+class SelectorError(ValueError):
+    """Ошибка в строке условия выбора."""
+
+
+# ================== ИНДЕКС ==================
+
+@dataclass
+class IndexEntry:
+    """Frontmatter одной заметки: None — заголовка нет; error — его не удалось разобрать."""
+    mtime_ns: int
+    size: int
+    frontmatter: Optional[dict] = None
+    error: Optional[str] = None
+
+
+def jsonable(value: Any) -> Any:
+    """Значение frontmatter в виде, который переживает сохранение в JSON (даты — строкой ISO)."""
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def read_entry(file_path: str, stat: Optional[os.stat_result] = None, limit: int = FRONTMATTER_READ_LIMIT) -> IndexEntry:
+    """Читает заметку до конца frontmatter (не дальше `limit` символов) и разбирает его."""
+    stat = stat or os.stat(file_path)
+    entry = IndexEntry(stat.st_mtime_ns, stat.st_size)
+    try:
+        fm_text = read_frontmatter_text(file_path, limit)
+        if fm_text is not None:
+            data = parse_frontmatter(fm_text)
+            if data is None:
+                entry.frontmatter = {}
+            elif isinstance(data, dict):
+                entry.frontmatter = jsonable(data)
+            else:
+                entry.error = "frontmatter не является словарем"
+    except (FrontmatterError, UnicodeDecodeError) as e:
+        entry.error = f"{type(e).__name__}: {e}"
+    return entry
+
+
+def read_chunk(root: str, items: List[Tuple[str, int, int]], limit: int = FRONTMATTER_READ_LIMIT) -> List[Tuple[str, IndexEntry]]:
+    """read_entry для пачки (путь, mtime, размер) — удобно отдавать рабочим процессам."""
+    results = []
+    for rel_path, mtime_ns, size in items:
+        try:
+            entry = read_entry(os.path.join(root, rel_path), limit=limit)
+        except OSError as e:
+            entry = IndexEntry(mtime_ns, size, error=f"{type(e).__name__}: {e}")
+        results.append((rel_path, entry))
+    return results
+
+
+def index_signature() -> str:
+    """Отпечаток версии индекса и разборщика frontmatter: при их изменении кэш сбрасывается."""
+    hasher = hashlib.sha256(str(INDEX_VERSION).encode())
+    with open(vault_frontmatter.__file__, "rb") as f:
+        hasher.update(f.read())
+    return hasher.hexdigest()[:16]
+
+
+# ================== УСЛОВИЯ ВЫБОРА ==================
+
+Selector = Callable[[dict], bool]
+
+_TOKEN_RE = re.compile(r"""\s*(?:(?P<op>==|!=|=|\(|\))|"(?P<dq>(?:[^"\\]|\\.)*)"|'(?P<sq>[^']*)'|(?P<word>[^\s()"'=!]+))""")
+_KEYWORDS = {"and", "or", "not", "contains", "exists"}
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _equals(value: Any, target: str) -> bool:
+    if isinstance(value, list):
+        return any(_text(item) == target for item in value)
+    return _text(value) == target
+
+
+def _contains(value: Any, target: str) -> bool:
+    if isinstance(value, list):
+        return any(_text(item) == target for item in value)
+    if isinstance(value, str):
+        return target in value
+    return _text(value) == target
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """Токены (вид, текст): 'op', 'kw' (ключевое слово), 'str' (слово или строка в кавычках)."""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise SelectorError(f"непонятный символ в условии на позиции {position + 1}: {text[position:position + 10]!r}")
+        position = match.end()
+        if match.group("op"):
+            tokens.append(("op", "==" if match.group("op") == "=" else match.group("op")))
+        elif match.group("dq") is not None:
+            tokens.append(("str", json.loads(f'"{match.group("dq")}"')))
+        elif match.group("sq") is not None:
+            tokens.append(("str", match.group("sq")))
+        elif match.group("word").lower() in _KEYWORDS:
+            tokens.append(("kw", match.group("word").lower()))
+        else:
+            tokens.append(("str", match.group("word")))
+    return tokens
+
+
+class _Parser:
+    """Рекурсивный спуск: or → and → not → (скобки | условие)."""
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self, kind: str, text: Optional[str] = None) -> bool:
+        token = self._peek()
+        if token and token[0] == kind and (text is None or token[1] == text):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect_str(self, what: str) -> str:
+        token = self._peek()
+        if not token or token[0] != "str":
+            raise SelectorError(f"ожидалось {what}, а найдено {token[1] if token else 'конец условия'!r}")
+        self.pos += 1
+        return token[1]
+
+    def parse(self) -> Selector:
+        selector = self._or()
+        if self._peek() is not None:
+            raise SelectorError(f"лишнее в конце условия: {self._peek()[1]!r}")
+        return selector
+
+    def _or(self) -> Selector:
+        parts = [self._and()]
+        while self._take("kw", "or"):
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else (lambda fm, parts=tuple(parts): any(p(fm) for p in parts))
+
+    def _and(self) -> Selector:
+        parts = [self._not()]
+        while self._take("kw", "and"):
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else (lambda fm, parts=tuple(parts): all(p(fm) for p in parts))
+
+    def _not(self) -> Selector:
+        if self._take("kw", "not"):
+            inner = self._not()
+            return lambda fm: not inner(fm)
+        if self._take("op", "("):
+            inner = self._or()
+            if not self._take("op", ")"):
+                raise SelectorError("не хватает закрывающей скобки")
+            return inner
+        return self._condition()
+
+    def _condition(self) -> Selector:
+        key = self._expect_str("имя свойства")
+        if self._take("kw", "exists"):
+            return lambda fm: key in fm
+        if self._take("kw", "contains"):
+            target = self._expect_str("значение")
+            return lambda fm: key in fm and _contains(fm[key], target)
+        if self._take("op", "=="):
+            target = self._expect_str("значение")
+            return lambda fm: key in fm and _equals(fm[key], target)
+        if self._take("op", "!="):
+            target = self._expect_str("значение")
+            return lambda fm: not (key in fm and _equals(fm[key], target))
+        token = self._peek()
+        raise SelectorError(f"после '{key}' ожидалось ==, !=, contains или exists, а найдено {token[1] if token else 'конец условия'!r}")
+
+
+def compile_selector(text: Optional[str]) -> Selector:
+    """Разбирает строку условия один раз; пустое условие выбирает все заметки с frontmatter."""
+    if not text or not text.strip():
+        return lambda fm: True
+    return _Parser(_tokenize(text)).parse()
+
@@ -0,0 +1,387 @@
+"""
+Точечное редактирование YAML frontmatter с сохранением форматирования.
+
+Вместо цикла `yaml.safe_load` → `yaml.dump` находится диапазон строк нужного ключа
+(строка `key:` и строки его значения) и переписывается только он. Остальной текст
+заголовка остается байт-в-байт прежним. После правки результат разбирается заново
+и сверяется с ожидаемым: если что-то пошло не так, правка не применяется.
+
+Кроме замены значения (`set_key`) поддерживаются удаление (`remove_key`), переименование
+(`rename_key`) и добавление элемента в конец списка (`append_to_list`) — новой строкой
+`  - item` без переписывания остальных элементов. `apply_mutations` применяет набор
+таких правок (`Mutation`) с общей проверкой, `mutate_file` — к файлу с атомарной записью.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from vault_frontmatter import parse_frontmatter, split_frontmatter, FrontmatterError
+from vault_stream import write_text_atomically
+
+_SCALAR_TYPES = (str, bool, int, float, type(None))
+
+
+def _same(a, b) -> bool:
+    """Строгое сравнение значений с учетом типов (True != 1)."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a.keys()) == list(b.keys()) and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _key_line_re(key: str) -> re.Pattern:
+    escaped = re.escape(key)
+    return re.compile(rf"^(?:{escaped}|\"{escaped}\"|'{escaped}')[ \t]*:(?=[ \t]|\r?$)", re.MULTILINE)
+
+
+def find_key_span(fm_text: str, key: str) -> Optional[Tuple[int, int]]:
+    """
+    Возвращает диапазон (start, end) строк ключа верхнего уровня: сама строка `key:`
+    и все строки его значения (с отступом или элементы списка `- `).
+    Если ключ встречается несколько раз, берется последнее вхождение (как в YAML).
+    """
+    matches = list(_key_line_re(key).finditer(fm_text))
+    if not matches:
+        return None
+    start = matches[-1].start()
+    line_end = fm_text.find("\n", start)
+    end = len(fm_text) if line_end == -1 else line_end + 1
+
+    pos = end
+    while pos < len(fm_text):
+        line_end = fm_text.find("\n", pos)
+        next_pos = len(fm_text) if line_end == -1 else line_end + 1
+        line = fm_text[pos:next_pos]
+        stripped = line.strip()
+        if line[0] in " \t" and stripped:
+            end = next_pos
+        elif stripped == "-" or stripped.startswith("- "):
+            end = next_pos
+        elif stripped and not stripped.startswith("#"):
+            break
+        # Пустые строки и комментарии входят в диапазон, только если за ними еще идет значение
+        pos = next_pos
+    return start, end
+
+
+def _comment_start(line: str, pos: int = 0) -> int:
+    """Позиция '#', с которого в строке начинается комментарий YAML (вне кавычек), или -1."""
+    quote = None
+    i = pos
+    while i < len(line):
+        ch = line[i]
+        if quote:
+            if ch == "\\" and quote == '"':
+                i += 1
+            elif ch == quote:
+                if quote == "'" and line[i + 1:i + 2] == "'":
+                    i += 1
+                else:
+                    quote = None
+        elif ch in "\"'" and (i == pos or line[i - 1] in " \t[{,"):
+            quote = ch
+        elif ch == "#" and (i == pos or line[i - 1] in " \t"):
+            return i
+        i += 1
+    return -1
+
+
+def format_scalar(value) -> str:
+    """Записывает скалярное значение в виде YAML так, чтобы оно читалось обратно без изменений."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value)
+    try:
+        if text and _same(parse_frontmatter(f"k: {text}\n"), {"k": text}):
+            return text
+    except FrontmatterError:
+        pass
+    # JSON-строка — корректная строка YAML в двойных кавычках
+    return json.dumps(text, ensure_ascii=False)
+
+
+def render_key(key: str, value, newline: str = "\n") -> Optional[str]:
+    """Формирует строки `key: value` или `key:` со списком. None — если значение не поддерживается."""
+    if isinstance(value, list):
+        if not all(isinstance(item, _SCALAR_TYPES) for item in value):
+            return None
+        if not value:
+            return f"{key}: []{newline}"
+        items = "".join(f"  - {format_scalar(item)}{newline}" for item in value)
+        return f"{key}:{newline}{items}"
+    if not isinstance(value, _SCALAR_TYPES):
+        return None
+    return f"{key}: {format_scalar(value)}{newline}"
+
+
+def set_key(fm_text: str, key: str, value) -> Optional[str]:
+    """
+    Заменяет значение ключа (или добавляет ключ в конец заголовка). Комментарий в конце
+    строки ключа (`status: todo  # keep`) переносится в новую строку. None — если значение
+    не поддерживается или комментарии стоят в строках самого значения (их некуда перенести).
+    """
+    newline = "\r\n" if "\r\n" in fm_text else "\n"
+    rendered = render_key(key, value, newline)
+    if rendered is None:
+        return None
+    span = find_key_span(fm_text, key)
+    if span:
+        start, end = span
+        lines = fm_text[start:end].split("\n")
+        if any(_comment_start(line) != -1 for line in lines[1:]):
+            return None
+        key_line = lines[0].rstrip("\r")
+        comment = _comment_start(key_line, _key_line_re(key).match(fm_text, start).end() - start)
+        if comment != -1:
+            first_end = rendered.index(newline)
+            spacing = key_line[:comment][len(key_line[:comment].rstrip(" \t")):] or " "
+            rendered = rendered[:first_end] + spacing + key_line[comment:].rstrip() + rendered[first_end:]
+        if not fm_text[start:end].endswith("\n"):
+            rendered = rendered[:-len(newline)]
+        return fm_text[:start] + rendered + fm_text[end:]
+    if fm_text and not fm_text.endswith("\n"):
+        fm_text += newline
+    return fm_text + rendered
+
+
+def patch_frontmatter(fm_text: str, updates: Dict[str, object], original: Optional[dict] = None) -> Optional[str]:
+    """
+    Применяет `updates` (ключ → новое значение) к тексту frontmatter.
+    `original` — уже разобранный заголовок, чтобы не разбирать его повторно.
+    Возвращает новый текст или None, если правку нельзя выполнить безопасно.
+    """
+    try:
+        if original is None:
+            original = parse_frontmatter(fm_text) or {}
+        if not isinstance(original, dict):
+            return None
+
+        new_text = fm_text
+        for key, value in updates.items():
+            new_text = set_key(new_text, key, value)
+            if new_text is None:
+                return None
+
+        expected = dict(original)
+        expected.update(updates)
+        if not _same(parse_frontmatter(new_text), expected):
+            return None
+        return new_text
+    except FrontmatterError:
+        return None
+
+
+def remove_key(fm_text: str, key: str) -> str:
+    """Удаляет строки ключа верхнего уровня (если ключа нет, текст не меняется)."""
+    span = find_key_span(fm_text, key)
+    if span is None:
+        return fm_text
+    start, end = span
+    return fm_text[:start] + fm_text[end:]
+
+
+def format_key(key: str) -> str:
+    """Имя ключа в виде YAML: как есть, если оно читается обратно без изменений, иначе в кавычках."""
+    try:
+        parsed = parse_frontmatter(f"{key}: x\n")
+        if isinstance(parsed, dict) and list(parsed) == [key]:
+            return key
+    except FrontmatterError:
+        pass
+    return json.dumps(key, ensure_ascii=False)
+
+
+def rename_key(fm_text: str, key: str, new_key: str) -> str:
+    """Переименовывает ключ верхнего уровня на месте, не трогая его значение."""
+    match = None
+    for match in _key_line_re(key).finditer(fm_text):
+        pass
+    if match is None:
+        return fm_text
+    # match заканчивается на ':' после имени ключа
+    return fm_text[:match.start()] + format_key(new_key) + fm_text[match.end() - 1:]
+
+
+def append_to_list(fm_text: str, key: str, value) -> Optional[str]:
+    """
+    Дописывает элемент в конец блочного списка `key:` / `  - item` одной новой строкой.
+    None — если значение ключа записано не блочным списком (тогда нужен set_key).
+    """
+    span = find_key_span(fm_text, key)
+    if span is None or not isinstance(value, _SCALAR_TYPES):
+        return None
+    start, end = span
+    item_lines = [line for line in fm_text[start:end].splitlines(keepends=True)[1:] if line.lstrip().startswith("-")]
+    if not item_lines:
+        return None
+    newline = "\r\n" if "\r\n" in fm_text else "\n"
+    last = item_lines[-1]
+    indent = last[:len(last) - len(last.lstrip())]
+    prefix = fm_text[:end] if fm_text[:end].endswith("\n") else fm_text[:end] + newline
+    return prefix + f"{indent}- {format_scalar(value)}{newline}" + fm_text[end:]
+
+
+# Операции над свойствами
+OP_SET = "set"
+OP_APPEND = "append"
+OP_REMOVE = "remove"
+OP_RENAME = "rename"
+OPERATIONS = (OP_SET, OP_APPEND, OP_REMOVE, OP_RENAME)
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Mutation:
+    """
+    Правка свойства:
+    *   set key value — записать значение;
+    *   append key value — добавить элемент в список (скаляр станет списком, повтор не добавляется);
+    *   remove key — удалить свойство; remove key value — убрать элемент из списка;
+    *   rename key new_key — переименовать свойство (если new_key уже есть, файл не меняется).
+    """
+    op: str
+    key: str
+    value: Any = _MISSING
+    new_key: Optional[str] = None
+
+    def __post_init__(self):
+        if self.op not in OPERATIONS:
+            raise ValueError(f"неизвестная операция '{self.op}' (доступны: {', '.join(OPERATIONS)})")
+        if self.op in (OP_SET, OP_APPEND) and self.value is _MISSING:
+            raise ValueError(f"операции '{self.op}' нужно значение")
+        if self.op == OP_RENAME and not self.new_key:
+            raise ValueError("операции 'rename' нужно новое имя свойства")
+
+    def describe(self) -> str:
+        parts = [self.op, self.key]
+        if self.value is not _MISSING:
+            parts.append(json.dumps(self.value, ensure_ascii=False, default=str))
+        if self.new_key:
+            parts.append(self.new_key)
+        return " ".join(parts)
+
+
+def _apply_one(fm_text: str, data: dict, mutation: Mutation) -> Tuple[Optional[str], dict]:
+    """Одна правка: новый текст (None — нельзя выполнить безопасно) и ожидаемые данные."""
+    key = mutation.key
+    current = data.get(key, _MISSING)
+    if mutation.op == OP_SET:
+        if current is not _MISSING and _same(current, mutation.value):
+            return fm_text, data
+        return set_key(fm_text, key, mutation.value), {**data, key: mutation.value}
+
+    if mutation.op == OP_APPEND:
+        value = mutation.value
+        if current is _MISSING or current is None:
+            return set_key(fm_text, key, [value]), {**data, key: [value]}
+        items = current if isinstance(current, list) else [current]
+        if any(_same(item, value) for item in items):
+            return fm_text, data
+        new_list = items + [value]
+        new_text = append_to_list(fm_text, key, value) if isinstance(current, list) else None
+        if new_text is None:
+            new_text = set_key(fm_text, key, new_list)
+        return new_text, {**data, key: new_list}
+
+    if mutation.op == OP_REMOVE:
+        if current is _MISSING:
+            return fm_text, data
+        if mutation.value is _MISSING or (not isinstance(current, list) and _same(current, mutation.value)):
+            return remove_key(fm_text, key), {k: v for k, v in data.items() if k != key}
+        if not isinstance(current, list):
+            return fm_text, data
+        new_list = [item for item in current if not _same(item, mutation.value)]
+        if len(new_list) == len(current):
+            return fm_text, data
+        return set_key(fm_text, key, new_list), {**data, key: new_list}
+
+    # OP_RENAME
+    if current is _MISSING or mutation.new_key == key:
+        return fm_text, data
+    if mutation.new_key in data:
+        return None, data
+    renamed = {(mutation.new_key if k == key else k): v for k, v in data.items()}
+    return rename_key(fm_text, key, mutation.new_key), renamed
+
+
+def apply_mutations(fm_text: str, mutations: Sequence[Mutation], original: Optional[dict] = None) -> Optional[str]:
+    """
+    Применяет правки по порядку к тексту frontmatter. Возвращает новый текст (равный
+    исходному, если менять нечего) или None, если правку нельзя выполнить безопасно.
+    """
+    try:
+        if original is None:
+            original = _parse(fm_text)
+        if not isinstance(original, dict):
+            return None
+        new_text, expected = fm_text, dict(original)
+        for mutation in mutations:
+            new_text, expected = _apply_one(new_text, expected, mutation)
+            if new_text is None:
+                return None
+        if new_text == fm_text:
+            return fm_text
+        if not _same(_parse(new_text), expected):
+            return None
+        return new_text
+    except FrontmatterError:
+        return None
+
+
+def _parse(fm_text: str):
+    return parse_frontmatter(fm_text.replace("\r\n", "\n")) or {}
+
+
+# Итог mutate_file
+MUTATE_CHANGED = "changed"
+MUTATE_UNCHANGED = "unchanged"
+MUTATE_NO_FRONTMATTER = "no_frontmatter"
+MUTATE_UNSAFE = "unsafe"  # правка не прошла проверку или конфликт имен — файл не тронут
+
+
+def mutate_file(file_path: str, mutations: Sequence[Mutation], dry_run: bool = False) -> Tuple[str, Optional[dict]]:
+    """
+    Применяет правки к frontmatter файла и атомарно записывает его, если текст изменился.
+    Переводы строк и остальной текст файла сохраняются. Возвращает (итог, новый frontmatter).
+    """
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        content = f.read()
+    span = split_frontmatter(content)
+    if span is None:
+        return MUTATE_NO_FRONTMATTER, None
+    start, end = span
+    fm_text = content[start:end]
+    try:
+        original = _parse(fm_text)
+    except FrontmatterError:
+        return MUTATE_UNSAFE, None
+    new_fm_text = apply_mutations(fm_text, mutations, original if isinstance(original, dict) else None)
+    if new_fm_text is None:
+        return MUTATE_UNSAFE, original if isinstance(original, dict) else None
+    if new_fm_text == fm_text:
+        return MUTATE_UNCHANGED, original
+    if not dry_run:
+        write_text_atomically(file_path, content[:start] + new_fm_text + content[end:], newline="")
+    return MUTATE_CHANGED, _parse(new_fm_text)
+
+
+def mutate_files(root: str, rel_paths: List[str], mutations: Sequence[Mutation], dry_run: bool = False) -> List[Tuple[str, str, Optional[dict], Optional[str]]]:
+    """mutate_file для пачки файлов (удобно отдавать рабочим процессам): (путь, итог, frontmatter, ошибка)."""
+    results = []
+    for rel_path in rel_paths:
+        try:
+            status, frontmatter = mutate_file(os.path.join(root, rel_path), mutations, dry_run)
+            results.append((rel_path, status, frontmatter, None))
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((rel_path, MUTATE_UNSAFE, None, f"{type(e).__name__}: {e}"))
+    return results
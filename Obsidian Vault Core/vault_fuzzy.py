@@ -0,0 +1,176 @@
+"""
+Приблизительный поиск имен заметок: n-граммный индекс с переранжированием по расстоянию правки.
+
+Имя (после `casefold()` и схлопывания пробелов) раскладывается на триграммы с отступами
+по краям. Правка — вставка, удаление, замена или перестановка соседних букв ("Alhpa" → "Alpha"
+— одна правка). Вставка, удаление и замена портят не больше n разных n-грамм запроса,
+перестановка — не больше n + 1, поэтому у имени на расстоянии не больше d есть хотя бы
+p − d·(n + 1) из любых p n-грамм запроса. Кандидаты собираются по инвертированным спискам
+n-грамм (сначала самым редким), проверяются по убыванию числа общих n-грамм, а точное
+расстояние (битово-параллельно) считается только для них — без полного перебора всех имен.
+
+    index = FuzzyIndex()
+    index.add("Project Alpha", "Projects/Project Alpha.md")
+    index.add("Альфа", "Projects/Project Alpha.md")          # псевдоним
+    index.search("Projcet Alpha")   # [("Projects/Project Alpha.md", "project alpha", 1)]
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+NGRAM = 3
+_PAD = "\x00"
+# Сколько вхождений инвертированных списков можно просмотреть за один поиск сверх обязательного минимума
+POSTINGS_BUDGET = 200000
+
+
+def normalize_name(text: str) -> str:
+    """Имя для сравнения: без учета регистра, пробелы схлопнуты."""
+    return " ".join(text.casefold().split())
+
+
+def ngrams(text: str, n: int = NGRAM) -> Set[str]:
+    """Разные n-граммы текста с отступами по краям (у "ab" есть "\\0\\0a", "\\0ab", "ab\\0", "b\\0\\0")."""
+    padded = _PAD * (n - 1) + text + _PAD * (n - 1)
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def default_max_distance(length: int) -> int:
+    """Сколько правок допускается для имени такой длины: 1 для коротких, 2 для длинных."""
+    return 1 if length < 8 else 2
+
+
+def _pattern_masks(pattern: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for position, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def edit_distance(a: str, b: str, masks: Optional[Dict[str, int]] = None) -> int:
+    """
+    Расстояние правки с перестановкой соседних букв (optimal string alignment: вставка, удаление,
+    замена, перестановка двух соседних букв — по одной правке) битово-параллельным алгоритмом
+    Майерса с расширением Хюрё: столбец таблицы — одно целое число, поэтому на символ b уходит
+    десяток операций над int, а не проход по всей длине a. masks — заранее посчитанные маски
+    символов a (для многих b).
+    """
+    if not a:
+        return len(b)
+    if masks is None:
+        masks = _pattern_masks(a)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    plus, minus, score = full, 0, len(a)
+    horizontal, previous_equal = 0, 0
+    for char in b:
+        equal = masks.get(char, 0)
+        # Перестановка: символ b совпадает с буквой a на шаг раньше, а предыдущий — на шаг позже
+        transposed = ((~horizontal & equal) << 1) & previous_equal
+        horizontal = (((equal & plus) + plus) ^ plus) | equal | minus | transposed
+        h_plus = minus | ~(horizontal | plus)
+        h_minus = plus & horizontal
+        if h_plus & last:
+            score += 1
+        elif h_minus & last:
+            score -= 1
+        h_plus = (h_plus << 1) | 1
+        h_minus <<= 1
+        plus = (h_minus | ~(horizontal | h_plus)) & full
+        minus = h_plus & horizontal & full
+        previous_equal = equal
+    return score
+
+
+class FuzzyIndex:
+    """Имена (заметок, псевдонимов) → значения, с приблизительным поиском по n-граммам."""
+
+    def __init__(self, n: int = NGRAM):
+        self.n = n
+        self._keys: List[str] = []
+        self._values: List[List[Any]] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._by_length: Dict[int, List[int]] = {}
+
+    def add(self, name: str, value: Any):
+        """Добавляет имя; у одного имени может быть несколько значений (одноименные заметки)."""
+        key = normalize_name(name)
+        if not key:
+            return
+        key_id = self._ids.get(key)
+        if key_id is None:
+            key_id = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+            self._values.append([])
+            self._by_length.setdefault(len(key), []).append(key_id)
+            for gram in ngrams(key, self.n):
+                self._postings.setdefault(gram, []).append(key_id)
+        if value not in self._values[key_id]:
+            self._values[key_id].append(value)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _candidates(self, query: str, max_distance: int) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Кандидаты (общих n-грамм, номер имени) по убыванию числа общих n-грамм и число
+        просмотренных n-грамм запроса (0 — отбор по длине, без n-грамм).
+        """
+        grams = sorted(ngrams(query, self.n), key=lambda gram: len(self._postings.get(gram, ())))
+        spoiled = max_distance * (self.n + 1)
+        if len(grams) <= spoiled:
+            # Короткий запрос: правки могут испортить все его n-граммы — перебираем имена близкой длины
+            return [(0, key_id) for length in range(len(query) - max_distance, len(query) + max_distance + 1)
+                    for key_id in self._by_length.get(length, ())], 0
+        # Минимум — spoiled + 1 самых редких n-грамм (хотя бы одна из них обязана совпасть); дальше
+        # n-граммы добавляются, пока хватает бюджета: каждая повышает порог числа совпадений
+        chosen = grams[:spoiled + 1]
+        budget = POSTINGS_BUDGET - sum(len(self._postings.get(gram, ())) for gram in chosen)
+        for gram in grams[spoiled + 1:]:
+            budget -= len(self._postings.get(gram, ()))
+            if budget < 0:
+                break
+            chosen.append(gram)
+        counts: Dict[int, int] = {}
+        for gram in chosen:
+            for key_id in self._postings.get(gram, ()):
+                counts[key_id] = counts.get(key_id, 0) + 1
+        required = len(chosen) - spoiled
+        candidates = [(shared, key_id) for key_id, shared in counts.items() if shared >= required]
+        candidates.sort(reverse=True)
+        return candidates, len(chosen)
+
+    def search(self, name: str, limit: int = 3, max_distance: Optional[int] = None) -> List[Tuple[Any, str, int]]:
+        """До limit ближайших значений: (значение, совпавшее имя, расстояние), ближайшие первыми."""
+        query = normalize_name(name)
+        if not query or limit <= 0:
+            return []
+        if max_distance is None:
+            max_distance = default_max_distance(len(query))
+        candidates, checked = self._candidates(query, max_distance)
+        masks = _pattern_masks(query)
+        bound = max_distance
+        ranked: List[Tuple[int, int, str, int]] = []
+        for shared, key_id in candidates:
+            # Каждая правка портит не больше n + 1 n-грамм: у кандидата с меньшим числом общих расстояние
+            # не меньше этой оценки, а кандидаты идут по убыванию общих n-грамм — дальше только хуже
+            if checked and -(-(checked - shared) // (self.n + 1)) > bound:
+                break
+            key = self._keys[key_id]
+            if abs(len(key) - len(query)) > bound:
+                continue
+            distance = edit_distance(query, key, masks)
+            if distance > bound:
+                continue
+            ranked.append((distance, abs(len(key) - len(query)), key, key_id))
+            if len(ranked) >= limit:
+                ranked.sort()
+                del ranked[limit:]
+                bound = ranked[-1][0]
+        ranked.sort()
+        results = []
+        for distance, _, key, key_id in ranked:
+            for value in self._values[key_id]:
+                results.append((value, key, distance))
+                if len(results) == limit:
+                    return results
+        return results
@@ -0,0 +1,239 @@
+"""
+Компактный граф ссылок хранилища.
+
+Пути файлов хранятся один раз (интернирование) и заменяются целыми номерами узлов.
+Ребра лежат в массивах array('i') в формате CSR: для узла i его соседи — это
+targets[offsets[i]:offsets[i + 1]]. Хранятся прямые (исходящие) и обратные (входящие)
+ребра, степени узлов считаются по смещениям. На 60 тыс. заметок и 500 тыс. ссылок
+это единицы мегабайт вместо гигабайтов множеств объектов Path.
+
+Граф сохраняется в файл, который при загрузке отображается в память (mmap): массивы
+не копируются, поэтому сохраненный граф открывается за миллисекунды.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+GRAPH_FILE_MAGIC = b"VGRAPH01"
+# magic, порядок байтов (1 — little-endian), узлов, ребер, длина путей, длина метаданных
+_HEADER = struct.Struct("<8sIqqqq")
+_PATH_SEPARATOR = "\0"
+
+
+class GraphFileError(Exception):
+    """Файл графа поврежден или записан в другом формате."""
+
+
+class PathInterner:
+    """Сопоставляет строкам путей последовательные номера узлов."""
+    __slots__ = ("_ids", "_paths")
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._paths: List[str] = []
+        for path in paths:
+            self.intern(path)
+
+    def intern(self, path: str) -> int:
+        node = self._ids.get(path)
+        if node is None:
+            node = self._ids[path] = len(self._paths)
+            self._paths.append(path)
+        return node
+
+    def get(self, path: str) -> Optional[int]:
+        return self._ids.get(path)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._ids
+
+    def __getitem__(self, node: int) -> str:
+        return self._paths[node]
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    @property
+    def paths(self) -> List[str]:
+        return self._paths
+
+
+_EDGE_SHIFT = 32
+_EDGE_MASK = (1 << _EDGE_SHIFT) - 1
+
+
+def _csr(keys: List[int], node_count: int):
+    """Из отсортированных ключей (source << 32) | target строит (offsets, targets)."""
+    offsets = array("i", bytes(4 * (node_count + 1)))
+    targets = array("i", bytes(4 * len(keys)))
+    for index, key in enumerate(keys):
+        offsets[(key >> _EDGE_SHIFT) + 1] += 1
+        targets[index] = key & _EDGE_MASK
+    for node in range(node_count):
+        offsets[node + 1] += offsets[node]
+    return offsets, targets
+
+
+class GraphBuilder:
+    """Накопитель ребер. Повторяющиеся ребра при сборке схлопываются."""
+
+    def __init__(self, interner: Optional[PathInterner] = None):
+        self.paths = interner if interner is not None else PathInterner()
+        self._edges = set()  # ребра в виде (source << 32) | target
+
+    def add_node(self, path: str) -> int:
+        return self.paths.intern(path)
+
+    def add_edge(self, source: int, target: int):
+        self._edges.add((source << _EDGE_SHIFT) | target)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edges)
+
+    def build(self, meta: Optional[dict] = None) -> "LinkGraph":
+        node_count = len(self.paths)
+        forward = sorted(self._edges)
+        reverse = sorted(((key & _EDGE_MASK) << _EDGE_SHIFT) | (key >> _EDGE_SHIFT) for key in forward)
+        forward_offsets, forward_targets = _csr(forward, node_count)
+        reverse_offsets, reverse_targets = _csr(reverse, node_count)
+        return LinkGraph(list(self.paths.paths), forward_offsets, forward_targets, reverse_offsets, reverse_targets, meta)
+
+
+class LinkGraph:
+    """Неизменяемый граф в формате CSR с прямыми и обратными ребрами."""
+
+    def __init__(
+        self,
+        paths: List[str],
+        forward_offsets: Sequence[int],
+        forward_targets: Sequence[int],
+        reverse_offsets: Sequence[int],
+        reverse_targets: Sequence[int],
+        meta: Optional[dict] = None,
+    ):
+        self.paths = paths
+        self.forward_offsets = forward_offsets
+        self.forward_targets = forward_targets
+        self.reverse_offsets = reverse_offsets
+        self.reverse_targets = reverse_targets
+        self.meta = meta or {}
+        self._ids: Optional[Dict[str, int]] = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.paths)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.forward_targets)
+
+    def node_id(self, path: str) -> Optional[int]:
+        if self._ids is None:
+            self._ids = {p: node for node, p in enumerate(self.paths)}
+        return self._ids.get(path)
+
+    # Соседи возвращаются копией: срез загруженного графа ссылался бы на отображение файла,
+    # и close() не смог бы его освободить, пока вызывающий держит такой срез.
+    def successors(self, node: int) -> List[int]:
+        return list(self.forward_targets[self.forward_offsets[node]:self.forward_offsets[node + 1]])
+
+    def predecessors(self, node: int) -> List[int]:
+        return list(self.reverse_targets[self.reverse_offsets[node]:self.reverse_offsets[node + 1]])
+
+    def out_degree(self, node: int) -> int:
+        return self.forward_offsets[node + 1] - self.forward_offsets[node]
+
+    def in_degree(self, node: int) -> int:
+        return self.reverse_offsets[node + 1] - self.reverse_offsets[node]
+
+    def out_degrees(self) -> array:
+        offsets = self.forward_offsets
+        return array("i", (offsets[node + 1] - offsets[node] for node in range(self.node_count)))
+
+    def in_degrees(self) -> array:
+        offsets = self.reverse_offsets
+        return array("i", (offsets[node + 1] - offsets[node] for node in range(self.node_count)))
+
+    # --- СОХРАНЕНИЕ И ЗАГРУЗКА ---
+    def save(self, file_path: str):
+        """Сохраняет граф (атомарно: через временный файл)."""
+        paths_blob = _PATH_SEPARATOR.join(self.paths).encode("utf-8")
+        meta_blob = json.dumps(self.meta, ensure_ascii=False).encode("utf-8")
+        header = _HEADER.pack(GRAPH_FILE_MAGIC, 1, self.node_count, self.edge_count, len(paths_blob), len(meta_blob))
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(meta_blob)
+            f.write(paths_blob)
+            f.write(b"\0" * (-(len(header) + len(meta_blob) + len(paths_blob)) % 4))
+            for values in (self.forward_offsets, self.forward_targets, self.reverse_offsets, self.reverse_targets):
+                block = array("i", values)
+                if sys.byteorder != "little":
+                    block.byteswap()
+                block.tofile(f)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> "LinkGraph":
+        """Открывает сохраненный граф; массивы ребер читаются прямо из отображенного в память файла."""
+        with open(file_path, "rb") as f:
+            meta, node_count, edge_count, paths_len, meta_len = _read_header(f)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        position = _HEADER.size + meta_len
+        paths = view[position:position + paths_len].tobytes().decode("utf-8").split(_PATH_SEPARATOR) if node_count else []
+        position += paths_len
+        position += -position % 4
+
+        blocks = []
+        for length in (node_count + 1, edge_count, node_count + 1, edge_count):
+            end = position + 4 * length
+            if end > len(mapped):
+                raise GraphFileError(f"Файл графа '{file_path}' обрезан")
+            block = view[position:end].cast("i")
+            if sys.byteorder != "little":
+                block = array("i", block.tobytes())
+                block.byteswap()
+            blocks.append(block)
+            position = end
+        graph = cls(paths, *blocks, meta=meta)
+        graph._mmap = mapped
+        return graph
+
+    def close(self):
+        """Освобождает отображение файла (после этого графом пользоваться нельзя)."""
+        if self._mmap is not None:
+            for block in (self.forward_offsets, self.forward_targets, self.reverse_offsets, self.reverse_targets):
+                if isinstance(block, memoryview):
+                    block.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+def _read_header(f):
+    raw = f.read(_HEADER.size)
+    if len(raw) != _HEADER.size:
+        raise GraphFileError("Файл графа слишком короткий")
+    magic, byteorder, node_count, edge_count, paths_len, meta_len = _HEADER.unpack(raw)
+    if magic != GRAPH_FILE_MAGIC or byteorder != 1:
+        raise GraphFileError("Неизвестный формат файла графа")
+    try:
+        meta = json.loads(f.read(meta_len).decode("utf-8"))
+    except ValueError as e:
+        raise GraphFileError(f"Метаданные графа повреждены: {e}")
+    return meta, node_count, edge_count, paths_len, meta_len
+
+
+def read_graph_meta(file_path: str) -> Optional[dict]:
+    """Метаданные сохраненного графа без его загрузки (None, если файла нет или он поврежден)."""
+    try:
+        with open(file_path, "rb") as f:
+            return _read_header(f)[0]
+    except (OSError, GraphFileError):
+        return None
@@ -0,0 +1,100 @@
+"""
+Выбор файлов хранилища по шаблонам include/exclude.
+
+Шаблоны записываются относительно корня обхода через '/':
+*   `*` и `?` — любые символы внутри одного имени (не переходят через '/');
+*   `**` — любое число папок: `**/*.md`, `Flashcards/**`, `**/.trash/**`;
+*   `[abc]` — один символ из набора.
+Папка, совпавшая с шаблоном исключения (`.obsidian/**` или просто `.obsidian`),
+не обходится вовсе. В Windows сравнение не учитывает регистр, как и в проводнике.
+"""
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Pattern, Sequence
+
+DEFAULT_INCLUDE = ("**/*.md",)
+DEFAULT_EXCLUDE = (".obsidian/**", ".trash/**", ".git/**")
+
+_FLAGS = re.IGNORECASE if os.name == "nt" else 0
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Переводит шаблон с `**` в регулярное выражение для относительного пути с '/'."""
+    pattern = pattern.replace("\\", "/").strip("/")
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            parts.append("(?:/.*)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif char == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif char == "?":
+            parts.append("[^/]")
+            i += 1
+        elif char == "[" and (end := pattern.find("]", i + 2)) != -1:
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            elif body.startswith("^"):
+                body = "\\" + body
+            parts.append("[" + body + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    return "".join(parts)
+
+
+def compile_globs(patterns: Iterable[str]) -> Optional[Pattern]:
+    """Объединяет шаблоны в одно регулярное выражение (None для пустого списка)."""
+    regexes = [glob_to_regex(pattern) for pattern in patterns if pattern and pattern.strip()]
+    if not regexes:
+        return None
+    return re.compile("(?:" + "|".join(regexes) + r")\Z", _FLAGS)
+
+
+class PathFilter:
+    """Проверка относительного пути по шаблонам include/exclude."""
+
+    def __init__(self, include: Sequence[str] = DEFAULT_INCLUDE, exclude: Sequence[str] = DEFAULT_EXCLUDE):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self._include = compile_globs(self.include)
+        self._exclude = compile_globs(self.exclude)
+
+    def excludes_dir(self, rel_dir: str) -> bool:
+        return self._exclude is not None and self._exclude.match(rel_dir) is not None
+
+    def matches(self, rel_path: str) -> bool:
+        if self._exclude is not None and self._exclude.match(rel_path):
+            return False
+        return self._include is None or self._include.match(rel_path) is not None
+
+
+def iter_files(root: str, path_filter: Optional[PathFilter] = None) -> Iterator[str]:
+    """
+    Рекурсивно обходит `root` и выдает относительные пути ('/' как разделитель) подходящих
+    файлов. Порядок детерминирован: папки и файлы сортируются по имени.
+    """
+    path_filter = path_filter or PathFilter()
+    for current, dirs, files in os.walk(root):
+        rel_current = os.path.relpath(current, root).replace(os.sep, "/")
+        prefix = "" if rel_current == "." else rel_current + "/"
+        dirs[:] = sorted(d for d in dirs if not path_filter.excludes_dir(prefix + d))
+        for name in sorted(files):
+            if path_filter.matches(prefix + name):
+                yield prefix + name
+
+
+def list_files(root: str, include: Sequence[str] = DEFAULT_INCLUDE, exclude: Sequence[str] = DEFAULT_EXCLUDE) -> List[str]:
+    """Список относительных путей файлов `root`, подходящих под шаблоны."""
+    return list(iter_files(root, PathFilter(include, exclude)))
@@ -0,0 +1,614 @@
+"""
+Статический разбор запросов Dataview (DQL) и фильтров Obsidian Bases.
+
+Запрос не выполняется, а переводится в дерево условий над индексами хранилища — папками,
+тегами, свойствами frontmatter и ссылками. Поддерживается частый случай:
+
+*   DQL: `LIST`/`TABLE`/`TASK`/`CALENDAR` с `FROM "папка"`, `#тег`, `[[заметка]]`,
+    `outgoing([[заметка]])` (через `and`, `or`, `-` и скобки) и `WHERE` со сравнениями
+    `=`/`!=`, `contains(...)`, `поле.contains(...)`, `startswith(file.folder, ...)`, проверкой
+    `поле`/`!поле`; значения — строки, числа, `true`/`false`, `link("...")`, `[[...]]`, `this.file.*`;
+*   Bases: `filters` с `and`/`or`/`not` на верхнем уровне и в представлениях (`views`),
+    выражения `file.inFolder(...)`, `file.hasTag(...)`, `file.hasLink(...)`, `file.hasProperty(...)`,
+    `свойство == значение`, `note.свойство`, `&&`, `||`, `!`.
+
+Условия вычисляются сразу для всех заметок — пересечением и объединением инвертированных
+списков `QueryIndex`, а не проверкой каждой заметки. Неподдерживаемая часть условия (даты,
+арифметика, `file.mtime > ...`) считается неизвестной: в `and` она отбрасывается, и выборка
+получается шире настоящей, а `or` или `not` с неизвестной частью, как и запрос вовсе без
+известных ограничений, не разрешаются.
+
+    index = QueryIndex()
+    index.add_file(0, "Projects/Alpha.md", tags=["project"], properties={"type": ["project"]})
+    tree = parse_dql('LIST FROM "Projects" WHERE type = "project"', "Hubs/Projects.md")
+    index.evaluate(tree, index.markdown)   # {0}
+
+Деревья — вложенные списки (`["and", ["folder", "projects", true], ["eq", "type", "project"]]`),
+поэтому их можно хранить в JSON-кэше вместе с остальным разбором заметки.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from vault_frontmatter_columns import normalize_value
+
+# Виды запросов: по-разному определяется множество всех кандидатов
+QUERY_DATAVIEW = "dataview"   # только заметки .md
+QUERY_BASE = "base"           # все файлы хранилища
+
+QUERY_TYPES = frozenset({"LIST", "TABLE", "TASK", "CALENDAR"})
+_CLAUSES = frozenset({"FROM", "WHERE", "SORT", "GROUP", "FLATTEN", "LIMIT"})
+
+# Тег в тексте заметки: '#' в начале слова, хотя бы один символ не цифра
+INLINE_TAG_RE = re.compile(r"(?<![^\s(])#([^\s#.,;:!?\"'`()\[\]{}<>|\\=+*&^%$@~]+)")
+PROPERTY_LINK_RE = re.compile(r"\[\[([^\]|#]*)")
+
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<link>\[\[[^\[\]\n]*\]\])
+  | (?P<tag>\#[^\s#,()\[\]"'`]+)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<name>[^\W\d]\w*(?:-\w+)*)
+  | (?P<op>==|!=|<=|>=|&&|\|\||[=<>!&|(),.\[\]+\-*/%:?])
+""", re.VERBOSE)
+
+Tree = List[Any]
+UNKNOWN: Tree = ["unknown"]
+
+
+class QueryError(ValueError):
+    """Запрос не удалось разобрать (или это не запрос DQL)."""
+
+
+# ================== ИМЕНА, ТЕГИ, СВОЙСТВА ==================
+
+def link_name(target: str) -> str:
+    """Имя заметки из цели ссылки: без псевдонима, заголовка, папок и '.md', в нижнем регистре."""
+    name = re.split(r"[|#^]", target, 1)[0].strip().rsplit("/", 1)[-1]
+    if name.lower().endswith(".md"):
+        name = name[:-3]
+    return name.lower()
+
+
+def _tag(text: str) -> str:
+    return text.strip().lstrip("#").rstrip("/").lower()
+
+
+def note_tags(frontmatter: Optional[dict], body: str) -> List[str]:
+    """Теги заметки (без '#', в нижнем регистре): свойства `tags`/`tag` и теги в тексте."""
+    tags = set()
+    if isinstance(frontmatter, dict):
+        for key in ("tags", "tag"):
+            value = frontmatter.get(key)
+            items = value if isinstance(value, list) else re.split(r"[,\s]+", value) if isinstance(value, str) else []
+            tags.update(_tag(str(item)) for item in items if item is not None)
+    for match in INLINE_TAG_RE.finditer(body):
+        tag = _tag(match.group(1))
+        if not tag.replace("/", "").isdigit():
+            tags.add(tag)
+    tags.discard("")
+    return sorted(tags)
+
+
+def normalize_properties(frontmatter: dict) -> Dict[str, List[str]]:
+    """Свойства заметки для индекса запросов: имя → значения строками (пустое свойство — [])."""
+    return {str(key): list(normalize_value(value)) for key, value in frontmatter.items()}
+
+
+# ================== РАЗБОР ВЫРАЖЕНИЙ ==================
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None:
+            raise QueryError(f"неожиданный символ {text[position]!r}")
+        if match.lastgroup != "space":
+            tokens.append((match.lastgroup, match.group()))
+        position = match.end()
+    return tokens
+
+
+def _unquote(text: str) -> str:
+    return re.sub(r"\\(.)", r"\1", text[1:-1])
+
+
+class _Parser:
+    """
+    Рекурсивный спуск по токенам; результат — синтаксическое дерево из кортежей:
+    ("str", s), ("num", s), ("bool", s), ("null",), ("link", цель), ("tag", тег), ("ref", [части]),
+    ("call", [части], [аргументы]), ("cmp", оп, л, п), ("and", л, п), ("or", л, п), ("not", x),
+    ("neg", x), ("list", [элементы]), ("other",) — всё, что дальше не поддерживается.
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self) -> Tuple[Optional[str], str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, "")
+
+    def _accept(self, *values: str, keyword: bool = False) -> Optional[str]:
+        kind, text = self._peek()
+        if (keyword and kind == "name" and text.lower() in values) or (not keyword and kind == "op" and text in values):
+            self.position += 1
+            return text
+        return None
+
+    def _expect(self, value: str):
+        if self._accept(value) is None:
+            raise QueryError(f"ожидалось {value!r}, найдено {self._peek()[1]!r}")
+
+    def parse(self):
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise QueryError(f"лишний текст после выражения: {self._peek()[1]!r}")
+        return node
+
+    def _or(self):
+        node = self._and()
+        while self._accept("or", keyword=True) or self._accept("||", "|"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._accept("and", keyword=True) or self._accept("&&", "&"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self._accept("!"):
+            return ("not", self._not())
+        if self._accept("-"):
+            return ("neg", self._not())
+        return self._compare()
+
+    def _compare(self):
+        node = self._arith()
+        op = self._accept("=", "==", "!=", "<", ">", "<=", ">=")
+        return ("cmp", op, node, self._arith()) if op else node
+
+    def _arith(self):
+        node = self._postfix()
+        while self._accept("+", "-", "*", "/", "%"):
+            self._postfix()
+            node = ("other",)
+        return node
+
+    def _postfix(self):
+        node = self._primary()
+        while True:
+            if self._accept("."):
+                kind, text = self._peek()
+                if kind != "name":
+                    raise QueryError(f"после '.' ожидалось имя, найдено {text!r}")
+                self.position += 1
+                node = ("ref", node[1] + [text]) if node[0] == "ref" else ("other",)
+            elif self._accept("("):
+                args = []
+                if not self._accept(")"):
+                    args.append(self._or())
+                    while self._accept(","):
+                        args.append(self._or())
+                    self._expect(")")
+                node = ("call", node[1], args) if node[0] == "ref" else ("other",)
+            elif self._accept("["):
+                key = self._or()
+                self._expect("]")
+                node = ("ref", node[1] + [key[1]]) if node[0] == "ref" and key[0] == "str" else ("other",)
+            else:
+                return node
+
+    def _primary(self):
+        kind, text = self._peek()
+        if kind is None:
+            raise QueryError("выражение оборвано")
+        if self._accept("("):
+            node = self._or()
+            self._expect(")")
+            return node
+        if self._accept("["):
+            items = []
+            if not self._accept("]"):
+                items.append(self._or())
+                while self._accept(","):
+                    items.append(self._or())
+                self._expect("]")
+            return ("list", items)
+        if kind == "op":
+            raise QueryError(f"неожиданный оператор {text!r}")
+        self.position += 1
+        if kind == "string":
+            return ("str", _unquote(text))
+        if kind == "number":
+            return ("num", text)
+        if kind == "link":
+            return ("link", text[2:-2])
+        if kind == "tag":
+            return ("tag", text[1:])
+        if text.lower() in ("true", "false"):
+            return ("bool", text.lower())
+        if text.lower() == "null":
+            return ("null",)
+        return ("ref", [text])
+
+
+def _parse_expression(tokens: List[Tuple[str, str]]):
+    if not tokens:
+        raise QueryError("пустое выражение")
+    return _Parser(tokens).parse()
+
+
+# ================== ПЕРЕВОД В ДЕРЕВО УСЛОВИЙ ==================
+
+class _This:
+    """Заметка, в которой записан запрос (для `this.file.*` и `[[]]`)."""
+
+    def __init__(self, rel_path: str):
+        self.path = rel_path
+        self.folder = rel_path.rsplit("/", 1)[0] if "/" in rel_path else ""
+        file_name = rel_path.rsplit("/", 1)[-1]
+        self.name = file_name[:-3] if file_name.lower().endswith(".md") else file_name.rsplit(".", 1)[0]
+
+
+def _number(text: str) -> str:
+    return normalize_value(float(text) if "." in text else int(text))[0]
+
+
+def _value(node, this: _This) -> Optional[Tuple[str, str]]:
+    """Значение для сравнения: ("str", строка) или ("link", имя заметки); None — не константа."""
+    kind = node[0]
+    if kind == "str":
+        return "str", node[1]
+    if kind == "num":
+        return "str", _number(node[1])
+    if kind == "bool":
+        return "str", node[1]
+    if kind == "link":
+        return "link", link_name(node[1]) if node[1].strip() else this.name.lower()
+    if kind == "call" and node[1] == ["link"] and len(node[2]) == 1:
+        inner = _value(node[2][0], this)
+        return ("link", link_name(inner[1])) if inner is not None else None
+    if kind == "ref" and node[1][0] == "this":
+        attribute = node[1][1:]
+        if attribute in ([], ["file"], ["file", "link"]):
+            return "link", this.name.lower()
+        if attribute in (["file", "name"], ["file", "basename"]):
+            return "str", this.name
+        if attribute == ["file", "folder"]:
+            return "str", this.folder
+        if attribute == ["file", "path"]:
+            return "str", this.path
+    return None
+
+
+def _field(node) -> Optional[Tuple[str, str]]:
+    """Поле заметки: ("prop", имя свойства) или ("file", атрибут file.*)."""
+    if node[0] != "ref":
+        return None
+    parts = node[1]
+    if parts[0] == "note" and len(parts) > 1:
+        parts = parts[1:]
+    if parts[0] == "file" and len(parts) == 2:
+        return "file", parts[1].lower()
+    if len(parts) == 1 and parts[0] not in ("this", "file", "formula"):
+        return "prop", parts[0].lower()
+    return None
+
+
+def _equals(field: Tuple[str, str], value: Tuple[str, str]) -> Tree:
+    (scope, name), (value_kind, text) = field, value
+    if scope == "prop":
+        return ["link", name, text] if value_kind == "link" else ["eq", name, text]
+    if value_kind == "link":
+        return ["name", text] if name in ("link", "name", "basename") else UNKNOWN
+    if name in ("name", "basename"):
+        return ["name", text.lower()]
+    if name == "folder":
+        return ["folder", text.strip("/").lower(), False]
+    if name == "path":
+        return ["path", text.strip("/").lower(), False]
+    if name in ("ext", "extension"):
+        return ["ext", text.lstrip(".").lower()]
+    return UNKNOWN
+
+
+def _contains(field: Tuple[str, str], value: Tuple[str, str], function: str) -> Tree:
+    (scope, name), (value_kind, text) = field, value
+    if scope == "prop":
+        if value_kind == "link":
+            return ["link", name, text]
+        if function == "econtains":
+            return ["eq", name, text]
+        return ["has", name, text, function == "icontains"]
+    if name in ("tags", "etags") and value_kind == "str":
+        return ["tag", _tag(text)]
+    if name == "outlinks" and value_kind == "link":
+        return ["links_to", text]
+    if name == "inlinks" and value_kind == "link":
+        return ["linked_by", text]
+    if name in ("name", "basename") and value_kind == "str":
+        return ["name_has", text.lower()]
+    return UNKNOWN
+
+
+def _lower_where(node, this: _This) -> Tree:
+    """Синтаксическое дерево условия → дерево условий над индексами."""
+    kind = node[0]
+    if kind in ("and", "or"):
+        return [kind, _lower_where(node[1], this), _lower_where(node[2], this)]
+    if kind == "not":
+        return ["not", _lower_where(node[1], this)]
+    if kind == "bool":
+        return ["all"] if node[1] == "true" else ["or"]
+    if kind == "ref":
+        field = _field(node)
+        return ["exists", field[1], True] if field is not None and field[0] == "prop" else UNKNOWN
+    if kind == "cmp":
+        _, op, left, right = node
+        if op not in ("=", "==", "!="):
+            return UNKNOWN
+        field, value = _field(left), _value(right, this)
+        if field is None or value is None:
+            field, value = _field(right), _value(left, this)
+        if field is None or value is None:
+            return UNKNOWN
+        tree = _equals(field, value)
+        return ["not", tree] if op == "!=" else tree
+    if kind == "call":
+        return _lower_call(node[1], node[2], this)
+    return UNKNOWN
+
+
+def _lower_call(callee: List[str], args: list, this: _This) -> Tree:
+    function = callee[-1]
+    lowered = function.lower()
+    if callee[:1] == ["note"]:
+        callee = callee[1:]
+    # Функции Bases над файлом: file.inFolder("..."), file.hasTag(...), ...
+    if callee[:-1] == ["file"]:
+        values = [_value(arg, this) for arg in args]
+        if not values or any(value is None for value in values):
+            return UNKNOWN
+        if function == "inFolder":
+            return ["or"] + [["folder", text.strip("/").lower(), True] for _, text in values]
+        if function == "hasTag":
+            return ["or"] + [["tag", _tag(text)] for _, text in values]
+        if function == "hasLink":
+            return ["or"] + [["links_to", text if kind == "link" else link_name(text)] for kind, text in values]
+        if function == "hasProperty":
+            return ["or"] + [["exists", text.lower(), False] for _, text in values]
+        return UNKNOWN
+    # contains(поле, значение) и поле.contains(значение), а также containsAny/containsAll в Bases
+    if len(callee) == 1 and lowered in ("contains", "econtains", "icontains", "startswith") and len(args) == 2:
+        field, value = _field(args[0]), _value(args[1], this)
+    elif len(callee) > 1 and lowered in ("contains", "containsany", "containsall", "startswith"):
+        field, value = _field(("ref", callee[:-1])), None
+        values = [_value(arg, this) for arg in args]
+        if field is None or not values or any(item is None for item in values):
+            return UNKNOWN
+        if lowered != "startswith":
+            trees = [_contains(field, item, "contains") for item in values]
+            return ["and" if lowered == "containsall" else "or"] + trees
+        value = values[0]
+    else:
+        return UNKNOWN
+    if field is None or value is None:
+        return UNKNOWN
+    if lowered == "startswith":
+        if field == ("file", "folder") and value[0] == "str":
+            return ["folder_prefix", value[1].strip("/").lower()]
+        return UNKNOWN
+    return _contains(field, value, lowered)
+
+
+def _lower_source(node, this: _This) -> Tree:
+    """Синтаксическое дерево FROM → дерево условий; неподдерживаемый источник — ошибка."""
+    kind = node[0]
+    if kind in ("and", "or"):
+        return [kind, _lower_source(node[1], this), _lower_source(node[2], this)]
+    if kind in ("not", "neg"):
+        return ["not", _lower_source(node[1], this)]
+    if kind == "str":
+        path = node[1].strip().strip("/").lower()
+        return ["path", path, True] if path else ["all"]
+    if kind == "tag":
+        return ["tag", _tag(node[1])]
+    if kind == "link":
+        return ["links_to", link_name(node[1]) if node[1].strip() else this.name.lower()]
+    if kind == "call" and node[1] == ["outgoing"] and len(node[2]) == 1 and node[2][0][0] == "link":
+        target = node[2][0][1]
+        return ["linked_by", link_name(target) if target.strip() else this.name.lower()]
+    raise QueryError("неподдерживаемый источник в FROM")
+
+
+def _split_clauses(tokens: List[Tuple[str, str]]) -> List[Tuple[str, List[Tuple[str, str]]]]:
+    """Делит DQL на предложения по ключевым словам вне скобок: [(ключевое слово, токены)]."""
+    clauses = [("", [])]
+    depth = 0
+    for kind, text in tokens:
+        if kind == "op" and text in "([":
+            depth += 1
+        elif kind == "op" and text in ")]":
+            depth -= 1
+        elif kind == "name" and depth == 0 and text.upper() in _CLAUSES:
+            clauses.append((text.upper(), []))
+            continue
+        clauses[-1][1].append((kind, text))
+    return clauses
+
+
+def parse_dql(query: str, this_path: str) -> Tree:
+    """Дерево условий запроса DQL (FROM и все WHERE через and); QueryError — если это не разобрать."""
+    tokens = _tokenize(query)
+    if not tokens or tokens[0][0] != "name" or tokens[0][1].upper() not in QUERY_TYPES:
+        raise QueryError("запрос должен начинаться с LIST, TABLE, TASK или CALENDAR")
+    this = _This(this_path)
+    conditions = []
+    for keyword, clause in _split_clauses(tokens):
+        if keyword == "FROM":
+            conditions.append(_lower_source(_parse_expression(clause), this))
+        elif keyword == "WHERE":
+            conditions.append(_lower_where(_parse_expression(clause), this))
+        elif keyword == "FLATTEN":
+            break  # после FLATTEN условия относятся к строкам, а не к заметкам
+    return ["and"] + conditions if conditions else ["all"]
+
+
+def _lower_filter(item, this: _This) -> Tree:
+    if isinstance(item, str):
+        return _lower_where(_parse_expression(_tokenize(item)), this)
+    if isinstance(item, list):
+        return ["and"] + [_lower_filter(sub, this) for sub in item]
+    if isinstance(item, dict) and len(item) == 1:
+        (op, items), = item.items()
+        items = items if isinstance(items, list) else [items]
+        if op == "and":
+            return ["and"] + [_lower_filter(sub, this) for sub in items]
+        if op == "or":
+            return ["or"] + [_lower_filter(sub, this) for sub in items]
+        if op == "not":
+            return ["not", ["or"] + [_lower_filter(sub, this) for sub in items]]
+    return UNKNOWN
+
+
+def parse_base(data: Any, this_path: str) -> Tree:
+    """
+    Дерево условий для разобранного YAML базы (`.base` или блока ```base):
+    общие `filters` и `filters` каждого представления — заметка попадает, если ее показывает хоть одно.
+    """
+    if not isinstance(data, dict):
+        raise QueryError("база должна быть словарем YAML")
+    this = _This(this_path)
+    common = _lower_filter(data["filters"], this) if data.get("filters") else ["all"]
+    views = [view for view in data.get("views") or [] if isinstance(view, dict)]
+    if not views:
+        return common
+    return ["or"] + [["and", common, _lower_filter(view["filters"], this)] if view.get("filters") else common
+                     for view in views]
+
+
+# ================== ВЫЧИСЛЕНИЕ ==================
+
+class QueryIndex:
+    """Инвертированные списки по файлам хранилища (номера файлов задает вызывающий, например узлы графа)."""
+
+    def __init__(self):
+        self.files: Set[int] = set()
+        self.markdown: Set[int] = set()
+        self._paths: Dict[str, int] = {}                    # путь в нижнем регистре → номер
+        self._folders: Dict[str, Set[int]] = {}             # папка → файлы прямо в ней
+        self._names: Dict[str, Set[int]] = {}               # имя (с расширением и без) → номера
+        self._exts: Dict[str, Set[int]] = {}
+        self._tags: Dict[str, Set[int]] = {}                # тег и все его родители → номера
+        self._values: Dict[str, Dict[str, Set[int]]] = {}   # свойство → значение → номера
+        self._links: Dict[str, Dict[str, Set[int]]] = {}    # свойство → заметка в [[...]] → номера
+        self._present: Dict[str, Set[int]] = {}             # свойство есть в заголовке
+        self._truthy: Dict[str, Set[int]] = {}              # свойство непустое и не false
+        self._outlinks: Dict[int, Set[int]] = {}
+        self._inlinks: Dict[int, Set[int]] = {}
+
+    def add_file(self, file_id: int, rel_path: str, tags: Iterable[str] = (),
+                 properties: Optional[Dict[str, List[str]]] = None):
+        lower = rel_path.lower()
+        folder, _, file_name = lower.rpartition("/")
+        stem, dot, ext = file_name.rpartition(".")
+        self.files.add(file_id)
+        if dot and ext == "md":
+            self.markdown.add(file_id)
+        self._paths[lower] = file_id
+        self._folders.setdefault(folder, set()).add(file_id)
+        self._names.setdefault(file_name, set()).add(file_id)
+        if dot:
+            self._names.setdefault(stem, set()).add(file_id)
+            self._exts.setdefault(ext, set()).add(file_id)
+        for tag in tags:
+            parts = tag.split("/")
+            for depth in range(1, len(parts) + 1):
+                self._tags.setdefault("/".join(parts[:depth]), set()).add(file_id)
+        for key, values in (properties or {}).items():
+            key = key.lower()
+            self._present.setdefault(key, set()).add(file_id)
+            if values and values != ["false"]:
+                self._truthy.setdefault(key, set()).add(file_id)
+            postings = self._values.setdefault(key, {})
+            for value in values:
+                postings.setdefault(value, set()).add(file_id)
+                for target in PROPERTY_LINK_RE.findall(value):
+                    self._links.setdefault(key, {}).setdefault(link_name(target), set()).add(file_id)
+
+    def add_link(self, source: int, target: int):
+        """Настоящая ссылка source → target (для `FROM [[...]]`, `outgoing(...)`, `file.hasLink`)."""
+        self._outlinks.setdefault(source, set()).add(target)
+        self._inlinks.setdefault(target, set()).add(source)
+
+    def _in_folder(self, folder: str, recursive: bool) -> Set[int]:
+        if not recursive:
+            return self._folders.get(folder, set())
+        prefix = folder + "/"
+        return set().union(*(ids for name, ids in self._folders.items() if name == folder or name.startswith(prefix)))
+
+    def _leaf(self, tree: Tree) -> Set[int]:
+        kind = tree[0]
+        if kind == "path":
+            file_id = self._paths.get(tree[1], self._paths.get(tree[1] + ".md"))
+            return {file_id} if file_id is not None else self._in_folder(tree[1], tree[2]) if tree[2] else set()
+        if kind == "folder":
+            return self._in_folder(tree[1], tree[2])
+        if kind == "folder_prefix":
+            return set().union(*(ids for name, ids in self._folders.items() if name.startswith(tree[1])))
+        if kind == "name":
+            return self._names.get(tree[1], set())
+        if kind == "name_has":
+            return set().union(*(ids for name, ids in self._names.items() if tree[1] in name))
+        if kind == "ext":
+            return self._exts.get(tree[1], set())
+        if kind == "tag":
+            return self._tags.get(tree[1], set())
+        if kind == "links_to":
+            return set().union(*(self._inlinks.get(target, ()) for target in self._names.get(tree[1], ())))
+        if kind == "linked_by":
+            return set().union(*(self._outlinks.get(source, ()) for source in self._names.get(tree[1], ())))
+        if kind == "eq":
+            return self._values.get(tree[1], {}).get(tree[2], set())
+        if kind == "has":
+            needle = tree[2].lower() if tree[3] else tree[2]
+            return set().union(*(ids for value, ids in self._values.get(tree[1], {}).items()
+                                 if needle in (value.lower() if tree[3] else value)))
+        if kind == "link":
+            return self._links.get(tree[1], {}).get(tree[2], set())
+        if kind == "exists":
+            return (self._truthy if tree[2] else self._present).get(tree[1], set())
+        raise QueryError(f"неизвестное условие {kind!r}")
+
+    def _eval(self, tree: Tree, universe: Set[int]) -> Tuple[Optional[Set[int]], bool]:
+        """(номера или None — "без ограничений", точен ли ответ)."""
+        kind = tree[0]
+        if kind == "all":
+            return None, True
+        if kind == "unknown":
+            return None, False
+        if kind == "and":
+            parts = [self._eval(sub, universe) for sub in tree[1:]]
+            exact = all(part_exact for _, part_exact in parts)
+            known = sorted((ids for ids, _ in parts if ids is not None), key=len)
+            return (known[0].intersection(*known[1:]) if known else None), exact
+        if kind == "or":
+            parts = [self._eval(sub, universe) for sub in tree[1:]]
+            exact = all(part_exact for _, part_exact in parts)
+            if any(ids is None for ids, _ in parts):
+                return None, exact
+            return set().union(*(ids for ids, _ in parts)), exact
+        if kind == "not":
+            ids, exact = self._eval(tree[1], universe)
+            if not exact:
+                return None, False
+            return (set() if ids is None else universe - ids), True
+        return self._leaf(tree), True
+
+    def evaluate(self, tree: Tree, universe: Set[int]) -> Optional[Set[int]]:
+        """Номера файлов из universe, которые выбирает запрос; None — запрос ничего не ограничивает или не разрешается."""
+        ids, _ = self._eval(tree, universe)
+        return None if ids is None else ids & universe
@@ -0,0 +1,307 @@
+"""
+Замена многих строк за один проход по тексту (автомат Ахо — Корасик).
+
+Все шаблоны словаря замен собираются в один автомат, поэтому каждый символ текста
+просматривается один раз, сколько бы шаблонов ни было. Из найденных вхождений
+выбираются непересекающиеся — самое левое, при равенстве самое длинное, — и заменяются
+разом: результат одной замены никогда не попадает под следующую.
+
+Для frontmatter замену можно ограничить:
+*   `keys` — только имена свойств (`Type:` → `tags:`), значения не трогаются;
+*   `values` — только значения;
+*   `all` — весь текст заголовка.
+С `whole_token=True` шаблон, начинающийся или заканчивающийся буквой/цифрой, совпадает
+только с целым словом: `Type` не заденет `Prototype` и `Types`.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import vault_frontmatter
+from vault_frontmatter import (
+    FrontmatterError, parse_frontmatter, read_frontmatter_text, split_frontmatter,
+)
+from vault_stream import write_text_atomically
+
+SCOPE_ALL = "all"
+SCOPE_KEYS = "keys"
+SCOPE_VALUES = "values"
+SCOPES = (SCOPE_ALL, SCOPE_KEYS, SCOPE_VALUES)
+
+# Имя свойства: `key:`, `  nested:`, `- key:` (в списке словарей), в том числе в кавычках.
+# Двоеточие должно стоять перед пробелом или концом строки, иначе это значение (`http://...`).
+# Используется без PyYAML: строки блочных (`|`, `>`) и многострочных значений в кавычках пропускаются
+_KEY_RE = re.compile(r"""[ \t]*(?:-[ \t]+)?("[^"\n]*"|'[^'\n]*'|[^\s#:'"\-][^:\n]*?)[ \t]*:(?=[ \t\r]|$)""")
+_BLOCK_SCALAR_RE = re.compile(r"[|>][-+0-9]*[ \t]*(?:#.*)?\r?$")
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class MultiReplacer:
+    """Словарь замен, собранный в автомат Ахо — Корасик."""
+
+    def __init__(self, mapping: Dict[str, str], whole_token: bool = False):
+        if any(not find for find in mapping):
+            raise ValueError("пустая строка не может быть шаблоном замены")
+        self.patterns: List[str] = list(mapping)
+        self.replacements: List[str] = [mapping[find] for find in self.patterns]
+        self.whole_token = whole_token
+        # Для whole_token: нужна ли граница слова слева/справа от шаблона
+        self._left_bound = [_is_word(p[0]) for p in self.patterns]
+        self._right_bound = [_is_word(p[-1]) for p in self.patterns]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._build()
+
+    def _build(self):
+        goto, out = self._goto, self._out
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    out.append(())
+                state = next_state
+            out[state] = (index,)
+        fail = self._fail = [0] * len(goto)
+        # Обход в ширину: ссылка неудачи узла ведет в самый длинный собственный суффикс,
+        # который тоже есть в боре; выходы суффиксов добавляются к выходам узла
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, child in goto[state].items():
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(char, 0)
+                fail[child] = target if target != child else 0
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+
+    def _all_matches(self, text: str, start: int, end: int) -> List[Tuple[int, int, int]]:
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        matches = []
+        state = 0
+        for position in range(start, end):
+            char = text[position]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for index in out[state]:
+                    matches.append((position + 1 - len(patterns[index]), position + 1, index))
+        return matches
+
+    def _on_boundary(self, text: str, start: int, end: int, index: int) -> bool:
+        if self._left_bound[index] and start > 0 and _is_word(text[start - 1]):
+            return False
+        if self._right_bound[index] and end < len(text) and _is_word(text[end]):
+            return False
+        return True
+
+    def find(self, text: str, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """Непересекающиеся вхождения (начало, конец, номер шаблона) в text[start:end] слева направо."""
+        matches = self._all_matches(text, start, len(text) if end is None else end)
+        if self.whole_token:
+            matches = [m for m in matches if self._on_boundary(text, *m)]
+        matches.sort(key=lambda m: (m[0], -m[1]))
+        chosen, covered = [], start
+        for match in matches:
+            if match[0] >= covered:
+                chosen.append(match)
+                covered = match[1]
+        return chosen
+
+    def replace(self, text: str, spans: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[str, int]:
+        """Заменяет вхождения (только внутри spans, если заданы) и возвращает (текст, число замен)."""
+        matches = []
+        for start, end in spans if spans is not None else [(0, len(text))]:
+            matches.extend(self.find(text, start, end))
+        if not matches:
+            return text, 0
+        parts, last = [], 0
+        for start, end, index in matches:
+            parts.append(text[last:start])
+            parts.append(self.replacements[index])
+            last = end
+        parts.append(text[last:])
+        return "".join(parts), len(matches)
+
+
+def key_spans(fm_text: str) -> List[Tuple[int, int]]:
+    """
+    Диапазоны имен свойств в тексте frontmatter (на любой глубине вложенности).
+    С PyYAML они берутся из дерева узлов (`yaml.compose`): строка `Type: ...` внутри
+    блочного значения `|` или многострочной строки в кавычках — это текст, а не свойство.
+    """
+    if vault_frontmatter.yaml is not None:
+        try:
+            root = vault_frontmatter.yaml.compose(fm_text, Loader=vault_frontmatter._SafeLoader)
+        except vault_frontmatter.yaml.YAMLError:
+            root = None
+        else:
+            spans: List[Tuple[int, int]] = []
+            _collect_key_spans(root, spans, set())
+            return sorted(spans)
+    return _line_key_spans(fm_text)
+
+
+def _collect_key_spans(node, spans: List[Tuple[int, int]], seen: set):
+    if node is None or id(node) in seen:
+        return
+    seen.add(id(node))  # узлы с якорями встречаются в дереве повторно
+    if node.id == "mapping":
+        for key, value in node.value:
+            if key.id == "scalar" and key.start_mark.index < key.end_mark.index:
+                spans.append((key.start_mark.index, key.end_mark.index))
+            _collect_key_spans(key, spans, seen)
+            _collect_key_spans(value, spans, seen)
+    elif node.id == "sequence":
+        for item in node.value:
+            _collect_key_spans(item, spans, seen)
+
+
+def _line_key_spans(fm_text: str) -> List[Tuple[int, int]]:
+    """Имена свойств по строкам (без PyYAML или если заголовок не разбирается)."""
+    spans = []
+    position = 0
+    skip_indent = None   # строки с большим отступом — продолжение блочного значения
+    quote = None         # незакрытая кавычка многострочного значения
+    for line in fm_text.split("\n"):
+        start, position = position, position + len(line) + 1
+        stripped = line.lstrip(" \t")
+        indent = len(line) - len(stripped)
+        if quote is not None:
+            if _closes_quote(stripped, quote):
+                quote = None
+            continue
+        if skip_indent is not None:
+            if not stripped.strip() or indent > skip_indent:
+                continue
+            skip_indent = None
+        match = _KEY_RE.match(line)
+        if not match:
+            continue
+        spans.append((start + match.start(1), start + match.end(1)))
+        value = line[match.end():].strip(" \t")
+        if _BLOCK_SCALAR_RE.match(value):
+            skip_indent = indent
+        elif value[:1] in ("'", '"') and not _closes_quote(value[1:], value[0]):
+            quote = value[0]
+    return spans
+
+
+def _closes_quote(text: str, quote: str) -> bool:
+    """Есть ли в тексте закрывающая кавычка (с учетом `''` и `\\"`)."""
+    if quote == "'":
+        return "'" in text.replace("''", "")
+    return '"' in re.sub(r'\\.', '', text)
+
+
+def scope_spans(fm_text: str, scope: str) -> List[Tuple[int, int]]:
+    """Диапазоны текста frontmatter, в которых разрешена замена."""
+    if scope == SCOPE_ALL:
+        return [(0, len(fm_text))]
+    keys = key_spans(fm_text)
+    if scope == SCOPE_KEYS:
+        return keys
+    if scope != SCOPE_VALUES:
+        raise ValueError(f"неизвестная область замены: {scope!r} (допустимо: {', '.join(SCOPES)})")
+    spans, last = [], 0
+    for start, end in keys:
+        spans.append((last, start))
+        last = end
+    spans.append((last, len(fm_text)))
+    return [(start, end) for start, end in spans if start < end]
+
+
+def _parse(fm_text: str):
+    return parse_frontmatter(fm_text.replace("\r\n", "\n"))
+
+
+def replace_in_frontmatter(fm_text: str, replacer: MultiReplacer, scope: str = SCOPE_ALL) -> Tuple[Optional[str], int]:
+    """
+    Заменяет вхождения в тексте frontmatter и возвращает (новый текст, число замен).
+    Если после замены заголовок перестал разбираться или два свойства слились в одно
+    (`Type` → `tags` при уже существующем `tags`), а для области `keys` — если изменилось
+    хоть одно значение, возвращает (None, число замен).
+    """
+    new_text, count = replacer.replace(fm_text, scope_spans(fm_text, scope))
+    if not count:
+        return fm_text, 0
+    try:
+        original = _parse(fm_text)
+    except FrontmatterError:
+        return new_text, count  # заголовок и раньше не разбирался — меняем только текст
+    try:
+        updated = _parse(new_text)
+    except FrontmatterError:
+        return None, count
+    if isinstance(original, dict) and (not isinstance(updated, dict) or len(updated) != len(original)):
+        return None, count
+    if scope == SCOPE_KEYS and _values_only(original) != _values_only(updated):
+        return None, count  # переименование свойств не должно менять ни одного значения
+    return new_text, count
+
+
+def _values_only(data):
+    """Значения заголовка без имен свойств (словари — списками значений по порядку)."""
+    if isinstance(data, dict):
+        return [_values_only(value) for value in data.values()]
+    if isinstance(data, list):
+        return [_values_only(item) for item in data]
+    return data
+
+
+REPLACE_CHANGED = "changed"
+REPLACE_UNCHANGED = "unchanged"
+REPLACE_NO_FRONTMATTER = "no_frontmatter"
+REPLACE_UNSAFE = "unsafe"  # после замены YAML сломался или свойства слились — файл не тронут
+
+
+def replace_in_file(file_path: str, replacer: MultiReplacer, scope: str = SCOPE_ALL, dry_run: bool = False) -> Tuple[str, int]:
+    """
+    Заменяет вхождения во frontmatter файла и возвращает (итог, число замен).
+    Сначала читается только заголовок; файл целиком читается и перезаписывается
+    (атомарно, с прежними переводами строк) лишь тогда, когда в заголовке есть что менять.
+    """
+    try:
+        head = read_frontmatter_text(file_path)
+    except FrontmatterError:
+        return REPLACE_NO_FRONTMATTER, 0
+    if head is None:
+        return REPLACE_NO_FRONTMATTER, 0
+    if not replacer.find(head):
+        return REPLACE_UNCHANGED, 0
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        content = f.read()
+    span = split_frontmatter(content)
+    if span is None:
+        return REPLACE_NO_FRONTMATTER, 0
+    start, end = span
+    new_fm_text, count = replace_in_frontmatter(content[start:end], replacer, scope)
+    if new_fm_text is None:
+        return REPLACE_UNSAFE, count
+    if not count:
+        return REPLACE_UNCHANGED, 0
+    if not dry_run:
+        write_text_atomically(file_path, content[:start] + new_fm_text + content[end:], newline="")
+    return REPLACE_CHANGED, count
+
+
+def replace_in_files(root: str, rel_paths: List[str], replacer: MultiReplacer, scope: str = SCOPE_ALL,
+                     dry_run: bool = False) -> List[Tuple[str, str, int, Optional[str]]]:
+    """replace_in_file для пачки файлов (удобно отдавать рабочим процессам): (путь, итог, замен, ошибка)."""
+    results = []
+    for rel_path in rel_paths:
+        try:
+            status, count = replace_in_file(os.path.join(root, rel_path), replacer, scope, dry_run)
+            results.append((rel_path, status, count, None))
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((rel_path, REPLACE_UNSAFE, 0, f"{type(e).__name__}: {e}"))
+    return results
@@ -0,0 +1,162 @@
+"""
+Потоковая построчная перезапись файлов.
+
+Преобразование — это генератор `transform(lines) -> pieces`: он получает строки файла
+по одной (с '\\n' на конце, как readlines()) и выдает куски нового текста. Файл целиком
+в память не читается, поэтому пиковое потребление не зависит от размера заметки.
+
+`stream_rewrite` сверяет выход преобразования с исходным файлом по мере работы. Пока они
+совпадают, ничего не пишется; временный файл рядом с исходным создается только при первом
+расхождении (совпавшее начало копируется в него из исходного файла) и в конце атомарно
+подменяет исходный через os.replace. Если файл не изменился, он не перезаписывается.
+"""
+import os
+import shutil
+import tempfile
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+LineTransform = Callable[[Iterator[str]], Iterable[str]]
+
+# Размер блока при копировании совпавшего начала файла и при сверке с исходным
+COPY_CHUNK_CHARS = 1 << 20
+COMPARE_CHUNK_CHARS = 1 << 16
+TEMP_PREFIX = ".vault_stream_"
+
+
+def split_lines(text: str) -> Iterator[str]:
+    """Делит текст по '\\n' с сохранением переводов строк — так же, как readlines() для файла."""
+    start = 0
+    while (end := text.find("\n", start)) != -1:
+        yield text[start:end + 1]
+        start = end + 1
+    if start < len(text):
+        yield text[start:]
+
+
+def transform_text(text: str, transform: LineTransform) -> str:
+    """Применяет построчное преобразование к строке целиком."""
+    return "".join(transform(split_lines(text)))
+
+
+def write_text_atomically(file_path: str, content: str, newline: Optional[str] = None):
+    """
+    Пишет текст во временный файл рядом и подменяет им исходный: файл не останется недописанным.
+    newline='' записывает переводы строк как есть (для текста, прочитанного с newline='').
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), prefix=TEMP_PREFIX, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            f.write(content)
+        _commit(tmp_path, file_path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+
+def _commit(tmp_path: str, file_path: str):
+    if os.path.exists(file_path):
+        shutil.copymode(file_path, tmp_path)
+    os.replace(tmp_path, file_path)
+
+
+def _discard(tmp_path: str):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+class _SourceCursor:
+    """Сравнивает куски выхода с исходным файлом, читая его блоками."""
+
+    def __init__(self, source: TextIO):
+        self._source = source
+        self._buffer = ""
+        self._pos = 0
+
+    def _fill(self, size: int) -> bool:
+        if self._pos + size <= len(self._buffer):
+            return True
+        self._buffer = self._buffer[self._pos:] + self._source.read(max(size, COMPARE_CHUNK_CHARS))
+        self._pos = 0
+        return size <= len(self._buffer)
+
+    def match(self, piece: str) -> bool:
+        """True и сдвиг вперед, если исходный текст в текущей позиции начинается с piece."""
+        if self._fill(len(piece)) and self._buffer.startswith(piece, self._pos):
+            self._pos += len(piece)
+            return True
+        return False
+
+    def at_end(self) -> bool:
+        return not self._fill(1)
+
+
+class _LazyWriter:
+    """Временный файл, который создается только при первом расхождении с исходным."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.tmp_path: Optional[str] = None
+        self._file: Optional[TextIO] = None
+
+    def open_with_prefix(self, matched_chars: int):
+        """Создает временный файл и копирует в него первые matched_chars символов исходного."""
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file_path)), prefix=TEMP_PREFIX, suffix=".tmp")
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        with open(self.file_path, "r", encoding="utf-8") as source:
+            remaining = matched_chars
+            while remaining:
+                chunk = source.read(min(remaining, COPY_CHUNK_CHARS))
+                if not chunk:
+                    break
+                self._file.write(chunk)
+                remaining -= len(chunk)
+
+    @property
+    def opened(self) -> bool:
+        return self._file is not None
+
+    def write(self, piece: str):
+        self._file.write(piece)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def stream_rewrite(file_path: str, transform: LineTransform, dry_run: bool = False) -> bool:
+    """
+    Пропускает файл через построчное преобразование. Возвращает True, если текст изменился
+    (при dry_run=True файл при этом не записывается).
+    """
+    writer = _LazyWriter(file_path)
+    matched = 0  # сколько символов выхода совпало с исходным текстом
+    try:
+        with open(file_path, "r", encoding="utf-8") as source, open(file_path, "r", encoding="utf-8") as original:
+            cursor = _SourceCursor(original)
+            for piece in transform(iter(source)):
+                if not piece:
+                    continue
+                if writer.opened:
+                    writer.write(piece)
+                    continue
+                if cursor.match(piece):
+                    matched += len(piece)
+                    continue
+                if dry_run:
+                    return True
+                writer.open_with_prefix(matched)
+                writer.write(piece)
+            if not writer.opened:
+                if cursor.at_end():
+                    return False  # выход совпал с файлом целиком
+                if dry_run:
+                    return True
+                writer.open_with_prefix(matched)  # выход оказался короче исходного
+        writer.close()
+        _commit(writer.tmp_path, file_path)
+        return True
+    except BaseException:
+        writer.close()
+        if writer.tmp_path is not None:
+            _discard(writer.tmp_path)
+        raise
@@ -0,0 +1,269 @@
+"""
+Генератор синтетического хранилища Obsidian для замеров скорости.
+
+Хранилище строится детерминированно: при одинаковых параметрах и `seed` получаются
+одинаковые файлы с одинаковым содержимым. В заметках встречается всё, что разбирают
+инструменты репозитория:
+*   вики-ссылки (с псевдонимами и заголовками), inline-ссылки на относительные пути, битые ссылки;
+*   повторяющиеся имена файлов в разных папках;
+*   frontmatter разной формы: `type` строкой и списком, `status` строкой, списком и 'important',
+    `Area`, `tags` в виде [..], `wikilinks` на заметки-хабы, `banner` со ссылкой на вложение;
+*   хабы с блоками ```dataview (wikilinks.contains(link(...))), блоки ```dataviewjs с разделителем
+    '---' и без него, строки INPUT[inlineSelect(...):status];
+*   вложения (PNG) и их встраивания `![[...]]`, флеш-карточки `![[...]]::...`, чекбоксы.
+
+Кроме хранилища создается папка с конфигами obsidian_updater (separator_remove.yml, конфиг
+замены и файл-шаблон), чтобы операции обновления можно было запускать на этом хранилище.
+
+Запуск: python vault_synth.py <папка> --notes 10000 [--seed 42]
+"""
+import argparse
+import os
+import random
+from dataclasses import dataclass, asdict
+from typing import List, Tuple
+
+START_NOTE_NAME = "Start.md"
+ATTACHMENTS_FOLDER = "attachments"
+UPDATER_CONFIG_FOLDER = "updater"
+REPLACE_CONFIG_NAME = "synth_replace.yml"
+REFERENCE_FILE_NAME = "synth_reference.md"
+
+# Минимальный корректный PNG 1x1: содержимое вложений не важно, важны их имена и число
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000005000177a3b3720000000049454e44ae426082"
+)
+
+WORDS = (
+    "заметка", "проект", "идея", "задача", "обзор", "музыка", "гармония", "ритм", "план",
+    "источник", "цитата", "вывод", "черновик", "вопрос", "note", "draft", "review", "scale",
+)
+
+
+@dataclass
+class SynthConfig:
+    """Параметры синтетического хранилища."""
+    notes: int = 1000
+    folder_depth: int = 3                 # глубина дерева папок
+    folders_per_level: int = 4            # подпапок в каждой папке
+    link_density: float = 5.0             # среднее число ссылок из заметки
+    inline_link_ratio: float = 0.2        # доля ссылок вида [текст](путь.md)
+    broken_link_ratio: float = 0.02       # доля ссылок на несуществующие заметки
+    duplicate_basename_ratio: float = 0.05  # доля заметок с именем, которое уже есть в другой папке
+    frontmatter_ratio: float = 0.9        # доля заметок с frontmatter
+    type_list_ratio: float = 0.2          # доля заметок, у которых `type` — список
+    status_list_ratio: float = 0.1        # доля заметок со `status` в виде списка
+    status_important_ratio: float = 0.05  # доля заметок со `status: important`
+    flow_tags_ratio: float = 0.2          # доля заметок с `tags: [..]` (разбирается PyYAML)
+    hub_count: int = 20                   # число заметок-хабов с блоками ```dataview
+    wikilinks_hub_ratio: float = 0.3      # доля заметок со свойством `wikilinks` на хабы
+    dataviewjs_ratio: float = 0.2         # доля заметок с блоком ```dataviewjs
+    dataviewjs_separator_ratio: float = 0.5  # доля блоков dataviewjs с разделителем '---' после
+    inline_select_ratio: float = 0.1      # доля заметок со строкой INPUT[inlineSelect(...):status]
+    attachments: int = 200                # число вложений (PNG)
+    embed_density: float = 0.5            # среднее число встраиваний вложений в заметке
+    flashcard_ratio: float = 0.05         # доля заметок со списком флеш-карточек
+    checkbox_ratio: float = 0.2           # доля заметок с чекбоксами
+    paragraphs: int = 3                   # абзацев текста в заметке
+    seed: int = 42
+
+
+@dataclass
+class SynthSummary:
+    """Что было создано."""
+    vault_path: str
+    updater_config_dir: str
+    start_note: str
+    notes: int
+    folders: int
+    attachments: int
+    links: int
+    broken_links: int
+    embeds: int
+    dataviewjs_blocks: int
+
+
+def _build_folders(rng: random.Random, depth: int, per_level: int) -> List[str]:
+    folders = [""]
+    level = [""]
+    for depth_index in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(per_level):
+                name = f"Area {i + 1:02d}" if depth_index == 0 else f"{rng.choice(WORDS).capitalize()} {depth_index}-{i + 1:02d}"
+                next_level.append(f"{parent}/{name}" if parent else name)
+        folders.extend(next_level)
+        level = next_level
+    # Корень хранилища не используется для заметок (find_orphans по умолчанию его пропускает)
+    return folders[1:] or ["Notes"]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _note_paths(rng: random.Random, config: SynthConfig, folders: List[str]) -> List[str]:
+    paths = [f"{folders[0]}/{START_NOTE_NAME}"]
+    paths += [f"{rng.choice(folders)}/Hub {i + 1:03d}.md" for i in range(config.hub_count)]
+    used = set(paths)
+    names = []
+    while len(paths) < config.notes:
+        if names and rng.random() < config.duplicate_basename_ratio:
+            name = rng.choice(names)
+        else:
+            name = f"Note {len(paths):06d}.md"
+            names.append(name)
+        path = f"{rng.choice(folders)}/{name}"
+        if path not in used:
+            used.add(path)
+            paths.append(path)
+    return paths[:config.notes]
+
+
+def _frontmatter(rng: random.Random, config: SynthConfig, folder: str, hubs: List[str], attachments: List[str]) -> str:
+    lines = ["---"]
+    types = ("project", "note", "wiki", "diary", "taskhub", "sourcehub")
+    if rng.random() < config.type_list_ratio:
+        lines.append("type:")
+        lines += [f"  - {value}" for value in rng.sample(types, 2)]
+    else:
+        lines.append(f"type: {rng.choice(types)}")
+    roll = rng.random()
+    if roll < config.status_list_ratio:
+        lines += ["status:", "  - in progress", "  - waiting"]
+    elif roll < config.status_list_ratio + config.status_important_ratio:
+        lines.append("status: important")
+    else:
+        lines.append(f"status: {rng.choice(('todo', 'in progress', 'done'))}")
+    lines.append(f"Area: {folder.split('/', 1)[0]}")
+    if rng.random() < config.flow_tags_ratio:
+        lines.append(f"tags: [{rng.choice(WORDS)}, {rng.choice(WORDS)}]")
+    if hubs and rng.random() < config.wikilinks_hub_ratio:
+        lines.append("wikilinks:")
+        lines += [f'  - "[[{hub}]]"' for hub in sorted(set(rng.sample(hubs, min(2, len(hubs)))))]
+    if attachments and rng.random() < 0.05:
+        lines.append(f'banner: "{ATTACHMENTS_FOLDER}/{rng.choice(attachments)}"')
+    lines.append("---")
+    return "\n".join(lines) + "\n"
+
+
+def _dataviewjs_block(rng: random.Random, with_separator: bool) -> str:
+    block = f"```dataviewjs\nconst pages = dv.pages('\"{rng.choice(WORDS)}\"');\ndv.table([\"Файл\"], pages.map(p => [p.file.link]));\n```\n"
+    return block + ("---\n" if with_separator else "")
+
+
+def _link(rng: random.Random, config: SynthConfig, source: str, paths: List[str]) -> Tuple[str, bool]:
+    """Возвращает (текст ссылки, битая ли она)."""
+    if rng.random() < config.broken_link_ratio:
+        return f"[[Missing {rng.randrange(10 ** 6):06d}]]", True
+    target = rng.choice(paths)
+    stem = target.rsplit("/", 1)[1][:-3]
+    if rng.random() < config.inline_link_ratio:
+        relative = os.path.relpath(target, os.path.dirname(source) or ".").replace("\\", "/")
+        return f"[{stem}]({relative.replace(' ', '%20')})", False
+    suffix = rng.choice(("", "", "", f"|{_text(rng, 1)}", "#Раздел"))
+    return f"[[{stem}{suffix}]]", False
+
+
+def _note(rng: random.Random, config: SynthConfig, path: str, paths: List[str], hubs: List[str], attachments: List[str], counters: dict) -> str:
+    folder, name = path.rsplit("/", 1)
+    parts = []
+    if rng.random() < config.frontmatter_ratio:
+        parts.append(_frontmatter(rng, config, folder, hubs, attachments))
+    parts.append(f"# {name[:-3]}\n")
+
+    if name.startswith("Hub "):
+        hub_name = name[:-3]
+        query = rng.choice((f'link("{hub_name}")', "link(this.file.name)"))
+        parts.append(f"```dataview\nLIST\nWHERE wikilinks.contains({query})\n```\n")
+
+    links_count = round(rng.expovariate(1 / config.link_density)) if config.link_density > 0 else 0
+    if name == START_NOTE_NAME:
+        links_count = max(links_count, 10)
+    paragraphs = [[_text(rng, rng.randint(8, 20))] for _ in range(max(1, config.paragraphs))]
+    for _ in range(links_count):
+        link, broken = _link(rng, config, path, paths)
+        rng.choice(paragraphs).append(link)
+        counters["links"] += 1
+        counters["broken_links"] += broken
+    parts.extend(" ".join(paragraph) + "\n" for paragraph in paragraphs)
+
+    if rng.random() < config.dataviewjs_ratio:
+        parts.append(_dataviewjs_block(rng, rng.random() < config.dataviewjs_separator_ratio))
+        counters["dataviewjs_blocks"] += 1
+    if rng.random() < config.inline_select_ratio:
+        parts.append("Статус: `INPUT[inlineSelect(option(todo), option(done)):status]`\n")
+    if attachments:
+        for _ in range(int(rng.expovariate(1 / config.embed_density)) if config.embed_density > 0 else 0):
+            parts.append(f"![[{rng.choice(attachments)}{rng.choice(('', '', '|300'))}]]\n")
+            counters["embeds"] += 1
+        if rng.random() < config.flashcard_ratio:
+            for image in rng.sample(attachments, min(len(attachments), rng.randint(3, 25))):
+                parts.append(f"![[{image}]]::{image.rsplit('.', 1)[0]}\n")
+                counters["embeds"] += 1
+    if rng.random() < config.checkbox_ratio:
+        parts.append("".join(f"{rng.choice(('', '> '))}- [{rng.choice(' x')}] {_text(rng, 4)}\n" for _ in range(rng.randint(1, 6))))
+    return "\n".join(parts)
+
+
+def generate_vault(vault_path: str, config: SynthConfig) -> SynthSummary:
+    """Создает хранилище в `vault_path` (папка должна быть пустой или отсутствовать)."""
+    if os.path.isdir(vault_path) and os.listdir(vault_path):
+        raise ValueError(f"Папка '{vault_path}' не пуста")
+    rng = random.Random(config.seed)
+    folders = _build_folders(rng, config.folder_depth, config.folders_per_level)
+    paths = _note_paths(rng, config, folders)
+    hubs = [path.rsplit("/", 1)[1][:-3] for path in paths if path.rsplit("/", 1)[1].startswith("Hub ")]
+    attachments = [f"img_{i + 1:05d}.png" for i in range(config.attachments)]
+    counters = {"links": 0, "broken_links": 0, "embeds": 0, "dataviewjs_blocks": 0}
+
+    for folder in folders:
+        os.makedirs(os.path.join(vault_path, folder), exist_ok=True)
+    for path in paths:
+        content = _note(rng, config, path, paths, hubs, attachments, counters)
+        with open(os.path.join(vault_path, path), "w", encoding="utf-8", newline="\n") as f:
+            f.write(content)
+    if attachments:
+        os.makedirs(os.path.join(vault_path, ATTACHMENTS_FOLDER), exist_ok=True)
+        for image in attachments:
+            with open(os.path.join(vault_path, ATTACHMENTS_FOLDER, image), "wb") as f:
+                f.write(TINY_PNG)
+
+    updater_config_dir = os.path.join(os.path.dirname(os.path.abspath(vault_path)), os.path.basename(os.path.abspath(vault_path)) + "_" + UPDATER_CONFIG_FOLDER)
+    write_updater_configs(updater_config_dir, rng)
+    return SynthSummary(
+        vault_path=vault_path, updater_config_dir=updater_config_dir, start_note=START_NOTE_NAME,
+        notes=len(paths), folders=len(folders), attachments=len(attachments), **counters
+    )
+
+
+def write_updater_configs(config_dir: str, rng: random.Random):
+    """Конфиги obsidian_updater для синтетического хранилища: отчеты пишутся в ту же папку."""
+    os.makedirs(config_dir, exist_ok=True)
+    reference_path = os.path.join(config_dir, REFERENCE_FILE_NAME).replace("\\", "/")
+    with open(reference_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("# Шаблон\n\n" + _dataviewjs_block(rng, with_separator=True))
+    with open(os.path.join(config_dir, REPLACE_CONFIG_NAME), "w", encoding="utf-8") as f:
+        f.write(f'reference_file_path: "{reference_path}"\nspecial_file_names: []\ntarget_types:\n  - project\n  - taskhub\nreport_file_name: "synth_replace_report.md"\n')
+    with open(os.path.join(config_dir, "separator_remove.yml"), "w", encoding="utf-8") as f:
+        f.write('report_file_name: "synth_report.md"\nexclude_configs: []\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Создает детерминированное синтетическое хранилище Obsidian.")
+    parser.add_argument("vault_path", help="Папка нового хранилища (пустая или несуществующая)")
+    defaults = SynthConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args())
+    vault_path = args.pop("vault_path")
+    summary = generate_vault(vault_path, SynthConfig(**args))
+    print(f"✅ Создано хранилище '{summary.vault_path}': {summary.notes} заметок в {summary.folders} папках, "
+          f"{summary.links} ссылок ({summary.broken_links} битых), {summary.attachments} вложений, "
+          f"{summary.dataviewjs_blocks} блоков dataviewjs.")
+    print(f"ℹ️ Конфиги obsidian_updater: {summary.updater_config_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Общий слой замеров для инструментов хранилища.
+
+`Telemetry` собирает за один запуск:
+*   время по фазам (обход папок, чтение, декодирование, разбор frontmatter, поиск ссылок
+    регулярными выражениями, построение графа, отчет, запись) — для вложенных фаз
+    считается "собственное" время, поэтому сумма фаз не превышает время работы;
+*   счетчики (файлы, байты, попадания в кэш и т.д.);
+*   N самых медленных файлов;
+*   по желанию — профиль cProfile и пиковое потребление памяти tracemalloc.
+
+Профилирование включается параметром `profile` или переменной окружения OBSIDIAN_PROFILE:
+"cpu", "memory" или "all" (можно через запятую). Итоги печатаются в консоль и сохраняются в JSON.
+
+Пока запуск активен (`with Telemetry(...)`), функции `phase()`, `count()` и `read_text()`
+этого модуля пишут в него; без активного запуска они ничего не замеряют. Вопросы пользователю
+задаются через `ask()`: время ожидания ответа не входит ни в общее время, ни в фазы, ни в
+профиль, поэтому замеры интерактивного и пакетного запуска сравнимы.
+"""
+import cProfile
+import heapq
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# --- ФАЗЫ ---
+PHASE_WALK = "walk"                      # обход папок хранилища
+PHASE_READ = "read"                      # чтение байтов с диска
+PHASE_DECODE = "decode"                  # декодирование UTF-8 и переводы строк
+PHASE_FRONTMATTER = "frontmatter_parse"  # разбор YAML frontmatter
+PHASE_REGEX = "regex"                    # поиск ссылок, блоков и строк в тексте
+PHASE_GRAPH = "graph"                    # построение графа ссылок и обход
+PHASE_REPORT = "report"                  # подготовка отчета
+PHASE_WRITE = "write"                    # запись файлов (отчеты, кэш, изменения)
+
+# --- ПРОФИЛИРОВАНИЕ ---
+PROFILE_ENV_VAR = "OBSIDIAN_PROFILE"
+PROFILE_CPU = "cpu"
+PROFILE_MEMORY = "memory"
+PROFILE_ALL = frozenset({PROFILE_CPU, PROFILE_MEMORY})
+# Сколько самых "дорогих" функций и строк выделения памяти попадает в JSON
+PROFILE_TOP_ENTRIES = 15
+
+# Сколько самых медленных файлов хранить
+TOP_SLOWEST_FILES = 20
+
+
+def parse_profile_modes(value: Optional[str]) -> FrozenSet[str]:
+    """'cpu', 'memory', 'all', '1' или их список через запятую -> набор режимов профилирования."""
+    modes = set()
+    for item in (value or "").lower().replace(" ", "").split(","):
+        if item in ("all", "1", "true", "yes"):
+            modes |= PROFILE_ALL
+        elif item in PROFILE_ALL:
+            modes.add(item)
+        elif item and item not in ("0", "false", "no"):
+            print(f"⚠️ Неизвестный режим профилирования '{item}' (допустимы: cpu, memory, all)")
+    return frozenset(modes)
+
+
+def decode_text(data: bytes) -> str:
+    """Декодирует UTF-8 и приводит переводы строк к '\\n' — так же, как open(..., 'r', encoding='utf-8')."""
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def read_text_timed(path) -> Tuple[str, int, float, float]:
+    """
+    Читает текстовый файл, раздельно замеряя чтение и декодирование.
+    Возвращает (текст, размер в байтах, время чтения, время декодирования).
+    Подходит для рабочих процессов, где активного замера нет.
+    """
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    read_done = time.perf_counter()
+    text = decode_text(data)
+    return text, len(data), read_done - started, time.perf_counter() - read_done
+
+
+@dataclass(slots=True)
+class PhaseStats:
+    seconds: float = 0.0  # собственное время (без вложенных фаз)
+    calls: int = 0
+
+
+class _PhaseTimer:
+    """Контекстный менеджер одной фазы: время вложенных фаз вычитается из родительской."""
+    __slots__ = ("telemetry", "name", "started", "child_seconds")
+
+    def __init__(self, telemetry: "Telemetry", name: str):
+        self.telemetry = telemetry
+        self.name = name
+
+    def __enter__(self):
+        self.child_seconds = 0.0
+        self.telemetry._stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        stack = self.telemetry._stack
+        stack.pop()
+        if stack:
+            stack[-1].child_seconds += elapsed
+        self.telemetry.add_phase_time(self.name, elapsed - self.child_seconds)
+        return False
+
+
+class _Pause:
+    """Контекст, время которого вычитается из общего времени запуска и из текущей фазы."""
+    __slots__ = ("telemetry", "started")
+
+    def __init__(self, telemetry: "Telemetry"):
+        self.telemetry = telemetry
+
+    def __enter__(self):
+        if self.telemetry._profiler is not None:
+            self.telemetry._profiler.disable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        paused = time.perf_counter() - self.started
+        self.telemetry.paused_seconds += paused
+        if self.telemetry._stack:
+            self.telemetry._stack[-1].child_seconds += paused
+        if self.telemetry._profiler is not None:
+            self.telemetry._profiler.enable()
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+_active: Optional["Telemetry"] = None
+
+
+class Telemetry:
+    """Замеры одного запуска инструмента. Используется как контекстный менеджер."""
+
+    def __init__(self, tool: str, profile: Optional[str] = None, top_n: int = TOP_SLOWEST_FILES):
+        self.tool = tool
+        self.profile_modes = parse_profile_modes(profile if profile is not None else os.environ.get(PROFILE_ENV_VAR))
+        self.top_n = top_n
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.started_at: Optional[str] = None
+        self.wall_seconds = 0.0
+        self.paused_seconds = 0.0  # ожидание ответов пользователя (не входит в wall_seconds)
+        self._stack: List[_PhaseTimer] = []
+        self._slowest: List[Tuple[float, str, int]] = []  # мин-куча (секунды, файл, байты)
+        self._started = 0.0
+        self._paused_before = 0.0
+        self._previous: Optional[Telemetry] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self.cpu_profile: List[dict] = []
+        self.memory_profile: Optional[dict] = None
+
+    # --- ЗАПУСК ---
+    def __enter__(self) -> "Telemetry":
+        global _active
+        self._previous, _active = _active, self
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        if PROFILE_MEMORY in self.profile_modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if PROFILE_CPU in self.profile_modes:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._started = time.perf_counter()
+        self._paused_before = self.paused_seconds
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        self.wall_seconds += time.perf_counter() - self._started - (self.paused_seconds - self._paused_before)
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.cpu_profile = _top_functions(self._profiler)
+        if PROFILE_MEMORY in self.profile_modes and tracemalloc.is_tracing():
+            self.memory_profile = _memory_snapshot()
+            tracemalloc.stop()
+        _active = self._previous
+        return False
+
+    # --- ЗАМЕРЫ ---
+    def phase(self, name: str) -> _PhaseTimer:
+        return _PhaseTimer(self, name)
+
+    def pause(self) -> _Pause:
+        return _Pause(self)
+
+    def add_phase_time(self, name: str, seconds: float, calls: int = 1):
+        """Добавляет готовый замер фазы (например, присланный рабочим процессом)."""
+        if (stats := self.phases.get(name)) is None:
+            stats = self.phases[name] = PhaseStats()
+        stats.seconds += seconds
+        stats.calls += calls
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_file(self, path: str, seconds: float, size: int = 0):
+        """Запоминает время обработки файла (хранятся только top_n самых медленных)."""
+        item = (seconds, str(path), size)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, item)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def read_text(self, path) -> str:
+        """Читает файл с замером фаз чтения и декодирования и счетчиком байтов."""
+        text, size, read_seconds, decode_seconds = read_text_timed(path)
+        self.add_phase_time(PHASE_READ, read_seconds)
+        self.add_phase_time(PHASE_DECODE, decode_seconds)
+        self.count("bytes_read", size)
+        if self._stack:
+            self._stack[-1].child_seconds += read_seconds + decode_seconds
+        return text
+
+    # --- ИТОГИ ---
+    def slowest_files(self) -> List[dict]:
+        return [
+            {"file": path, "seconds": round(seconds, 6), "bytes": size}
+            for seconds, path, size in sorted(self._slowest, reverse=True)
+        ]
+
+    def to_dict(self) -> dict:
+        data = {
+            "tool": self.tool,
+            "started_at": self.started_at,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "paused_seconds": round(self.paused_seconds, 6),
+            "phases": {
+                name: {"seconds": round(stats.seconds, 6), "calls": stats.calls}
+                for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].seconds)
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "slowest_files": self.slowest_files(),
+        }
+        if self.cpu_profile:
+            data["cpu_profile"] = self.cpu_profile
+        if self.memory_profile:
+            data["memory_profile"] = self.memory_profile
+        return data
+
+    def print_summary(self, limit: int = 5):
+        print(f"\n⏱️  Замеры ({self.tool}): всего {self.wall_seconds:.2f} сек.")
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].seconds):
+            print(f"  - {name}: {stats.seconds:.3f} сек. ({stats.calls} раз)")
+        if self.counters:
+            print("  Счетчики: " + ", ".join(f"{name}={value}" for name, value in sorted(self.counters.items())))
+        if slowest := self.slowest_files()[:limit]:
+            print("  Самые медленные файлы:")
+            for item in slowest:
+                print(f"    {item['seconds'] * 1000:8.1f} мс  {item['file']}")
+        if self.memory_profile:
+            print(f"  Пик памяти (tracemalloc): {self.memory_profile['peak_bytes'] / 1024 / 1024:.1f} МБ")
+
+    def write_json(self, path: str) -> Optional[str]:
+        """Сохраняет итоги в JSON; профиль cProfile (если снят) — рядом, в файл .prof."""
+        data = self.to_dict()
+        try:
+            if self._profiler is not None:
+                profile_path = os.path.splitext(path)[0] + ".prof"
+                self._profiler.dump_stats(profile_path)
+                data["cpu_profile_path"] = profile_path
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"📄 Замеры сохранены в: {path}")
+            return path
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить замеры: {e}")
+            return None
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[dict]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    entries = []
+    for (file_name, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        entries.append({
+            "function": f"{os.path.basename(file_name)}:{line}({function})",
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        })
+    entries.sort(key=lambda entry: -entry["cumulative_seconds"])
+    return entries[:PROFILE_TOP_ENTRIES]
+
+
+def _memory_snapshot() -> dict:
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP_ENTRIES]
+    return {
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top_allocations": [
+            {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "bytes": stat.size, "blocks": stat.count}
+            for stat in top
+        ],
+    }
+
+
+# --- ФУНКЦИИ ДЛЯ АКТИВНОГО ЗАПУСКА ---
+def active() -> Optional[Telemetry]:
+    """Текущий активный запуск замеров или None."""
+    return _active
+
+
+def phase(name: str):
+    """Замер фазы активного запуска (без активного запуска — пустой контекст)."""
+    return _PhaseTimer(_active, name) if _active is not None else _NULL_PHASE
+
+
+def pause():
+    """Контекст без замеров активного запуска (например, ожидание ответа пользователя)."""
+    return _Pause(_active) if _active is not None else _NULL_PHASE
+
+
+def ask(prompt: str = "") -> str:
+    """input(), время ожидания ответа которого не входит в замеры активного запуска."""
+    with pause():
+        return input(prompt)
+
+
+def count(name: str, value: int = 1):
+    if _active is not None:
+        _active.count(name, value)
+
+
+def read_text(path) -> str:
+    """Читает текстовый файл UTF-8; при активном запуске замеряет чтение и декодирование."""
+    if _active is not None:
+        return _active.read_text(path)
+    with open(path, "rb") as f:
+        return decode_text(f.read())
@@ -0,0 +1,391 @@
+"""
+Триграммный индекс содержимого заметок для предварительного отбора файлов перед поиском регуляркой.
+
+Для каждой заметки хранится сигнатура — фильтр Блума по ее триграммам (три подряд идущих
+байта UTF-8 текста после `fold_case()`: посимвольного приведения регистра, как его делает `re`
+с флагом IGNORECASE). Размер сигнатуры растет с числом разных триграмм
+заметки (от 32 байт до 4 КБ), поэтому индекс занимает заметно меньше самих заметок.
+
+`plan_regex(pattern)` разбирает регулярное выражение (модулем `re._parser`, он же `sre_parse`)
+и выводит из него запрос: какие литералы обязаны встретиться в совпадении — с `and` для
+последовательности и `or` для альтернатив. `index.candidates(plan)` отбирает заметки, сигнатуры
+которых содержат все нужные триграммы; фильтр Блума может дать лишнего кандидата, но никогда
+не пропускает заметку, в которой есть совпадение. Регулярка без обязательных литералов длиной
+от трех байт отбирает все заметки.
+
+    index = build_trigram_index(vault, cache_path="content_trigrams.bin")
+    for rel_path in index.candidates(plan_regex(r"option\\(important\\)")):
+        ...  # полная проверка регуляркой только здесь
+
+Индекс сохраняется в двоичный файл и обновляется инкрементально: заново читаются только
+заметки с изменившимися (mtime, размер).
+"""
+import json
+import os
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+import _sre
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+    from re._casefix import _EXTRA_CASES
+except ImportError:  # Python до 3.11
+    import sre_parse
+    import sre_constants
+    from sre_compile import _ignorecase_fixes as _EXTRA_CASES
+
+from vault_paths import PathFilter, iter_files
+
+TRIGRAM_FILE_MAGIC = b"VTRIGR01"
+TRIGRAM_INDEX_VERSION = 2
+# magic, порядок байтов (1 — little-endian), заметок, длина метаданных, длина сигнатур
+_HEADER = struct.Struct("<8sIqqq")
+
+# Размер сигнатуры — степень двойки бит, примерно вдвое больше числа разных триграмм заметки
+MIN_BITS_LOG2 = 8    # 32 байта
+MAX_BITS_LOG2 = 15   # 4 КБ: у очень больших заметок сигнатура насыщается и они просто чаще попадают в кандидаты
+_HASH_MULTIPLIER = 0x9E3779B1
+# Сигнатура "заметку не удалось прочитать": такая заметка всегда попадает в кандидаты
+_ALWAYS = 0
+
+PARALLEL_MIN_FILES = 64
+CHUNK_SIZE = 64
+
+
+# ================== СИГНАТУРЫ ==================
+
+class _FoldTable(dict):
+    """Таблица для `str.translate`: приведение символа считается при первой встрече и запоминается."""
+
+    def __missing__(self, code: int) -> int:
+        lower = _sre.unicode_tolower(code)
+        folded = self[code] = min((lower, *_EXTRA_CASES.get(lower, ())))
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def fold_case(text: str) -> str:
+    """
+    Приводит регистр посимвольно так же, как `re` сравнивает символы с IGNORECASE: простое
+    (однобуквенное) преобразование в нижний регистр плюс дополнительные равенства `re`
+    (`ı` ~ `i`, `ſ` ~ `s`, `ς` ~ `σ`, ...). `casefold()` для этого не годится: `İ` он превращает
+    в две буквы `i̇`, и литерал `important` не нашелся бы в `İMPORTANT`, хотя `re` его находит.
+    """
+    if text.isascii():
+        # Для ASCII дополнительные равенства `re` ведут к той же латинской букве
+        return text.lower()
+    return text.translate(_FOLD_TABLE)
+
+
+def text_trigrams(text: str) -> Set[int]:
+    """Триграммы текста: три байта UTF-8 после fold_case(), упакованные в число."""
+    data = fold_case(text).encode("utf-8")
+    if len(data) < 3:
+        return set()
+    return {int.from_bytes(data[i:i + 3], "big") for i in range(len(data) - 2)}
+
+
+def _bit(trigram: int, bits_log2: int) -> int:
+    return ((trigram * _HASH_MULTIPLIER) & 0xFFFFFFFF) >> (32 - bits_log2)
+
+
+def _bits_log2(trigram_count: int) -> int:
+    return min(MAX_BITS_LOG2, max(MIN_BITS_LOG2, (2 * trigram_count - 1).bit_length()))
+
+
+def signature(trigrams: Set[int]) -> Tuple[int, bytes]:
+    """Фильтр Блума по триграммам: (log2 числа бит, байты little-endian)."""
+    bits_log2 = _bits_log2(len(trigrams))
+    bloom = bytearray(1 << (bits_log2 - 3))
+    for trigram in trigrams:
+        position = _bit(trigram, bits_log2)
+        bloom[position >> 3] |= 1 << (position & 7)
+    return bits_log2, bytes(bloom)
+
+
+def _mask(trigrams: FrozenSet[int], bits_log2: int) -> int:
+    mask = 0
+    for trigram in trigrams:
+        mask |= 1 << _bit(trigram, bits_log2)
+    return mask
+
+
+def read_signature(file_path: str) -> Tuple[int, bytes]:
+    """Сигнатура заметки; нечитаемая заметка получает "пустую" сигнатуру (всегда кандидат)."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return signature(text_trigrams(f.read()))
+    except (OSError, UnicodeDecodeError):
+        return _ALWAYS, b""
+
+
+def _signature_chunk(root: str, rel_paths: List[str]) -> List[Tuple[int, bytes]]:
+    return [read_signature(os.path.join(root, rel_path)) for rel_path in rel_paths]
+
+
+# ================== ЗАПРОСЫ ==================
+
+# Узлы запроса: None — ограничений нет; frozenset триграмм — все должны встретиться;
+# ("and", [узлы]) и ("or", [узлы])
+Query = Union[None, FrozenSet[int], Tuple[str, list]]
+
+
+def _literal_query(literal: str, ignore_case: bool) -> Query:
+    # fold_case() посимвольный и совпадает с правилами IGNORECASE в re, поэтому литерал
+    # (с учетом регистра или без) всегда дает подмножество триграмм совпавшего текста
+    trigrams = frozenset(text_trigrams(literal))
+    return trigrams or None
+
+
+def _and(nodes: List[Query]) -> Query:
+    nodes = [node for node in nodes if node is not None]
+    trigrams = frozenset().union(*(node for node in nodes if isinstance(node, frozenset)))
+    rest = [node for node in nodes if not isinstance(node, frozenset)]
+    if trigrams:
+        rest.insert(0, trigrams)
+    if not rest:
+        return None
+    return rest[0] if len(rest) == 1 else ("and", rest)
+
+
+def _or(nodes: List[Query]) -> Query:
+    if not nodes or any(node is None for node in nodes):
+        return None
+    return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+
+def _sequence_query(items, ignore_case: bool) -> Query:
+    terms: List[Query] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            terms.append(_literal_query("".join(run), ignore_case))
+            run.clear()
+
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if op in _REPEATS and av[0] >= 1 and len(av[2]) == 1 and av[2][0][0] == sre_constants.LITERAL:
+            # 'x+' или 'x{2,}': первый 'x' продолжает предыдущий литерал, последний начинает следующий
+            char = chr(av[2][0][1])
+            run.append(char)
+            flush()
+            run.append(char)
+            continue
+        flush()
+        if op == sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            case = (ignore_case or bool(add_flags & sre_constants.SRE_FLAG_IGNORECASE)) and not del_flags & sre_constants.SRE_FLAG_IGNORECASE
+            terms.append(_sequence_query(sub, case))
+        elif op == getattr(sre_constants, "ATOMIC_GROUP", None):
+            terms.append(_sequence_query(av, ignore_case))
+        elif op == sre_constants.BRANCH:
+            terms.append(_or([_sequence_query(branch, ignore_case) for branch in av[1]]))
+        elif op in _REPEATS:
+            low, _, sub = av
+            if low >= 1:
+                terms.append(_sequence_query(sub, ignore_case))
+        # Остальное (классы символов, '.', якоря, проверки вперед/назад, обратные ссылки)
+        # ничего не требует от текста и лишь разрывает литерал
+    flush()
+    return _and(terms)
+
+
+class TrigramQuery:
+    """План отбора заметок для регулярного выражения."""
+
+    def __init__(self, pattern: str, root: Query):
+        self.pattern = pattern
+        self.root = root
+        self._masks: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def matches_all(self) -> bool:
+        """Регулярка не требует ни одного литерала — отобрать придется все заметки."""
+        return self.root is None
+
+    def _test(self, node: Query, bloom: int, bits_log2: int) -> bool:
+        if node is None:
+            return True
+        if isinstance(node, frozenset):
+            key = (id(node), bits_log2)
+            if (mask := self._masks.get(key)) is None:
+                mask = self._masks[key] = _mask(node, bits_log2)
+            return bloom & mask == mask
+        kind, children = node
+        if kind == "and":
+            return all(self._test(child, bloom, bits_log2) for child in children)
+        return any(self._test(child, bloom, bits_log2) for child in children)
+
+    def may_match(self, bits_log2: int, bloom: int) -> bool:
+        return bits_log2 == _ALWAYS or self._test(self.root, bloom, bits_log2)
+
+    def describe(self) -> str:
+        def text(node: Query) -> str:
+            if node is None:
+                return "*"
+            if isinstance(node, frozenset):
+                return f"{len(node)} триграмм"
+            kind, children = node
+            return "(" + f" {kind} ".join(text(child) for child in children) + ")"
+        return text(self.root)
+
+
+def plan_regex(pattern: Union[str, "re.Pattern"], flags: int = 0) -> TrigramQuery:
+    """Строит план отбора по регулярному выражению (строке или скомпилированному шаблону)."""
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    parsed = sre_parse.parse(pattern, flags)
+    ignore_case = bool(parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE)
+    return TrigramQuery(pattern, _sequence_query(parsed, ignore_case))
+
+
+def plan_literal(literal: str) -> TrigramQuery:
+    """План отбора для поиска подстроки (с учетом регистра)."""
+    return TrigramQuery(re.escape(literal), _literal_query(literal, False))
+
+
+# ================== ИНДЕКС ==================
+
+class TrigramIndex:
+    """Сигнатуры триграмм всех заметок хранилища по относительным путям ('/' как разделитель)."""
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.stats: List[Tuple[int, int]] = []       # (mtime_ns, размер)
+        self.signatures: List[Tuple[int, bytes]] = []
+        self._blooms: Optional[List[int]] = None       # сигнатуры как целые числа (для запросов)
+        self.indexed = 0                               # сколько заметок прочитано при последнем обновлении
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def refresh(self, root: str, path_filter: Optional[PathFilter] = None, max_workers: Optional[int] = None):
+        """Сверяет индекс с хранилищем: убирает исчезнувшие заметки, перечитывает изменившиеся."""
+        known = {rel_path: i for i, rel_path in enumerate(self.paths)}
+        paths, stats, signatures = [], [], []
+        stale: List[int] = []
+        for rel_path in iter_files(root, path_filter):
+            try:
+                stat = os.stat(os.path.join(root, rel_path))
+            except OSError:
+                continue
+            current = (stat.st_mtime_ns, stat.st_size)
+            i = known.get(rel_path)
+            if i is not None and self.stats[i] == current:
+                signatures.append(self.signatures[i])
+            else:
+                signatures.append(None)
+                stale.append(len(paths))
+            paths.append(rel_path)
+            stats.append(current)
+
+        stale_paths = [paths[i] for i in stale]
+        if max_workers == 1 or len(stale) < PARALLEL_MIN_FILES:
+            fresh = _signature_chunk(root, stale_paths)
+        else:
+            chunks = [stale_paths[i:i + CHUNK_SIZE] for i in range(0, len(stale_paths), CHUNK_SIZE)]
+            fresh = []
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                for chunk_result in executor.map(_signature_chunk, [root] * len(chunks), chunks):
+                    fresh.extend(chunk_result)
+        for i, sig in zip(stale, fresh):
+            signatures[i] = sig
+
+        self.dirty = self.dirty or bool(stale) or len(paths) != len(self.paths)
+        self.paths, self.stats, self.signatures = paths, stats, signatures
+        self._blooms = None
+        self.indexed = len(stale)
+
+    def candidates(self, *queries: TrigramQuery) -> List[str]:
+        """Пути заметок (в порядке обхода), в которых может совпасть хотя бы один из запросов."""
+        if any(query.matches_all for query in queries):
+            return list(self.paths)
+        if self._blooms is None:
+            self._blooms = [int.from_bytes(bloom, "little") for _, bloom in self.signatures]
+        return [
+            rel_path for rel_path, (bits_log2, _), bloom in zip(self.paths, self.signatures, self._blooms)
+            if any(query.may_match(bits_log2, bloom) for query in queries)
+        ]
+
+    def save(self, file_path: str, root: Optional[str] = None):
+        """Сохраняет индекс (атомарно: через временный файл)."""
+        meta = {
+            "version": TRIGRAM_INDEX_VERSION,
+            "root": os.path.abspath(root) if root is not None else None,
+            "paths": self.paths,
+            "mtime_ns": [mtime for mtime, _ in self.stats],
+            "size": [size for _, size in self.stats],
+            "bits_log2": [bits_log2 for bits_log2, _ in self.signatures],
+        }
+        meta_blob = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blooms = b"".join(bloom for _, bloom in self.signatures)
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(TRIGRAM_FILE_MAGIC, 1, len(self.paths), len(meta_blob), len(blooms)))
+            f.write(meta_blob)
+            f.write(blooms)
+        os.replace(tmp_path, file_path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, file_path: str, root: Optional[str] = None) -> "TrigramIndex":
+        """Читает индекс; поврежденный, устаревший или собранный для другой папки дает пустой."""
+        index = cls()
+        try:
+            with open(file_path, "rb") as f:
+                magic, byteorder, count, meta_len, blooms_len = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != TRIGRAM_FILE_MAGIC or byteorder != 1:
+                    return index
+                meta = json.loads(f.read(meta_len).decode("utf-8"))
+                blooms = f.read(blooms_len)
+            if meta.get("version") != TRIGRAM_INDEX_VERSION or len(blooms) != blooms_len:
+                return index
+            if root is not None and meta.get("root") != os.path.abspath(root):
+                return index
+            signatures, position = [], 0
+            for bits_log2 in meta["bits_log2"]:
+                length = (1 << (bits_log2 - 3)) if bits_log2 != _ALWAYS else 0
+                signatures.append((bits_log2, blooms[position:position + length]))
+                position += length
+            if len(signatures) != count or position != blooms_len:
+                return index
+            index.paths = list(meta["paths"])
+            index.stats = list(zip(meta["mtime_ns"], meta["size"]))
+            index.signatures = signatures
+        except (OSError, ValueError, TypeError, KeyError, struct.error):
+            return cls()
+        return index
+
+
+def build_trigram_index(
+    root: str,
+    path_filter: Optional[PathFilter] = None,
+    cache_path: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> TrigramIndex:
+    """Загружает индекс из файла (если указан), обновляет его по хранилищу и сохраняет, если он изменился."""
+    index = TrigramIndex.load(cache_path, root) if cache_path else TrigramIndex()
+    index.refresh(root, path_filter, max_workers)
+    if cache_path and index.dirty:
+        index.save(cache_path, root)
+    return index
+
+
+def candidate_paths(index: TrigramIndex, patterns: Iterable[Union[str, "re.Pattern"]]) -> List[str]:
+    """Заметки, в которых может совпасть хотя бы одна из регулярок."""
+    return index.candidates(*(plan_regex(pattern) for pattern in patterns))
@@ -5,14 +5,33 @@ import json
 import time
 import hashlib
 import sys
+from array import array
 from pathlib import Path
-from urllib.parse import unquote
-
-# PyYAML is required for advanced frontmatter parsing (e.g., in 'banner' property).
-try:
-    import yaml
-except ImportError:
-    yaml = None # Make it optional, check for it later.
+from urllib.parse import quote, unquote
+
+# Общие модули (разбор frontmatter и т.д.) лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = Path(__file__).resolve().parent.parent / "Obsidian Vault Core"
+if str(VAULT_CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(VAULT_CORE_DIR))
+
+# Плоские frontmatter разбираются без PyYAML; он нужен только для сложных заголовков.
+import vault_frontmatter
+from vault_frontmatter import parse_frontmatter, FrontmatterError, YAML_BACKEND
+import vault_telemetry
+import vault_graph
+import vault_frontmatter_columns
+import vault_queries
+from vault_graph import GraphBuilder, PathInterner
+from vault_fuzzy import FuzzyIndex, normalize_name
+from vault_duplicates import DuplicateSet, find_duplicates
+from vault_attachments import is_attachment
+from vault_stream import write_text_atomically
+from vault_queries import (
+    QueryIndex, QueryError, parse_dql, parse_base, note_tags, normalize_properties, QUERY_DATAVIEW, QUERY_BASE
+)
+from vault_telemetry import (
+    Telemetry, phase, count, PHASE_WALK, PHASE_FRONTMATTER, PHASE_REGEX, PHASE_GRAPH, PHASE_REPORT, PHASE_WRITE
+)
 
 # ================== CONFIGURATION ==================
 # Укажите АБСОЛЮТНЫЙ путь к вашему хранилищу Obsidian
@@ -32,6 +51,34 @@ IGNORED_FOLDERS = [
 # Игнорировать ли файлы в корневой папке хранилища (но продолжать сканировать подпапки).
 # True - да, игнорировать файлы в корне. False - нет, сканировать как обычно.
 IGNORE_ROOT_FILES = True
+
+# История состава категорий (рядом со скриптом): отчет переписывается, только если состав
+# изменился, и показывает, какие файлы появились и какие решены с прошлого отчета.
+HISTORY_FILE_NAME = ".find_orphans_history.json"
+# Сколько последних изменений хранить в истории и сколько строк показывать в таблице динамики
+HISTORY_MAX_RUNS = 100
+TREND_TABLE_ROWS = 10
+
+# Подсказки к оборванным ссылкам: сколько самых похожих имен файлов (и псевдонимов заметок)
+# показывать под каждой ссылкой. 0 — без подсказок.
+SUGGESTIONS_PER_LINK = 3
+# True — перед анализом исправить ссылки по подсказкам, отмеченным в прошлом отчете (`- [x]`):
+# оборванная ссылка в заметке заменяется ссылкой на выбранный файл.
+APPLY_LINK_FIXES = False
+
+# Поиск одинаковых вложений (по содержимому, под любыми именами и в любых папках): файлы
+# сверяются по размеру, затем по хэшу начала и конца, затем целиком. Хэши кэшируются
+# по (mtime, размер) в DUPLICATES_CACHE_FILE_NAME (рядом со скриптом).
+FIND_DUPLICATES = True
+DUPLICATES_CACHE_FILE_NAME = ".find_orphans_hashes.json"
+# Вложения меньше этого размера (в байтах) не сверяются
+DUPLICATES_MIN_SIZE = 1024
+
+# Замеры времени по фазам сохраняются в этот JSON (рядом со скриптом).
+TELEMETRY_FILE_NAME = "find_orphans_telemetry.json"
+# Профилирование: None (выкл.), "cpu", "memory" или "all".
+# Если None, используется переменная окружения OBSIDIAN_PROFILE.
+PROFILE_MODE = None
 # ===================================================
 
 # Свойства в frontmatter, которые могут содержать ссылки в виде простого текста.
@@ -44,23 +91,40 @@ FRONTMATTER_LINK_PROPERTIES = [
 
 # --- Вспомогательные функции (аналогичные предыдущему скрипту) ---
 
+HISTORY_VERSION = 1
+# Сколько новых и решенных файлов перечислять поименно в разделе изменений
+CHANGES_LIST_LIMIT = 50
+
 # Регулярные выражения для поиска ссылок
 WIKI_RE = re.compile(r'\[\[([^\]\|#]+)')
 INLINE_RE = re.compile(r'\[.*?\]\(([^)\s#?]+)')
-# Регулярные выражения для анализа "виртуальных" ссылок
-QUERY_BLOCK_RE = re.compile(r'```(?:dataview|base).*?\n(.*?)\n```', re.DOTALL | re.IGNORECASE)
-# Ищет `wikilinks.contains(link("..."))` и `wikilinks.contains(link(this.file.name))`
+# Регулярные выражения для анализа "виртуальных" ссылок: блоки запросов Dataview и Bases
+QUERY_BLOCK_RE = re.compile(r'```(dataviewjs|dataview|base)[^\n]*\n(.*?)\n```', re.DOTALL | re.IGNORECASE)
+# В блоках dataviewjs (JavaScript не разбирается) ищется только
+# `wikilinks.contains(link("..."))` и `wikilinks.contains(link(this.file.name))`
 DATAVIEW_FILTER_RE = re.compile(r'wikilinks\.contains\(link\((?:"([^"]+)"|this\.file\.name)\)\)')
 FRONTMATTER_RE = re.compile(r'^---\s*\n(.*?)\n---', re.DOTALL)
 FM_WIKILINKS_SECTION_RE = re.compile(r'^wikilinks:(.*?)(?=\n^\S|\Z)', re.MULTILINE | re.DOTALL)
 FM_WIKILINK_ITEM_RE = re.compile(r'\[\[([^\]\|#]+)\]\]')
+# Код и комментарии, в которых ссылки не учитываются (и не исправляются)
+PROTECTED_RE = re.compile(r'```.*?```|%%.*?%%|`[^`]*`', re.DOTALL)
+# Строки раздела оборванных ссылок в отчете: заметка, ссылка и отмеченная подсказка
+REPORT_SOURCE_RE = re.compile(r'^- \[\[(.+)\]\]\s*$')
+REPORT_BROKEN_RE = re.compile(r'^  - `\(битая ссылка\) → (.*)`\s*$')
+REPORT_CHOICE_RE = re.compile(r'^    - \[[xX]\] \[\[([^\]]+)\]\]')
 
 def _get_script_hash() -> str:
-    """Вычисляет хэш SHA256 текущего файла скрипта для автоматической инвалидации кэша."""
+    """
+    Вычисляет хэш SHA256 файла скрипта и используемых им общих модулей
+    для автоматической инвалидации кэша.
+    """
     try:
-        with open(__file__, 'rb') as f:
-            script_content = f.read()
-        return hashlib.sha256(script_content).hexdigest()
+        hasher = hashlib.sha256()
+        modules = (vault_frontmatter, vault_telemetry, vault_graph, vault_frontmatter_columns, vault_queries)
+        for source_path in (__file__, *(module.__file__ for module in modules)):
+            with open(source_path, 'rb') as f:
+                hasher.update(f.read())
+        return hasher.hexdigest()
     except Exception:
         # Резервный вариант на случай ошибки хеширования, гарантирующий повторный анализ.
         return str(time.time())
@@ -117,13 +181,21 @@ def _clean_markdown_body(body: str) -> str:
 
 def _create_obsidian_link(file_path: Path, vault: Path) -> str:
     """Создает кликабельную wikilink-ссылку для Obsidian."""
-    relative_path_str = file_path.relative_to(vault).as_posix()
+    return _link_for_relative_path(file_path.relative_to(vault).as_posix())
+
+def _link_for_relative_path(relative_path_str: str) -> str:
+    """Wikilink-ссылка по пути относительно хранилища (через '/')."""
     if relative_path_str.lower().endswith('.md'):
         link_text = relative_path_str[:-3]
     else:
         link_text = relative_path_str
     return f"[[{link_text}]]"
 
+def _link_name(relative_path_str: str) -> str:
+    """Имя файла, как его пишут в wikilink-ссылке: у заметок без '.md'."""
+    name = relative_path_str.rsplit('/', 1)[-1]
+    return name[:-3] if name.lower().endswith('.md') else name
+
 def _generate_table_for_category(files: list[Path], vault: Path) -> list[str]:
     """Генерирует Markdown-таблицы для категории файлов, сгруппированных по папкам."""
     lines = []
@@ -155,13 +227,42 @@ def _generate_table_for_category(files: list[Path], vault: Path) -> list[str]:
     return lines
 
 def _format_dead_ends_with_loose_ends(items: dict, vault: Path) -> list[str]:
-    """Форматирует список для категории 'тупики с оборванными ссылками'."""
+    """
+    Форматирует список для категории 'тупики с оборванными ссылками'.
+    Под каждой ссылкой — похожие файлы флажками: отмеченный флажок при APPLY_LINK_FIXES
+    заменяет ссылку в заметке на выбранный файл.
+    """
     lines = []
     sorted_items = sorted(items.items(), key=lambda item: str(item[0]))
     for file_path, broken_links in sorted_items:
         lines.append(f"- {_create_obsidian_link(file_path, vault)}\n")
         for broken in sorted(broken_links):
             lines.append(f"  - `(битая ссылка) → {broken}`\n")
+            for relative_path, name, distance in broken_links[broken]:
+                hint = f"правок: {distance}"
+                if name != normalize_name(_link_name(relative_path)):
+                    hint += f", по имени «{name}»"
+                lines.append(f"    - [ ] {_link_for_relative_path(relative_path)} ({hint})\n")
+    lines.append("\n")
+    return lines
+
+def _format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+def _format_duplicates(duplicates: list[DuplicateSet], referrers: dict[str, list[str]]) -> list[str]:
+    """Раздел одинаковых вложений: копии каждой группы и заметки, которые на них ссылаются."""
+    wasted = sum(duplicate.wasted for duplicate in duplicates)
+    lines = [
+        f"## 🧬 Одинаковые вложения (групп: {len(duplicates)}, лишних {_format_size(wasted)})\n\n",
+        "Файлы с одинаковым содержимым под разными именами или в разных папках. "
+        "Оставьте одну копию и перенаправьте на нее ссылки.\n\n",
+    ]
+    for duplicate in duplicates:
+        lines.append(f"- `{_format_size(duplicate.size)}` × {len(duplicate.paths)} (лишних {_format_size(duplicate.wasted)})\n")
+        for relative_path in duplicate.paths:
+            notes = referrers.get(relative_path)
+            used_by = ", ".join(_link_for_relative_path(note) for note in notes) if notes else "не используется"
+            lines.append(f"  - {_link_for_relative_path(relative_path)} ← {used_by}\n")
     lines.append("\n")
     return lines
 
@@ -184,7 +285,6 @@ def analyze_file_content(content: str, file_path: Path, vault_path: Path, file_i
     broken_links = set()
     has_external_links = False
     fm_wikilinks = []
-    dataview_hubs_found = []
 
     # --- 1. Анализ ссылок в теле и frontmatter (WIKI и INLINE) ---
     # _clean_markdown_body удаляет код-блоки и т.д., где ссылки не должны учитываться.
@@ -218,6 +318,7 @@ def analyze_file_content(content: str, file_path: Path, vault_path: Path, file_i
             broken_links.add(decoded_link)
 
     # --- 2. Дополнительный анализ Frontmatter ---
+    fm_data = None
     fm_match = FRONTMATTER_RE.match(content)
     if fm_match:
         frontmatter_content = fm_match.group(1)
@@ -227,66 +328,106 @@ def analyze_file_content(content: str, file_path: Path, vault_path: Path, file_i
             for link_match in FM_WIKILINK_ITEM_RE.finditer(section.group(1)):
                 hub_name = link_match.group(1).strip()
                 fm_wikilinks.append(hub_name)
-        
-        # 2.2. Глубокий анализ ссылок в специальных свойствах с использованием YAML-парсера
-        if yaml and FRONTMATTER_LINK_PROPERTIES:
-            try:
-                fm_data = yaml.safe_load(frontmatter_content)
-                if isinstance(fm_data, dict):
-                    for prop in FRONTMATTER_LINK_PROPERTIES:
-                        if prop in fm_data:
-                            # Рекурсивно извлекаем все строковые значения из свойства
-                            link_candidates = _extract_strings_from_yaml_value(fm_data[prop])
-                            
-                            for raw_link_text in link_candidates:
-                                link_text = ""
-                                # Сначала проверяем, не является ли строка вики-ссылкой
-                                wiki_links_in_value = FM_WIKILINK_ITEM_RE.findall(raw_link_text)
-                                if wiki_links_in_value:
-                                    link_text = wiki_links_in_value[0].strip()
-                                else:
-                                    # Если нет, используем всю строку как есть
-                                    link_text = raw_link_text.strip()
-
-                                if not link_text:
-                                    continue
-                                
-                                decoded_link = unquote(link_text)
-                                
-                                if decoded_link.startswith(('http://', 'https://')):
-                                    has_external_links = True
-                                    continue
-
-                                # Логика поиска файла (такая же, как была)
-                                # 1. Try as a path relative to the vault root.
-                                potential_path = (vault_path / decoded_link).resolve()
-                                if potential_path.exists() and potential_path.is_file():
-                                    valid_links.add(potential_path)
-                                    continue
-
-                                # 2. If not, try to find by filename in the whole vault (fallback) and handle broken links
-                                file_name_only = Path(decoded_link).name
-                                target_path = find_file_in_vault(file_index, file_name_only)
-                                if target_path and target_path.exists():
-                                    valid_links.add(target_path)
-                                else:
-                                    broken_links.add(decoded_link)
-            except yaml.YAMLError:
-                # Игнорируем ошибки парсинга YAML, чтобы не прерывать весь анализ
-                pass
-
-    # --- 3. Анализ dataview-запросов (может быть где угодно в файле) ---
+
+        try:
+            with phase(PHASE_FRONTMATTER):
+                fm_data = parse_frontmatter(frontmatter_content)
+        except FrontmatterError:
+            # Игнорируем ошибки парсинга YAML (и сложные заголовки без PyYAML), чтобы не прерывать весь анализ
+            fm_data = None
+
+    if isinstance(fm_data, dict):
+        # 2.2. Свойства для запросов Dataview/Bases (`WHERE type = "project"`)
+        properties = normalize_properties(fm_data)
+
+        # 2.3. Глубокий анализ ссылок в специальных свойствах с использованием YAML-парсера
+        for prop in FRONTMATTER_LINK_PROPERTIES:
+            if prop in fm_data:
+                # Рекурсивно извлекаем все строковые значения из свойства
+                link_candidates = _extract_strings_from_yaml_value(fm_data[prop])
+                
+                for raw_link_text in link_candidates:
+                    link_text = ""
+                    # Сначала проверяем, не является ли строка вики-ссылкой
+                    wiki_links_in_value = FM_WIKILINK_ITEM_RE.findall(raw_link_text)
+                    if wiki_links_in_value:
+                        link_text = wiki_links_in_value[0].strip()
+                    else:
+                        # Если нет, используем всю строку как есть
+                        link_text = raw_link_text.strip()
+
+                    if not link_text:
+                        continue
+                    
+                    decoded_link = unquote(link_text)
+                    
+                    if decoded_link.startswith(('http://', 'https://')):
+                        has_external_links = True
+                        continue
+
+                    # Логика поиска файла (такая же, как была)
+                    # 1. Try as a path relative to the vault root.
+                    potential_path = (vault_path / decoded_link).resolve()
+                    if potential_path.exists() and potential_path.is_file():
+                        valid_links.add(potential_path)
+                        continue
+
+                    # 2. If not, try to find by filename in the whole vault (fallback) and handle broken links
+                    file_name_only = Path(decoded_link).name
+                    target_path = find_file_in_vault(file_index, file_name_only)
+                    if target_path and target_path.exists():
+                        valid_links.add(target_path)
+                    else:
+                        broken_links.add(decoded_link)
+    elif fm_wikilinks:
+        # Заголовок не разобран: для запросов остаются хотя бы ссылки из `wikilinks`
+        properties = {"wikilinks": [f"[[{hub_name}]]" for hub_name in fm_wikilinks]}
+    else:
+        properties = {}
+
+    # --- 3. Запросы dataview и base (могут быть где угодно в файле) ---
+    rel_path = file_path.relative_to(vault_path).as_posix()
+    queries = []
     for block in QUERY_BLOCK_RE.finditer(content):
-        for match in DATAVIEW_FILTER_RE.finditer(block.group(1)):
-            hub_name = match.group(1).strip() if match.group(1) else file_path.stem
-            dataview_hubs_found.append(hub_name)
+        language, query_text = block.group(1).lower(), block.group(2)
+        if language == "dataviewjs":
+            for match in DATAVIEW_FILTER_RE.finditer(query_text):
+                hub_name = match.group(1).strip() if match.group(1) else file_path.stem
+                queries.append([QUERY_DATAVIEW, ["link", "wikilinks", hub_name.lower()]])
+        else:
+            queries.append(_parse_query_block(language, query_text, rel_path))
 
     return {
         "valid_links": sorted([p.relative_to(vault_path).as_posix() for p in valid_links]),
         "broken_links": sorted(list(broken_links)),
         "has_external_links": has_external_links,
-        "fm_wikilinks": fm_wikilinks,
-        "dataview_hubs": dataview_hubs_found,
+        "tags": note_tags(fm_data, FRONTMATTER_RE.sub('', cleaned_content, count=1)),
+        "properties": properties,
+        "queries": queries,
+    }
+
+
+def _parse_query_block(language: str, query_text: str, rel_path: str) -> list:
+    """[вид запроса, дерево условий] для блока dataview/base; дерево None — запрос не разобран."""
+    try:
+        if language == "base":
+            with phase(PHASE_FRONTMATTER):
+                data = parse_frontmatter(query_text)
+            return [QUERY_BASE, parse_base(data, rel_path)]
+        return [QUERY_DATAVIEW, parse_dql(query_text, rel_path)]
+    except (QueryError, FrontmatterError, RecursionError):
+        return [QUERY_BASE if language == "base" else QUERY_DATAVIEW, None]
+
+
+def analyze_base_file(content: str, file_path: Path, vault_path: Path) -> dict:
+    """Анализирует файл базы Obsidian (.base): ссылок в нем нет, только фильтры запроса."""
+    return {
+        "valid_links": [],
+        "broken_links": [],
+        "has_external_links": False,
+        "tags": [],
+        "properties": {},
+        "queries": [_parse_query_block("base", content, file_path.relative_to(vault_path).as_posix())],
     }
 
 
@@ -314,7 +455,7 @@ def _save_cache(cache_path: Path, cache_data: dict):
         "files": cache_data
     }
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
+        with phase(PHASE_WRITE), open(cache_path, 'w', encoding='utf-8') as f:
             json.dump(full_cache_content, f, indent=2)
         print(f"✅ Кэш успешно сохранен в: {cache_path}")
     except Exception as e:
@@ -323,75 +464,136 @@ def _save_cache(cache_path: Path, cache_data: dict):
 def _analyze_all_files(
     markdown_files: list[Path], vault_path: Path, file_index: dict, cache: dict
 ) -> tuple[dict[Path, dict], dict]:
-    """Анализирует все markdown-файлы, используя кэш."""
+    """Анализирует все markdown-файлы (и файлы баз .base), используя кэш."""
     print("🔄 Анализ файлов (с использованием кэша)...")
     new_cache = {}
     all_analysis_data = {}
     files_from_cache = 0
     files_analyzed = 0
 
+    telemetry = vault_telemetry.active()
     for md_file in markdown_files:
         file_key = md_file.relative_to(vault_path).as_posix()
-        current_mtime = md_file.stat().st_mtime
+        with phase(PHASE_WALK):
+            file_stat = md_file.stat()
+        current_mtime = file_stat.st_mtime
 
         if file_key in cache and cache[file_key].get("mtime") == current_mtime:
             all_analysis_data[md_file] = cache[file_key]["analysis"]
             new_cache[file_key] = cache[file_key]
             files_from_cache += 1
         else:
+            file_started = time.perf_counter()
             try:
-                content = md_file.read_text(encoding='utf-8')
-                analysis_result = analyze_file_content(content, md_file, vault_path, file_index)
+                content = vault_telemetry.read_text(md_file)
+                with phase(PHASE_REGEX):
+                    if md_file.suffix.lower() == '.base':
+                        analysis_result = analyze_base_file(content, md_file, vault_path)
+                    else:
+                        analysis_result = analyze_file_content(content, md_file, vault_path, file_index)
                 all_analysis_data[md_file] = analysis_result
                 new_cache[file_key] = {"mtime": current_mtime, "analysis": analysis_result}
                 files_analyzed += 1
             except Exception as e:
+                count("analysis_errors")
                 print(f"  ⚠️  Ошибка при анализе файла {md_file.name}: {e}")
+            if telemetry is not None:
+                telemetry.record_file(file_key, time.perf_counter() - file_started, file_stat.st_size)
 
+    count("cache_hits", files_from_cache)
+    count("files_analyzed", files_analyzed)
     print(f"  - Загружено из кэша: {files_from_cache} файлов.")
     print(f"  - Проанализировано заново: {files_analyzed} файлов.")
     return all_analysis_data, new_cache
 
 def _build_link_graph(all_files: list[Path], analysis_data: dict, vault_path: Path) -> dict:
-    """Строит граф связей между файлами на основе данных анализа."""
+    """
+    Строит граф связей между файлами на основе данных анализа.
+    Узлы — относительные пути (первые len(all_files) узлов — файлы индекса), ребра хранятся
+    в компактном графе vault_graph. Возвращает словарь с графом и свойствами файлов.
+    """
     print("🔄 Построение графа ссылок...")
-    file_graph = {
-        path: {"in_links": set(), "out_links": set(), "broken_out_links": set(), "has_external_links": False}
-        for path in all_files
-    }
-
-    dataview_hubs = collections.defaultdict(list)
-    dataview_link_targets = collections.defaultdict(list)
+    builder = GraphBuilder()
+    for path in all_files:
+        builder.add_node(path.relative_to(vault_path).as_posix())
+    file_count = len(builder.paths)
+    # Исходящие ссылки считаются только настоящие: "виртуальные" ссылки запросов dataview/base
+    # добавляют входящие связи найденным заметкам, но не делают агрегатор файлом с исходящими ссылками
+    real_out_links = array('i', bytes(4 * file_count))
+    broken_out_links = {}
+    has_external_links = bytearray(file_count)
+
+    query_index = QueryIndex()
+    queries = []
+    note_data = {}
 
     for md_file, data in analysis_data.items():
-        valid_links = {vault_path / p for p in data["valid_links"]}
-        file_graph[md_file]["out_links"].update(valid_links)
-        file_graph[md_file]["broken_out_links"].update(data["broken_links"])
-        file_graph[md_file]["has_external_links"] = data["has_external_links"]
-        for target_path in valid_links:
-            if target_path in file_graph:
-                file_graph[target_path]["in_links"].add(md_file)
-
-        for hub_name in data["dataview_hubs"]:
-            dataview_hubs[hub_name.lower()].append(md_file)
-        for hub_name in data["fm_wikilinks"]:
-            dataview_link_targets[hub_name.lower()].append(md_file)
-
-    virtual_links_count = 0
-    for hub_name_lower, aggregator_files in dataview_hubs.items():
-        if hub_name_lower in dataview_link_targets:
-            target_files = dataview_link_targets[hub_name_lower]
-            for aggregator_file in aggregator_files:
-                for target_file in target_files:
-                    file_graph[target_file]["in_links"].add(aggregator_file)
-                    virtual_links_count += 1
+        source = builder.paths.get(md_file.relative_to(vault_path).as_posix())
+        if source is None:
+            continue
+        for link in data["valid_links"]:
+            target = builder.add_node(link)
+            builder.add_edge(source, target)
+            query_index.add_link(source, target)
+        real_out_links[source] = len(data["valid_links"])
+        if data["broken_links"]:
+            broken_out_links[source] = set(data["broken_links"])
+        has_external_links[source] = data["has_external_links"]
+        note_data[source] = data
+        queries.extend((source, kind, tree) for kind, tree in data["queries"])
+
+    # Индекс папок, имен, тегов и свойств строится по всем файлам индекса, а не только по заметкам
+    for node in range(file_count):
+        data = note_data.get(node)
+        if data is None:
+            query_index.add_file(node, builder.paths[node])
+        else:
+            query_index.add_file(node, builder.paths[node], data["tags"], data["properties"])
+    virtual_links_count = _add_query_links(builder, query_index, queries)
 
+    graph = builder.build()
     if virtual_links_count > 0:
-        print(f"  - Учтено {virtual_links_count} 'виртуальных' ссылок.")
-    print("✅ Граф ссылок построен.")
-    return file_graph
+        print(f"  - Учтено {virtual_links_count} 'виртуальных' ссылок из запросов dataview/base.")
+    print(f"✅ Граф ссылок построен: {graph.node_count} узлов, {graph.edge_count} связей.")
+    return {
+        "graph": graph,
+        "file_count": file_count,
+        "real_out_links": real_out_links,
+        "broken_out_links": broken_out_links,
+        "has_external_links": has_external_links,
+    }
 
-def _categorize_files(file_graph: dict, report_file_name: str) -> dict:
+def _add_query_links(builder: GraphBuilder, query_index: QueryIndex, queries: list) -> int:
+    """
+    Добавляет "виртуальные" ребра от заметки с запросом к каждой заметке, которую он выбирает.
+    Запросы вычисляются операциями над множествами индекса; одинаковые вычисляются один раз.
+    """
+    resolved = {}
+    virtual_links_count = 0
+    unresolved = 0
+    for source, kind, tree in queries:
+        if tree is None:
+            unresolved += 1
+            continue
+        key = (kind, json.dumps(tree))
+        if key not in resolved:
+            universe = query_index.files if kind == QUERY_BASE else query_index.markdown
+            resolved[key] = query_index.evaluate(tree, universe)
+        matches = resolved[key]
+        if matches is None:
+            unresolved += 1
+            continue
+        for target in matches:
+            if target != source:
+                builder.add_edge(source, target)
+                virtual_links_count += 1
+    count("queries", len(queries))
+    count("queries_unresolved", unresolved)
+    if unresolved:
+        print(f"  - Не удалось разобрать или ограничить {unresolved} запросов (ссылки от них не учтены).")
+    return virtual_links_count
+
+def _categorize_files(file_graph: dict, vault_path: Path, report_file_name: str) -> dict:
     """Категоризирует файлы на основе графа ссылок."""
     print("🔄 Категоризация файлов...")
     categories = {
@@ -399,31 +601,238 @@ def _categorize_files(file_graph: dict, report_file_name: str) -> dict:
         "dead_ends": [],
         "absolute_orphans": [],
     }
-
-    for file_path, data in file_graph.items():
-        if file_path.name == report_file_name:
+    graph = file_graph["graph"]
+    in_degrees = graph.in_degrees()
+    real_out_links = file_graph["real_out_links"]
+    broken_out_links = file_graph["broken_out_links"]
+    has_external_links = file_graph["has_external_links"]
+
+    for node in range(file_graph["file_count"]):
+        if in_degrees[node]:
             continue
+        relative_path = graph.paths[node]
+        if relative_path.rsplit('/', 1)[-1] == report_file_name:
+            continue
+        file_path = vault_path / relative_path
 
-        has_in_links = bool(data["in_links"])
-        has_out_links = bool(data["out_links"])
-        has_broken_links = bool(data["broken_out_links"])
-        has_external_links = data["has_external_links"]
-
-        if not has_in_links:
-            if has_broken_links:
-                categories["dead_ends_with_loose_ends"][file_path] = data["broken_out_links"]
-            elif has_out_links or has_external_links:
-                categories["dead_ends"].append(file_path)
-            else:
-                categories["absolute_orphans"].append(file_path)
+        if node in broken_out_links:
+            categories["dead_ends_with_loose_ends"][file_path] = broken_out_links[node]
+        elif real_out_links[node] or has_external_links[node]:
+            categories["dead_ends"].append(file_path)
+        else:
+            categories["absolute_orphans"].append(file_path)
     
     total_found = sum(len(v) for v in categories.values())
     print(f"✅ Найдено {total_found} проблемных файлов.")
     return categories
 
-def _generate_report(categories: dict, vault_path: Path, report_path: Path):
+def _build_name_index(all_files: list[Path], analysis_data: dict, vault_path: Path) -> FuzzyIndex:
+    """Индекс имен для подсказок: имена всех файлов (у заметок без '.md') и их псевдонимы (aliases)."""
+    index = FuzzyIndex()
+    for path in all_files:
+        relative_path = path.relative_to(vault_path).as_posix()
+        index.add(_link_name(relative_path), relative_path)
+    for md_file, data in analysis_data.items():
+        relative_path = md_file.relative_to(vault_path).as_posix()
+        for key in ("aliases", "alias"):
+            for alias in data["properties"].get(key, ()):
+                index.add(alias, relative_path)
+    return index
+
+def _suggest_link_targets(categories: dict, name_index: FuzzyIndex, limit: int):
+    """
+    Заменяет у тупиков с оборванными ссылками множество ссылок словарем
+    "ссылка → [(путь, совпавшее имя, число правок), ...]" с самыми похожими файлами.
+    """
+    loose_ends = categories["dead_ends_with_loose_ends"]
+    suggested = 0
+    for file_path, broken_links in loose_ends.items():
+        suggestions = {}
+        for broken in broken_links:
+            name = broken.rstrip('/').rsplit('/', 1)[-1]
+            if name.lower().endswith('.md'):
+                name = name[:-3]
+            suggestions[broken] = name_index.search(name, limit)
+            suggested += bool(suggestions[broken])
+        loose_ends[file_path] = suggestions
+    count("broken_links_suggested", suggested)
+    if suggested:
+        print(f"  - Найдены похожие файлы для {suggested} оборванных ссылок.")
+
+def _find_duplicate_attachments(
+    all_files: list[Path], analysis_data: dict, vault_path: Path, cache_path: Path
+) -> tuple[list[DuplicateSet], dict[str, list[str]]]:
+    """Группы одинаковых вложений и заметки, ссылающиеся на каждую копию."""
+    print("🔄 Поиск одинаковых вложений...")
+    attachments = [
+        relative_path for relative_path in (path.relative_to(vault_path).as_posix() for path in all_files)
+        if is_attachment(relative_path)
+    ]
+    duplicates = find_duplicates(str(vault_path), attachments, str(cache_path), DUPLICATES_MIN_SIZE)
+    copies = {relative_path for duplicate in duplicates for relative_path in duplicate.paths}
+    referrers = collections.defaultdict(list)
+    for md_file, data in analysis_data.items():
+        source = md_file.relative_to(vault_path).as_posix()
+        for link in data["valid_links"]:
+            if link in copies:
+                referrers[link].append(source)
+    if duplicates:
+        wasted = sum(duplicate.wasted for duplicate in duplicates)
+        print(f"  - Групп одинаковых вложений: {len(duplicates)}, лишние копии занимают {_format_size(wasted)}.")
+    return duplicates, {relative_path: sorted(notes) for relative_path, notes in referrers.items()}
+
+REPORT_SECTIONS = {
+    "dead_ends_with_loose_ends": {
+        "title": "🕸️ Тупики с оборванными ссылками",
+        "description": "Файлы, на которые нет ссылок, и которые сами ссылаются на **несуществующие** файлы. **Требуют внимания в первую очередь.**",
+        "formatter": _format_dead_ends_with_loose_ends
+    },
+    "dead_ends": {
+        "title": "🛑 Тупики",
+        "description": "Файлы, на которые нет ссылок, но которые сами ссылаются на **существующие** файлы. На эти файлы невозможно попасть по ссылкам.",
+        "formatter": _generate_table_for_category
+    },
+    "absolute_orphans": {
+        "title": "🗑️ Абсолютные сироты",
+        "description": "Файлы, у которых нет ни входящих, ни исходящих ссылок.",
+        "formatter": _generate_table_for_category
+    }
+}
+
+
+class OrphanHistory:
+    """
+    История состава категорий отчета. Пути хранятся один раз в общей таблице (PathInterner),
+    а состав каждой категории — отсортированным списком номеров путей. Запуск попадает
+    в историю, только если состав категорий, список оборванных ссылок (с подсказками к ним)
+    или группы одинаковых вложений изменились.
+    """
+
+    def __init__(self, vault: str):
+        self.vault = vault
+        self.paths = PathInterner()
+        self.runs: list[dict] = []
+
+    @classmethod
+    def load(cls, history_path: Path, vault: str) -> "OrphanHistory":
+        """Загружает историю; история другого хранилища или поврежденный файл дают пустую."""
+        history = cls(vault)
+        if not history_path.exists():
+            return history
+        try:
+            with open(history_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != HISTORY_VERSION or data.get("vault") != vault:
+                print("  ℹ️  История отчетов относится к другому хранилищу, начинается новая.")
+                return history
+            history.paths = PathInterner(data["paths"])
+            history.runs = data["runs"]
+        except (json.JSONDecodeError, IOError, KeyError, TypeError):
+            print("  ⚠️  Не удалось прочитать историю отчетов, начинается новая.")
+            return cls(vault)
+        return history
+
+    def record(self, categories: dict, vault_path: Path, duplicates: list[DuplicateSet] = ()) -> bool:
+        """Добавляет текущий запуск, если состав категорий изменился; возвращает, добавлен ли он."""
+        members = {
+            key: sorted(self.paths.intern(path.relative_to(vault_path).as_posix()) for path in categories[key])
+            for key in REPORT_SECTIONS
+        }
+        loose_ends = categories["dead_ends_with_loose_ends"]
+        hasher = hashlib.sha256()
+        for file_path in sorted(loose_ends, key=str):
+            for broken in sorted(loose_ends[file_path]):
+                targets = "\0".join(relative_path for relative_path, _, _ in loose_ends[file_path][broken])
+                hasher.update(f"{file_path.relative_to(vault_path).as_posix()}\0{broken}\0{targets}\n".encode('utf-8'))
+        broken_digest = hasher.hexdigest()[:16]
+        hasher = hashlib.sha256()
+        for duplicate in duplicates:
+            hasher.update(("\0".join(duplicate.paths) + "\n").encode('utf-8'))
+        duplicates_digest = hasher.hexdigest()[:16]
+        if (self.runs and self.runs[-1]["members"] == members and self.runs[-1]["broken_digest"] == broken_digest
+                and self.runs[-1].get("duplicates_digest") == duplicates_digest):
+            return False
+
+        counts = {key: len(ids) for key, ids in members.items()}
+        counts["broken_links"] = sum(len(links) for links in loose_ends.values())
+        counts["duplicate_sets"] = len(duplicates)
+        self.runs.append({
+            "time": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "counts": counts,
+            "broken_digest": broken_digest,
+            "duplicates_digest": duplicates_digest,
+            "members": members,
+        })
+        del self.runs[:-HISTORY_MAX_RUNS]
+        return True
+
+    def membership(self, run_index: int) -> dict[str, set[str]]:
+        """Состав категорий запуска в виде множеств относительных путей."""
+        return {key: {self.paths[i] for i in ids} for key, ids in self.runs[run_index]["members"].items()}
+
+    def save(self, history_path: Path):
+        """Сохраняет историю, оставляя в таблице только пути, которые еще встречаются в запусках."""
+        used = sorted({i for run in self.runs for ids in run["members"].values() for i in ids})
+        remap = {old: new for new, old in enumerate(used)}
+        self.paths = PathInterner(self.paths[i] for i in used)
+        for run in self.runs:
+            run["members"] = {key: [remap[i] for i in ids] for key, ids in run["members"].items()}
+        data = {"version": HISTORY_VERSION, "vault": self.vault, "paths": self.paths.paths, "runs": self.runs}
+        tmp_path = history_path.with_name(history_path.name + ".tmp")
+        try:
+            with phase(PHASE_WRITE):
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, history_path)
+        except Exception as e:
+            print(f"  ⚠️  Не удалось сохранить историю отчетов: {e}")
+
+
+def _format_changes_section(history: OrphanHistory) -> list[str]:
+    """Раздел "что изменилось с прошлого отчета": новые и решенные файлы по категориям."""
+    if len(history.runs) < 2:
+        return ["## 🔄 С прошлого отчета\n\n", "Это первый отчет: сравнивать пока не с чем.\n\n"]
+    previous, current = history.membership(-2), history.membership(-1)
+    lines = [f"## 🔄 С прошлого отчета ({history.runs[-2]['time']})\n\n"]
+    for key, config in REPORT_SECTIONS.items():
+        added = sorted(current[key] - previous.get(key, set()))
+        resolved = sorted(previous.get(key, set()) - current[key])
+        if not added and not resolved:
+            continue
+        lines.append(f"**{config['title']}**: новых {len(added)}, решено {len(resolved)}\n\n")
+        for relative_path in added[:CHANGES_LIST_LIMIT]:
+            lines.append(f"- ➕ {_link_for_relative_path(relative_path)}\n")
+        for relative_path in resolved[:CHANGES_LIST_LIMIT]:
+            lines.append(f"- ✅ `{relative_path}`\n")
+        hidden = max(0, len(added) - CHANGES_LIST_LIMIT) + max(0, len(resolved) - CHANGES_LIST_LIMIT)
+        if hidden:
+            lines.append(f"- … и еще {hidden}\n")
+        lines.append("\n")
+    if len(lines) == 1:
+        lines.append("Состав категорий не изменился, изменились только оборванные ссылки или одинаковые вложения.\n\n")
+    return lines
+
+
+def _format_trend_table(history: OrphanHistory) -> list[str]:
+    """Таблица динамики: число файлов в категориях по последним изменениям отчета."""
+    lines = [
+        "## 📈 Динамика\n\n",
+        "| Дата | " + " | ".join(config['title'] for config in REPORT_SECTIONS.values()) + " | Оборванных ссылок |\n",
+        "|:---|" + "---:|" * (len(REPORT_SECTIONS) + 1) + "\n",
+    ]
+    for run in reversed(history.runs[-TREND_TABLE_ROWS:]):
+        counts = run["counts"]
+        cells = [str(counts.get(key, 0)) for key in REPORT_SECTIONS] + [str(counts.get("broken_links", 0))]
+        lines.append(f"| {run['time']} | " + " | ".join(cells) + " |\n")
+    lines.append("\n")
+    return lines
+
+
+def _generate_report(categories: dict, vault_path: Path, report_path: Path, history: OrphanHistory,
+                     duplicates: tuple[list[DuplicateSet], dict[str, list[str]]] = ([], {})):
     """Генерирует и сохраняет итоговый markdown-отчет."""
     total_found = sum(len(v) for v in categories.values())
+    duplicate_lines = _format_duplicates(*duplicates) if duplicates[0] else []
 
     # Если проблемных файлов нет, создаем чистый отчет и выходим.
     if total_found == 0:
@@ -431,10 +840,13 @@ def _generate_report(categories: dict, vault_path: Path, report_path: Path):
         report_lines = [
             "---\ntags:\n  - optimization\n  - cleanup\n---\n\n",
             "# Отчет о проблемных файлах\n\n",
-            f"✅ **Проблемных файлов не найдено.**\n\n_Отчет обновлен {time.strftime('%Y-%m-%d %H:%M:%S')}_"
+            f"✅ **Проблемных файлов не найдено.**\n\n_Отчет обновлен {time.strftime('%Y-%m-%d %H:%M:%S')}_\n\n"
         ]
+        report_lines.extend(_format_changes_section(history))
+        report_lines.extend(duplicate_lines)
+        report_lines.extend(_format_trend_table(history))
         try:
-            with open(report_path, 'w', encoding='utf-8') as f:
+            with phase(PHASE_WRITE), open(report_path, 'w', encoding='utf-8') as f:
                 f.writelines(report_lines)
             print(f"✅ Отчет обновлен, подтверждено отсутствие проблем: {report_path}")
         except Exception as e:
@@ -446,77 +858,189 @@ def _generate_report(categories: dict, vault_path: Path, report_path: Path):
         "---\ntags:\n  - optimization\n  - cleanup\n---\n\n",
         f"# Отчет о проблемных файлах ({total_found} шт.)\n\n"
     ]
+    report_lines.extend(_format_changes_section(history))
 
-    report_sections = {
-        "dead_ends_with_loose_ends": {
-            "title": "🕸️ Тупики с оборванными ссылками",
-            "description": "Файлы, на которые нет ссылок, и которые сами ссылаются на **несуществующие** файлы. **Требуют внимания в первую очередь.**",
-            "formatter": _format_dead_ends_with_loose_ends
-        },
-        "dead_ends": {
-            "title": "🛑 Тупики",
-            "description": "Файлы, на которые нет ссылок, но которые сами ссылаются на **существующие** файлы. На эти файлы невозможно попасть по ссылкам.",
-            "formatter": _generate_table_for_category
-        },
-        "absolute_orphans": {
-            "title": "🗑️ Абсолютные сироты",
-            "description": "Файлы, у которых нет ни входящих, ни исходящих ссылок.",
-            "formatter": _generate_table_for_category
-        }
-    }
-
-    for key, config in report_sections.items():
+    for key, config in REPORT_SECTIONS.items():
         items = categories.get(key)
         if items:
             report_lines.append(f"## {config['title']} ({len(items)} шт.)\n\n")
             report_lines.append(f"{config['description']}\n\n")
             report_lines.extend(config['formatter'](items, vault_path))
 
+    report_lines.extend(duplicate_lines)
+    report_lines.extend(_format_trend_table(history))
+
     try:
-        with open(report_path, 'w', encoding='utf-8') as f:
+        with phase(PHASE_WRITE), open(report_path, 'w', encoding='utf-8') as f:
             f.writelines(report_lines)
         print(f"\n✅ Отчет успешно сохранен в: {report_path}")
     except Exception as e:
         print(f"❌ Критическая ошибка при записи файла отчета: {e}")
 
+def _read_chosen_fixes(report_path: Path, vault_path: Path) -> dict[Path, dict[str, Path]]:
+    """Отмеченные в отчете подсказки: заметка → {оборванная ссылка: выбранный файл}."""
+    fixes = collections.defaultdict(dict)
+    source = broken = None
+    with open(report_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if match := REPORT_SOURCE_RE.match(line):
+                source, broken = _path_for_link(match.group(1), vault_path), None
+            elif match := REPORT_BROKEN_RE.match(line):
+                broken = match.group(1)
+            elif (match := REPORT_CHOICE_RE.match(line)) and source is not None and broken is not None:
+                # Из нескольких отмеченных подсказок побеждает первая
+                fixes[source].setdefault(broken, _path_for_link(match.group(1), vault_path))
+            elif line.startswith('#'):
+                source = broken = None
+    return fixes
+
+def _path_for_link(link_text: str, vault_path: Path) -> Path:
+    """Путь файла по ссылке отчета ([[папка/заметка]] — это заметка 'папка/заметка.md')."""
+    note_path = vault_path / f"{link_text}.md"
+    return note_path if note_path.is_file() else vault_path / link_text
+
+def _rewrite_broken_links(content: str, source: Path, fixes: dict[str, Path]) -> tuple[str, int]:
+    """
+    Заменяет оборванные ссылки заметки (wiki и markdown) ссылками на выбранные файлы.
+    Алиасы и заголовки ([[ссылка#раздел|текст]]) сохраняются, код и комментарии не трогаются.
+    """
+    replaced = 0
+
+    def wiki_target(raw_link: str):
+        target = fixes.get(unquote(raw_link.strip()))
+        return None if target is None else _link_name(target.name)
+
+    def inline_target(raw_link: str):
+        target = fixes.get(unquote(raw_link.strip()))
+        return None if target is None else quote(Path(os.path.relpath(target, source.parent)).as_posix())
+
+    def rewrite(pattern: re.Pattern, text: str, new_target) -> str:
+        def substitute(match: re.Match) -> str:
+            nonlocal replaced
+            new_link = new_target(match.group(1))
+            if new_link is None:
+                return match.group(0)
+            replaced += 1
+            start, end = match.start(1) - match.start(), match.end(1) - match.start()
+            return match.group(0)[:start] + new_link + match.group(0)[end:]
+        return pattern.sub(substitute, text)
+
+    parts = []
+    position = 0
+    for protected in PROTECTED_RE.finditer(content):
+        text = content[position:protected.start()]
+        parts.append(rewrite(INLINE_RE, rewrite(WIKI_RE, text, wiki_target), inline_target))
+        parts.append(protected.group(0))
+        position = protected.end()
+    parts.append(rewrite(INLINE_RE, rewrite(WIKI_RE, content[position:], wiki_target), inline_target))
+    return "".join(parts), replaced
+
+def _apply_link_fixes(report_path: Path, vault_path: Path) -> int:
+    """Исправляет в заметках оборванные ссылки, подсказки к которым отмечены в отчете; возвращает число замен."""
+    if not report_path.exists():
+        return 0
+    print("🔄 Исправление оборванных ссылок по отмеченным подсказкам отчета...")
+    total = 0
+    for source, fixes in _read_chosen_fixes(report_path, vault_path).items():
+        missing = [broken for broken, target in fixes.items() if not target.is_file()]
+        for broken in missing:
+            print(f"  ⚠️  {source.name}: выбранный для '{broken}' файл {fixes.pop(broken).name} не найден, пропущено.")
+        if not fixes or not source.is_file():
+            continue
+        try:
+            with open(source, 'r', encoding='utf-8', newline='') as f:
+                content = f.read()
+            new_content, replaced = _rewrite_broken_links(content, source, fixes)
+            if replaced:
+                with phase(PHASE_WRITE):
+                    write_text_atomically(str(source), new_content, newline='')
+                print(f"  - {source.relative_to(vault_path).as_posix()}: исправлено ссылок: {replaced}")
+                total += replaced
+            else:
+                print(f"  ⚠️  {source.name}: отмеченные ссылки не найдены в тексте (ссылки в свойствах исправьте вручную).")
+        except Exception as e:
+            print(f"  ⚠️  Не удалось исправить ссылки в {source.name}: {e}")
+    count("links_fixed", total)
+    print(f"✅ Исправлено оборванных ссылок: {total}.")
+    return total
+
 def main():
     """Главная функция скрипта для поиска файлов-сирот."""
-    start_time = time.time()
     vault = Path(VAULT_PATH)
     if not vault.is_dir():
         print(f"❌ Ошибка: Указанный путь к хранилищу не существует или не является папкой: {VAULT_PATH}")
         return
 
-    if not yaml:
+    if not YAML_BACKEND:
         print("\n  ⚠️  Предупреждение: Библиотека PyYAML не найдена (команда для установки: pip install PyYAML).")
-        print("     Расширенный анализ ссылок в YAML-свойствах (например, 'banner') будет пропущен.\n")
-
-    # Шаг 1: Индексация файлов
-    print("🔄 Создание индекса файлов хранилища...")
-    file_index = build_file_index(vault, IGNORED_FOLDERS, CACHE_FILE_NAME, REPORT_FILE_NAME, IGNORE_ROOT_FILES)
-    all_files = list(file_index.values())
-    markdown_files = [f for f in all_files if f.suffix.lower() == '.md']
-    print(f"✅ Найдено {len(all_files)} файлов в хранилище ({len(markdown_files)} markdown).")
+        print("     Ссылки в YAML-свойствах (например, 'banner') будут найдены только в простых frontmatter.\n")
 
-    # Шаг 2: Анализ файлов с использованием кэша
     script_dir = Path(__file__).parent.resolve()
-    cache_path = script_dir / CACHE_FILE_NAME
-    cache = _load_cache(cache_path)
-    analysis_data, new_cache = _analyze_all_files(markdown_files, vault, file_index, cache)
-    _save_cache(cache_path, new_cache)
-
-    # Шаг 3: Построение графа ссылок
-    file_graph = _build_link_graph(all_files, analysis_data, vault)
-
-    # Шаг 4: Категоризация файлов
-    categories = _categorize_files(file_graph, REPORT_FILE_NAME)
-
-    # Шаг 5: Генерация отчета
     report_path = vault / REPORT_FILE_NAME
-    _generate_report(categories, vault, report_path)
-    
-    end_time = time.time()
-    print(f"⏱️  Время выполнения: {end_time - start_time:.2f} сек.")
+    with Telemetry("find_orphans", profile=PROFILE_MODE) as telemetry:
+        # Шаг 0: Исправления, выбранные в прошлом отчете (измененные заметки будут проанализированы заново)
+        if APPLY_LINK_FIXES:
+            with phase("link_fixes"):
+                _apply_link_fixes(report_path, vault)
+
+        # Шаг 1: Индексация файлов
+        print("🔄 Создание индекса файлов хранилища...")
+        with phase(PHASE_WALK):
+            file_index = build_file_index(vault, IGNORED_FOLDERS, CACHE_FILE_NAME, REPORT_FILE_NAME, IGNORE_ROOT_FILES)
+        all_files = list(file_index.values())
+        markdown_files = [f for f in all_files if f.suffix.lower() == '.md']
+        count("files", len(all_files))
+        count("markdown_files", len(markdown_files))
+        print(f"✅ Найдено {len(all_files)} файлов в хранилище ({len(markdown_files)} markdown).")
+
+        # Шаг 2: Анализ файлов с использованием кэша
+        cache_path = script_dir / CACHE_FILE_NAME
+        with phase("cache"):
+            cache = _load_cache(cache_path)
+        # Файлы баз (.base) анализируются вместе с заметками: их фильтры тоже дают "виртуальные" ссылки
+        analyzed_files = markdown_files + [f for f in all_files if f.suffix.lower() == '.base']
+        analysis_data, new_cache = _analyze_all_files(analyzed_files, vault, file_index, cache)
+        with phase("cache"):
+            _save_cache(cache_path, new_cache)
+
+        # Шаг 3: Построение графа ссылок
+        with phase(PHASE_GRAPH):
+            file_graph = _build_link_graph(all_files, analysis_data, vault)
+
+            # Шаг 4: Категоризация файлов
+            categories = _categorize_files(file_graph, vault, REPORT_FILE_NAME)
+
+        # Шаг 5: Подсказки к оборванным ссылкам (индекс имен строится, только если такие ссылки есть)
+        if categories["dead_ends_with_loose_ends"]:
+            with phase("suggestions"):
+                name_index = _build_name_index(all_files, analysis_data, vault) if SUGGESTIONS_PER_LINK > 0 else FuzzyIndex()
+                _suggest_link_targets(categories, name_index, SUGGESTIONS_PER_LINK)
+
+        # Шаг 6: Одинаковые вложения (читаются только файлы из групп одного размера)
+        duplicates = ([], {})
+        if FIND_DUPLICATES:
+            with phase("duplicates"):
+                duplicates = _find_duplicate_attachments(all_files, analysis_data, vault, script_dir / DUPLICATES_CACHE_FILE_NAME)
+
+        # Шаг 7: Сверка с историей и генерация отчета (только если что-то изменилось)
+        history_path = script_dir / HISTORY_FILE_NAME
+        with phase("history"):
+            history = OrphanHistory.load(history_path, str(vault.resolve()))
+            changed = history.record(categories, vault, duplicates[0])
+        write_report = changed or not report_path.exists()
+        count("report_written", int(write_report))
+        if write_report:
+            with phase(PHASE_REPORT):
+                _generate_report(categories, vault, report_path, history, duplicates)
+        else:
+            print("✅ Состав категорий не изменился с прошлого отчета — отчет не перезаписывается.")
+        if changed:
+            with phase("history"):
+                history.save(history_path)
+
+    print(f"⏱️  Время выполнения: {telemetry.wall_seconds:.2f} сек.")
+    telemetry.print_summary()
+    telemetry.write_json(str(script_dir / TELEMETRY_FILE_NAME))
 
 
 if __name__ == "__main__":
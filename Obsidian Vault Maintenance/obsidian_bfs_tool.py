@@ -1,11 +1,24 @@
 import os
 import re
+import sys
+import time
+import hashlib
 import collections
 import shutil
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import unquote, quote as url_quote
 
+# Общие модули (замеры, граф ссылок и т.д.) лежат в соседней папке 'Obsidian Vault Core'
+VAULT_CORE_DIR = Path(__file__).resolve().parent.parent / "Obsidian Vault Core"
+if str(VAULT_CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(VAULT_CORE_DIR))
+
+import vault_telemetry
+import vault_graph
+from vault_graph import GraphBuilder, GraphFileError, LinkGraph, read_graph_meta
+from vault_telemetry import Telemetry, phase, count, PHASE_WALK, PHASE_REGEX, PHASE_GRAPH, PHASE_REPORT, PHASE_WRITE
+
 # ================== CONFIGURATION ==================
 # Укажите АБСОЛЮТНЫЙ путь к вашему хранилищу Obsidian
 # Пример для Windows: "C:/Users/User/Documents/MyVault"
@@ -17,6 +30,17 @@ VAULT_PATH = "C:\Obsidian\dkosarevmusic"
 START_FILE_NAME = "DVFU.md"
 
 RESULTS_FILE_NAME = "BFS_report.md"
+
+# Замеры времени по фазам сохраняются в этот JSON (рядом со скриптом).
+TELEMETRY_FILE_NAME = "BFS_telemetry.json"
+# Профилирование: None (выкл.), "cpu", "memory" или "all".
+# Если None, используется переменная окружения OBSIDIAN_PROFILE.
+PROFILE_MODE = None
+
+# Карта ссылок сохраняется рядом со скриптом и переиспользуется, пока в хранилище
+# не изменился, не добавился и не удалился ни один файл.
+USE_GRAPH_CACHE = True
+GRAPH_CACHE_FILE_NAME = ".bfs_graph_cache.bin"
 # ===================================================
 
 # Регулярное выражение для поиска ссылок в формате [text](link.md)
@@ -28,10 +52,14 @@ def build_file_index(vault_path: Path) -> dict[str, Path]:
     """
     Создает индекс всех файлов в хранилище для быстрого разрешения ссылок.
     Ключ - имя файла (e.g., 'My Note.md'), значение - полный путь (Path object).
+    Собственный отчет скрипта (RESULTS_FILE_NAME в корне хранилища) в индекс не попадает:
+    ссылки на него не разрешаются, и граф не зависит от того, создан ли уже отчет.
     """
     index = {}
     for root, _, files in os.walk(vault_path):
         for file in files:
+            if file == RESULTS_FILE_NAME and os.path.samefile(root, vault_path):
+                continue
             # Используем normcase для регистронезависимого сравнения на Windows
             index[os.path.normcase(file)] = Path(root) / file
     return index
@@ -112,9 +140,9 @@ def parse_file_links(file_path: Path, file_index: dict[str, Path]) -> dict[str,
     """
     results = {'frontmatter': set(), 'body': set()}
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = vault_telemetry.read_text(file_path)
     except (IOError, UnicodeDecodeError):
+        count("read_errors")
         return results
 
     frontmatter = ""
@@ -128,70 +156,132 @@ def parse_file_links(file_path: Path, file_index: dict[str, Path]) -> dict[str,
     else:
         body = content
 
-    if frontmatter:
-        results['frontmatter'] = _parse_links_from_text(frontmatter, file_path.parent, file_index)
-    if body:
-        results['body'] = _parse_links_from_text(body, file_path.parent, file_index)
+    with phase(PHASE_REGEX):
+        if frontmatter:
+            results['frontmatter'] = _parse_links_from_text(frontmatter, file_path.parent, file_index)
+        if body:
+            results['body'] = _parse_links_from_text(body, file_path.parent, file_index)
         
     return results
 
-def build_link_maps(vault_path: Path, file_index: dict[str, Path]) -> tuple[dict, dict]:
+def _vault_signature(vault_path: Path) -> str:
+    """
+    Отпечаток состояния хранилища: пути, время изменения и размеры всех файлов, а также
+    код скрипта и графа. Разрешение ссылок зависит от наличия других файлов, поэтому
+    учитываются все файлы, а не только markdown. Собственный отчет скрипта (RESULTS_FILE_NAME
+    в корне хранилища) перезаписывается при каждом запуске и в граф не входит, поэтому не учитывается.
+    """
+    hasher = hashlib.sha256(str(vault_path.resolve()).encode('utf-8'))
+    for source_path in (__file__, vault_graph.__file__):
+        with open(source_path, 'rb') as f:
+            hasher.update(f.read())
+    entries = []
+    for root, dirs, files in os.walk(vault_path):
+        dirs.sort()
+        for file in files:
+            if file == RESULTS_FILE_NAME and os.path.samefile(root, vault_path):
+                continue
+            try:
+                stat = os.stat(os.path.join(root, file))
+            except OSError:
+                continue
+            entries.append(f"{os.path.relpath(os.path.join(root, file), vault_path)}\0{stat.st_mtime_ns}\0{stat.st_size}")
+    hasher.update("\n".join(sorted(entries)).encode('utf-8'))
+    return hasher.hexdigest()
+
+def build_link_graph(vault_path: Path, file_index: dict[str, Path], signature: str = "") -> LinkGraph:
     """
-    Сканирует хранилище один раз для построения двух карт:
-    1. forward_graph: {source_file: {'body': {links}, 'frontmatter': {links}}}
-    2. backlinks_map (только для frontmatter): {target_file: {sources}}
+    Сканирует хранилище один раз и строит граф обхода (vault_graph, узлы — абсолютные пути):
+    1. ссылка из ТЕЛА файла source на target дает ребро source -> target;
+    2. ссылка из FRONTMATTER файла source на target дает обратное ребро target -> source
+       (от target обход переходит к файлам, которые ссылаются на него из frontmatter).
+    Ссылки из собственного отчета скрипта в граф не попадают.
     """
     print("🔄 Сканирование хранилища и построение карты ссылок...")
-    forward_graph = {}
-    backlinks_map = collections.defaultdict(set)
-    all_md_files = list(vault_path.rglob('*.md'))
-    
+    builder = GraphBuilder()
+    with phase(PHASE_WALK):
+        report_path = vault_path / RESULTS_FILE_NAME
+        all_md_files = [path for path in vault_path.rglob('*.md') if path != report_path]
+    count("markdown_files", len(all_md_files))
+    telemetry = vault_telemetry.active()
+
     for i, source_path in enumerate(all_md_files):
         if (i + 1) % 500 == 0 or i + 1 == len(all_md_files):
             print(f"  - Просканировано {i+1}/{len(all_md_files)} файлов...")
         
+        file_started = time.perf_counter()
         all_links = parse_file_links(source_path, file_index)
-        forward_graph[source_path.resolve()] = all_links
-        
-        for target_path in all_links.get('frontmatter', set()):
-            backlinks_map[target_path.resolve()].add(source_path.resolve())
-    print(f"✅ Карта ссылок создана. Обработано {len(forward_graph)} файлов.")
-    return forward_graph, backlinks_map
+        if telemetry is not None:
+            telemetry.record_file(source_path.relative_to(vault_path).as_posix(), time.perf_counter() - file_started)
+
+        with phase(PHASE_GRAPH):
+            source = builder.add_node(str(source_path.resolve()))
+            for target_path in all_links['body']:
+                builder.add_edge(source, builder.add_node(str(target_path.resolve())))
+            for target_path in all_links['frontmatter']:
+                builder.add_edge(builder.add_node(str(target_path.resolve())), source)
+    with phase(PHASE_GRAPH):
+        graph = builder.build(meta={"signature": signature})
+    print(f"✅ Карта ссылок создана. Обработано {len(all_md_files)} файлов ({graph.edge_count} связей).")
+    return graph
+
+def load_or_build_link_graph(vault_path: Path, file_index: dict[str, Path], cache_path: Path | None) -> LinkGraph:
+    """Берет сохраненный граф, если хранилище не менялось с его построения, иначе строит и сохраняет новый."""
+    if cache_path is None:
+        return build_link_graph(vault_path, file_index)
+    with phase(PHASE_WALK):
+        signature = _vault_signature(vault_path)
+    meta = read_graph_meta(str(cache_path))
+    if meta and meta.get("signature") == signature:
+        try:
+            graph = LinkGraph.load(str(cache_path))
+            count("graph_cache_hits")
+            print(f"✅ Карта ссылок загружена из кэша ({graph.node_count} файлов, {graph.edge_count} связей).")
+            return graph
+        except (OSError, ValueError, GraphFileError) as e:
+            print(f"  ⚠️  Не удалось прочитать кэш карты ссылок, она будет построена заново: {e}")
+    graph = build_link_graph(vault_path, file_index, signature)
+    try:
+        with phase(PHASE_WRITE):
+            graph.save(str(cache_path))
+    except OSError as e:
+        print(f"  ⚠️  Не удалось сохранить кэш карты ссылок: {e}")
+    return graph
 
-def perform_bfs(start_file_path: Path, vault: Path, forward_graph: dict, backlinks_map: dict) -> tuple[dict, list]:
+def perform_bfs(start_file_path: Path, vault: Path, graph: LinkGraph) -> tuple[dict, list]:
     """
     Выполняет обход в ширину (BFS) от стартового файла.
     Возвращает словарь посещенных файлов (path -> level) и список ошибок.
     """
     print(f"🚀 Начинаем обход в ширину (BFS) от '{start_file_path.name}'...")
-    queue = collections.deque([(start_file_path, 0, None)]) # path, level, parent_path
-    visited = {}  # path -> {'level': level, 'parent': parent_path}
-    errors = []
-    
-    while queue:
-        current_path, level, parent_path = queue.popleft()
-        current_path = current_path.resolve()
-        if current_path in visited:
-            continue
-        
-        visited[current_path] = {'level': level, 'parent': parent_path}
-        print(f"  - Обработка ({len(visited)}): {current_path.relative_to(vault)}")
-
-        # 1. Ищем ИСХОДЯЩИЕ ссылки из ТЕЛА (из пред-построенной карты)
-        file_links = forward_graph.get(current_path.resolve(), {})
-        out_links_from_body = file_links.get("body", set())
-        for link in out_links_from_body:
-            if link.resolve() not in visited:
-                queue.append((link, level + 1, current_path))
-        
-        # 2. Ищем ВХОДЯЩИЕ ссылки из FRONTMATTER'а других файлов
-        in_links_from_frontmatter = backlinks_map.get(current_path.resolve(), set())
-        for link_source in in_links_from_frontmatter:
-            if link_source.resolve() not in visited:
-                queue.append((link_source, level + 1, current_path))
+    start_path = start_file_path.resolve()
+    start = graph.node_id(str(start_path))
+    if start is None:
+        # Стартовый файл не участвует ни в одной связи
+        print(f"  - Обработка (1): {start_path.relative_to(vault)}")
+        print("\n✅ Обход завершен. Найдено 1 связанных файлов.")
+        return {start_path: {'level': 0, 'parent': None}}, []
+
+    queue = collections.deque([start])
+    # Узел помечается при постановке в очередь: первый, кто его нашел, и есть родитель
+    found = {start: (0, None)}  # узел -> (уровень, узел-родитель)
+    paths = graph.paths
 
+    while queue:
+        current = queue.popleft()
+        level = found[current][0]
+        print(f"  - Обработка ({len(found) - len(queue)}): {Path(paths[current]).relative_to(vault)}")
+        for neighbor in graph.successors(current):
+            if neighbor not in found:
+                found[neighbor] = (level + 1, current)
+                queue.append(neighbor)
+
+    visited = {
+        Path(paths[node]): {'level': level, 'parent': Path(paths[parent]) if parent is not None else None}
+        for node, (level, parent) in found.items()
+    }
     print(f"\n✅ Обход завершен. Найдено {len(visited)} связанных файлов.")
-    return visited, errors
+    return visited, []
 
 
 def _create_obsidian_link(file_path: Path, vault: Path) -> str:
@@ -325,10 +415,30 @@ def main(mode: str):
         print(f"❌ Ошибка: Указанный путь к хранилищу не существует или не является папкой: {VAULT_PATH}")
         return
 
+    script_dir = Path(__file__).parent.resolve()
+    with Telemetry("obsidian_bfs_tool", profile=PROFILE_MODE) as telemetry:
+        _run(mode, vault)
+    telemetry.print_summary()
+    telemetry.write_json(str(script_dir / TELEMETRY_FILE_NAME))
+
+
+def _run(mode: str, vault: Path):
+    """Индексация, обход и отчет (выполняется под замерами main)."""
     print("🔄 Создание индекса файлов хранилища...")
-    file_index = build_file_index(vault)
-    forward_graph, backlinks_map = build_link_maps(vault, file_index)
-    
+    with phase(PHASE_WALK):
+        file_index = build_file_index(vault)
+    count("files", len(file_index))
+    cache_path = Path(__file__).parent.resolve() / GRAPH_CACHE_FILE_NAME if USE_GRAPH_CACHE else None
+    graph = load_or_build_link_graph(vault, file_index, cache_path)
+    try:
+        _traverse_and_report(mode, vault, file_index, graph)
+    finally:
+        # Загруженный из кэша граф держит файл отображенным в память
+        graph.close()
+
+
+def _traverse_and_report(mode: str, vault: Path, file_index: dict[str, Path], graph: LinkGraph):
+    """Обход от стартового файла и запись отчета (или архивация)."""
     start_file_path = find_file_in_vault(file_index, START_FILE_NAME)
     if not start_file_path:
         print(f"❌ Ошибка: Стартовый файл '{START_FILE_NAME}' не найден в хранилище '{VAULT_PATH}'.")
@@ -336,7 +446,9 @@ def main(mode: str):
         return
 
     # 1. Выполняем поиск файлов
-    visited, errors = perform_bfs(start_file_path, vault, forward_graph, backlinks_map)
+    with phase(PHASE_GRAPH):
+        visited, errors = perform_bfs(start_file_path, vault, graph)
+    count("visited", len(visited))
 
     # 2. Группируем найденные файлы по уровням вложенности и родителям
     levels = collections.defaultdict(lambda: collections.defaultdict(list))
@@ -363,12 +475,15 @@ def main(mode: str):
 
             # Выполняем действие в зависимости от режима
             if mode == 'report':
-                report_body = generate_report_body(levels, vault)
-                handle_report_mode(f, report_body)
+                with phase(PHASE_REPORT):
+                    report_body = generate_report_body(levels, vault)
+                with phase(PHASE_WRITE):
+                    handle_report_mode(f, report_body)
             elif mode == 'archive':
                 # В режиме архивации, функция сама запишет и краткий отчет в f,
                 # и подробный лог в папку архива.
-                handle_archive_mode(f, visited, levels, vault, START_FILE_NAME)
+                with phase("archive"):
+                    handle_archive_mode(f, visited, levels, vault, START_FILE_NAME)
 
             # Записываем ошибки, если они были
             if errors: